@@ -17,6 +17,33 @@ class AppConfig(BaseModel):
     # ModelName: Optional[str] = Field("yolo", title="模型的名称,默认是yolo.onnx")
     OcrInterval: float = Field(0.5, title="OCR间隔时间", ge=0)
     GameMonitorTime: int = Field(5, title="游戏窗口检测间隔时间")
+    FrameBusEnabled: bool = Field(True, title="刷boss时战斗线程与主循环共用截图帧，减少重复截图")
+    FrameBusInterval: float = Field(0.03, title="帧总线两次截图的最小间隔时间", ge=0)
+    FrameMaxAge: float = Field(0.04, title="共享帧最大可复用时间，超过则重新截图", ge=0)
+    FrameServerEnabled: bool = Field(False, title="刷boss与自动拾取同时运行时由截图服务进程统一截图，通过共享内存读取")
+    FrameServerSlots: int = Field(8, title="截图服务共享内存的帧槽位数", ge=2)
+    FrameServerZeroCopy: bool = Field(False, title="直接读取共享内存中的帧不复制，帧在之后槽位数-1次截图内有效")
+    OcrRoiEnabled: bool = Field(True, title="待匹配页面的文本都限定了区域时，只OCR这些区域")
+    OcrGateEnabled: bool = Field(True, title="刷boss主循环画面无变化时复用OCR结果，局部变化时只识别变化区域")
+    OcrGateGrid: int = Field(8, title="OCR门控网格行列数", ge=1)
+    OcrGatePixelThreshold: float = Field(12.0, title="OCR门控格子变化阈值，缩略图最大灰度差，0~255", ge=0)
+    OcrGateFullRatio: float = Field(0.5, title="变化区域占比达到该值时整图OCR", ge=0, le=1)
+    OcrGateFullInterval: int = Field(30, title="连续复用或局部OCR的最大次数，达到后强制整图OCR，0为不强制", ge=0)
+    PickupPromptGateEnabled: bool = Field(True, title="自动拾取先检测交互提示，没有提示时不OCR，提示不变时复用识别结果")
+    OrtIntraOpThreads: int = Field(0, title="ONNX Runtime单个算子并行线程数，OCR与YOLO共用，0为默认（全部物理核心）", ge=0)
+    OrtInterOpThreads: int = Field(0, title="ONNX Runtime算子间并行线程数，仅并行执行模式有效，0为默认", ge=0)
+    OrtParallelExecution: bool = Field(False, title="YOLO模型使用ONNX Runtime并行执行模式，默认顺序执行")
+    OrtPreloadBossModels: bool = Field(True, title="启动后在后台加载所有boss模型，切换boss时无需重新加载")
+    OrtSessionCacheMB: int = Field(0, title="YOLO模型会话缓存的估算内存上限MB，超过时淘汰最久未使用的，0为不限制", ge=0)
+    InputTimerMode: str = Field(
+        "hybrid", title="按键按压与连招等待的计时模式：sleep 省CPU，hybrid 睡眠后忙等，spin 全程忙等最精确",
+        pattern="^(sleep|hybrid|spin)$")
+    InputTimerSpinMs: float = Field(2.0, title="hybrid计时模式下截止时间前忙等的毫秒数", ge=0)
+    InputDispatchAsync: bool = Field(False, title="战斗按键由后台分发线程按时间发送，调用方不再阻塞等待按压时间")
+    TaskWarmStandby: bool = Field(False, title="任务运行时预热一个备用进程，任务异常退出后由其直接接替，无需重新加载模型")
+    MetricsSnapshotInterval: float = Field(10.0, title="任务进程写入耗时统计快照的间隔，秒，0为不写入", ge=0)
+    TraceEnabled: bool = Field(False, title="记录任务主循环各阶段耗时，异常时或按需导出为Chrome追踪文件")
+    TraceBufferSize: int = Field(20000, title="每个任务进程最多保留的追踪记录数", ge=100)
     # project_root: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     # LogFilePath: Optional[str] = Field(None, title="日志文件路径")
 
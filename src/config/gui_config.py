@@ -5,7 +5,6 @@ from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict
 
 from src.core.boss import BossNameEnum
-from src.util import winreg_util
 
 logger = logging.getLogger(__name__)
 
@@ -83,6 +82,7 @@ class ParamConfig(BaseModel):
 
     @classmethod
     def get_default_game_path(cls):
+        from src.util import winreg_util
         return winreg_util.get_install_path()
 
     def get_boss_name_list(self):
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 
-from src.util.keymouse_util import KEYBOARD_VK_MAPPING
+from src.util.vk_util import KEYBOARD_VK_MAPPING
 
 
 class KeyboardMappingConfig(BaseModel):
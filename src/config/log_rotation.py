@@ -0,0 +1,241 @@
+import gzip
+import logging
+import os
+import shutil
+import threading
+import time
+from datetime import date, datetime
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+class InterProcessLock:
+    """
+    基于文件锁的跨进程互斥锁，同一进程内的多个线程也互斥。
+    锁文件保持打开，每次加锁只锁定第一个字节
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._thread_lock = threading.Lock()
+        self._file = None
+
+    def acquire(self):
+        self._thread_lock.acquire()
+        try:
+            if self._file is None:
+                self._file = open(self.path, "a+b")
+            if os.name == "nt":
+                import msvcrt
+                self._file.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:  # LK_LOCK 重试约10秒后仍未获得锁
+                        continue
+            else:
+                import fcntl
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        except BaseException:
+            self._thread_lock.release()
+            raise
+
+    def release(self):
+        try:
+            if os.name == "nt":
+                import msvcrt
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        finally:
+            self._thread_lock.release()
+
+    def close(self):
+        with self._thread_lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+
+class LogRotator:
+    """
+    多进程共用一个日志文件时的滚动：各进程写入前持有跨进程锁，检查文件大小与日期，需要时重命名为
+    <日志名>.<时间>，写入后即关闭文件，不会有进程持有被重命名的文件（Windows 下打开的文件无法重命名）。
+    滚动后的文件由后台线程压缩为 .gz，并按修改时间删除最早的归档，使日志目录不超过总大小
+    """
+
+    # 压缩中断留下的 .gz 超过该秒数未修改视为无效，重新压缩
+    STALE_SECONDS = 60.0
+
+    def __init__(self, filename: str | Path, max_bytes: int = 0, daily: bool = False, max_total_bytes: int = 0,
+                 compress: bool = True):
+        """
+        :param max_bytes: 单个日志文件的最大字节数，0为不按大小滚动
+        :param daily: 是否每天滚动，按文件最后写入的日期判断
+        :param max_total_bytes: 日志目录的总大小上限，0为不限制，只删除归档，不删除正在写入的日志
+        :param compress: 是否压缩滚动后的文件
+        """
+        self.path = Path(filename).absolute()
+        self.max_bytes = max_bytes
+        self.daily = daily
+        self.max_total_bytes = max_total_bytes
+        self.compress = compress
+        self.lock = InterProcessLock(self.path.with_name(self.path.name + ".lock"))
+        self._thread: threading.Thread | None = None
+        self._thread_lock = threading.Lock()
+        self._pending = False
+
+    def should_rotate(self) -> bool:
+        """ 需持有锁 """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        if stat.st_size == 0:
+            return False
+        if self.max_bytes and stat.st_size >= self.max_bytes:
+            return True
+        if self.daily and date.fromtimestamp(stat.st_mtime) != date.today():
+            return True
+        return False
+
+    def rotate(self) -> Path | None:
+        """ 重命名当前日志文件，需持有锁，返回滚动后的文件 """
+        backup_name = f"{self.path.name}.{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+        backup_path = self.path.with_name(backup_name)
+        count = 1
+        while backup_path.exists() or backup_path.with_name(backup_path.name + ".gz").exists():
+            backup_path = self.path.with_name(f"{backup_name}.{count}")
+            count += 1
+        try:
+            self.path.rename(backup_path)
+        except FileNotFoundError:
+            return None
+        except OSError as e:  # 仍被未加锁的进程打开
+            logger.warning("日志滚动失败: %s", e)
+            return None
+        return backup_path
+
+    def rotate_if_needed(self) -> Path | None:
+        """ 需持有锁，滚动后在后台压缩并清理 """
+        if not self.should_rotate():
+            return None
+        backup_path = self.rotate()
+        if backup_path is not None:
+            self.schedule_maintenance()
+        return backup_path
+
+    def write(self, data: str, encoding: str | None = None, errors: str | None = None):
+        """ 加锁后检查滚动，再追加写入，写完即关闭 """
+        with self.lock:
+            self.rotate_if_needed()
+            with open(self.path, "a", encoding=encoding, errors=errors) as f:
+                f.write(data)
+
+    def archives(self) -> list[Path]:
+        """ 本日志滚动后的文件，含已压缩的 """
+        prefix = self.path.name + "."
+        return [i for i in self.path.parent.glob(prefix + "*")
+                if i.is_file() and not i.name.endswith(".lock")]
+
+    def compress_file(self, path: Path) -> Path | None:
+        """ 压缩为 .gz 并删除原文件，保留原修改时间；已有其他进程在压缩时跳过 """
+        target = path.with_name(path.name + ".gz")
+        try:
+            if target.exists():
+                if time.time() - target.stat().st_mtime < self.STALE_SECONDS:
+                    return None
+                target.unlink()
+            stat = path.stat()
+            with open(path, "rb") as src, open(target, "xb") as raw, \
+                    gzip.GzipFile(filename=path.name, fileobj=raw, mode="wb") as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+            os.utime(target, (stat.st_atime, stat.st_mtime))
+            path.unlink()
+        except (FileExistsError, FileNotFoundError):  # 其他进程正在压缩或已压缩完成
+            return None
+        except OSError as e:
+            logger.warning("日志压缩失败: %s, %s", path, e)
+            return None
+        return target
+
+    def enforce_budget(self) -> list[Path]:
+        """ 日志目录超过总大小时，从最早的归档开始删除，返回删除的文件 """
+        if not self.max_total_bytes:
+            return []
+        files = []
+        total = 0
+        for path in self.path.parent.iterdir():
+            try:
+                if not path.is_file():
+                    continue
+                stat = path.stat()
+            except OSError:
+                continue
+            total += stat.st_size
+            files.append((stat.st_mtime, stat.st_size, path))
+        removed = []
+        archives = set(self.archives())
+        for _, size, path in sorted(files):
+            if total <= self.max_total_bytes:
+                break
+            if path not in archives or (self.compress and not path.name.endswith(".gz")):
+                continue  # 只删除压缩完成的归档
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning("删除日志归档失败: %s, %s", path, e)
+                continue
+            total -= size
+            removed.append(path)
+        return removed
+
+    def maintain(self):
+        """ 压缩未压缩的归档（包括之前中断的），再按总大小清理 """
+        if self.compress:
+            for path in self.archives():
+                if not path.name.endswith(".gz"):
+                    self.compress_file(path)
+        self.enforce_budget()
+
+    def schedule_maintenance(self):
+        """ 在后台线程压缩与清理，线程运行中时标记为再运行一次 """
+        with self._thread_lock:
+            self._pending = True
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="LogRotationThread", daemon=True)
+            self._thread.start()
+
+    def join(self, timeout: float | None = None):
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _run(self):
+        while True:
+            with self._thread_lock:
+                if not self._pending:
+                    self._thread = None
+                    return
+                self._pending = False
+            try:
+                self.maintain()
+            except Exception:
+                logger.exception("日志归档处理异常")
+
+    def close(self):
+        self.lock.close()
@@ -1,14 +1,18 @@
+import atexit
 import logging.config
 import multiprocessing
 import os
 import pprint
 import queue
 import re
-from datetime import datetime
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 
 from colorlog import ColoredFormatter
 
+from src.config.log_rotation import LogRotator
 from src.core import environs
 from src.util import file_util
 
@@ -17,6 +21,19 @@ logger = logging.getLogger(__name__)
 RE_CUSTOM_LINENO = re.compile(r'%\(customLineno\)-(\d+)s')
 
 
+def _get_custom_lineno_width(formatter: logging.Formatter) -> int | None:
+    """ 格式中 customLineno 占位符的宽度，每个 formatter 只解析一次 """
+    try:
+        return formatter._custom_lineno_width  # noqa
+    except AttributeError:
+        pass
+    # noinspection PyProtectedMember
+    match = RE_CUSTOM_LINENO.search(formatter._style._fmt)  # 提取占位符中的数字
+    width = int(match.group(1)) if match else None
+    formatter._custom_lineno_width = width
+    return width
+
+
 def _custom_logging_format(formatter: logging.Formatter, record: logging.LogRecord):
     """
     动态添加 customLineno 字段，由三个变量（filename:funcName:lineno）拼接而成，函数名过长会截短用省略号表示
@@ -24,13 +41,11 @@ def _custom_logging_format(formatter: logging.Formatter, record: logging.LogReco
     :param record:
     :return:
     """
-    # noinspection PyProtectedMember
-    match = RE_CUSTOM_LINENO.search(formatter._style._fmt)  # 提取占位符中的数字
     # TODO filename再短些，将中间一段字符缩减为三个点表示
     custom_filename = os.path.splitext(record.filename)[0]
     custom_func_name = record.funcName
-    if match:
-        width = int(match.group(1))
+    width = _get_custom_lineno_width(formatter)
+    if width is not None:
         max_fun_name_len = width - 2 - len(str(custom_filename)) - len(str(record.lineno))
         if 4 < max_fun_name_len < len(record.funcName):
             custom_func_name = f"{record.funcName[:max_fun_name_len - 4]}...{record.funcName[-1]}"
@@ -57,28 +72,167 @@ def get_log_queue():
 
 
 class QueueFileHandler(logging.FileHandler):
+    """
+    日志文件批量写入：格式化后先缓存，达到时间间隔、缓存大小或遇到 WARNING 以上级别时一次写入并 flush，
+    多个进程追加同一文件时每次写入都是完整的行。
+    配置了滚动时，每次写入都持有跨进程锁、写完即关闭文件，由写入时发现需要滚动的进程负责滚动
+    """
     LOG_QUEUE = None
+    FLUSH_INTERVAL = 0.5  # 秒
+    FLUSH_BYTES = 64 * 1024
+
+    def __init__(self, filename, mode='a', encoding=None, delay=False, errors=None, max_bytes: int = 0,
+                 daily: bool = False, max_total_bytes: int = 0):
+        """
+        :param max_bytes: 日志文件超过该字节数时滚动，0为不按大小滚动
+        :param daily: 是否每天滚动
+        :param max_total_bytes: 日志目录总大小上限，超出后删除最早的归档，0为不限制
+        """
+        self.rotator: LogRotator | None = None
+        if max_bytes or daily or max_total_bytes:
+            self.rotator = LogRotator(filename, max_bytes, daily, max_total_bytes)
+            delay = True  # 不持有文件，否则其他进程无法重命名
+        super().__init__(filename, mode, encoding, delay, errors)
+        self._pending: list[str] = []
+        self._pending_size = 0
+        self._last_flush = time.monotonic()
 
     def emit(self, record):
-        if self.stream is None:
-            if self.mode != 'w' or not self._closed:
-                self.stream = self._open()
-        if self.stream:
+        try:
+            msg = self.format(record)
+            self._pending.append(msg + self.terminator)
+            self._pending_size += len(msg) + 1
+            if (record.levelno >= logging.WARNING or self._pending_size >= self.FLUSH_BYTES
+                    or time.monotonic() - self._last_flush >= self.FLUSH_INTERVAL):
+                self.flush()
+            if self.LOG_QUEUE is not None:  # 启动时日志未初始化，若写入了日志，则跳过
+                emit_msg = (record.levelname, msg)
+                self.LOG_QUEUE.put(emit_msg, block=False)
+        except RecursionError:  # See issue 36272
+            raise
+        except queue.Full:
+            pass  # 日志队列满了忽略
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        """ 写入缓存的日志 """
+        with self.lock:
+            self._last_flush = time.monotonic()
+            if self._pending:
+                if self.rotator is not None:
+                    self.rotator.write("".join(self._pending), self.encoding, self.errors)
+                else:
+                    if self.stream is None:
+                        if self.mode != 'w' or not self._closed:
+                            self.stream = self._open()
+                    if self.stream:
+                        # issue 35046: 一次写入
+                        self.stream.write("".join(self._pending))
+                self._pending.clear()
+                self._pending_size = 0
+            if self.stream and hasattr(self.stream, "flush"):
+                self.stream.flush()
+
+    def close(self):
+        with self.lock:
             try:
-                msg = self.format(record)
-                stream = self.stream
-                # issue 35046: merged two stream.writes into one.
-                stream.write(msg + self.terminator)
                 self.flush()
-                if self.LOG_QUEUE is not None: # 启动时日志未初始化，若写入了日志，则跳过
-                    emit_msg = (record.levelname, msg)
-                    self.LOG_QUEUE.put(emit_msg, block=False)
-            except RecursionError:  # See issue 36272
-                raise
-            except queue.Full:
-                pass  # 日志队列满了忽略
             except Exception:
-                self.handleError(record)
+                pass
+            super().close()
+            if self.rotator is not None:
+                self.rotator.join(2.0)  # 等待压缩完成
+                self.rotator.close()
+
+
+class LightQueueHandler(QueueHandler):
+    """
+    只在调用线程合并日志参数，格式化交给监听线程。
+    队列只在进程内使用，记录无需复制与序列化，异常信息也留给监听线程格式化
+    """
+
+    def prepare(self, record):
+        if record.args:
+            record.msg = record.getMessage()  # 参数可能在之后被修改
+            record.args = None
+        return record
+
+
+class BatchQueueListener(QueueListener):
+    """
+    日志监听线程：业务线程只把日志记录放入队列，由该线程批量取出交给各 handler 格式化、写入，
+    空闲时按间隔 flush，避免日志缓存在 handler 中迟迟不写入
+    """
+
+    def __init__(self, log_queue, *handlers, respect_handler_level: bool = True, flush_interval: float = 0.5,
+                 max_batch: int = 1000):
+        super().__init__(log_queue, *handlers, respect_handler_level=respect_handler_level)
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+
+    def _flush(self):
+        for handler in self.handlers:
+            try:
+                handler.flush()
+            except Exception:
+                pass
+
+    def _monitor(self):
+        log_queue = self.queue
+        while True:
+            try:
+                batch = [log_queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                self._flush()
+                continue
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(log_queue.get_nowait())
+                except queue.Empty:
+                    break
+            for record in batch:
+                if record is self._sentinel:
+                    self._flush()
+                    return
+                self.handle(record)
+
+
+# 当前进程的日志监听线程
+_listener: BatchQueueListener | None = None
+_listener_lock = threading.Lock()
+
+
+def _start_listener(dict_config: dict):
+    """ 已配置的 logger 改为只向队列写入日志，原 handler 由监听线程调用 """
+    global _listener
+    loggers = [logging.getLogger()] + [logging.getLogger(name) for name in dict_config.get("loggers", {})]
+    handlers = []
+    for config_logger in loggers:
+        for handler in config_logger.handlers:
+            if handler not in handlers:
+                handlers.append(handler)
+    log_queue = queue.SimpleQueue()
+    queue_handler = LightQueueHandler(log_queue)
+    for config_logger in loggers:
+        for handler in list(config_logger.handlers):
+            config_logger.removeHandler(handler)
+        config_logger.addHandler(queue_handler)
+    with _listener_lock:
+        _listener = BatchQueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+
+
+def stop_log_listener():
+    """ 停止日志监听线程，处理完队列中的日志并写入文件 """
+    global _listener
+    with _listener_lock:
+        listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
+
+
+atexit.register(stop_log_listener)
 
 
 def rotate_log(max_size=5 * 1024 * 1024, is_test: bool = False):
@@ -96,23 +250,18 @@ def rotate_log(max_size=5 * 1024 * 1024, is_test: bool = False):
         return log_file
     log_path = Path(log_file)
     if not log_path.exists():
+        log_path.parent.mkdir(parents=True, exist_ok=True)
         log_path.touch(exist_ok=True)
         return log_file
-    # 滚动日志，防止单文件过大
-    if log_path.stat().st_size > max_size:
-        backup_name = f"{log_file}.{datetime.now().strftime("%Y%m%d")}"
-        backup_name_new = backup_name
-        count = 1
-        while True:
-            backup_path = Path(backup_name_new)
-            if backup_path.exists():
-                backup_name_new = backup_name + "." + str(count)
-                count += 1
-                continue
+    # 滚动日志，防止单文件过大，运行中的滚动由 QueueFileHandler 处理
+    rotator = LogRotator(log_file, max_bytes=max_size)
+    try:
+        with rotator.lock:
             # logger.info("Backing up log file: %s", backup_path) # 此时日志还未初始化
-            log_path.rename(backup_path)  # 重命名日志文件
-            log_path.touch(exist_ok=True)  # 重新创建一个空的日志文件
-            break
+            if rotator.rotate_if_needed() is not None:
+                log_path.touch(exist_ok=True)  # 重新创建一个空的日志文件
+    finally:
+        rotator.close()
     return log_file
 
 
@@ -161,7 +310,10 @@ def build_logging_config():
                 'formatter': 'standard',
                 'filename': rotate_log(),
                 'encoding': 'utf-8',
-                'level': 'INFO'
+                'level': 'INFO',
+                'max_bytes': 10 * 1024 * 1024,  # 10MB 或跨天时滚动
+                'daily': True,
+                'max_total_bytes': 200 * 1024 * 1024,  # 日志目录最多 200MB
             },
         },
         'loggers': {  # module 的日志级别
@@ -253,7 +405,9 @@ def build_logging_config_test():
                 'formatter': 'standard',
                 'filename': rotate_log(is_test=True),
                 'encoding': 'utf-8',
-                'level': 'INFO'
+                'level': 'INFO',
+                'max_bytes': 10 * 1024 * 1024,  # 文件名已按天区分，只按大小滚动
+                'max_total_bytes': 200 * 1024 * 1024,
             },
         },
         'loggers': {  # module 的日志级别
@@ -301,18 +455,22 @@ def build_logging_config_test():
 
 
 def setup_logging(log_queue = None):
+    stop_log_listener()
     QueueFileHandler.LOG_QUEUE = get_log_queue() if log_queue is None else log_queue
     logging.addLevelName(logging.WARNING, "WARN")
     file_util.get_logs().mkdir(exist_ok=True, parents=True)
     dict_config = build_logging_config()
     logging.config.dictConfig(dict_config)
+    _start_listener(dict_config)
     logger.debug(f"logging_config: {pprint.pformat(dict_config, indent=4)}")
 
 
 def setup_logging_test(log_queue = None):
+    stop_log_listener()
     QueueFileHandler.LOG_QUEUE = get_log_queue() if log_queue is None else log_queue
     logging.addLevelName(logging.WARNING, "WARN")
     file_util.get_logs().mkdir(exist_ok=True, parents=True)
     dict_config = build_logging_config_test()
     logging.config.dictConfig(dict_config)
+    _start_listener(dict_config)
     logger.debug(f"logging_config_test: {pprint.pformat(dict_config, indent=4)}")
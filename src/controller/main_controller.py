@@ -7,11 +7,11 @@ from enum import Enum
 from multiprocessing import Event
 
 from src.config.gui_config import ParamConfig
-from src.core import environs
+from src.core import environs, metrics, profiler, tracing
 from src.core.contexts import Context
 from src.core.exceptions import StopError
 from src.core.tasks import ProcessTask
-from src.util import hwnd_util
+from src.util import file_util, hwnd_util
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +19,7 @@ logger = logging.getLogger(__name__)
 class TaskOpsEnum(Enum):
     START = "START"
     STOP = "STOP"
+    PROFILE = "PROFILE"  # 采样运行中任务的调用栈
 
 
 class TaskMonitor:
@@ -110,7 +111,10 @@ class TaskMonitor:
                     if not event.is_set():
                         continue
                     self._sleep(1)
-                    if not event.is_set() or process_task.is_alive():
+                    if not event.is_set():
+                        continue
+                    if process_task.is_alive():
+                        process_task.start_standby_if_idle()
                         continue
                     if self.task_restart_time is None or time.monotonic() - self.task_restart_time > self.task_restart_cooldown:
                         self.task_restart_time = time.monotonic()
@@ -245,13 +249,26 @@ class TaskMonitor:
             sleep_seconds -= 1
 
 
+# 同时运行时共用截图服务的任务
+FRAME_SERVER_CLIENTS = ("AutoBossProcessTask", "AutoPickupProcessTask")
+FRAME_SERVER_TASK_NAME = "FrameServerProcessTask"
+# 任务对应的进程名，与任务进程内写入指标、等待采样请求时使用的名称一致
+TASK_PROCESS_NAMES = {
+    "AutoBossProcessTask": "AutoBoss",
+    "AutoPickupProcessTask": "AutoPickup",
+    "AutoStorySkipProcessTask": "AutoStory",
+    "AutoStoryEnjoyProcessTask": "AutoStory",
+    "DailyActivityProcessTask": "DailyActivity",
+}
+
+
 class MainController:
 
     def __init__(self):
         logger.debug("Initializing %s", self.__class__.__name__)
 
         from src.core.tasks import MouseResetProcessTask, AutoBossProcessTask, AutoPickupProcessTask, \
-            AutoStoryProcessTask, DailyActivityProcessTask, ProcessTask
+            AutoStoryProcessTask, DailyActivityProcessTask, FrameServerProcessTask, ProcessTask
 
         self.tasks = {
             "MouseResetProcessTask": MouseResetProcessTask,
@@ -261,6 +278,8 @@ class MainController:
             "AutoStoryEnjoyProcessTask": AutoStoryProcessTask,
             "DailyActivityProcessTask": DailyActivityProcessTask,
         }
+        self.frame_server_builder = FrameServerProcessTask
+        self.frame_server_name = f"wwa_frames_{os.getpid()}"
         self.running_tasks: dict[str, tuple[ProcessTask, Event]] = {}
         self._lock = threading.Lock()
 
@@ -268,6 +287,7 @@ class MainController:
 
         self.param_config_path = None
         self.gui_win_id = None
+        metrics.clear_snapshots(file_util.get_temp("metrics"))
 
     def execute(self, task_name: str, task_ops: str):
         logger.debug("task_name: %s, task_ops: %s", task_name, task_ops)
@@ -298,7 +318,15 @@ class MainController:
                 else:
                     kwargs[environs.ENV_WWA_OCR_USE_GPU] = "False"
 
+                app_config = Context().app_config
+                frame_server = None
+                if task_name in FRAME_SERVER_CLIENTS and app_config.FrameServerEnabled:
+                    kwargs[environs.ENV_WWA_FRAME_SERVER_NAME] = self.frame_server_name
+                    frame_server = self._build_frame_server(kwargs)
+
                 task = task_builder.build(args=(event,), kwargs=kwargs, daemon=True)
+                if app_config.TaskWarmStandby:
+                    task.enable_standby()
                 self.running_tasks[task_name] = (task, event)
 
                 self.task_monitor = TaskMonitor(self.running_tasks.copy(), self.param_config_path, self.gui_win_id)
@@ -307,6 +335,8 @@ class MainController:
 
                 # self.task_monitor.start_game()
 
+                if frame_server:
+                    frame_server.start()
                 task.start()
 
                 # if task_name in ["AutoBossProcessTask", "DailyActivityProcessTask"]:
@@ -333,15 +363,68 @@ class MainController:
                 event.clear()
                 task.stop(0.1)
                 self.running_tasks.pop(task_name)
+                self._stop_frame_server_if_idle()
                 # if self.running_tasks.get("MouseResetProcessTask"):
                 #     task, event = self.running_tasks["MouseResetProcessTask"]
                 #     task.stop()
                 #     self.running_tasks.pop("MouseResetProcessTask")
                 logger.info("任务已停止: %s", task_name)
+                summary = self.metrics_summary()
+                if summary:
+                    logger.info("任务耗时统计:\n%s", summary)
                 return True, "任务已停止"
+            elif task_ops == TaskOpsEnum.PROFILE.value:
+                return self.profile(task_name)
             else:
                 raise NotImplementedError(f"不支持的类型{task_ops}")
 
+    def metrics(self) -> dict:
+        """ 汇总各任务进程写入的指标快照 """
+        return metrics.aggregate(metrics.load_snapshots(file_util.get_temp("metrics")))
+
+    def metrics_summary(self) -> str:
+        return metrics.format_summary(self.metrics())
+
+    def dump_trace(self):
+        """ 请求运行中的任务进程导出追踪，需开启 TraceEnabled，导出到 temp/trace """
+        tracing.request_dump(file_util.get_temp("trace"))
+        logger.info("已请求导出追踪: %s", file_util.get_temp("trace"))
+
+    def profile(self, task_name: str, seconds: float = 10.0, interval: float = 0.01) -> tuple[bool, str]:
+        """
+        请求运行中的任务进程采样所有线程的调用栈 seconds 秒，无需重启任务，
+        结果以折叠栈格式导出到 temp/profile，可用 flamegraph.pl 或 speedscope 查看
+        """
+        process_name = TASK_PROCESS_NAMES.get(task_name)
+        if process_name is None or not self.running_tasks.get(task_name):
+            logger.warning("任务未运行，无法采样: %s", task_name)
+            return False, "任务未运行"
+        profiler.request_profile(file_util.get_temp("profile"), process_name, seconds, interval)
+        logger.info("已请求采样: %s, %.1fs", task_name, seconds)
+        return True, "已请求采样"
+
+    def _build_frame_server(self, kwargs: dict):
+        """ 构建截图服务任务，已在运行时返回None；与第一个使用它的任务共用参数，GAME_PATH 等在启动前补齐 """
+        if FRAME_SERVER_TASK_NAME in self.running_tasks:
+            return None
+        event = Event()
+        event.set()
+        frame_server = self.frame_server_builder.build(args=(event,), kwargs=kwargs, daemon=True)
+        self.running_tasks[FRAME_SERVER_TASK_NAME] = (frame_server, event)
+        logger.info("开启截图服务: %s", self.frame_server_name)
+        return frame_server
+
+    def _stop_frame_server_if_idle(self):
+        """ 没有任务使用截图服务时关闭 """
+        if FRAME_SERVER_TASK_NAME not in self.running_tasks:
+            return
+        if any(i in self.running_tasks for i in FRAME_SERVER_CLIENTS):
+            return
+        frame_server, event = self.running_tasks.pop(FRAME_SERVER_TASK_NAME)
+        event.clear()
+        frame_server.stop(1)
+        logger.info("截图服务已关闭")
+
     def stop(self):
         logger.info("关闭主窗口")
         if self.task_monitor:
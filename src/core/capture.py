@@ -0,0 +1,132 @@
+import logging
+import threading
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class CaptureBackend(ABC):
+    """
+    截图后端，整个客户区渲染到可复用的缓冲区，再按需复制子区域。
+    缓冲区在尺寸不变时复用，由 Capturer 负责分配与释放。
+    """
+
+    @abstractmethod
+    def get_size(self) -> tuple[int, int]:
+        """ 客户区宽高px """
+        pass
+
+    @abstractmethod
+    def allocate(self, width: int, height: int):
+        """ 按客户区尺寸分配缓冲区（设备上下文、位图等） """
+        pass
+
+    @abstractmethod
+    def render(self):
+        """ 将整个客户区渲染到缓冲区 """
+        pass
+
+    @abstractmethod
+    def copy(self, rect: tuple[int, int, int, int]) -> np.ndarray:
+        """
+        从缓冲区复制子区域
+        :param rect: 客户区坐标 (left, top, right, bottom)，已裁剪到客户区范围内
+        :return: BGR图片
+        """
+        pass
+
+    @abstractmethod
+    def release(self):
+        """ 释放缓冲区 """
+        pass
+
+
+def region_to_rect(region: tuple[float, float, float, float] | None,
+                   width: int, height: int) -> tuple[int, int, int, int]:
+    """
+    区域比例转为客户区坐标，取整方式与 hwnd_util.get_focus_rect_on_screen 一致，并裁剪到客户区范围内
+    :param region: 区域比例 (x1, y1, x2, y2)，为空表示整个客户区
+    :param width: 客户区宽
+    :param height: 客户区高
+    :return: (left, top, right, bottom)
+    """
+    if region is None:
+        return 0, 0, width, height
+    left = min(max(int(width * region[0]), 0), width)
+    top = min(max(int(height * region[1]), 0), height)
+    right = min(max(int(width * region[2]), left), width)
+    bottom = min(max(int(height * region[3]), top), height)
+    return left, top, right, bottom
+
+
+class Capturer:
+    """ 区域截图，客户区尺寸不变时复用截图后端的缓冲区，线程安全 """
+
+    def __init__(self, backend: CaptureBackend):
+        self._backend: CaptureBackend = backend
+        self._lock = threading.Lock()
+        self._size: tuple[int, int] | None = None
+        # 统计
+        self.allocate_count = 0
+        self.capture_count = 0
+
+    @property
+    def backend(self) -> CaptureBackend:
+        return self._backend
+
+    def capture(self, region: tuple[float, float, float, float] | None = None) -> np.ndarray:
+        """
+        截图，只复制所需区域
+        :param region: 区域比例 (x1, y1, x2, y2)，为空表示整个客户区
+        :return: BGR图片
+        """
+        with self._lock:
+            size = self._backend.get_size()
+            if size != self._size:
+                if self._size is not None:
+                    logger.debug("Client size changed: %s -> %s", self._size, size)
+                    self._backend.release()
+                self._size = None
+                self._backend.allocate(*size)
+                self._size = size
+                self.allocate_count += 1
+            rect = region_to_rect(region, *size)
+            if rect[2] <= rect[0] or rect[3] <= rect[1]:
+                raise ValueError(f"Empty capture region: {region}, client size: {size}")
+            self._backend.render()
+            self.capture_count += 1
+            return self._backend.copy(rect)
+
+    def release(self):
+        with self._lock:
+            if self._size is not None:
+                self._backend.release()
+                self._size = None
+
+
+class ArrayCaptureBackend(CaptureBackend):
+    """ 以图片作为客户区的截图后端，不依赖窗口，用于测试与回放 """
+
+    def __init__(self, img: np.ndarray):
+        self.img: np.ndarray = img
+        self._buffer: np.ndarray | None = None
+        self.render_count = 0
+
+    def get_size(self) -> tuple[int, int]:
+        return self.img.shape[1], self.img.shape[0]
+
+    def allocate(self, width: int, height: int):
+        self._buffer = np.empty((height, width, 3), dtype=np.uint8)
+
+    def render(self):
+        np.copyto(self._buffer, self.img[..., :3])
+        self.render_count += 1
+
+    def copy(self, rect: tuple[int, int, int, int]) -> np.ndarray:
+        left, top, right, bottom = rect
+        return self._buffer[top:bottom, left:right].copy()
+
+    def release(self):
+        self._buffer = None
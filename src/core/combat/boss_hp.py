@@ -0,0 +1,194 @@
+import logging
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from src.core.combat.combat_core import AlignEnum, DynamicPointTransformer
+
+logger = logging.getLogger(__name__)
+
+
+class BossHealthReading:
+    """ 一帧的boss血条读数 """
+
+    __slots__ = ("fraction", "present", "timestamp")
+
+    def __init__(self, fraction: float, present: bool, timestamp: float):
+        self.fraction = fraction  # 剩余血量比例，0~1
+        self.present = present  # 是否有boss血条
+        self.timestamp = timestamp  # time.monotonic()
+
+    def __repr__(self):
+        return f"BossHealthReading(fraction={self.fraction:.3f}, present={self.present})"
+
+
+class _CompiledBar:
+    """ 某一分辨率下血条所在行的坐标与每个像素的期望颜色 """
+
+    def __init__(self, w: int, h: int, bar: "BossHealthBar"):
+        dpt = DynamicPointTransformer((w, h))
+        xs_1280 = np.arange(bar.LEFT, bar.RIGHT + 1)
+        xs = [dpt.transform((int(x), bar.ROWS[0]), AlignEnum.TOP_CENTER)[0] for x in xs_1280]
+        ys = [dpt.transform((bar.LEFT, y), AlignEnum.TOP_CENTER)[1] for y in bar.ROWS]
+        self.valid = max(xs) < w and max(ys) < h
+        self.xs = np.array(xs, dtype=np.intp)
+        self.ys = np.array(ys, dtype=np.intp)[:, np.newaxis]
+        # 血条为黄到红的渐变色，按采样点插值出每个像素的颜色
+        stops_x = [x for x, _ in bar.GRADIENT]
+        colors = np.array([color for _, color in bar.GRADIENT], dtype=np.float64)
+        self.expected = np.stack(
+            [np.interp(xs_1280, stops_x, colors[:, c]) for c in range(3)], axis=-1).astype(np.int16)
+        self.head = max(1, len(xs) // 100)  # 血条最左端1%，判断血条是否存在
+
+
+class BossHealthBar:
+    """
+    boss血条读取：一次取出血条所在行的所有像素，与渐变色逐像素比较，剩余血量取从左端开始的填充段的结束位置，
+    伤害数字、特效等遮挡造成的短暂间断不影响读数
+    """
+
+    # 1280x720下血条的水平范围与采样行
+    LEFT = 453
+    RIGHT = 830
+    ROWS = (40, 41)
+    # (x, BGR) 血条渐变色采样点
+    GRADIENT = (
+        (453, (68, 179, 255)),
+        (528, (62, 164, 255)),
+        (565, (55, 148, 255)),
+        (641, (38, 109, 255)),
+        (830, (8, 37, 255)),
+    )
+    # 血条最左端的其他颜色，如boss受击闪烁时
+    HEAD_COLORS = ((71, 134, 180),)
+    TOLERANCE = 30
+    # 填充段内允许的最大间断，按1280x720下的像素数，更宽的间断视为填充段结束
+    MAX_GAP = 6
+    # (x, 血量) 原 boss_hp 的采样点，从高到低
+    LEGACY_POINTS = ((830, 1.0), (641, 0.5), (565, 0.3), (528, 0.2), (454, 0.01))
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._compiled: dict[tuple[int, int], _CompiledBar] = {}
+        self._head_colors = np.array(self.HEAD_COLORS, dtype=np.int16)
+        self._last_img: np.ndarray | None = None
+        self._last_reading: BossHealthReading | None = None
+
+    def _get_compiled(self, w: int, h: int) -> _CompiledBar:
+        compiled = self._compiled.get((w, h))
+        if compiled is None:
+            compiled = self._compiled[(w, h)] = _CompiledBar(w, h, self)
+        return compiled
+
+    def filled(self, img: np.ndarray) -> np.ndarray | None:
+        """ 血条每个像素是否为血量颜色，分辨率过小时返回None """
+        h, w = img.shape[:2]
+        compiled = self._get_compiled(w, h)
+        if not compiled.valid:
+            return None
+        pixels = img[compiled.ys, compiled.xs].astype(np.int16)  # (行, 像素, 通道)
+        matched = np.abs(pixels - compiled.expected).max(axis=-1) <= self.TOLERANCE
+        return matched.any(axis=0)
+
+    @staticmethod
+    def fill_end(filled: np.ndarray, max_gap: int) -> int:
+        """ 从左端开始的填充段的结束位置（不含），忽略不超过 max_gap 个像素的间断 """
+        idx = np.flatnonzero(filled)
+        if idx.size == 0:
+            return 0
+        # 每个填充像素之前的间断长度，第一个为与左端的距离
+        gaps = np.diff(idx, prepend=-1) - 1
+        breaks = np.flatnonzero(gaps > max_gap)
+        if breaks.size == 0:
+            return int(idx[-1]) + 1
+        if breaks[0] == 0:
+            return 0
+        return int(idx[breaks[0] - 1]) + 1
+
+    def legacy_level(self, fraction: float) -> float:
+        """ 按原五个采样点的位置把精确比例换算为 0/0.01/0.2/0.3/0.5/1.0，与连招中的血量判断保持一致 """
+        n = self.RIGHT - self.LEFT + 1
+        for x, level in self.LEGACY_POINTS:
+            if fraction >= (x - self.LEFT + 1) / n:
+                return level
+        return 0.0
+
+    def read(self, img: np.ndarray) -> BossHealthReading:
+        """ 读取一帧的boss血条，同一帧只计算一次 """
+        with self._lock:
+            if img is self._last_img and self._last_reading is not None:
+                return self._last_reading
+            filled = self.filled(img)
+            if filled is None:
+                reading = BossHealthReading(0.0, False, time.monotonic())
+            else:
+                compiled = self._get_compiled(img.shape[1], img.shape[0])
+                fraction = self.fill_end(filled, self.MAX_GAP) / len(filled)
+                present = bool(filled[:compiled.head].any())
+                if not present:
+                    head = img[compiled.ys, compiled.xs[:compiled.head]].astype(np.int16).reshape(-1, 1, 3)
+                    present = bool((np.abs(head - self._head_colors).max(axis=-1) <= self.TOLERANCE).any())
+                reading = BossHealthReading(fraction, present, time.monotonic())
+            self._last_img = img
+            self._last_reading = reading
+            return reading
+
+
+class BossHealthSeries:
+    """
+    boss血量时间序列：按最近一段时间的血量下降速度估算击杀剩余时间，
+    血量明显回升（换boss、回血）时重新开始记录
+    """
+
+    def __init__(self, window_seconds: float = 10.0, max_len: int = 512, reset_threshold: float = 0.05):
+        self.window_seconds = window_seconds
+        self.reset_threshold = reset_threshold
+        self._lock = threading.Lock()
+        self._samples: deque[tuple[float, float]] = deque(maxlen=max_len)
+
+    def __len__(self):
+        return len(self._samples)
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+
+    def add(self, reading: BossHealthReading):
+        """ 记录一次读数，没有血条的帧不记录 """
+        if not reading.present:
+            return
+        with self._lock:
+            if self._samples and reading.fraction - self._samples[-1][1] > self.reset_threshold:
+                self._samples.clear()
+            self._samples.append((reading.timestamp, reading.fraction))
+
+    def latest(self) -> float | None:
+        with self._lock:
+            return self._samples[-1][1] if self._samples else None
+
+    def damage_rate(self, now: float | None = None) -> float | None:
+        """ 最近窗口内每秒下降的血量比例，样本不足时返回None """
+        with self._lock:
+            if len(self._samples) < 2:
+                return None
+            if now is None:
+                now = self._samples[-1][0]
+            samples = [i for i in self._samples if now - i[0] <= self.window_seconds]
+        if len(samples) < 2:
+            return None
+        ts = np.array([i[0] for i in samples])
+        fractions = np.array([i[1] for i in samples])
+        if ts[-1] - ts[0] <= 0:
+            return None
+        slope = np.polyfit(ts - ts[0], fractions, 1)[0]
+        return float(-slope)
+
+    def time_to_kill(self, now: float | None = None) -> float | None:
+        """ 按当前速度击杀boss还需的秒数，血量未下降时返回None """
+        rate = self.damage_rate(now)
+        fraction = self.latest()
+        if rate is None or rate <= 1e-6 or fraction is None:
+            return None
+        return fraction / rate
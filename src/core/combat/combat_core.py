@@ -3,12 +3,17 @@ import random
 import threading
 import time
 from enum import Enum
-from typing import Sequence
+from typing import Callable, Sequence
 
 import numpy as np
 
+from src.core import metrics
+from src.core.combat.combo import CompiledCombo, OP_CLICK, OP_KEY_DOWN, OP_KEY_UP, OP_MOUSE_LEFT_DOWN, \
+    OP_MOUSE_LEFT_UP, OP_MOUSE_RIGHT_DOWN, OP_MOUSE_RIGHT_UP, OP_RIGHT_CLICK, OP_TAP, get_compiled_combo
+from src.core.combat.cooldown import CooldownTracker, SKILL_KEYS
 from src.core.exceptions import StopError
 from src.core.interface import ControlService, ImgService
+from src.util import timer_util
 
 logger = logging.getLogger(__name__)
 
@@ -316,7 +321,13 @@ class DynamicPointTransformer:
 
 
 class ColorChecker(BaseChecker):
-    """ 像素颜色校验器 """
+    """
+    像素颜色校验器
+    每个分辨率首次校验时计算并缓存各点转换后的坐标，之后一次取出所有点的像素，查颜色掩码表一次比较所有颜色
+    """
+
+    # 通道索引，与像素值一起查颜色掩码表
+    _CHANNELS = np.arange(3)
 
     def __init__(self, points: Sequence[tuple[int, int]], colors: Sequence[tuple[int, int, int]], tolerance: int = 30,
                  logic=LogicEnum.OR, align: AlignEnum = None):
@@ -326,11 +337,62 @@ class ColorChecker(BaseChecker):
         self.tolerance = tolerance  # 容差
         self.logic = logic
         self.align = align  # 对齐方式
+        # (w, h) -> 转换后的坐标 (ys, xs)，坐标越界时为None
+        self._compiled_points: dict[tuple[int, int], tuple[np.ndarray, np.ndarray] | None] = {}
+        self._color_masks: np.ndarray | None = None
+        self._hud_reader = None  # 注册到 HudReader 后，直接读取当前帧快照中的结果，只绑定对象自有的校验器
+
+    def _compile(self, w: int, h: int) -> tuple[np.ndarray, np.ndarray] | None:
+        if (w, h) in self._compiled_points:
+            return self._compiled_points[(w, h)]
+        dpt = DynamicPointTransformer((w, h))
+        points = [dpt.transform(pre_point, self.align) for pre_point in self.points]
+        ys = np.array([point[1] for point in points], dtype=np.intp)
+        xs = np.array([point[0] for point in points], dtype=np.intp)
+        compiled = (ys, xs) if -h <= ys.min() and ys.max() < h and -w <= xs.min() and xs.max() < w else None
+        self._compiled_points[(w, h)] = compiled
+        return compiled
+
+    def _get_color_masks(self) -> np.ndarray:
+        """
+        颜色掩码表 (通道, 像素值)：第i位为1表示该通道的像素值在第i个颜色的容差内，
+        一个像素三个通道的掩码按位与之后不为0，即至少匹配一个颜色
+        """
+        if self._color_masks is None:
+            values = np.arange(256)
+            masks = np.zeros((3, 256), dtype=np.uint64)
+            for i, color in enumerate(self.colors):
+                for channel in range(3):
+                    matched = np.abs(int(color[channel]) - values) <= self.tolerance
+                    masks[channel, matched] |= np.uint64(1 << i)
+            self._color_masks = masks
+        return self._color_masks
 
     def check(self, img: np.ndarray) -> bool:
         if self.points is None or len(self.points) == 0:
             raise ValueError("Points is empty")
+        if self._hud_reader is not None and (result := self._hud_reader.lookup(self, img)) is not None:
+            return result
+        if (self.logic not in (LogicEnum.OR, LogicEnum.AND)
+                or len(self.colors) > 64 or img.dtype != np.uint8 or img.ndim != 3 or img.shape[2] != 3):
+            return self._check_points(img)
+
+        h, w = img.shape[:2]
+        compiled = self._compile(w, h)
+        if compiled is None:
+            # 坐标越界，按原逐点方式校验，保持短路与异常行为一致
+            return self._check_points(img)
+        # 一次取出所有点的像素，查表得到每个点匹配的颜色
+        targets = img[compiled]
+        point_masks = np.bitwise_and.reduce(self._get_color_masks()[self._CHANNELS, targets], axis=1)
+        if self.logic == LogicEnum.OR:
+            # 多点匹配，一个点的颜色匹配上就为真
+            return bool(point_masks.any())
+        # 多点匹配，所有点的颜色都匹配才为真
+        return bool(point_masks.all())
 
+    def _check_points(self, img: np.ndarray) -> bool:
+        """ 逐点逐颜色校验 """
         dpt = DynamicPointTransformer(img)
 
         if self.logic == LogicEnum.OR:
@@ -406,105 +468,109 @@ class ColorChecker(BaseChecker):
 class BaseCombo:
     """ 连招 """
 
+    # 落后计划时间超过该值时不再追赶，从当前时间重新计时，避免连续按键过快
+    MAX_LAG_SECONDS = 0.05
+
     def __init__(self, control_service: ControlService):
         super().__init__()
         self.control_service = control_service
         self.event: threading.Event | None = None
         self.auto_pickup: bool = False
+        # 技能冷却预测，见 CombatSystem
+        self.cooldowns: CooldownTracker | None = None
+        self._compile_combo_attrs()
+
+    def _compile_combo_attrs(self):
+        """ 编译类上定义的连招序列 COMBO_SEQ*，格式错误在构造时即抛出 """
+        for cls in type(self).__mro__:
+            for name, value in vars(cls).items():
+                if name.startswith("COMBO_SEQ") and isinstance(value, list):
+                    try:
+                        get_compiled_combo(value)
+                    except ValueError as e:
+                        raise ValueError(f"{cls.__name__}.{name}: {e}") from e
+
+    def _release_keys(self, key_down_caches: set[str]):
+        """ 退出前释放按压的按键 """
+        for key_down_cache in key_down_caches:
+            if key_down_cache in ["a", "z"]:
+                self.control_service.mouse_left_up(0.001)
+            elif key_down_cache == "w":
+                pass
+            elif key_down_cache == "j":
+                self.control_service.key_up("SPACE", 0.001)
+            elif key_down_cache == "d":
+                self.control_service.mouse_right_up(0.001)
+            else:
+                self.control_service.key_up(key_down_cache, 0.001)
 
-    def combo_action(self, sequence: Sequence, end_wait: bool, ignore_event: bool = False):
+    @metrics.timed(name="combo_action")
+    def combo_action(self, sequence: Sequence | CompiledCombo, end_wait: bool, ignore_event: bool = False):
         """
-        执行按键序列
-        :param sequence:
+        执行按键序列，按连招开始时间计算每一步的计划时间，等待到计划时间而非累加睡眠，避免误差累积
+        :param sequence: 连招序列或编译后的连招，见 compile_combo
         :param end_wait: 队列最后一个按键是否睡眠等待后摇时间，用于合轴，False不等就是一放就切，True等待就是放完技能结束才切
         :param ignore_event:
         :return:
         """
-        max_size = len(sequence)
+        ops = get_compiled_combo(sequence).ops
+        control_service = self.control_service
+        max_size = len(ops)
         key_down_caches = set()
         tap_f_time = time.monotonic()
-        for i, keys in enumerate(sequence):
+        deadline = time.perf_counter()
+        for i, (op, key, press_time, wait_time, down_key, up_key) in enumerate(ops):
             if not ignore_event and self.event is not None and not self.event.is_set():
-                # 退出前释放按压的按键
-                for key_down_cache in key_down_caches:
-                    if key_down_cache in ["a", "z"]:
-                        self.control_service.mouse_left_up(0.001)
-                    elif key_down_cache == "w":
-                        pass
-                    elif key_down_cache == "j":
-                        self.control_service.key_up("SPACE", 0.001)
-                    elif key_down_cache == "d":
-                        self.control_service.mouse_right_up(0.001)
-                    else:
-                        self.control_service.key_up(key_down_cache, 0.001)
+                # 异步分发时先丢弃尚未发送的按键
+                control_service.cancel_input()
+                self._release_keys(key_down_caches)
                 raise StopError()
             if self.auto_pickup:
                 tap_f_cur_time = time.monotonic()
                 # 限制自动F频率
                 if tap_f_cur_time - tap_f_time > 0.25 or (i > 0 and i == max_size - 1):
                     tap_f_time = tap_f_cur_time
-                    self.control_service.fight_tap("F", 0.001)
-            key_src, press_time, wait_time = keys[:3]
-            key = key_src  # a a_down a_up
-            key_action = None  # down up
-            if "_" in key_src:
-                key, key_action = key_src.strip().split("_", 1)
-            if not key_action:
-                if key == "a":
-                    if press_time > 0.2:
-                        raise ValueError("普攻按压时间不可大于0.2，默认统一填写0.05")
-                    self.control_service.fight_click(seconds=press_time)
-                elif key == "z":
-                    if press_time < 0.3:
-                        raise ValueError("重击按压时间不可小于0.3，默认统一写0.5")
-                    self.control_service.fight_click(seconds=press_time)
-                elif key == "w":
-                    pass
-                elif key == "j":
-                    self.control_service.fight_tap("SPACE", press_time)
-                elif key == "d":
-                    # self.control_service.fight_tap("LSHIFT", press_time)
-                    self.control_service.fight_right_click(seconds=press_time)
-                else:
-                    self.control_service.fight_tap(key, press_time)
-            else:
-                if key_action == "down":
-                    if key in ["a", "z"]:
-                        self.control_service.mouse_left_down(seconds=press_time)
-                    elif key == "w":
-                        pass
-                    elif key == "j":
-                        self.control_service.key_down("SPACE", press_time)
-                    elif key == "d":
-                        # self.control_service.fight_tap("LSHIFT", press_time)
-                        self.control_service.mouse_right_down(seconds=press_time)
-                    else:
-                        self.control_service.key_down(key, press_time)
-                    key_down_caches.add(key)
-                elif key_action == "up":
-                    if key in ["a", "z"]:
-                        self.control_service.mouse_left_up(seconds=press_time)
-                    elif key == "w":
-                        pass
-                    elif key == "j":
-                        self.control_service.key_up("SPACE", press_time)
-                    elif key == "d":
-                        # self.control_service.fight_tap("LSHIFT", press_time)
-                        self.control_service.mouse_right_up(seconds=press_time)
-                    else:
-                        self.control_service.key_up(key, press_time)
-                    key_down_caches.discard(key)
-                else:
-                    logger.warning("Unknown key action '{}'".format(key_action))
+                    control_service.fight_tap("F", 0.001)
+            if op == OP_CLICK:
+                control_service.fight_click(seconds=press_time)
+            elif op == OP_TAP:
+                control_service.fight_tap(key, press_time)
+                if self.cooldowns is not None and key in SKILL_KEYS:
+                    self.cooldowns.mark_used(key)
+            elif op == OP_RIGHT_CLICK:
+                control_service.fight_right_click(seconds=press_time)
+            elif op == OP_KEY_DOWN:
+                control_service.key_down(key, press_time)
+            elif op == OP_KEY_UP:
+                control_service.key_up(key, press_time)
+            elif op == OP_MOUSE_LEFT_DOWN:
+                control_service.mouse_left_down(seconds=press_time)
+            elif op == OP_MOUSE_LEFT_UP:
+                control_service.mouse_left_up(seconds=press_time)
+            elif op == OP_MOUSE_RIGHT_DOWN:
+                control_service.mouse_right_down(seconds=press_time)
+            elif op == OP_MOUSE_RIGHT_UP:
+                control_service.mouse_right_up(seconds=press_time)
+            if down_key is not None:
+                key_down_caches.add(down_key)
+            elif up_key is not None:
+                key_down_caches.discard(up_key)
+            deadline += press_time
             if wait_time <= 0:
                 continue
             # 最后一下可合轴，显示传入False表示无需等待后摇结束
             if i == max_size - 1 and end_wait is False:
                 break
             if not ignore_event and self.event is not None and not self.event.is_set():
+                control_service.cancel_input()
                 raise StopError()
-            # 后摇等待
-            time.sleep(wait_time)
+            # 后摇等待，等到计划时间
+            deadline += wait_time
+            now = time.perf_counter()
+            if now - deadline > self.MAX_LAG_SECONDS:
+                deadline = now
+            else:
+                timer_util.sleep_until(deadline)
 
 
 class CharClassEnum(Enum):
@@ -585,9 +651,32 @@ class BaseResonator(BaseCombo):
     # health_100_point = [(830, 41)]
     # health_100_color = [(8, 37, 255), (65, 30, 41), (93, 80, 83)]  # BGR
 
+    ## boss_is_immobilized
+    # # 共振度，比血条略短一点点
+    _vibration_strength_00_point = [(453, 54)]
+    # vibration_strength_20_point = [(528, 54)]
+    # vibration_strength_50_point = [(641, 54)]
+    # vibration_strength_100_point = [(826, 54)]
+    # vibration_strength_color = [(255, 255, 255)]  # BGR
+
+    # 瘫痪后，共振条由白色变为黄色
+    _immobilize_color = [(28, 235, 255)]  # BGR
+    _immobilize_checker = ColorChecker(_vibration_strength_00_point, _immobilize_color, align=AlignEnum.TOP_CENTER)
+
+    ## is_avatar_grey
+    # 1号位头像采样点，多点采样，有些角色带灰色，会误判灰度
+    # 0: 头像中心
+    # 1: 头像中心偏左下，脸部
+    AVATAR_POINTS = [(1195, 168), (1193, 177)]
+
     def __init__(self, control_service: ControlService, img_service: ImgService):
         super().__init__(control_service)
         self.img_service = img_service
+        # boss血条读取与血量时间序列，由所属的 CombatSystem 设置，见 BossHealthBar、BossHealthSeries
+        self.boss_health_bar = None
+        self.boss_health_series = None
+        # 当前帧HUD快照，编入队伍时由所属 CombatSystem 的 HudReader 设置
+        self.hud_reader = None
 
     def resonator_name(self) -> ResonatorNameEnum:
         """ 角色名 """
@@ -612,6 +701,25 @@ class BaseResonator(BaseCombo):
     def is_resonance_liberation_ready(self, img: np.ndarray) -> bool:
         raise NotImplementedError()
 
+    def skills_ready(self, checks: dict[str, Callable[[np.ndarray], bool]],
+                     img: np.ndarray | None = None) -> dict[str, bool]:
+        """
+        校验技能是否就绪，按学习到的冷却时间跳过预计未就绪的技能，全部预计未就绪时不截图
+        :param checks: 技能按键 -> 像素校验函数，如 {"E": self.is_resonance_skill_ready}
+        :param img: 已有截图，为空时按需截图
+        :return: 技能按键 -> 是否就绪
+        """
+        if self.cooldowns is None:
+            if img is None:
+                img = self.img_service.screenshot()
+            return {skill: check(img) for skill, check in checks.items()}
+        return self.cooldowns.check(checks, self.img_service.screenshot, img)
+
+    def mark_skill_used(self, skill: str):
+        """ 同一按键在不同形态下为不同技能时，由连招按技能名开始计算冷却，见 skills_ready """
+        if self.cooldowns is not None:
+            self.cooldowns.mark_used(skill)
+
     def exit_special_state(self, scenario_enum: ScenarioEnum | None = None):
         pass
 
@@ -622,13 +730,18 @@ class BaseResonator(BaseCombo):
     def random_float(cls) -> float:
         return random.random()
 
+    def is_avatar_grey(self, img: np.ndarray, member: int) -> bool:
+        if self.hud_reader is not None and img.dtype == np.uint8 and img.ndim == 3 and img.shape[2] == 3:
+            avatar_grey = self.hud_reader.read(img).avatar_grey
+            if avatar_grey:
+                return avatar_grey[member - 1]
+        return self.legacy_is_avatar_grey(img, member)
+
     @classmethod
-    def is_avatar_grey(cls, img: np.ndarray, member: int) -> bool:
+    def legacy_is_avatar_grey(cls, img: np.ndarray, member: int) -> bool:
+        """ 逐点判断头像是否变灰 """
         dpt = DynamicPointTransformer(img)
-        # 多点采样，有些角色带灰色，会误判灰度
-        # 0: 头像中心
-        # 1: 头像中心偏左下，脸部
-        member1_points = [(1195, 168), (1193, 177)]
+        member1_points = cls.AVATAR_POINTS
         alive_count = 0
         for member1_point in member1_points:
             if not cls._is_avatar_grey(img, member, dpt, member1_point):
@@ -656,9 +769,35 @@ class BaseResonator(BaseCombo):
         # logger.debug("is_avatar_grey: %s", is_avatar_grey)
         return is_avatar_grey
 
-    @classmethod
-    def boss_hp(cls, img: np.ndarray) -> float:
+    def boss_health(self, img: np.ndarray):
+        """ boss精确血量比例与血条是否存在，并记录到血量时间序列，未设置血条读取器时返回None """
+        if self.boss_health_bar is None:
+            return None
+        reading = self.boss_health_bar.read(img)
+        if self.boss_health_series is not None:
+            self.boss_health_series.add(reading)
+        return reading
+
+    def boss_hp(self, img: np.ndarray) -> float:
         """ boss剩余血条比例，归一 """
+        reading = self.boss_health(img)
+        if reading is None:
+            return self.legacy_boss_hp(img)
+        health = self.boss_health_bar.legacy_level(reading.fraction) if reading.present else 0.0
+        logger.debug("boss_hp: %s, %s", health, reading)
+        return health
+
+    def is_boss_health_bar_exist(self, img: np.ndarray) -> bool:
+        """ boss血条是否存在 """
+        reading = self.boss_health(img)
+        if reading is None:
+            return self.legacy_is_boss_health_bar_exist(img)
+        logger.debug("is_boss_health_bar_exist: %s", reading.present)
+        return reading.present
+
+    @classmethod
+    def legacy_boss_hp(cls, img: np.ndarray) -> float:
+        """ 按五个采样点判断boss剩余血条比例，归一 """
         health = 0.0
         if cls._health_01_color_checker.check(img):
             health = 0.01  # 血量1%
@@ -678,8 +817,8 @@ class BaseResonator(BaseCombo):
         return health
 
     @classmethod
-    def is_boss_health_bar_exist(cls, img: np.ndarray) -> float:
-        """ boss剩余血条比例，归一 """
+    def legacy_is_boss_health_bar_exist(cls, img: np.ndarray) -> bool:
+        """ 按采样点判断boss血条是否存在 """
         if (cls._a_health_02_checker.check(img)
                 or cls._a_health_01_checker.check(img)
                 or cls._a_health_20_checker.check(img)
@@ -694,17 +833,7 @@ class BaseResonator(BaseCombo):
     @classmethod
     def boss_is_immobilized(cls, img: np.ndarray) -> bool:
         """ boss是否已瘫痪 """
-        # # 共振度，比血条略短一点点
-        vibration_strength_00_point = [(453, 54)]
-        # vibration_strength_20_point = [(528, 54)]
-        # vibration_strength_50_point = [(641, 54)]
-        # vibration_strength_100_point = [(826, 54)]
-        # vibration_strength_color = [(255, 255, 255)]  # BGR
-
-        # 瘫痪后，共振条由白色变为黄色
-        immobilize_color = [(28, 235, 255)]  # BGR
-        checker = ColorChecker(vibration_strength_00_point, immobilize_color, align=AlignEnum.TOP_CENTER)
-        is_immobilized = checker.check(img)
+        is_immobilized = cls._immobilize_checker.check(img)
         logger.debug("is_immobilized: %s", is_immobilized)
         return is_immobilized
 
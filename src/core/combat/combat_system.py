@@ -1,30 +1,59 @@
+import importlib
 import logging
 import threading
 import time
 
+import numpy as np
+
 from src.core.combat.combat_core import TeamMemberSelector, BaseResonator, CharClassEnum, ResonatorNameEnum, \
     ScenarioEnum
-from src.core.combat.resonator.camellya import Camellya
-from src.core.combat.resonator.cantarella import Cantarella
-from src.core.combat.resonator.cartethyia import Cartethyia
-from src.core.combat.resonator.changli import Changli
-from src.core.combat.resonator.ciaccona import Ciaccona
-from src.core.combat.resonator.encore import Encore
-from src.core.combat.resonator.generic import GenericResonator
-from src.core.combat.resonator.jinhsi import Jinhsi
-from src.core.combat.resonator.lynae import Lynae
-from src.core.combat.resonator.mornye import Mornye
-from src.core.combat.resonator.phoebe import Phoebe
-from src.core.combat.resonator.phrolova import Phrolova
-from src.core.combat.resonator.rover import Rover
-from src.core.combat.resonator.sanhua import Sanhua
-from src.core.combat.resonator.shorekeeper import Shorekeeper
-from src.core.combat.resonator.verina import Verina
+from src.core.combat.boss_hp import BossHealthBar, BossHealthReading, BossHealthSeries
+from src.core.combat.cooldown import CooldownStore
+from src.core.combat.hud import HudReader
 from src.core.exceptions import StopError
 from src.core.interface import ControlService, ImgService
+from src.util import file_util
 
 logger = logging.getLogger(__name__)
 
+# 角色 -> (模块, 类名)，编队用到时才导入并构造
+RESONATOR_REGISTRY: dict[ResonatorNameEnum, tuple[str, str]] = {
+    ResonatorNameEnum.rover: ("src.core.combat.resonator.rover", "Rover"),
+    ResonatorNameEnum.generic: ("src.core.combat.resonator.generic", "GenericResonator"),
+    ResonatorNameEnum.jinhsi: ("src.core.combat.resonator.jinhsi", "Jinhsi"),
+    ResonatorNameEnum.changli: ("src.core.combat.resonator.changli", "Changli"),
+    ResonatorNameEnum.shorekeeper: ("src.core.combat.resonator.shorekeeper", "Shorekeeper"),
+    ResonatorNameEnum.encore: ("src.core.combat.resonator.encore", "Encore"),
+    ResonatorNameEnum.verina: ("src.core.combat.resonator.verina", "Verina"),
+    ResonatorNameEnum.camellya: ("src.core.combat.resonator.camellya", "Camellya"),
+    ResonatorNameEnum.sanhua: ("src.core.combat.resonator.sanhua", "Sanhua"),
+    ResonatorNameEnum.cartethyia: ("src.core.combat.resonator.cartethyia", "Cartethyia"),
+    ResonatorNameEnum.ciaccona: ("src.core.combat.resonator.ciaccona", "Ciaccona"),
+    ResonatorNameEnum.phoebe: ("src.core.combat.resonator.phoebe", "Phoebe"),
+    ResonatorNameEnum.phrolova: ("src.core.combat.resonator.phrolova", "Phrolova"),
+    ResonatorNameEnum.lynae: ("src.core.combat.resonator.lynae", "Lynae"),
+    ResonatorNameEnum.mornye: ("src.core.combat.resonator.mornye", "Mornye"),
+    ResonatorNameEnum.cantarella: ("src.core.combat.resonator.cantarella", "Cantarella"),
+}
+
+# 有定制连招的角色，其余角色使用默认连招
+CUSTOM_COMBO_RESONATORS: tuple[ResonatorNameEnum, ...] = (
+    ResonatorNameEnum.jinhsi,
+    ResonatorNameEnum.changli,
+    ResonatorNameEnum.shorekeeper,
+    ResonatorNameEnum.encore,
+    ResonatorNameEnum.verina,
+    ResonatorNameEnum.camellya,
+    ResonatorNameEnum.sanhua,
+    ResonatorNameEnum.cartethyia,
+    ResonatorNameEnum.ciaccona,
+    # ResonatorNameEnum.phoebe,
+    ResonatorNameEnum.phrolova,
+    ResonatorNameEnum.lynae,
+    ResonatorNameEnum.mornye,
+    ResonatorNameEnum.cantarella,
+)
+
 
 class CombatSystem:
 
@@ -34,6 +63,14 @@ class CombatSystem:
 
         self.team_member_selector = TeamMemberSelector(self.control_service, self.img_service)
 
+        # 每帧一次批量读取boss血条、编队数字标、头像与当前编队角色的所有颜色校验
+        self.hud_reader = HudReader()
+        self.hud_reader.register_checkers("boss", BaseResonator)
+        self.hud_reader.register_checkers("team", self.team_member_selector)
+        # 逐像素读取boss血条，记录血量变化估算击杀剩余时间，本系统的角色共用
+        self.boss_health_bar = BossHealthBar()
+        self.boss_health_series = BossHealthSeries()
+
         self.is_async = False
         self.event = threading.Event()
         # self._thread = threading.Thread(target=self.run)
@@ -43,45 +80,49 @@ class CombatSystem:
         self._delay_time = None
         self._lock = threading.Lock()
 
-        self.rover = Rover(self.control_service, self.img_service)
-        self.generic_resonator = GenericResonator(self.control_service, self.img_service)
-
-        self.jinhsi = Jinhsi(self.control_service, self.img_service)
-        self.changli = Changli(self.control_service, self.img_service)
-        self.shorekeeper = Shorekeeper(self.control_service, self.img_service)
-        self.encore = Encore(self.control_service, self.img_service)
-        self.verina = Verina(self.control_service, self.img_service)
-        self.camellya = Camellya(self.control_service, self.img_service)
-        self.sanhua = Sanhua(self.control_service, self.img_service)
-        self.cartethyia = Cartethyia(self.control_service, self.img_service)
-        self.ciaccona = Ciaccona(self.control_service, self.img_service)
-        self.phoebe = Phoebe(self.control_service, self.img_service)
-        self.phrolova = Phrolova(self.control_service, self.img_service)
-        self.lynae = Lynae(self.control_service, self.img_service)
-        self.mornye = Mornye(self.control_service, self.img_service)
-        self.cantarella = Cantarella(self.control_service, self.img_service)
-
-        self.resonator_map: dict[ResonatorNameEnum, BaseResonator] = {
-            ResonatorNameEnum.jinhsi: self.jinhsi,
-            ResonatorNameEnum.changli: self.changli,
-            ResonatorNameEnum.shorekeeper: self.shorekeeper,
-            ResonatorNameEnum.encore: self.encore,
-            ResonatorNameEnum.verina: self.verina,
-            ResonatorNameEnum.camellya: self.camellya,
-            ResonatorNameEnum.sanhua: self.sanhua,
-            ResonatorNameEnum.cartethyia: self.cartethyia,
-            ResonatorNameEnum.ciaccona: self.ciaccona,
-            # ResonatorNameEnum.phoebe: self.phoebe,
-            ResonatorNameEnum.phrolova: self.phrolova,
-            ResonatorNameEnum.lynae: self.lynae,
-            ResonatorNameEnum.mornye: self.mornye,
-            ResonatorNameEnum.cantarella: self.cantarella,
-        }
+        # 角色按需构造，拾取、剧情等不战斗的任务无需加载
+        self._resonator_lock = threading.Lock()
+        self._loaded_resonators: dict[ResonatorNameEnum, BaseResonator] = {}
+        # 按角色学习技能冷却，跳过预计未就绪的截图校验，冷却时间保存到文件供下次使用
+        self.cooldown_store = CooldownStore(file_util.get_temp("cooldowns.json"))
+
         self.resonators: list[BaseResonator] | None = None
         self._sorted_resonators: list[tuple[BaseResonator, int]] | None = None
 
         self.auto_pickup: bool = False
 
+    def __getattr__(self, name: str):
+        # 兼容 combat_system.jinhsi、combat_system.generic_resonator 等属性
+        if name.startswith("_"):
+            raise AttributeError(name)
+        name_enum = ResonatorNameEnum.generic if name == "generic_resonator" else ResonatorNameEnum.__members__.get(name)
+        if name_enum not in RESONATOR_REGISTRY:
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+        return self.get_resonator(name_enum)
+
+    def get_resonator(self, name_enum: ResonatorNameEnum) -> BaseResonator:
+        """ 获取角色，首次使用时导入并构造 """
+        resonator = self._loaded_resonators.get(name_enum)
+        if resonator is not None:
+            return resonator
+        with self._resonator_lock:
+            resonator = self._loaded_resonators.get(name_enum)
+            if resonator is None:
+                module_name, class_name = RESONATOR_REGISTRY[name_enum]
+                resonator_cls = getattr(importlib.import_module(module_name), class_name)
+                resonator = resonator_cls(self.control_service, self.img_service)
+                resonator.boss_health_bar = self.boss_health_bar
+                resonator.boss_health_series = self.boss_health_series
+                if name_enum in CUSTOM_COMBO_RESONATORS:
+                    resonator.cooldowns = self.cooldown_store.tracker(name_enum.name)
+                self._loaded_resonators[name_enum] = resonator
+                logger.debug("Loaded resonator: %s", class_name)
+        return resonator
+
+    def loaded_resonators(self) -> list[BaseResonator]:
+        """ 已构造的角色 """
+        return list(self._loaded_resonators.values())
+
     # def get_resonators(self) -> list[BaseResonator]:
     #     resonators = []
     #     member_names = self.team_member_selector.get_team_members()
@@ -191,7 +232,8 @@ class CombatSystem:
                 index = self._next_index(index, seq_length)
 
             resonator.event = event
-            resonator.auto_pickup = self.auto_pickup
+            # boss即将被击杀时提前开始自动F，声骸掉落后立即吸收
+            resonator.auto_pickup = self.auto_pickup or self.is_boss_near_death()
             try:
                 # logger.debug(f"combo: {resonator.resonator_name().value}")
                 resonator.combo()
@@ -213,6 +255,7 @@ class CombatSystem:
                 # logger.info("Combat system started.")
                 if not self.event.is_set():
                     self.control_service.camera_reset()
+                    self.boss_health_series.clear()
                 self.event.set()
                 if delay_seconds > 0.0:
                     self._delay_seconds = delay_seconds
@@ -238,6 +281,27 @@ class CombatSystem:
             self.event.clear()
             # logger.debug("combat pause")
 
+    def boss_time_to_kill(self) -> float | None:
+        """ 按最近的输出速度击杀boss还需的秒数，未知或最近没有读数时返回None """
+        return self.boss_health_series.time_to_kill(time.monotonic())
+
+    def is_boss_near_death(self, seconds: float = 3.0) -> bool:
+        """ boss是否即将被击杀，用于提前准备吸收声骸 """
+        time_to_kill = self.boss_time_to_kill()
+        return time_to_kill is not None and time_to_kill <= seconds
+
+    def cooldown_stats(self) -> dict[str, dict]:
+        """ 各角色的技能冷却与跳过截图次数 """
+        return {
+            tracker.name: {
+                "cooldowns": tracker.cooldowns(),
+                "checked": tracker.checked_count,
+                "skipped": tracker.skipped_count,
+                "skipped_captures": tracker.skipped_captures,
+            }
+            for tracker in self.cooldown_store.trackers()
+        }
+
     def set_resonators(self, resonator_names_zh: list[str]):
         resonators: list[BaseResonator] = []
         _resonators_names_en = []
@@ -246,26 +310,37 @@ class CombatSystem:
                 break
             resonator_temp = None
             if name_zh == ResonatorNameEnum.rover.value:
-                resonator_temp = self.rover
+                resonator_temp = self.get_resonator(ResonatorNameEnum.rover)
             elif name_zh == ResonatorNameEnum.none.value:
                 resonator_temp = None
             else:
                 name_enum = ResonatorNameEnum.get_enum_by_value(name_zh)
-                if name_enum:
+                if name_enum in CUSTOM_COMBO_RESONATORS:
                     # 找出定制连招
-                    resonator_temp = self.resonator_map.get(name_enum)
+                    resonator_temp = self.get_resonator(name_enum)
                 # 没有定制连招则使用默认连招
                 if resonator_temp is None:
-                    resonator_temp = self.generic_resonator
+                    resonator_temp = self.get_resonator(ResonatorNameEnum.generic)
             resonators.append(resonator_temp)
             _resonators_names_en.append(resonator_temp.resonator_name().name if resonator_temp else None)
 
         logger.info(f"team_members: {_resonators_names_en}")
         logger.info(f"编队: {resonator_names_zh}")
+        self.hud_reader.set_resonators(resonators)
         self.resonators = resonators
 
-    def is_boss_health_bar_exist(self):
-        return BaseResonator.is_boss_health_bar_exist(self.img_service.screenshot())
+    def boss_health(self, img: np.ndarray | None = None) -> BossHealthReading:
+        """ 读取boss血条并记录到血量时间序列 """
+        if img is None:
+            img = self.img_service.screenshot()
+        reading = self.boss_health_bar.read(img)
+        self.boss_health_series.add(reading)
+        return reading
+
+    def is_boss_health_bar_exist(self, img: np.ndarray | None = None) -> bool:
+        reading = self.boss_health(img)
+        logger.debug("is_boss_health_bar_exist: %s", reading.present)
+        return reading.present
 
     def exit_special_state(self, scenario_enum: ScenarioEnum | None = None):
         if self.resonators is None:
@@ -0,0 +1,118 @@
+import logging
+import threading
+from typing import Sequence
+
+logger = logging.getLogger(__name__)
+
+# 操作码
+OP_NONE = 0  # 不按键，只等待
+OP_CLICK = 1  # 左键点击
+OP_RIGHT_CLICK = 2  # 右键点击
+OP_TAP = 3  # 按键
+OP_KEY_DOWN = 4
+OP_KEY_UP = 5
+OP_MOUSE_LEFT_DOWN = 6
+OP_MOUSE_LEFT_UP = 7
+OP_MOUSE_RIGHT_DOWN = 8
+OP_MOUSE_RIGHT_UP = 9
+
+# 连招中的按键字母 -> 实际按键，其余按原样传给控制服务
+_KEY_MAP = {"j": "SPACE"}
+
+
+class CompiledCombo:
+    """
+    编译后的连招，操作数组每项为 (操作码, 按键, 按压时间, 等待时间, 按下的按键, 抬起的按键)。
+    按下、抬起的按键为连招中的按键字母，用于中断时释放仍按下的按键，其余操作为None。
+    """
+
+    def __init__(self, ops: tuple[tuple[int, str | None, float, float, str | None, str | None], ...]):
+        self.ops = ops
+        # 每一步相对连招开始的计划开始时间
+        starts = []
+        offset = 0.0
+        for _, _, press, wait, _, _ in ops:
+            starts.append(offset)
+            offset += press + max(wait, 0.0)
+        self.starts: tuple[float, ...] = tuple(starts)
+        self.duration = offset
+
+    def __len__(self):
+        return len(self.ops)
+
+
+def compile_step(step: Sequence, index: int = 0) -> tuple[int, str | None, float, float, str | None, str | None]:
+    """
+    编译一步连招
+    :param step: [按键, 按压时间, 等待时间]，按键可带 _down / _up 后缀
+    :param index: 步骤序号，用于错误信息
+    :return: (操作码, 按键, 按压时间, 等待时间, 按下的按键, 抬起的按键)
+    """
+    if len(step) < 3:
+        raise ValueError(f"连招第{index + 1}步格式错误，应为[按键, 按压时间, 等待时间]: {step}")
+    key_src, press_time, wait_time = step[:3]
+    if not isinstance(key_src, str) or not key_src.strip():
+        raise ValueError(f"连招第{index + 1}步按键错误: {step}")
+    if not isinstance(press_time, (int, float)) or not isinstance(wait_time, (int, float)) or press_time < 0:
+        raise ValueError(f"连招第{index + 1}步时间错误: {step}")
+    press_time, wait_time = float(press_time), float(wait_time)
+    key = key_src  # a a_down a_up
+    key_action = None  # down up
+    if "_" in key_src:
+        key, key_action = key_src.strip().split("_", 1)
+    if not key_action:
+        if key == "a":
+            if press_time > 0.2:
+                raise ValueError("普攻按压时间不可大于0.2，默认统一填写0.05")
+            return OP_CLICK, None, press_time, wait_time, None, None
+        if key == "z":
+            if press_time < 0.3:
+                raise ValueError("重击按压时间不可小于0.3，默认统一写0.5")
+            return OP_CLICK, None, press_time, wait_time, None, None
+        if key == "w":
+            return OP_NONE, None, press_time, wait_time, None, None
+        if key == "d":
+            return OP_RIGHT_CLICK, None, press_time, wait_time, None, None
+        return OP_TAP, _KEY_MAP.get(key, key), press_time, wait_time, None, None
+    if key_action == "down":
+        if key in ["a", "z"]:
+            return OP_MOUSE_LEFT_DOWN, None, press_time, wait_time, key, None
+        if key == "w":
+            return OP_NONE, None, press_time, wait_time, key, None
+        if key == "d":
+            return OP_MOUSE_RIGHT_DOWN, None, press_time, wait_time, key, None
+        return OP_KEY_DOWN, _KEY_MAP.get(key, key), press_time, wait_time, key, None
+    if key_action == "up":
+        if key in ["a", "z"]:
+            return OP_MOUSE_LEFT_UP, None, press_time, wait_time, None, key
+        if key == "w":
+            return OP_NONE, None, press_time, wait_time, None, key
+        if key == "d":
+            return OP_MOUSE_RIGHT_UP, None, press_time, wait_time, None, key
+        return OP_KEY_UP, _KEY_MAP.get(key, key), press_time, wait_time, None, key
+    raise ValueError(f"连招第{index + 1}步未知的按键动作'{key_action}': {step}")
+
+
+def compile_combo(sequence: Sequence[Sequence]) -> CompiledCombo:
+    """ 编译连招序列，格式错误时抛出 ValueError """
+    return CompiledCombo(tuple(compile_step(step, i) for i, step in enumerate(sequence)))
+
+
+_cache_lock = threading.Lock()
+_cache: dict[tuple, CompiledCombo] = {}
+_CACHE_SIZE = 1024
+
+
+def get_compiled_combo(sequence: Sequence[Sequence] | CompiledCombo) -> CompiledCombo:
+    """ 按连招内容缓存编译结果，连招方法每次返回新列表时也只编译一次 """
+    if isinstance(sequence, CompiledCombo):
+        return sequence
+    key = tuple(tuple(step[:3]) for step in sequence)
+    compiled = _cache.get(key)
+    if compiled is None:
+        compiled = compile_combo(sequence)
+        with _cache_lock:
+            if len(_cache) >= _CACHE_SIZE:
+                _cache.pop(next(iter(_cache)))
+            _cache[key] = compiled
+    return compiled
@@ -0,0 +1,221 @@
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 连招中按下这些键即视为释放了对应技能，开始计算冷却
+SKILL_KEYS = ("E", "Q", "R")
+# 声骸技能的冷却取决于装备的声骸而非共鸣者，只在本次运行中学习，不持久化
+ECHO_SKILL_KEYS = ("Q",)
+
+
+class SkillCooldown:
+    """
+    单个技能的冷却：记录释放时间与释放后最后一次未就绪、第一次就绪的观测时间，学习冷却时间。
+    只在观测区间（未就绪, 就绪] 内得到冷却时间，首次检查即就绪时只说明冷却不超过该值。
+    """
+
+    __slots__ = ("cooldown", "used_at", "not_ready_at", "ready_at")
+
+    def __init__(self, cooldown: float | None = None):
+        self.cooldown: float | None = cooldown  # 学习到的冷却时间
+        self.used_at: float | None = None
+        self.not_ready_at: float | None = None  # 释放后最后一次观测到未就绪
+        self.ready_at: float | None = None  # 释放后第一次观测到就绪
+
+    def mark_used(self, t: float):
+        self.used_at = t
+        self.not_ready_at = None
+        self.ready_at = None
+
+    def is_cooling(self, t: float) -> bool:
+        """ 释放后未观测到就绪，且最后一次观测为未就绪或按已学习的冷却预计未就绪 """
+        if self.used_at is None or self.ready_at is not None:
+            return False
+        if self.not_ready_at is not None:
+            return True
+        return self.cooldown is not None and t < self.used_at + self.cooldown
+
+    def predict_ready_at(self, margin: float) -> float | None:
+        """ 预计就绪时间，提前 margin 比例开始校验，未知时返回None """
+        if self.used_at is None or self.cooldown is None or self.ready_at is not None:
+            return None
+        return self.used_at + self.cooldown * (1 - margin)
+
+    def observe(self, ready: bool, t: float) -> bool:
+        """
+        记录一次像素校验结果
+        :return: 冷却时间是否有更新
+        """
+        if self.used_at is None or self.ready_at is not None:
+            return False
+        if not ready:
+            self.not_ready_at = t
+            return False
+        self.ready_at = t
+        upper = t - self.used_at
+        if self.not_ready_at is not None:
+            # 冷却时间在两次观测之间，取中点，与已学习的值平均
+            observed = (self.not_ready_at - self.used_at + upper) / 2
+            self.cooldown = observed if self.cooldown is None else (self.cooldown + observed) / 2
+            return True
+        if self.cooldown is not None and upper < self.cooldown:
+            # 提前就绪，如冷却缩减，或按键时技能并未真正释放
+            self.cooldown = upper
+            return True
+        return False
+
+
+class CooldownTracker:
+    """
+    单个共鸣者的技能冷却预测：预计未就绪的技能直接视为未就绪，跳过截图与像素校验，
+    预计就绪或冷却未知时才截图校验，校验结果用于继续学习冷却时间。
+    """
+
+    # 在预计就绪前该比例的时间开始校验，冷却时间偏大时也只会晚于实际就绪一小段
+    MARGIN = 0.15
+
+    def __init__(self, name: str, cooldowns: dict[str, float] | None = None, store: "CooldownStore | None" = None):
+        self.name = name
+        self._store = store
+        self._skills: dict[str, SkillCooldown] = {}
+        for skill, cooldown in (cooldowns or {}).items():
+            self._skills[skill] = SkillCooldown(cooldown)
+        # 统计
+        self.checked_count = 0  # 像素校验次数
+        self.skipped_count = 0  # 预计未就绪而跳过的校验次数
+        self.skipped_captures = 0  # 所有技能都预计未就绪而跳过的截图次数
+
+    def _skill(self, skill: str) -> SkillCooldown:
+        cooldown = self._skills.get(skill)
+        if cooldown is None:
+            cooldown = self._skills[skill] = SkillCooldown()
+        return cooldown
+
+    def cooldowns(self) -> dict[str, float]:
+        """ 已学习的冷却时间 """
+        return {skill: round(i.cooldown, 2) for skill, i in self._skills.items() if i.cooldown is not None}
+
+    def mark_used(self, skill: str, t: float | None = None) -> bool:
+        """
+        按下技能键时调用，开始计算冷却。预计仍在冷却时按键不会释放技能，不重新计时，避免学习到的冷却偏短
+        :return: 是否记为释放
+        """
+        cooldown = self._skill(skill)
+        t = time.monotonic() if t is None else t
+        if cooldown.is_cooling(t):
+            return False
+        cooldown.mark_used(t)
+        return True
+
+    def predict_ready_at(self, skill: str) -> float | None:
+        cooldown = self._skills.get(skill)
+        return None if cooldown is None else cooldown.predict_ready_at(self.MARGIN)
+
+    def should_check(self, skill: str, t: float | None = None) -> bool:
+        """ 是否需要截图校验，预计仍在冷却时返回False """
+        ready_at = self.predict_ready_at(skill)
+        if ready_at is None:
+            return True
+        return (time.monotonic() if t is None else t) >= ready_at
+
+    def observe(self, skill: str, ready: bool, t: float | None = None):
+        self.checked_count += 1
+        if self._skill(skill).observe(ready, time.monotonic() if t is None else t):
+            logger.debug("%s-%s 冷却: %.3fs", self.name, skill, self._skills[skill].cooldown)
+            if self._store is not None:
+                self._store.update(self.name, self.cooldowns())
+
+    def check(self, checks: dict[str, Callable[[np.ndarray], bool]], capture: Callable[[], np.ndarray],
+              img: np.ndarray | None = None) -> dict[str, bool]:
+        """
+        校验技能是否就绪，预计未就绪的技能不校验，全部预计未就绪时不截图
+        :param checks: 技能 -> 像素校验函数
+        :param capture: 截图函数
+        :param img: 已有截图，为空时按需截图
+        :return: 技能 -> 是否就绪
+        """
+        results = {}
+        pending = {}
+        now = time.monotonic()
+        for skill, check in checks.items():
+            if self.should_check(skill, now):
+                pending[skill] = check
+            else:
+                results[skill] = False
+                self.skipped_count += 1
+        if not pending:
+            if img is None:
+                self.skipped_captures += 1
+            return results
+        if img is None:
+            img = capture()
+        now = time.monotonic()
+        for skill, check in pending.items():
+            ready = bool(check(img))
+            results[skill] = ready
+            self.observe(skill, ready, now)
+        return results
+
+
+class CooldownStore:
+    """ 按共鸣者持久化学习到的冷却时间，下次启动直接使用 """
+
+    def __init__(self, path: str | Path | None):
+        self._path = Path(path) if path else None
+        self._lock = threading.Lock()
+        self._data: dict[str, dict[str, float]] = self._load()
+        self._trackers: dict[str, CooldownTracker] = {}
+
+    def _load(self) -> dict[str, dict[str, float]]:
+        if self._path is None or not self._path.exists():
+            return {}
+        try:
+            with open(self._path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("读取技能冷却失败: %s, %s", self._path, e)
+            return {}
+        if not isinstance(data, dict):
+            return {}
+        return {
+            name: {skill: float(v) for skill, v in cooldowns.items()
+                   if skill not in ECHO_SKILL_KEYS and isinstance(v, (int, float)) and v > 0}
+            for name, cooldowns in data.items() if isinstance(cooldowns, dict)
+        }
+
+    def tracker(self, name: str) -> CooldownTracker:
+        tracker = self._trackers.get(name)
+        if tracker is None:
+            tracker = self._trackers[name] = CooldownTracker(name, self._data.get(name), self)
+        return tracker
+
+    def trackers(self) -> list[CooldownTracker]:
+        return list(self._trackers.values())
+
+    def update(self, name: str, cooldowns: dict[str, float]):
+        cooldowns = {skill: cooldown for skill, cooldown in cooldowns.items() if skill not in ECHO_SKILL_KEYS}
+        with self._lock:
+            if self._data.get(name) == cooldowns:
+                return
+            self._data[name] = cooldowns
+            self._save()
+
+    def _save(self):
+        if self._path is None:
+            return
+        try:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self._path.with_suffix(self._path.suffix + ".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._data, f, ensure_ascii=False, indent=4)
+            os.replace(tmp_path, self._path)
+        except OSError as e:
+            logger.warning("保存技能冷却失败: %s, %s", self._path, e)
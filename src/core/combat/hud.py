@@ -0,0 +1,230 @@
+import logging
+import threading
+import time
+from typing import Iterable
+
+import numpy as np
+
+from src.core.combat.combat_core import AlignEnum, BaseResonator, ColorChecker, DynamicPointTransformer, LogicEnum
+
+logger = logging.getLogger(__name__)
+
+
+class HudState:
+    """ 一帧的HUD状态快照，包含所有已注册校验器的结果与队伍头像是否变灰 """
+
+    def __init__(self, frame_id: int, timestamp: float, checks: dict[str, bool], avatar_grey: tuple[bool, ...]):
+        self.frame_id = frame_id
+        self.timestamp = timestamp
+        self.checks = checks  # 校验器名 -> 结果
+        self.avatar_grey = avatar_grey  # 1~3号位头像是否变灰（阵亡）
+
+    def get(self, name: str) -> bool | None:
+        return self.checks.get(name)
+
+    def to_record(self) -> dict:
+        """ 一帧一条记录，用于日志 """
+        return {
+            "frame_id": self.frame_id,
+            "timestamp": round(self.timestamp, 3),
+            "avatar_grey": list(self.avatar_grey),
+            "checks": [name for name, value in self.checks.items() if value],
+        }
+
+    def __repr__(self):
+        return f"HudState({self.to_record()})"
+
+
+class _CompiledHud:
+    """ 某一分辨率下所有可批量校验的点 """
+
+    def __init__(self, w: int, h: int, entries: list[tuple[str, ColorChecker]]):
+        ys, xs, tables, lengths, is_and = [], [], [], [], []
+        self.names: list[str] = []
+        self.fallback: list[tuple[str, ColorChecker]] = []  # 坐标越界等，逐个校验
+        for name, checker in entries:
+            compiled = checker._compile(w, h)
+            if compiled is None or len(checker.colors) > 64 or checker.logic not in (LogicEnum.OR, LogicEnum.AND):
+                self.fallback.append((name, checker))
+                continue
+            masks = checker._get_color_masks()
+            ys.append(compiled[0])
+            xs.append(compiled[1])
+            tables.extend([masks] * len(compiled[0]))
+            lengths.append(len(compiled[0]))
+            is_and.append(checker.logic == LogicEnum.AND)
+            self.names.append(name)
+        self.ys = np.concatenate(ys) if ys else np.empty(0, dtype=np.intp)
+        self.xs = np.concatenate(xs) if xs else np.empty(0, dtype=np.intp)
+        # (点数, 通道, 像素值) 每个点所属校验器的颜色掩码表
+        self.tables = np.stack(tables) if tables else np.empty((0, 3, 256), dtype=np.uint64)
+        self.point_index = np.arange(len(self.ys))[:, np.newaxis]
+        self.lengths = np.array(lengths, dtype=np.int64)
+        self.starts = np.concatenate([[0], np.cumsum(self.lengths)[:-1]]).astype(np.intp) if lengths else None
+        self.is_and = np.array(is_and, dtype=bool)
+
+        # 头像变灰检测点，与 BaseResonator.is_avatar_grey 一致：每个号位两个采样点
+        dpt = DynamicPointTransformer((w, h))
+        avatar_points = []
+        for member in (1, 2, 3):
+            for x, y in BaseResonator.AVATAR_POINTS:
+                point = (x, y + (member - 1) * 88)
+                avatar_points.append(dpt.transform(point, AlignEnum.TOP_RIGHT))
+        self.avatar_ys = np.array([point[1] for point in avatar_points], dtype=np.intp)
+        self.avatar_xs = np.array([point[0] for point in avatar_points], dtype=np.intp)
+        self.avatar_valid = bool(self.avatar_ys.max() < h and self.avatar_xs.max() < w)
+
+    def evaluate(self, img: np.ndarray) -> dict[str, bool]:
+        results = {}
+        if len(self.names) > 0:
+            targets = img[self.ys, self.xs]
+            point_masks = np.bitwise_and.reduce(self.tables[self.point_index, np.arange(3), targets], axis=1)
+            matched_count = np.add.reduceat((point_masks != 0).astype(np.int64), self.starts)
+            matched = np.where(self.is_and, matched_count == self.lengths, matched_count > 0)
+            results = dict(zip(self.names, matched.tolist()))
+        for name, checker in self.fallback:
+            try:
+                results[name] = checker._check_points(img)
+            except IndexError:  # 不记录结果，由校验器自行校验并抛出异常
+                pass
+        return results
+
+    def avatar_grey(self, img: np.ndarray) -> tuple[bool, ...]:
+        if not self.avatar_valid:
+            return ()
+        pixels = img[self.avatar_ys, self.avatar_xs].astype(np.int16)
+        b, g, r = pixels[:, 0], pixels[:, 1], pixels[:, 2]
+        # 容差1，所有点都是灰才认定为阵亡
+        grey = ((np.abs(b - g) <= 1) & (np.abs(g - r) <= 1)).reshape(3, -1).all(axis=1)
+        return tuple(grey.tolist())
+
+
+class HudReader:
+    """
+    HUD状态读取器：一帧只做一次批量取像素与颜色比较，得到所有已注册校验器的结果，按帧缓存。
+    对象自有的校验器注册后，ColorChecker.check 直接读取当前帧的快照；类属性上的校验器（如boss血条）
+    为所有实例共用，只参与批量校验，不绑定读取器，每个 CombatSystem 的读取器互不影响。
+    编入队伍的角色通过 hud_reader 读取头像是否变灰。
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._entries: dict[str, ColorChecker] = {}
+        self._names: dict[int, str] = {}  # id(checker) -> 名称
+        self._resonator_names: list[str] = []
+        self._resonators: list[BaseResonator] = []
+        self._compiled: dict[tuple[int, int], _CompiledHud] = {}
+        self._frame_count = 0
+        self._last_key = None
+        self._last_img: np.ndarray | None = None
+        self._last_state: HudState | None = None
+        # 统计
+        self.read_count = 0
+        self.hit_count = 0
+
+    def register(self, name: str, checker: ColorChecker, bind: bool = True):
+        """
+        注册校验器，同一校验器只注册一次
+        :param bind: 是否绑定到校验器，绑定后 checker.check 读取本读取器的快照，共用的校验器不绑定
+        """
+        with self._lock:
+            if id(checker) in self._names or name in self._entries:
+                return
+            self._entries[name] = checker
+            self._names[id(checker)] = name
+            if bind:
+                checker._hud_reader = self
+            self._invalidate()
+
+    def unregister(self, name: str):
+        with self._lock:
+            checker = self._entries.pop(name, None)
+            if checker is None:
+                return
+            self._names.pop(id(checker), None)
+            if checker._hud_reader is self:
+                checker._hud_reader = None
+            self._invalidate()
+
+    def register_checkers(self, prefix: str, owner: object, base: type | None = None):
+        """
+        注册对象及其类上的所有 ColorChecker 属性，类属性为所有实例共用，不绑定
+        :param prefix: 名称前缀
+        :param owner: 对象或类
+        :param base: 不注册该类及其父类上的属性，如共鸣者共用的 BaseResonator
+        """
+        owner_cls = owner if isinstance(owner, type) else type(owner)
+        classes = [cls for cls in owner_cls.__mro__ if base is None or not issubclass(base, cls)]
+        for cls in reversed(classes):
+            for attr, value in vars(cls).items():
+                if isinstance(value, ColorChecker):
+                    self.register(f"{prefix}.{attr}", value, bind=False)
+        if not isinstance(owner, type):
+            for attr, value in vars(owner).items():
+                if isinstance(value, ColorChecker):
+                    self.register(f"{prefix}.{attr}", value)
+
+    def set_resonators(self, resonators: Iterable[BaseResonator | None]):
+        """ 只保留当前编队角色的校验器，编队角色读取本读取器的快照 """
+        with self._lock:
+            for name in self._resonator_names:
+                self.unregister(name)
+            for resonator in self._resonators:
+                if resonator.hud_reader is self:
+                    resonator.hud_reader = None
+            before = set(self._entries)
+            self._resonators = [resonator for resonator in resonators if resonator is not None]
+            for resonator in self._resonators:
+                self.register_checkers(resonator.resonator_name().name, resonator, base=BaseResonator)
+                resonator.hud_reader = self
+            self._resonator_names = [name for name in self._entries if name not in before]
+
+    def _invalidate(self):
+        self._compiled.clear()
+        self._last_key = None
+        self._last_img = None
+        self._last_state = None
+
+    def _is_last(self, img: np.ndarray, frame_id: int | None) -> bool:
+        if frame_id is not None:
+            return frame_id == self._last_key
+        return img is self._last_img
+
+    def read(self, img: np.ndarray, frame_id: int | None = None) -> HudState:
+        """
+        读取一帧的HUD状态，同一帧只计算一次
+        :param img: BGR图片
+        :param frame_id: 帧序号，如 Frame.frame_id，为空时按图片对象判断是否为同一帧
+        :return:
+        """
+        with self._lock:
+            self.read_count += 1
+            if self._last_state is not None and self._is_last(img, frame_id):
+                self.hit_count += 1
+                return self._last_state
+            h, w = img.shape[:2]
+            compiled = self._compiled.get((w, h))
+            if compiled is None:
+                compiled = self._compiled[(w, h)] = _CompiledHud(w, h, list(self._entries.items()))
+            self._frame_count += 1
+            state = HudState(
+                frame_id=frame_id if frame_id is not None else self._frame_count,
+                timestamp=time.time(),
+                checks=compiled.evaluate(img),
+                avatar_grey=compiled.avatar_grey(img),
+            )
+            self._last_key = frame_id
+            self._last_img = img
+            self._last_state = state
+            logger.debug("HUD: %s", state)
+            return state
+
+    def lookup(self, checker: ColorChecker, img: np.ndarray) -> bool | None:
+        """ 已注册校验器在该帧的结果，不支持批量校验的图片返回None """
+        if img.dtype != np.uint8 or img.ndim != 3 or img.shape[2] != 3:
+            return None
+        with self._lock:
+            name = self._names.get(id(checker))
+            if name is None:
+                return None
+            return self.read(img).get(name)
@@ -197,6 +197,10 @@ class BaseCartethyia(BaseResonator):
 
 
 class Cartethyia(BaseCartethyia):
+    # 小卡、大卡的E按键相同但为不同技能，按各自的技能名计算冷却
+    SKILL_CARTETHYIA_E = "cartethyia_E"
+    SKILL_FLEURDELYS_E = "fleurdelys_E"
+
     # COMBO_SEQ 为训练场单人静态完整连段，后续开发以此为准从中拆分截取
 
     # 常规轴
@@ -952,13 +956,17 @@ class Cartethyia(BaseCartethyia):
         self.combo_action(self.a3(), False)
 
         img = self.img_service.screenshot()
+        skills = self.skills_ready({
+            self.SKILL_CARTETHYIA_E: self.is_resonance_skill_cartethyia_ready,
+            self.SKILL_FLEURDELYS_E: self.is_resonance_skill_fleurdelys_ready,
+        }, img)
         # 常态 小卡技能
         # is_concerto_energy_ready = self.is_concerto_energy_ready(img)
-        is_resonance_skill_cartethyia_ready = self.is_resonance_skill_cartethyia_ready(img)
+        is_resonance_skill_cartethyia_ready = skills[self.SKILL_CARTETHYIA_E]
         # is_echo_skill_ready = self.is_echo_skill_ready(img)
         is_resonance_liberation_ready = self.is_resonance_liberation_ready(img)
         # 大卡技能
-        is_resonance_skill_fleurdelys_ready = self.is_resonance_skill_fleurdelys_ready(img)
+        is_resonance_skill_fleurdelys_ready = skills[self.SKILL_FLEURDELYS_E]
         # is_resonance_skill_fleurdelys_2_ready = self.is_resonance_skill_fleurdelys_2_ready(img)
         is_resonance_liberation_avatar_fleurdelys_ready = self.is_resonance_liberation_avatar_fleurdelys_ready(img)
         is_resonance_liberation_avatar_cartethyia_ready = self.is_resonance_liberation_avatar_cartethyia_ready(img)
@@ -992,6 +1000,7 @@ class Cartethyia(BaseCartethyia):
                     return
                 time.sleep(0.15)
                 self.combo_action(self.cartethyia_Eza(), False)
+                self.mark_skill_used(self.SKILL_CARTETHYIA_E)
             return
 
         self.combo_action(self.Q(), False)
@@ -1009,6 +1018,7 @@ class Cartethyia(BaseCartethyia):
                     return
                 time.sleep(0.15)
                 self.combo_action(self.cartethyia_Eza(), self.is_avatar_cartethyia_attack_done)
+                self.mark_skill_used(self.SKILL_CARTETHYIA_E)
             else:
                 self.combo_action(self.cartethyia_a4(), self.is_avatar_cartethyia_attack_done)
             if boss_hp <= 0.01:
@@ -1034,8 +1044,10 @@ class Cartethyia(BaseCartethyia):
                 else:
                     self.combo_action(self.R(), False)
                 self.combo_action(self.fleurdelys_EaaE(), False)
+                self.mark_skill_used(self.SKILL_FLEURDELYS_E)
             elif is_resonance_skill_fleurdelys_ready:
                 self.combo_action(self.fleurdelys_EaaE(), False)
+                self.mark_skill_used(self.SKILL_FLEURDELYS_E)
             else:
                 if boss_hp <= 0.01:
                     # self.combo_action(self.fleurdelys_a2(), False)
@@ -1066,12 +1078,14 @@ class Cartethyia(BaseCartethyia):
                 if is_resonance_skill_cartethyia_ready:
                     if self.random_float() < 0.5:
                         self.combo_action(self.cartethyia_E(), False)
+                        self.mark_skill_used(self.SKILL_CARTETHYIA_E)
                         time.sleep(0.2)
                     else:
                         # self.combo_action(self.cartethyia_a4Eza(), False)
                         self.combo_action(self.cartethyia_a4(), False)
                         time.sleep(0.3)
                         self.combo_action(self.cartethyia_Eza(), True)
+                        self.mark_skill_used(self.SKILL_CARTETHYIA_E)
                         time.sleep(0.2)
             return
 
@@ -1086,6 +1100,7 @@ class Cartethyia(BaseCartethyia):
                     self.combo_action(self.cartethyia_a4(), False)
                 if not is_sword_of_virtue_existing and is_resonance_skill_cartethyia_ready:
                     self.combo_action(self.cartethyia_Eza(), True)
+                    self.mark_skill_used(self.SKILL_CARTETHYIA_E)
                 elif not is_sword_of_discord_existing:
                     self.combo_action(self.cartethyia_z(), True)
                     self.combo_action(self.cartethyia_ja(), True)
@@ -1102,6 +1117,7 @@ class Cartethyia(BaseCartethyia):
                 # 检查E 收剑
                 if is_resonance_skill_cartethyia_ready:
                     self.combo_action(self.cartethyia_Eza(), True)
+                    self.mark_skill_used(self.SKILL_CARTETHYIA_E)
                 else:
                     if not is_sword_of_discord_existing:
                         self.combo_action(self.cartethyia_z(), False)
@@ -1128,11 +1144,13 @@ class Cartethyia(BaseCartethyia):
             # 真容，于此展露
             self.combo_action(self.cartethyia_R(), True)
 
-            # 显化爆发
-            img = self.img_service.screenshot()
-            is_resonance_skill_fleurdelys_ready = self.is_resonance_skill_fleurdelys_ready(img)
+            # 显化爆发，只用到技能状态，按冷却预测跳过截图
+            is_resonance_skill_fleurdelys_ready = self.skills_ready({
+                self.SKILL_FLEURDELYS_E: self.is_resonance_skill_fleurdelys_ready,
+            })[self.SKILL_FLEURDELYS_E]
             if is_resonance_skill_fleurdelys_ready:
                 self.combo_action(self.fleurdelys_EaaE(), False)
+                self.mark_skill_used(self.SKILL_FLEURDELYS_E)
             else:
                 self.combo_action(self.fleurdelys_ja3(), False)
             if self.random_float() < 0.5:
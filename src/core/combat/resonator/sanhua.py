@@ -185,11 +185,16 @@ class Sanhua(BaseSanhua):
         # 变奏下砸
         self.combo_action(self.a3(), True)
 
-        img = self.img_service.screenshot()
+        # 只用到技能状态，按冷却预测跳过截图
+        skills = self.skills_ready({
+            "E": self.is_resonance_skill_ready,
+            "Q": self.is_echo_skill_ready,
+            "R": self.is_resonance_liberation_ready,
+        })
         # is_concerto_energy_ready = self.is_concerto_energy_ready(img)
-        is_resonance_skill_ready = self.is_resonance_skill_ready(img)
-        is_echo_skill_ready = self.is_echo_skill_ready(img)
-        is_resonance_liberation_ready = self.is_resonance_liberation_ready(img)
+        is_resonance_skill_ready = skills["E"]
+        is_echo_skill_ready = skills["Q"]
+        is_resonance_liberation_ready = skills["R"]
 
         # 大红莲华
         if is_resonance_liberation_ready:
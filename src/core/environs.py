@@ -8,6 +8,8 @@ ENV_WWA_LOG_PATH = "WWA_LOG_PATH"
 ENV_WWA_LOG_LEADER = "WWA_LOG_LEADER"
 ENV_WWA_PARAM_CONFIG_PATH = "WWA_PARAM_CONFIG_PATH"
 ENV_WWA_OCR_USE_GPU = "WWA_OCR_USE_GPU"
+ENV_WWA_SESSION_RECORD_PATH = "WWA_SESSION_RECORD_PATH"
+ENV_WWA_FRAME_SERVER_NAME = "WWA_FRAME_SERVER_NAME"
 
 
 def __set_root_path():
@@ -65,3 +67,19 @@ def set_ocr_use_gpu(value: bool):
 
 def get_ocr_use_gpu():
     return os.environ.get(ENV_WWA_OCR_USE_GPU)  # "True" / None
+
+
+def set_session_record_path(value: str):
+    os.environ[ENV_WWA_SESSION_RECORD_PATH] = value
+
+
+def get_session_record_path():
+    return os.environ.get(ENV_WWA_SESSION_RECORD_PATH)  # x:/xxx/temp/session/boss.wwas，为空则不录制
+
+
+def set_frame_server_name(value: str):
+    os.environ[ENV_WWA_FRAME_SERVER_NAME] = value
+
+
+def get_frame_server_name():
+    return os.environ.get(ENV_WWA_FRAME_SERVER_NAME)  # 截图服务的共享内存名称，为空则各任务进程自行截图
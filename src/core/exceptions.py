@@ -61,3 +61,10 @@ class StopError(Exception):
     def __init__(self, message="Stopped intentionally"):
         super().__init__(message)
 
+
+
+class ReplayFinishedError(Exception):
+    """Session replay finished"""
+
+    def __init__(self, message="Session replay finished"):
+        super().__init__(message)
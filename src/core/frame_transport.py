@@ -0,0 +1,385 @@
+import logging
+import os
+import threading
+import time
+from multiprocessing import shared_memory
+from typing import Callable
+
+import numpy as np
+
+from src.core.frames import Frame
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = 0x57574146  # "WWAF"
+# 头部字段，int64
+_H_MAGIC = 0
+_H_SLOTS = 1
+_H_SLOT_BYTES = 2
+_H_LATEST = 3  # 最新帧序号
+_H_REQUEST_NS = 4  # 最近一次取帧请求的时间
+_H_HEARTBEAT_NS = 5  # 截图服务心跳
+_H_SERVER_PID = 6
+_H_ERROR_NS = 7  # 最近一次截图或写入失败的时间，等待中的读取方据此立即放弃
+_HEADER_FIELDS = 8
+# 每个槽位的元数据，int64
+_M_STATE = 0  # 槽位中帧的序号，写入中为-1
+_M_TIMESTAMP_NS = 1
+_M_HEIGHT = 2
+_M_WIDTH = 3
+_M_CHANNELS = 4
+_META_FIELDS = 8
+_ALIGN = 64
+
+
+def _align(n: int) -> int:
+    return (n + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def _untrack(shm: shared_memory.SharedMemory):
+    """ posix 下连接方不交给 resource_tracker 管理，避免任务进程退出时删除截图服务创建的共享内存 """
+    if os.name != "posix":
+        return
+    try:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")  # noqa
+    except Exception:
+        pass
+
+
+class SharedFrameRing:
+    """
+    共享内存中的截图环形缓冲区，一个写入方（截图服务进程）多个读取方（任务进程）。
+    每个槽位记录帧序号，写入前置为-1、写完再写入序号，读取方在读取前后比较序号判断是否被覆盖（seqlock）。
+    时间戳为 time.monotonic_ns()，跨进程可比较。
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        self._shm = shm
+        self._owner = owner
+        self._header = np.ndarray((_HEADER_FIELDS,), dtype=np.int64, buffer=shm.buf)
+        if self._header[_H_MAGIC] != _MAGIC:  # 截图服务尚未初始化完成
+            self._header = None
+            shm.close()
+            raise ValueError(f"不是截图共享内存: {shm.name}")
+        self.slots = int(self._header[_H_SLOTS])
+        self.slot_bytes = int(self._header[_H_SLOT_BYTES])
+        meta_offset = _HEADER_FIELDS * 8
+        self._meta = np.ndarray((self.slots, _META_FIELDS), dtype=np.int64, buffer=shm.buf, offset=meta_offset)
+        self._data_offset = _align(meta_offset + self.slots * _META_FIELDS * 8)
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    @staticmethod
+    def size(slots: int, slot_bytes: int) -> int:
+        meta_offset = _HEADER_FIELDS * 8
+        return _align(meta_offset + slots * _META_FIELDS * 8) + slots * _align(slot_bytes)
+
+    @classmethod
+    def create(cls, name: str | None, slots: int, slot_bytes: int) -> "SharedFrameRing":
+        """
+        创建缓冲区，由截图服务进程持有，退出时 unlink
+        :param name: 共享内存名称，为空时自动生成
+        :param slots: 槽位数，读取方持有的零拷贝视图在其后 slots-1 次写入内有效
+        :param slot_bytes: 每个槽位的最大字节数
+        """
+        if slots < 2:
+            raise ValueError("slots must be >= 2")
+        shm = shared_memory.SharedMemory(name=name, create=True, size=cls.size(slots, slot_bytes))
+        header = np.ndarray((_HEADER_FIELDS,), dtype=np.int64, buffer=shm.buf)
+        header[:] = 0
+        header[_H_SLOTS] = slots
+        header[_H_SLOT_BYTES] = _align(slot_bytes)
+        header[_H_SERVER_PID] = os.getpid()
+        header[_H_MAGIC] = _MAGIC
+        del header
+        ring = cls(shm, owner=True)
+        ring._meta[:] = 0
+        return ring
+
+    @classmethod
+    def attach(cls, name: str) -> "SharedFrameRing":
+        """ 连接截图服务创建的缓冲区，共享内存不存在时抛出 FileNotFoundError """
+        ring = cls(shared_memory.SharedMemory(name=name, create=False), owner=False)
+        if ring._header[_H_SERVER_PID] != os.getpid():
+            _untrack(ring._shm)
+        return ring
+
+    def close(self):
+        # 释放引用共享内存的数组后才能关闭
+        self._header = None
+        self._meta = None
+        if self._owner:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+        try:
+            self._shm.close()
+        except BufferError:  # 仍有零拷贝视图，随视图释放
+            logger.debug("共享内存仍被引用: %s", self._shm.name)
+
+    def _slot_view(self, slot: int, shape: tuple[int, ...]) -> np.ndarray:
+        offset = self._data_offset + slot * self.slot_bytes
+        return np.ndarray(shape, dtype=np.uint8, buffer=self._shm.buf, offset=offset)
+
+    # 写入方
+
+    def write(self, img: np.ndarray, timestamp_ns: int) -> int:
+        """
+        写入一帧
+        :param img: uint8 图片
+        :param timestamp_ns: time.monotonic_ns() 截图开始时间
+        :return: 帧序号
+        """
+        if img.dtype != np.uint8 or img.ndim not in (2, 3):
+            raise ValueError(f"不支持的图片: {img.dtype} {img.shape}")
+        if img.nbytes > self.slot_bytes:
+            raise ValueError(f"图片大小超出槽位: {img.nbytes} > {self.slot_bytes}")
+        seq = int(self._header[_H_LATEST]) + 1
+        slot = seq % self.slots
+        meta = self._meta[slot]
+        meta[_M_STATE] = -1
+        self._slot_view(slot, img.shape)[...] = img
+        meta[_M_TIMESTAMP_NS] = timestamp_ns
+        meta[_M_HEIGHT] = img.shape[0]
+        meta[_M_WIDTH] = img.shape[1]
+        meta[_M_CHANNELS] = img.shape[2] if img.ndim == 3 else 0
+        meta[_M_STATE] = seq
+        self._header[_H_LATEST] = seq
+        return seq
+
+    def heartbeat(self):
+        self._header[_H_HEARTBEAT_NS] = time.monotonic_ns()
+
+    def request_ns(self) -> int:
+        return int(self._header[_H_REQUEST_NS])
+
+    def set_error(self, timestamp_ns: int):
+        """ 标记截图失败，timestamp_ns 为该次截图的开始时间 """
+        self._header[_H_ERROR_NS] = timestamp_ns
+
+    # 读取方
+
+    def request(self) -> int:
+        """ 请求截图服务截取新帧，返回请求时间 """
+        request_ns = time.monotonic_ns()
+        self._header[_H_REQUEST_NS] = request_ns
+        return request_ns
+
+    def error_ns(self) -> int:
+        return int(self._header[_H_ERROR_NS])
+
+    def heartbeat_age(self) -> float | None:
+        """ 距离截图服务上次心跳的秒数，尚未心跳（截图服务启动中）时返回None """
+        heartbeat_ns = int(self._header[_H_HEARTBEAT_NS])
+        if heartbeat_ns == 0:
+            return None
+        return (time.monotonic_ns() - heartbeat_ns) / 1e9
+
+    def latest_seq(self) -> int:
+        return int(self._header[_H_LATEST])
+
+    def read(self, seq: int | None = None, copy: bool = False) -> Frame | None:
+        """
+        读取一帧
+        :param seq: 帧序号，为空时读取最新帧
+        :param copy: 为False时返回共享内存的只读视图，在之后 slots-1 次写入内有效，可用 is_current 校验
+        :return: 帧不存在或已被覆盖时返回None
+        """
+        for _ in range(3):
+            if seq is None:
+                target = self.latest_seq()
+            else:
+                target = seq
+            if target <= 0:
+                return None
+            meta = self._meta[target % self.slots]
+            if meta[_M_STATE] != target:
+                if seq is not None:
+                    return None
+                continue  # 最新帧正在被覆盖
+            timestamp_ns = int(meta[_M_TIMESTAMP_NS])
+            h, w, c = int(meta[_M_HEIGHT]), int(meta[_M_WIDTH]), int(meta[_M_CHANNELS])
+            img = self._slot_view(target % self.slots, (h, w, c) if c else (h, w))
+            if copy:
+                img = img.copy()
+            else:
+                img.flags.writeable = False
+            if meta[_M_STATE] != target:  # 读取期间被覆盖
+                continue
+            return Frame(target, timestamp_ns / 1e9, img)
+        return None
+
+    def is_current(self, frame: Frame) -> bool:
+        """ 零拷贝视图对应的槽位是否仍是该帧 """
+        return self._meta[frame.frame_id % self.slots][_M_STATE] == frame.frame_id
+
+
+class FrameServer:
+    """
+    截图服务：按读取方的请求截图写入共享内存，无人请求时不截图，多个进程同时请求合并为一次截图
+    """
+
+    def __init__(self, ring: SharedFrameRing, capture: Callable[[], np.ndarray], interval: float = 0.03,
+                 poll: float = 0.001):
+        """
+        :param ring: 截图服务创建的缓冲区
+        :param capture: 截图函数，返回BGR图片
+        :param interval: 两次截图的最小间隔，秒
+        :param poll: 检查取帧请求的间隔，秒
+        """
+        self._ring = ring
+        self._capture = capture
+        self._interval = interval
+        self._poll = poll
+        self._last_start_ns = 0
+        # 统计
+        self.capture_count = 0
+        self.error_count = 0
+
+    def step(self) -> bool:
+        """ 有新的取帧请求时截一次图，返回是否截图 """
+        ring = self._ring
+        ring.heartbeat()
+        now_ns = time.monotonic_ns()
+        # 上次截图开始后的请求才需要新帧
+        if ring.request_ns() <= self._last_start_ns or now_ns - self._last_start_ns < self._interval * 1e9:
+            return False
+        self._last_start_ns = now_ns
+        try:
+            img = self._capture()
+            ring.write(img, now_ns)
+        except Exception as e:
+            # 截图失败或图片超出槽位，通知等待中的读取方自行截图，先更新统计，读取方被唤醒后即可见
+            self.error_count += 1
+            ring.set_error(now_ns)
+            logger.debug("frame server capture error: %s", e)
+            return False
+        self.capture_count += 1
+        return True
+
+    def serve(self, event):
+        """ 运行直到 event 被清除 """
+        logger.debug("frame server started: %s", self._ring.name)
+        while event.is_set():
+            if not self.step():
+                time.sleep(self._poll)
+        logger.debug("frame server stopped, capture: %s, error: %s", self.capture_count, self.error_count)
+
+
+class SharedFrameClient:
+    """
+    读取截图服务的帧，按需连接共享内存，截图服务不存在或无响应时返回None，由调用方自行截图
+    """
+
+    # 心跳超过该秒数视为截图服务已退出，重新连接
+    STALE_SECONDS = 1.0
+    # 缓冲区已创建而截图服务尚未心跳时视为启动中，超过该秒数仍未心跳视为已退出
+    STARTUP_SECONDS = 10.0
+    # 连接失败后的重试间隔
+    RETRY_SECONDS = 1.0
+    # 截图服务截图失败后，该秒数内不再请求，直接由调用方截图
+    ERROR_BACKOFF_SECONDS = 1.0
+
+    def __init__(self, name: str, copy: bool = True, poll: float = 0.001):
+        """
+        :param name: 共享内存名称
+        :param copy: 是否复制帧，为False时返回共享内存的只读视图
+        :param poll: 等待新帧时的轮询间隔，秒
+        """
+        self.name = name
+        self.copy = copy
+        self._poll = poll
+        self._lock = threading.Lock()
+        self._ring: SharedFrameRing | None = None
+        self._retry_at = 0.0
+        self._error_until = 0.0
+        self._starting_since: float | None = None  # 首次看到截图服务启动中的时间
+        # 统计
+        self.hit_count = 0
+        self.wait_count = 0
+        self.miss_count = 0
+
+    def _is_alive(self, ring: SharedFrameRing) -> bool:
+        age = ring.heartbeat_age()
+        if age is not None:
+            self._starting_since = None
+            return age <= self.STALE_SECONDS
+        # 启动中，与截图服务同时启动的读取方可以先请求，截图服务开始运行后即响应
+        now = time.monotonic()
+        if self._starting_since is None:
+            self._starting_since = now
+        return now - self._starting_since <= self.STARTUP_SECONDS
+
+    def _get_ring(self) -> SharedFrameRing | None:
+        ring = self._ring
+        if ring is not None:
+            if self._is_alive(ring):
+                return ring
+            logger.debug("frame server stale: %s", self.name)
+            self._ring = None
+            ring.close()
+        now = time.monotonic()
+        if now < self._retry_at:
+            return None
+        self._retry_at = now + self.RETRY_SECONDS
+        try:
+            ring = SharedFrameRing.attach(self.name)
+        except (FileNotFoundError, ValueError) as e:
+            logger.debug("frame server not available: %s, %s", self.name, e)
+            return None
+        if not self._is_alive(ring):
+            ring.close()
+            return None
+        self._ring = ring
+        return ring
+
+    def get(self, max_age: float = 0.05, timeout: float = 0.5) -> Frame | None:
+        """
+        获取不早于 max_age 秒前截取的帧，没有则请求截图服务截图并等待
+        :return: 超时、截图服务不可用或截图失败时返回None
+        """
+        with self._lock:
+            ring = self._get_ring()
+            if ring is None:
+                self.miss_count += 1
+                return None
+            request_time = time.monotonic()
+            oldest = request_time - max_age
+            frame = ring.read(copy=self.copy)
+            if frame is not None and frame.timestamp >= oldest:
+                self.hit_count += 1
+                return frame
+            if request_time < self._error_until:
+                self.miss_count += 1
+                return None
+            self.wait_count += 1
+            request_ns = ring.request()
+            deadline = request_time + timeout
+            seq = ring.latest_seq()
+            while time.monotonic() < deadline:
+                latest = ring.latest_seq()
+                if latest != seq:
+                    seq = latest
+                    frame = ring.read(copy=self.copy)
+                    if frame is not None and frame.timestamp >= oldest:
+                        return frame
+                    request_ns = ring.request()
+                elif ring.error_ns() >= request_ns:  # 本次请求的截图失败
+                    self._error_until = time.monotonic() + self.ERROR_BACKOFF_SECONDS
+                    self.miss_count += 1
+                    logger.debug("frame server capture failed: %s", self.name)
+                    return None
+                time.sleep(self._poll)
+            self.miss_count += 1
+            logger.debug("frame server timeout: %s", self.name)
+            return None
+
+    def close(self):
+        with self._lock:
+            ring, self._ring = self._ring, None
+        if ring is not None:
+            ring.close()
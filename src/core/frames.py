@@ -0,0 +1,160 @@
+import logging
+import threading
+import time
+from typing import Callable
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class Frame:
+    """ 一帧截图，frame_id 单调递增，timestamp 为 time.monotonic() 截图开始时间 """
+
+    __slots__ = ("frame_id", "timestamp", "img")
+
+    def __init__(self, frame_id: int, timestamp: float, img: np.ndarray):
+        self.frame_id: int = frame_id
+        self.timestamp: float = timestamp
+        self.img: np.ndarray = img
+
+    def __repr__(self):
+        return f"Frame(frame_id={self.frame_id}, timestamp={self.timestamp:.4f}, shape={self.img.shape})"
+
+    def age(self, now: float | None = None) -> float:
+        """ 帧龄，秒 """
+        if now is None:
+            now = time.monotonic()
+        return now - self.timestamp
+
+
+class FrameBus:
+    """
+    共享最新帧总线，单个后台线程截图并发布最新帧，供战斗线程与页面主循环共用，避免同一窗口被重复截图。
+    按需截图：最新帧足够新则直接复用，否则唤醒截图线程，多个同时等待的取帧请求合并为一次截图，无人取帧时不截图。
+    """
+
+    def __init__(self, capture: Callable[[], np.ndarray], interval: float = 0.03, name: str = "FrameBusThread"):
+        """
+        :param capture: 截图函数，返回BGR图片
+        :param interval: 两次截图的最小间隔，秒
+        :param name: 线程名
+        """
+        self._capture = capture
+        self._interval = interval
+        self._name = name
+
+        self._cond = threading.Condition()
+        self._frame: Frame | None = None
+        self._frame_id = 0
+        self._error: Exception | None = None
+        self._pending = False  # 有取帧请求在等待新帧
+        self._capture_start: float | None = None  # 进行中的截图的开始时间
+        self._running = False
+        self._thread: threading.Thread | None = None
+
+        # 统计
+        self.capture_count = 0
+        self.hit_count = 0
+        self.wait_count = 0
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return self
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name=self._name)
+            self._thread.daemon = True
+            self._thread.start()
+        logger.debug("%s started, interval: %s", self._name, self._interval)
+        return self
+
+    def stop(self, timeout: float = 1.0):
+        with self._cond:
+            if not self._running:
+                return
+            self._running = False
+            self._cond.notify_all()
+            thread = self._thread
+            self._thread = None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+        logger.debug("%s stopped, capture: %s, hit: %s, wait: %s",
+                     self._name, self.capture_count, self.hit_count, self.wait_count)
+
+    def latest(self) -> Frame | None:
+        """ 最新帧，不触发截图，可能为空 """
+        with self._cond:
+            return self._frame
+
+    def get(self, max_age: float = 0.05, timeout: float = 1.0) -> Frame | None:
+        """
+        获取不早于 max_age 秒前截取的帧，没有则唤醒截图线程并等待新帧
+        :param max_age: 可接受的最大帧龄，秒
+        :param timeout: 等待新帧的超时时间，秒
+        :return: 超时或总线未运行返回None，由调用方自行截图
+        """
+        request_time = time.monotonic()
+        deadline = request_time + timeout
+        oldest = request_time - max_age
+        with self._cond:
+            frame = self._frame
+            if frame is not None and frame.timestamp >= oldest:
+                self.hit_count += 1
+                return frame
+            self.wait_count += 1
+            self._error = None
+            while self._running:
+                frame = self._frame
+                if frame is not None and frame.timestamp >= oldest:
+                    return frame
+                if self._error is not None:
+                    raise self._error
+                capturing = self._capture_start is not None and self._capture_start >= oldest
+                if not self._pending and not capturing:  # 进行中的截图已满足要求则无需再截
+                    self._pending = True
+                    self._cond.notify_all()  # 唤醒挂起的截图线程
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.debug("%s get frame timeout", self._name)
+                    return None
+                self._cond.wait(remaining)
+        return None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                # 无人等待新帧时挂起
+                while self._running and not self._pending:
+                    self._cond.wait()
+                if not self._running:
+                    break
+                # 截图开始前清除标记，此后到达的请求若要求更新的帧，会重新标记
+                self._pending = False
+                start_time = self._capture_start = time.monotonic()
+            try:
+                img = self._capture()
+            except Exception as e:
+                logger.debug("%s capture error: %s", self._name, e)
+                with self._cond:
+                    self._capture_start = None
+                    self._error = e
+                    self._cond.notify_all()
+                time.sleep(self._interval)
+                continue
+            if img is not None and img.flags.writeable:
+                img.flags.writeable = False  # 多线程共享，只读
+            with self._cond:
+                self._frame_id += 1
+                self._frame = Frame(self._frame_id, start_time, img)
+                self._capture_start = None
+                self._error = None
+                self.capture_count += 1
+                self._cond.notify_all()
+            sleep_seconds = self._interval - (time.monotonic() - start_time)
+            if sleep_seconds > 0:
+                time.sleep(sleep_seconds)
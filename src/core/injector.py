@@ -1,8 +1,10 @@
-import importlib.util
+import atexit
 import logging
 
 from dependency_injector import containers, providers
 
+from src.core import environs
+
 logger = logging.getLogger(__name__)
 
 
@@ -14,35 +16,32 @@ class Container(containers.DeclarativeContainer):
     from src.service.boss_info_service import BossInfoServiceImpl
     from src.service.control_service import Win32ControlServiceImpl
     from src.service.daily_activity_service import DailyActivityServiceImpl
-    from src.service.img_service import ImgServiceImpl
+    from src.service.img_service import ImgServiceImpl, SharedFrameImgServiceImpl
     # from src.service.ocr_service import PaddleOcrServiceImpl
     # from src.service.ocr_service import RapidOcrServiceImpl
     from src.service.od_service import YoloServiceImpl
     from src.service.window_service import HwndServiceImpl
 
-    ocr_engine_impl = None
-    try:
-        # 若安装paddleocr则是用paddleocr作为ocr引擎
-        if importlib.util.find_spec("paddleocr"):
-            from paddleocr import PaddleOCR
-            from src.service.ocr_service import PaddleOcrServiceImpl
-            ocr_engine_impl = PaddleOcrServiceImpl
-            logger.info("paddleocr detected")
-    except Exception:
-        pass
-    # 默认ocr引擎
-    if ocr_engine_impl is None:
-        from src.service.ocr_service import RapidOcrServiceImpl
-        ocr_engine_impl = RapidOcrServiceImpl
-        logger.debug("rapidocr detected")
+    from src.service.ocr_service import get_ocr_service_impl
+    ocr_engine_impl = get_ocr_service_impl()
 
     context = providers.Dependency()
     keyboard_mapping = providers.Object({})
     window_service = providers.Singleton(HwndServiceImpl, context=context)
-    img_service = providers.Singleton(
-        ImgServiceImpl,
-        context=context,
-        window_service=window_service
+    # 开启截图服务时从共享内存读取截图
+    img_service = providers.Selector(
+        lambda: "shared" if environs.get_frame_server_name() else "local",
+        local=providers.Singleton(
+            ImgServiceImpl,
+            context=context,
+            window_service=window_service
+        ),
+        shared=providers.Singleton(
+            SharedFrameImgServiceImpl,
+            context=context,
+            window_service=window_service,
+            frame_server_name=providers.Callable(environs.get_frame_server_name)
+        ),
     )
     ocr_service = providers.Singleton(
         ocr_engine_impl,
@@ -115,4 +114,20 @@ class Container(containers.DeclarativeContainer):
         container.context.override(providers.Object(context))
         context._container = container
         container.init_resources()
+        if session_record_path := environs.get_session_record_path():
+            Container._record_session(container, session_record_path)
         return container
+
+    @staticmethod
+    def _record_session(container: "Container", session_record_path: str):
+        """ 录制截图与键鼠调用，用于离线回放 """
+        from src.core.sessions import SessionWriter
+        from src.service.replay_service import RecordingImgServiceImpl, RecordingControlService
+
+        session_writer = SessionWriter(session_record_path)
+        atexit.register(session_writer.close)
+        img_service = container.img_service()
+        control_service = container.control_service()
+        container.img_service.override(providers.Object(RecordingImgServiceImpl(img_service, session_writer)))
+        container.control_service.override(
+            providers.Object(RecordingControlService(control_service, session_writer)))
@@ -0,0 +1,201 @@
+import heapq
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+
+from src.util import timer_util
+
+logger = logging.getLogger(__name__)
+
+# 输入事件类型
+KEY_DOWN = "key_down"
+KEY_UP = "key_up"
+MOUSE_LEFT_DOWN = "mouse_left_down"
+MOUSE_LEFT_UP = "mouse_left_up"
+MOUSE_RIGHT_DOWN = "mouse_right_down"
+MOUSE_RIGHT_UP = "mouse_right_up"
+
+# 按下 -> 对应的抬起
+_RELEASE = {KEY_DOWN: KEY_UP, MOUSE_LEFT_DOWN: MOUSE_LEFT_UP, MOUSE_RIGHT_DOWN: MOUSE_RIGHT_UP}
+_UPS = frozenset(_RELEASE.values())
+
+# 同一时间抬起先于按下
+PRIORITY_UP = 0
+PRIORITY_DOWN = 1
+
+
+class InputEvent:
+    """ 输入事件，按键码与坐标均已解析，发送时无需再查表 """
+
+    __slots__ = ("kind", "code", "x", "y")
+
+    def __init__(self, kind: str, code: int = 0, x: int = 0, y: int = 0):
+        self.kind = kind
+        self.code = code  # 虚拟键码，鼠标事件为0
+        self.x = x
+        self.y = y
+
+    @property
+    def target(self) -> tuple[str, int]:
+        """ 按下与抬起共用的标识，如 (key, 87)、(mouse_left, 0) """
+        return self.kind.rsplit("_", 1)[0], self.code
+
+    def __repr__(self):
+        return f"InputEvent({self.kind}, {self.code}, {self.x}, {self.y})"
+
+
+class InputBackend(ABC):
+    """ 输入发送后端 """
+
+    @abstractmethod
+    def send(self, event: InputEvent):
+        pass
+
+
+class RecordingInputBackend(InputBackend):
+    """ 只记录事件与发送时间，不依赖窗口，用于测试与测量 """
+
+    def __init__(self):
+        self.events: list[tuple[InputEvent, float]] = []
+
+    def send(self, event: InputEvent):
+        self.events.append((event, time.perf_counter()))
+
+
+class InputDispatcher:
+    """
+    输入分发线程：调用方把按下、抬起事件按时间放入优先队列后立即返回，由分发线程在到期时发送。
+    事件按调用顺序排在时间线上，前一个按键抬起后才按下下一个，调用方无需阻塞等待按压时间。
+    """
+
+    # 距到期时间小于该值时不再等待条件变量，改用精确计时
+    _PRECISE_SECONDS = 0.002
+
+    def __init__(self, backend: InputBackend, name: str = "InputDispatcher"):
+        self._backend = backend
+        self._name = name
+        self._cond = threading.Condition()
+        self._queue: list[tuple[float, int, int, InputEvent]] = []
+        self._seq = 0
+        self._cursor = 0.0  # 时间线末尾，下一个动作最早的开始时间
+        self._held: dict[tuple[str, int], InputEvent] = {}  # 已发送或正在发送按下、未发送抬起的按键
+        self._thread: threading.Thread | None = None
+        self._running = False
+        self._sending = False
+        # 统计：发送时间与计划时间的延迟
+        self.sent_count = 0
+        self.cancelled_count = 0
+        self.latencies: list[float] = []
+        self._max_latencies = 10000
+
+    @property
+    def backend(self) -> InputBackend:
+        return self._backend
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name=self._name, daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float | None = 1.0):
+        """ 停止分发线程，未发送的事件丢弃，已按下的按键释放 """
+        self.cancel()
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _push(self, due: float, priority: int, event: InputEvent):
+        heapq.heappush(self._queue, (due, priority, self._seq, event))
+        self._seq += 1
+
+    def schedule(self, event: InputEvent, seconds: float = 0.0):
+        """
+        在时间线末尾加入一个事件，之后的事件至少等待 seconds
+        :param event: 事件
+        :param seconds: 事件发送后的等待时间
+        """
+        with self._cond:
+            due = max(self._cursor, time.perf_counter())
+            self._push(due, PRIORITY_UP if event.kind in _UPS else PRIORITY_DOWN, event)
+            self._cursor = due + max(seconds, 0.0)
+            self._cond.notify()
+
+    def press(self, down: InputEvent, up: InputEvent, seconds: float):
+        """ 在时间线末尾加入按下与抬起，按压 seconds 秒 """
+        with self._cond:
+            due = max(self._cursor, time.perf_counter())
+            self._push(due, PRIORITY_DOWN, down)
+            self._push(due + max(seconds, 0.0), PRIORITY_UP, up)
+            self._cursor = due + max(seconds, 0.0)
+            self._cond.notify()
+
+    def cancel(self):
+        """ 丢弃未发送的事件，释放已按下的按键，如连招被 StopError 中断时 """
+        with self._cond:
+            self.cancelled_count += len(self._queue)
+            self._queue.clear()
+            now = time.perf_counter()
+            self._cursor = now
+            for down in list(self._held.values()):
+                kind = _RELEASE[down.kind]
+                self._push(now, PRIORITY_UP, InputEvent(kind, down.code, down.x, down.y))
+            self._cond.notify()
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._queue)
+
+    def wait_idle(self, timeout: float | None = None) -> bool:
+        """ 等待所有事件发送完 """
+        end = None if timeout is None else time.perf_counter() + timeout
+        with self._cond:
+            while self._queue or self._sending:
+                remaining = None if end is None else end - time.perf_counter()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and not self._queue:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                due = self._queue[0][0]
+                remaining = due - time.perf_counter()
+                if remaining > self._PRECISE_SECONDS:
+                    # 等待期间可能加入更早的事件，被唤醒后重新取队首
+                    self._cond.wait(remaining - self._PRECISE_SECONDS)
+                    continue
+                self._sending = True
+            timer_util.sleep_until(due)
+            with self._cond:
+                if not self._queue or self._queue[0][0] != due:
+                    self._sending = False
+                    continue
+                _, _, _, event = heapq.heappop(self._queue)
+                # 出队时即更新按下状态，发送期间 cancel 也能释放正在按下的按键
+                if event.kind in _UPS:
+                    self._held.pop(event.target, None)
+                else:
+                    self._held[event.target] = event
+            try:
+                self._backend.send(event)
+            except Exception as e:
+                logger.warning("Send input event failed: %s, %s", event, e)
+            sent = time.perf_counter()
+            with self._cond:
+                self.sent_count += 1
+                if len(self.latencies) < self._max_latencies:
+                    self.latencies.append(sent - due)
+                self._sending = False
+                self._cond.notify_all()
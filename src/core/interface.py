@@ -5,6 +5,7 @@ from enum import Enum
 import numpy as np
 
 from src.core.boss import RouteStep, RestartParam
+from src.core.frames import Frame
 from src.core.pages import Page, ConditionalAction
 from src.core.regions import Position, TextPosition, DynamicPosition
 
@@ -75,6 +76,24 @@ class ImgService(ABC):
     def set_capture_mode(self, capture_mode: CaptureEnum):
         pass
 
+    @abstractmethod
+    def get_frame(self, max_age: float | None = None) -> Frame:
+        """
+        获取整个窗口的截图帧，帧总线开启时复用不早于 max_age 秒前的共享帧
+        :param max_age: 可接受的最大帧龄，秒，None则使用配置值
+        :return:
+        """
+        pass
+
+    @abstractmethod
+    def start_frame_bus(self):
+        """开启帧总线，后台线程统一截图，screenshot()无区域时从总线取帧"""
+        pass
+
+    @abstractmethod
+    def stop_frame_bus(self):
+        pass
+
     @abstractmethod
     def match_template(self,
                        img: np.ndarray | None,
@@ -171,6 +190,14 @@ class PageEventService(ABC):
     def get_conditional_actions(self) -> list[ConditionalAction]:
         pass
 
+    def get_ocr_regions(self, pages: list[Page] | None = None) -> tuple[tuple[float, float, float, float], ...] | None:
+        """
+        待匹配页面所需的OCR区域
+        :param pages: 待匹配页面，默认为全部页面
+        :return: 百分比区域，None表示需整图识别
+        """
+        return None
+
 
 class GameControlService(ABC):
     """游戏基础按键控制，包含常用按键，简化调用，不做精细控制"""
@@ -320,6 +347,10 @@ class PlayerControlService(ABC):
     def key_up(self, key: str, seconds: float | None = None):
         pass
 
+    def cancel_input(self):
+        """丢弃尚未发送的按键并释放已按下的按键，同步发送时无需处理"""
+        pass
+
 
 class ExtendedControlService(ABC):
     """拓展操作键鼠控制"""
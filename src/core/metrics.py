@@ -0,0 +1,381 @@
+import bisect
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# 延迟直方图的桶上界，秒，0.1ms 到约 26s，相邻桶相差 25%
+LATENCY_BUCKETS: tuple[float, ...] = tuple(round(1e-4 * 1.25 ** i, 7) for i in range(57))
+
+
+class Counter:
+    """ 只增计数 """
+
+    __slots__ = ("name", "value", "_lock")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, n: int = 1):
+        with self._lock:
+            self.value += n
+
+
+class Gauge:
+    """ 当前值，如队列长度、已缓存的会话数 """
+
+    __slots__ = ("name", "value")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.value = 0.0
+
+    def set(self, value: float):
+        self.value = value
+
+
+class Histogram:
+    """
+    固定桶直方图：记录每个桶的次数与总数、总和、最值，按桶插值估算分位数。
+    桶固定，多个进程的直方图可直接按桶相加后再算分位数。
+    """
+
+    __slots__ = ("name", "buckets", "counts", "count", "sum", "min", "max", "_lock")
+
+    def __init__(self, name: str, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # 最后一个为超出最大上界
+        self.count = 0
+        self.sum = 0.0
+        self.min = float("inf")
+        self.max = float("-inf")
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+            if value < self.min:
+                self.min = value
+            if value > self.max:
+                self.max = value
+
+    def time(self) -> "_Timer":
+        """ with histogram.time(): ... 记录代码块耗时 """
+        return _Timer(self)
+
+    def percentile(self, q: float) -> float | None:
+        with self._lock:
+            return _percentile(self.buckets, self.counts, self.count, self.min, self.max, q)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts = list(self.counts)
+            count, total, min_value, max_value = self.count, self.sum, self.min, self.max
+        return _histogram_dict(self.buckets, counts, count, total, min_value, max_value)
+
+
+class _Timer:
+    __slots__ = ("_histogram", "_start")
+
+    def __init__(self, histogram: Histogram):
+        self._histogram = histogram
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._histogram.observe(time.perf_counter() - self._start)
+
+
+def _percentile(buckets: tuple[float, ...] | list[float], counts: list[int], count: int, min_value: float,
+                max_value: float, q: float) -> float | None:
+    """ 按桶线性插值估算分位数，结果限制在最值之间 """
+    if count <= 0:
+        return None
+    rank = q * count
+    cumulative = 0
+    for index, bucket_count in enumerate(counts):
+        if bucket_count == 0:
+            continue
+        if cumulative + bucket_count >= rank:
+            lower = buckets[index - 1] if index > 0 else min_value
+            upper = buckets[index] if index < len(buckets) else max_value
+            lower, upper = max(lower, min_value), min(upper, max_value)
+            value = lower + (upper - lower) * (rank - cumulative) / bucket_count
+            return min(max(value, min_value), max_value)
+        cumulative += bucket_count
+    return max_value
+
+
+def _histogram_dict(buckets, counts: list[int], count: int, total: float, min_value: float,
+                    max_value: float) -> dict:
+    if count == 0:
+        min_value = max_value = 0.0
+    return {
+        "count": count,
+        "sum": total,
+        "min": min_value,
+        "max": max_value,
+        "mean": total / count if count else 0.0,
+        "p50": _percentile(buckets, counts, count, min_value, max_value, 0.5),
+        "p95": _percentile(buckets, counts, count, min_value, max_value, 0.95),
+        "p99": _percentile(buckets, counts, count, min_value, max_value, 0.99),
+        "buckets": list(buckets),
+        "counts": counts,
+    }
+
+
+class MetricsRegistry:
+    """ 进程内的指标注册表，按名称获取或创建指标 """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: dict[str, Counter] = {}
+        self._gauges: dict[str, Gauge] = {}
+        self._histograms: dict[str, Histogram] = {}
+
+    def counter(self, name: str) -> Counter:
+        metric = self._counters.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._counters.setdefault(name, Counter(name))
+        return metric
+
+    def gauge(self, name: str) -> Gauge:
+        metric = self._gauges.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._gauges.setdefault(name, Gauge(name))
+        return metric
+
+    def histogram(self, name: str, buckets: tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        metric = self._histograms.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._histograms.setdefault(name, Histogram(name, buckets))
+        return metric
+
+    def clear(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counters = list(self._counters.values())
+            gauges = list(self._gauges.values())
+            histograms = list(self._histograms.values())
+        return {
+            "pid": os.getpid(),
+            "timestamp": time.time(),
+            "counters": {i.name: i.value for i in counters},
+            "gauges": {i.name: i.value for i in gauges},
+            "histograms": {i.name: i.snapshot() for i in histograms},
+        }
+
+
+# 当前进程的默认注册表
+REGISTRY = MetricsRegistry()
+
+
+def counter(name: str) -> Counter:
+    return REGISTRY.counter(name)
+
+
+def gauge(name: str) -> Gauge:
+    return REGISTRY.gauge(name)
+
+
+def histogram(name: str, buckets: tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+    return REGISTRY.histogram(name, buckets)
+
+
+def timed(_func=None, *, name: str | None = None, ignore: int = 0, registry: MetricsRegistry | None = None):
+    """
+    记录函数耗时到直方图，跳过前 ignore 次调用（如模型首次推理），跳过的次数计入 <name>.ignored 计数
+    :param name: 指标名称，默认为函数的 __qualname__
+    """
+
+    def decorator(func):
+        metric_name = name or func.__qualname__
+        ignored = 0
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            nonlocal ignored
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                if ignored < ignore:
+                    ignored += 1
+                    (registry or REGISTRY).counter(f"{metric_name}.ignored").inc()
+                else:
+                    (registry or REGISTRY).histogram(metric_name).observe(elapsed)
+
+        return wrapper
+
+    # 支持 @timed 与 @timed(name=..., ignore=...)
+    if _func is None:
+        return decorator
+    return decorator(_func)
+
+
+class SnapshotWriter:
+    """ 后台线程按间隔把注册表快照写入 JSON 文件，供主进程汇总 """
+
+    def __init__(self, path: str | Path, interval: float = 10.0, registry: MetricsRegistry | None = None,
+                 process_name: str | None = None):
+        self.path = Path(path)
+        self.interval = interval
+        self.registry = registry or REGISTRY
+        self.process_name = process_name
+        self._event = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def write(self):
+        snapshot = self.registry.snapshot()
+        snapshot["process"] = self.process_name
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning("写入指标快照失败: %s, %s", self.path, e)
+
+    def start(self) -> "SnapshotWriter":
+        if self._thread is not None:
+            return self
+        self._thread = threading.Thread(target=self._run, name="MetricsSnapshotThread", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._event.set()
+        thread, self._thread = self._thread, None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(1.0)
+        self.write()
+
+    def _run(self):
+        while not self._event.wait(self.interval):
+            self.write()
+
+
+def snapshot_path(directory: str | Path, process_name: str) -> Path:
+    return Path(directory).joinpath(f"{process_name}-{os.getpid()}.json")
+
+
+def load_snapshots(directory: str | Path, max_age: float | None = None) -> list[dict]:
+    """
+    读取目录内各进程的快照
+    :param max_age: 只读取该秒数内写入的快照，为空则全部读取
+    """
+    snapshots = []
+    directory = Path(directory)
+    if not directory.exists():
+        return snapshots
+    now = time.time()
+    for path in directory.glob("*.json"):
+        try:
+            with open(path, encoding="utf-8") as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if not isinstance(snapshot, dict):
+            continue
+        if max_age is not None and now - snapshot.get("timestamp", 0) > max_age:
+            continue
+        snapshots.append(snapshot)
+    return snapshots
+
+
+def clear_snapshots(directory: str | Path):
+    """ 删除目录内的快照，主进程启动时清理上次运行留下的文件 """
+    directory = Path(directory)
+    if not directory.exists():
+        return
+    for path in directory.glob("*.json"):
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+
+def aggregate(snapshots: list[dict]) -> dict:
+    """
+    汇总多个进程的快照：计数相加，当前值按进程列出，直方图按桶相加后重新计算分位数
+    """
+    counters: dict[str, int] = {}
+    gauges: dict[str, dict[str, float]] = {}
+    merged: dict[str, dict] = {}
+    processes = []
+    for snapshot in snapshots:
+        process = f"{snapshot.get('process')}-{snapshot.get('pid')}"
+        processes.append(process)
+        for name, value in snapshot.get("counters", {}).items():
+            counters[name] = counters.get(name, 0) + value
+        for name, value in snapshot.get("gauges", {}).items():
+            gauges.setdefault(name, {})[process] = value
+        for name, hist in snapshot.get("histograms", {}).items():
+            if not hist.get("count"):
+                continue
+            target = merged.get(name)
+            if target is None or target["buckets"] != hist["buckets"]:
+                if target is not None:
+                    logger.debug("直方图桶不一致，忽略: %s", name)
+                    continue
+                merged[name] = {
+                    "buckets": list(hist["buckets"]),
+                    "counts": list(hist["counts"]),
+                    "count": hist["count"],
+                    "sum": hist["sum"],
+                    "min": hist["min"],
+                    "max": hist["max"],
+                }
+                continue
+            target["counts"] = [a + b for a, b in zip(target["counts"], hist["counts"])]
+            target["count"] += hist["count"]
+            target["sum"] += hist["sum"]
+            target["min"] = min(target["min"], hist["min"])
+            target["max"] = max(target["max"], hist["max"])
+    histograms = {
+        name: _histogram_dict(i["buckets"], i["counts"], i["count"], i["sum"], i["min"], i["max"])
+        for name, i in merged.items()
+    }
+    return {"processes": processes, "counters": counters, "gauges": gauges, "histograms": histograms}
+
+
+def format_summary(aggregated: dict) -> str:
+    """ 汇总结果的简要文本，每个直方图一行 """
+    lines = []
+    for name, i in sorted(aggregated.get("histograms", {}).items()):
+        lines.append(f"{name}: count={i['count']}, mean={i['mean'] * 1000:.1f}ms, p50={i['p50'] * 1000:.1f}ms, "
+                     f"p95={i['p95'] * 1000:.1f}ms, p99={i['p99'] * 1000:.1f}ms, max={i['max'] * 1000:.1f}ms")
+    for name, value in sorted(aggregated.get("counters", {}).items()):
+        lines.append(f"{name}: {value}")
+    return "\n".join(lines)
+
+
+def start_snapshot_writer(directory: str | Path, process_name: str, interval: float) -> SnapshotWriter | None:
+    """ 开启当前进程的快照写入，interval 为0时不开启 """
+    if interval <= 0:
+        return None
+    return SnapshotWriter(snapshot_path(directory, process_name), interval, process_name=process_name).start()
+
@@ -0,0 +1,205 @@
+import logging
+from typing import Callable
+
+import cv2
+import numpy as np
+
+from src.config.app_config import AppConfig
+from src.core.ocr_plan import merge_rects, mosaic_ocr, planned_ocr, regions_to_rects
+from src.core.regions import TextPosition
+
+logger = logging.getLogger(__name__)
+
+
+class OcrGate:
+    """
+    帧差分OCR门控：将图片划分为网格，与缓存结果所对应的画面比较每个格子的变化，
+    无变化时复用上一次的OCR结果，部分变化时只重新识别变化的格子，变化较多时整图识别。
+    比较基准只在识别时更新，逐帧缓慢的变化累积超过阈值后同样会重新识别。
+    指定识别区域时，整图识别替换为只识别这些区域，区域外的变化忽略。
+    """
+
+    # 每个格子缩略为 _CELL_SAMPLES x _CELL_SAMPLES 个像素后比较
+    _CELL_SAMPLES = 8
+
+    def __init__(self,
+                 ocr: Callable[[np.ndarray], list[TextPosition]],
+                 grid: int = 8,
+                 pixel_threshold: float = 12.0,
+                 full_ratio: float = 0.5,
+                 full_interval: int = 30,
+                 margin: int = 8):
+        """
+        :param ocr: OCR函数，如 ocr_service.ocr
+        :param grid: 网格行列数
+        :param pixel_threshold: 格子内缩略像素的最大灰度差超过该值视为变化，0~255
+        :param full_ratio: 变化区域占比达到该值时整图识别
+        :param full_interval: 连续复用或局部识别的最大次数，达到后强制整图识别一次，0表示不强制
+        :param margin: 局部识别区域向外扩展的像素，避免文字被截断
+        """
+        self._ocr = ocr
+        self._grid = grid
+        self._pixel_threshold = pixel_threshold
+        self._full_ratio = full_ratio
+        self._full_interval = full_interval
+        self._margin = margin
+
+        self._signature: np.ndarray | None = None  # 缓存结果所对应画面的缩略图
+        self._shape: tuple[int, ...] | None = None
+        self._results: list[TextPosition] = []
+        self._incremental_count = 0
+        self._regions: tuple[tuple[float, float, float, float], ...] | None = None
+        self._region_rects: list[tuple[int, int, int, int]] = []  # 规划区域的像素矩形
+        self._full_area = 0  # 整图或规划区域的总面积
+
+        # 统计
+        self.skipped_count = 0
+        self.partial_count = 0
+        self.full_count = 0
+
+    def reset(self):
+        """ 丢弃缓存，下一次强制整图识别 """
+        self._signature = None
+        self._shape = None
+        self._results = []
+        self._incremental_count = 0
+        self._regions = None
+
+    def stats(self) -> str:
+        total = self.skipped_count + self.partial_count + self.full_count
+        return (f"OCR total: {total}, skipped: {self.skipped_count}, "
+                f"partial: {self.partial_count}, full: {self.full_count}")
+
+    def ocr(self, img: np.ndarray,
+            regions: tuple[tuple[float, float, float, float], ...] | None = None) -> list[TextPosition]:
+        """
+        :param img: 图片
+        :param regions: 只识别的百分比区域，见 OcrRegionPlanner，None表示整图
+        :return: 识别结果
+        """
+        signature = self._get_signature(img)
+        if (self._signature is None
+                or self._shape != img.shape
+                or self._regions != regions
+                or 0 < self._full_interval <= self._incremental_count):
+            return self._full_ocr(img, signature, regions)
+
+        dirty = self._get_dirty_cells(self._signature, signature)
+        rects = self._get_dirty_rects(dirty, img.shape[1], img.shape[0]) if dirty.any() else []
+        if regions is not None:  # 只关心规划区域内的变化
+            rects = self._clip_rects(rects, self._region_rects)
+        if not rects:
+            self.skipped_count += 1
+            self._incremental_count += 1
+            return list(self._results)
+
+        # 与变化区域相交的旧结果需要重新识别，扩大区域以完整包含这些文字，直到区域不再变化
+        while True:
+            expanded = []
+            for x1, y1, x2, y2 in rects:
+                for result in self._results:
+                    if self._intersects(result, (x1, y1, x2, y2)):
+                        x1, y1 = min(x1, result.x1), min(y1, result.y1)
+                        x2, y2 = max(x2, result.x2), max(y2, result.y2)
+                expanded.append((x1, y1, x2, y2))
+            expanded = merge_rects(expanded)
+            if expanded == rects:
+                break
+            rects = expanded
+        kept = [i for i in self._results if not any(self._intersects(i, rect) for rect in rects)]
+        area = sum((x2 - x1) * (y2 - y1) for x1, y1, x2, y2 in rects)
+        if area >= self._full_ratio * self._full_area:
+            return self._full_ocr(img, signature, regions)
+
+        self.partial_count += 1
+        self._incremental_count += 1
+        self._results = kept + mosaic_ocr(self._ocr, img, rects)
+        self._update_signature(signature, rects, img.shape[1], img.shape[0])
+        return list(self._results)
+
+    def _full_ocr(self, img: np.ndarray, signature: np.ndarray,
+                  regions: tuple[tuple[float, float, float, float], ...] | None = None) -> list[TextPosition]:
+        self.full_count += 1
+        self._incremental_count = 0
+        self._signature = signature
+        self._shape = img.shape
+        self._regions = regions
+        h, w = img.shape[:2]
+        if regions is None:
+            self._region_rects = []
+            self._full_area = w * h
+        else:
+            self._region_rects = regions_to_rects(regions, w, h, self._margin)
+            self._full_area = sum((x2 - x1) * (y2 - y1) for x1, y1, x2, y2 in self._region_rects)
+        self._results = planned_ocr(self._ocr, img, regions, self._margin)
+        return list(self._results)
+
+    @staticmethod
+    def _clip_rects(rects: list[tuple[int, int, int, int]],
+                    region_rects: list[tuple[int, int, int, int]]) -> list[tuple[int, int, int, int]]:
+        """ 变化区域与规划区域求交集 """
+        clipped = []
+        for a in rects:
+            for b in region_rects:
+                x1, y1, x2, y2 = max(a[0], b[0]), max(a[1], b[1]), min(a[2], b[2]), min(a[3], b[3])
+                if x2 > x1 and y2 > y1:
+                    clipped.append((x1, y1, x2, y2))
+        return merge_rects(clipped)
+
+    def _get_signature(self, img: np.ndarray) -> np.ndarray:
+        """ 缩略灰度图 """
+        size = self._grid * self._CELL_SAMPLES
+        small = cv2.resize(img, (size, size), interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGRA2GRAY if small.shape[2] == 4 else cv2.COLOR_BGR2GRAY)
+        return small
+
+    def _update_signature(self, signature: np.ndarray, rects: list[tuple[int, int, int, int]], width: int,
+                          height: int):
+        """ 只把重新识别的区域更新为当前帧，区域只覆盖一部分的缩略像素保留原值，之后继续参与比较 """
+        size = signature.shape[0]
+        for x1, y1, x2, y2 in rects:
+            sx1, sy1 = -(-x1 * size // width), -(-y1 * size // height)
+            sx2, sy2 = x2 * size // width, y2 * size // height
+            if sx2 > sx1 and sy2 > sy1:
+                self._signature[sy1:sy2, sx1:sx2] = signature[sy1:sy2, sx1:sx2]
+
+    def _get_dirty_cells(self, previous: np.ndarray, signature: np.ndarray) -> np.ndarray:
+        """ 变化的格子，grid x grid 布尔矩阵 """
+        diff = cv2.absdiff(previous, signature)
+        n, s = self._grid, self._CELL_SAMPLES
+        cell_max = diff.reshape(n, s, n, s).max(axis=(1, 3))
+        return cell_max > self._pixel_threshold
+
+    def _get_dirty_rects(self, dirty: np.ndarray, width: int, height: int) -> list[tuple[int, int, int, int]]:
+        """ 相邻的变化格子合并为矩形，返回图片坐标 (x1, y1, x2, y2) """
+        count, _, stats, _ = cv2.connectedComponentsWithStats(dirty.astype(np.uint8), connectivity=8)
+        cell_w, cell_h = width / self._grid, height / self._grid
+        m = self._margin
+        rects = []
+        for i in range(1, count):
+            col, row, cols, rows = stats[i][:4]
+            rects.append((
+                max(int(col * cell_w) - m, 0),
+                max(int(row * cell_h) - m, 0),
+                min(int((col + cols) * cell_w) + m, width),
+                min(int((row + rows) * cell_h) + m, height),
+            ))
+        return rects
+
+    @staticmethod
+    def _intersects(position: TextPosition, rect: tuple[int, int, int, int]) -> bool:
+        return position.x1 < rect[2] and position.x2 > rect[0] and position.y1 < rect[3] and position.y2 > rect[1]
+
+
+def create_ocr_gate(config: AppConfig, ocr: Callable[[np.ndarray], list[TextPosition]]) -> OcrGate | None:
+    """ 按配置创建OCR门控，画面无变化时复用上次OCR结果，未开启时返回None """
+    if not config.OcrGateEnabled:
+        return None
+    return OcrGate(
+        ocr,
+        grid=config.OcrGateGrid,
+        pixel_threshold=config.OcrGatePixelThreshold,
+        full_ratio=config.OcrGateFullRatio,
+        full_interval=config.OcrGateFullInterval,
+    )
@@ -0,0 +1,149 @@
+import logging
+from typing import Callable, Iterable
+
+import numpy as np
+
+from src.core.pages import Page, TextMatch
+from src.core.regions import TextPosition
+
+logger = logging.getLogger(__name__)
+
+# 拼接图中各区域之间的间隔px，避免相邻区域的文字被检测为同一文本框
+MOSAIC_GAP = 24
+
+
+def merge_rects(rects: list[tuple[int, int, int, int]]) -> list[tuple[int, int, int, int]]:
+    """ 合并相交的矩形 (x1, y1, x2, y2)，避免重复识别 """
+    rects = list(rects)
+    merged = True
+    while merged and len(rects) > 1:
+        merged = False
+        for i in range(len(rects)):
+            for j in range(i + 1, len(rects)):
+                a, b = rects[i], rects[j]
+                if a[0] < b[2] and a[2] > b[0] and a[1] < b[3] and a[3] > b[1]:
+                    rects[i] = (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+                    del rects[j]
+                    merged = True
+                    break
+            if merged:
+                break
+    return rects
+
+
+def regions_to_rects(regions: Iterable[tuple[float, float, float, float]], width: int, height: int,
+                     margin: int = 0) -> list[tuple[int, int, int, int]]:
+    """ 百分比区域转为像素矩形，向外扩展margin并合并相交的矩形 """
+    rects = []
+    for region in regions:
+        rects.append((
+            max(int(width * region[0]) - margin, 0),
+            max(int(height * region[1]) - margin, 0),
+            min(int(width * region[2]) + margin, width),
+            min(int(height * region[3]) + margin, height),
+        ))
+    return merge_rects([i for i in rects if i[2] > i[0] and i[3] > i[1]])
+
+
+def mosaic_ocr(ocr: Callable[[np.ndarray], list[TextPosition]], img: np.ndarray,
+               rects: list[tuple[int, int, int, int]]) -> list[TextPosition]:
+    """
+    多个区域纵向拼接为一张图只识别一次，结果映射回原图坐标
+    :param ocr: OCR函数
+    :param img: 原图
+    :param rects: 像素矩形 (x1, y1, x2, y2)，互不相交
+    :return:
+    """
+    if not rects:
+        return []
+    width = max(x2 - x1 for x1, _, x2, _ in rects)
+    height = sum(y2 - y1 for _, y1, _, y2 in rects) + MOSAIC_GAP * (len(rects) - 1)
+    mosaic = np.zeros((height, width) + img.shape[2:], dtype=img.dtype)
+    offsets = []
+    y = 0
+    for x1, y1, x2, y2 in rects:
+        mosaic[y:y + y2 - y1, 0:x2 - x1] = img[y1:y2, x1:x2]
+        offsets.append((y, y + y2 - y1, x1, y1))
+        y += y2 - y1 + MOSAIC_GAP
+    results = []
+    for result in ocr(mosaic):
+        center_y = (result.y1 + result.y2) / 2
+        for start, end, x1, y1 in offsets:
+            if start <= center_y < end:
+                dx, dy = x1, y1 - start
+                results.append(result.model_copy(update={
+                    "x1": result.x1 + dx, "y1": result.y1 + dy, "x2": result.x2 + dx, "y2": result.y2 + dy
+                }))
+                break
+    return results
+
+
+class OcrRegionPlanner:
+    """
+    根据待匹配页面的文本区域规划OCR区域：所有文本匹配都限定了区域时，只识别这些区域的并集；
+    任一文本匹配未限定区域，或区域并集过大时，返回None表示整图识别。
+    """
+
+    def __init__(self, max_ratio: float = 0.6, cache_size: int = 32):
+        """
+        :param max_ratio: 区域并集占整图比例达到该值时整图识别
+        :param cache_size: 规划结果缓存数量，按页面列表缓存
+        """
+        self._max_ratio = max_ratio
+        self._cache_size = cache_size
+        self._cache: dict[tuple[int, ...], tuple[tuple[float, float, float, float], ...] | None] = {}
+
+    def plan(self, pages: list[Page]) -> tuple[tuple[float, float, float, float], ...] | None:
+        """
+        :param pages: 待匹配的页面
+        :return: 需识别的百分比区域，None表示整图识别
+        """
+        key = tuple(id(page) for page in pages)
+        if key in self._cache:
+            return self._cache[key]
+        regions = self._plan(pages)
+        if len(self._cache) >= self._cache_size:
+            self._cache.pop(next(iter(self._cache)))
+        self._cache[key] = regions
+        logger.debug("OCR regions: %s, pages: %s", regions, [page.name for page in pages])
+        return regions
+
+    def _plan(self, pages: list[Page]) -> tuple[tuple[float, float, float, float], ...] | None:
+        regions = []
+        for page in pages:
+            for text_match in page.targetTexts + page.excludeTexts:
+                region = self._get_region(text_match)
+                if region is None:
+                    return None
+                regions.append(region)
+        if not regions:  # 无文本匹配，无需识别
+            return ()
+        # 以1280x720估算并集面积
+        rects = regions_to_rects(regions, 1280, 720)
+        area = sum((x2 - x1) * (y2 - y1) for x1, y1, x2, y2 in rects)
+        if area >= self._max_ratio * 1280 * 720:
+            return None
+        return tuple(regions)
+
+    @staticmethod
+    def _get_region(text_match: TextMatch) -> tuple[float, float, float, float] | None:
+        if not text_match.open_position or text_match.position is None or text_match.position.rate is None:
+            return None
+        return text_match.position.rate
+
+
+def planned_ocr(ocr: Callable[[np.ndarray], list[TextPosition]], img: np.ndarray,
+                regions: tuple[tuple[float, float, float, float], ...] | None,
+                margin: int = 8) -> list[TextPosition]:
+    """
+    按规划的区域识别
+    :param ocr: OCR函数
+    :param img: 图片
+    :param regions: 百分比区域，None表示整图识别
+    :param margin: 区域向外扩展的像素，为文本检测保留边缘
+    :return: 原图坐标的识别结果
+    """
+    if regions is None:
+        return ocr(img)
+    h, w = img.shape[:2]
+    return mosaic_ocr(ocr, img, regions_to_rects(regions, w, h, margin))
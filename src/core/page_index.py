@@ -0,0 +1,149 @@
+import logging
+import re
+from re import Pattern
+
+from src.core.pages import Page, TextMatch
+from src.core.regions import TextPosition
+
+logger = logging.getLogger(__name__)
+
+# 正则解析器是标准库的私有模块，不可用时不提取锚点，所有页面均为候选
+try:
+    import re._constants as sre_constants
+    import re._parser as sre_parser
+
+    _REPEATS = tuple(getattr(sre_constants, i) for i in ("MAX_REPEAT", "MIN_REPEAT", "POSSESSIVE_REPEAT")
+                     if hasattr(sre_constants, i))
+    _ATOMIC_GROUP = getattr(sre_constants, "ATOMIC_GROUP", None)
+    _LITERAL, _SUBPATTERN, _BRANCH = sre_constants.LITERAL, sre_constants.SUBPATTERN, sre_constants.BRANCH
+except (ImportError, AttributeError):
+    logger.warning("正则解析器不可用，页面索引已停用")
+    sre_parser = None
+
+
+def _sequence_anchors(items) -> frozenset[str] | None:
+    """
+    从正则序列中提取锚点：匹配成功时，锚点中至少有一个必然是匹配文本的子串
+    :return: 锚点集合，None表示无法提取
+    """
+    best: frozenset[str] | None = None
+
+    def consider(candidate: frozenset[str] | None):
+        nonlocal best
+        if candidate and all(candidate) and (best is None or _score(candidate) > _score(best)):
+            best = candidate
+
+    run: list[str] = []
+    for op, av in items:
+        if op == _LITERAL and chr(av) != "\n":
+            run.append(chr(av))
+            continue
+        consider(frozenset(["".join(run)]) if run else None)
+        run = []
+        if op == _SUBPATTERN:
+            consider(_sequence_anchors(av[-1]))
+        elif _ATOMIC_GROUP is not None and op == _ATOMIC_GROUP:
+            consider(_sequence_anchors(av))
+        elif op == _BRANCH:
+            consider(_branch_anchors(av[1]))
+        elif op in _REPEATS and av[0] >= 1:  # 至少出现一次
+            consider(_sequence_anchors(av[2]))
+    consider(frozenset(["".join(run)]) if run else None)
+    return best
+
+
+def _branch_anchors(branches) -> frozenset[str] | None:
+    anchors = set()
+    for branch in branches:
+        branch_anchors = _sequence_anchors(branch)
+        if branch_anchors is None:  # 任一分支无锚点，则整个分支结构无锚点
+            return None
+        anchors.update(branch_anchors)
+    return frozenset(anchors)
+
+
+def _score(anchors: frozenset[str]) -> int:
+    """ 锚点选择性，最短的锚点越长越好 """
+    return min(len(i) for i in anchors)
+
+
+def extract_anchors(pattern: str | Pattern) -> frozenset[str] | None:
+    """
+    提取正则的字面量锚点，均为小写
+    :param pattern: 正则
+    :return: 锚点集合，匹配成功时至少有一个锚点出现在文本中（忽略大小写）；None表示无法提取
+    """
+    if isinstance(pattern, Pattern):
+        pattern, flags = pattern.pattern, pattern.flags
+    else:
+        flags = re.I
+    if not isinstance(pattern, str) or sre_parser is None:
+        return None
+    try:
+        # 解析结果的结构随 Python 版本变化时同样视为无法提取
+        anchors = _sequence_anchors(list(sre_parser.parse(pattern, flags)))
+    except Exception:
+        logger.debug("Parse regex failed: %s", pattern)
+        return None
+    if anchors is None:
+        return None
+    return frozenset(i.lower() for i in anchors)
+
+
+class PageIndex:
+    """
+    页面关键字倒排索引：从每个页面必需文本的正则中提取字面量锚点，
+    根据一次OCR结果只返回锚点都出现了的候选页面，再由 Page.is_match 完整匹配。
+    """
+
+    def __init__(self):
+        # id(page) -> (page, 必需文本的锚点集合列表)，保存page引用防止id被复用
+        self._entries: dict[int, tuple[Page, tuple[frozenset[str], ...]]] = {}
+        self._text_match_cache: dict[int, tuple[TextMatch, frozenset[str] | None]] = {}
+
+    def _get_requirements(self, page: Page) -> tuple[frozenset[str], ...]:
+        entry = self._entries.get(id(page))
+        if entry is not None and entry[0] is page:
+            return entry[1]
+        requirements = []
+        for text_match in page.targetTexts:
+            if not text_match.must:
+                continue
+            if (anchors := self._get_anchors(text_match)) is not None:
+                requirements.append(anchors)
+        requirements = tuple(requirements)
+        self._entries[id(page)] = (page, requirements)
+        return requirements
+
+    def _get_anchors(self, text_match: TextMatch) -> frozenset[str] | None:
+        cached = self._text_match_cache.get(id(text_match))
+        if cached is not None and cached[0] is text_match:
+            return cached[1]
+        anchors = extract_anchors(text_match.pattern)
+        self._text_match_cache[id(text_match)] = (text_match, anchors)
+        return anchors
+
+    def candidates(self, pages: list[Page], ocr_results: list[TextPosition]) -> list[Page]:
+        """
+        :param pages: 待匹配页面
+        :param ocr_results: OCR结果
+        :return: 可能匹配的页面，保持原顺序
+        """
+        # 各文本以换行分隔，锚点不含换行，不会跨文本匹配
+        texts = "\n".join(i.text for i in ocr_results).lower()
+        present: dict[str, bool] = {}
+        result = []
+        for page in pages:
+            for anchors in self._get_requirements(page):
+                found = False
+                for anchor in anchors:
+                    if (hit := present.get(anchor)) is None:
+                        hit = present[anchor] = anchor in texts
+                    if hit:
+                        found = True
+                        break
+                if not found:
+                    break
+            else:
+                result.append(page)
+        return result
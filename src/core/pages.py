@@ -7,6 +7,7 @@ from typing import Callable, Dict, List
 import numpy as np
 from pydantic import BaseModel, Field, PrivateAttr
 
+from src.core import metrics
 from src.core.languages import Languages
 from src.core.regions import Position, DynamicPosition, TextPosition, Pos
 from src.util import img_util, file_util
@@ -116,7 +117,7 @@ class Page(BaseModel):
             return self.name == other.name
         return False
 
-    # @timeit
+    @metrics.timed(name="page.is_match")
     def is_match(self, src_img: np.ndarray, img: np.ndarray | None, ocr_results: list[TextPosition]) -> bool:
         """
         页面匹配
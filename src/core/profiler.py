@@ -0,0 +1,186 @@
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# 请求文件后缀，主进程写入 <进程名>.request，任务进程按修改时间判断是否有新请求
+REQUEST_SUFFIX = ".request"
+
+
+class SamplingProfiler:
+    """
+    统计采样分析器：后台线程按间隔读取所有线程的调用栈（sys._current_frames），累计相同调用栈的次数，
+    导出为折叠栈格式（每行 "线程;模块:函数;... 次数"），可用 flamegraph.pl 或 speedscope 生成火焰图。
+    采样的是挂钟时间，线程在 OCR 推理、截图等释放 GIL 的调用中同样会被采到，等待中的线程也会出现在结果中
+    """
+
+    def __init__(self, interval: float = 0.01):
+        """ :param interval: 采样间隔，秒 """
+        self.interval = interval
+        self.stacks: Counter[tuple[str, ...]] = Counter()
+        self.sample_count = 0
+        self._labels: dict = {}
+        self._event = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._start_time = 0.0
+        self.elapsed = 0.0
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            module = os.path.splitext(os.path.basename(code.co_filename))[0]
+            label = f"{module}:{getattr(code, 'co_qualname', code.co_name)}"
+            self._labels[code] = label
+        return label
+
+    def sample(self):
+        """ 采样一次所有线程（不含采样线程自身） """
+        current = threading.get_ident()
+        names = {i.ident: i.name for i in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():  # noqa
+            if ident == current:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            stack.append(names.get(ident, str(ident)))
+            stack.reverse()
+            self.stacks[tuple(stack)] += 1
+        self.sample_count += 1
+
+    def start(self) -> "SamplingProfiler":
+        if self._thread is not None:
+            return self
+        self._event.clear()
+        self._start_time = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="SamplingProfilerThread", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._event.set()
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join()
+            self.elapsed += time.perf_counter() - self._start_time
+
+    def run_for(self, seconds: float) -> "SamplingProfiler":
+        """ 在当前线程等待，采样 seconds 秒 """
+        self.start()
+        self._event.wait(seconds)
+        self.stop()
+        return self
+
+    def _run(self):
+        interval = self.interval
+        next_time = time.perf_counter()
+        while not self._event.is_set():
+            self.sample()
+            next_time += interval
+            delay = next_time - time.perf_counter()
+            if delay > 0:
+                self._event.wait(delay)
+            else:  # 采样跟不上时不补采
+                next_time = time.perf_counter()
+
+    def collapsed(self) -> list[str]:
+        """ 折叠栈格式的行，按次数降序 """
+        return [f"{';'.join(stack)} {count}" for stack, count in self.stacks.most_common()]
+
+    def dump(self, path: str | Path) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(self.collapsed()))
+            f.write("\n")
+        return path
+
+    def summary(self, top: int = 10) -> str:
+        """ 按函数自身采样次数（栈顶）排序的简要文本 """
+        own = Counter()
+        for stack, count in self.stacks.items():
+            own[(stack[0], stack[-1])] += count
+        total = sum(self.stacks.values()) or 1
+        lines = [f"samples: {self.sample_count}, {self.elapsed:.1f}s"]
+        for (thread, func), count in own.most_common(top):
+            lines.append(f"{count * 100 / total:5.1f}% {thread} {func}")
+        return "\n".join(lines)
+
+
+class ProfileRequestWatcher:
+    """
+    任务进程内的后台线程，等待主进程的采样请求（<目录>/<进程名>.request），
+    收到后采样指定秒数并导出到 <目录>/<进程名>-<pid>-<时间>.collapsed，主循环卡住时也能采样
+    """
+
+    def __init__(self, directory: str | Path, process_name: str, poll: float = 0.5):
+        self.directory = Path(directory)
+        self.process_name = process_name
+        self.poll = poll
+        self.request_path = self.directory.joinpath(process_name + REQUEST_SUFFIX)
+        # 启动前已存在的请求不处理
+        self._request_mtime = self._get_request_mtime()
+        self._event = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.profiler: SamplingProfiler | None = None
+
+    def _get_request_mtime(self) -> float:
+        try:
+            return os.stat(self.request_path).st_mtime
+        except OSError:
+            return 0.0
+
+    def check(self) -> Path | None:
+        """ 有新请求时采样并导出，返回导出路径 """
+        mtime = self._get_request_mtime()
+        if mtime <= self._request_mtime:
+            return None
+        self._request_mtime = mtime
+        try:
+            request = json.loads(self.request_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            logger.warning("采样请求无效: %s, %s", self.request_path, e)
+            return None
+        seconds = float(request.get("seconds", 10.0))
+        logger.info("开始采样 %.1fs", seconds)
+        self.profiler = SamplingProfiler(float(request.get("interval", 0.01)))
+        self.profiler.start()
+        self._event.wait(seconds)
+        self.profiler.stop()
+        file_name = f"{self.process_name}-{os.getpid()}-{time.strftime('%Y%m%d-%H%M%S')}.collapsed"
+        path = self.profiler.dump(self.directory.joinpath(file_name))
+        logger.info("采样结束，已导出: %s\n%s", path, self.profiler.summary())
+        return path
+
+    def start(self) -> "ProfileRequestWatcher":
+        self._thread = threading.Thread(target=self._run, name="ProfileRequestWatcherThread", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._event.set()
+
+    def _run(self):
+        while not self._event.wait(self.poll):
+            try:
+                self.check()
+            except Exception:
+                logger.exception("采样异常")
+
+
+def start_request_watcher(directory: str | Path, process_name: str) -> ProfileRequestWatcher:
+    return ProfileRequestWatcher(directory, process_name).start()
+
+
+def request_profile(directory: str | Path, process_name: str, seconds: float = 10.0, interval: float = 0.01):
+    """ 主进程调用，请求任务进程采样 seconds 秒 """
+    path = Path(directory).joinpath(process_name + REQUEST_SUFFIX)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({"seconds": seconds, "interval": interval, "time": time.time()}), encoding="utf-8")
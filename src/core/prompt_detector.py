@@ -0,0 +1,115 @@
+import logging
+import time
+from typing import Callable
+
+import cv2
+import numpy as np
+
+from src.core.ocr_gate import OcrGate
+from src.core.regions import TextPosition
+
+logger = logging.getLogger(__name__)
+
+
+class PromptDetector:
+    """
+    交互提示存在检测：拾取等交互提示是半透明深色底上的白色文字与按键图标，
+    统计与深色像素相邻的亮白像素（文字笔画的边缘）占比，天空、雪地等大片亮色区域内部不计入。
+    占比低于阈值视为没有提示
+    """
+
+    _KERNEL = np.ones((3, 3), dtype=np.uint8)
+
+    def __init__(self,
+                 min_ratio: float = 0.001,
+                 white_threshold: int = 200,
+                 dark_threshold: int = 110,
+                 max_saturation: int = 60,
+                 min_ratio_floor: float = 0.0003):
+        """
+        :param min_ratio: 文字像素占比阈值
+        :param white_threshold: 亮度不低于该值且饱和度不高于 max_saturation 的像素视为白色，0~255
+        :param dark_threshold: 亮度不高于该值的像素视为深色底，0~255
+        :param min_ratio_floor: 校准时阈值的下限
+        """
+        self.min_ratio = min_ratio
+        self._white_threshold = white_threshold
+        self._dark_threshold = dark_threshold
+        self._max_saturation = max_saturation
+        self._min_ratio_floor = min_ratio_floor
+        self.last_ratio = 0.0
+
+    def text_ratio(self, img: np.ndarray) -> float:
+        if img.ndim == 3 and img.shape[2] == 4:
+            img = cv2.cvtColor(img, cv2.COLOR_BGRA2BGR)
+        hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
+        saturation, value = hsv[..., 1], hsv[..., 2]
+        white = (value >= self._white_threshold) & (saturation <= self._max_saturation)
+        near_dark = cv2.dilate((value <= self._dark_threshold).astype(np.uint8), self._KERNEL)
+        return np.count_nonzero(white & (near_dark > 0)) / white.size
+
+    def detect(self, img: np.ndarray) -> bool:
+        self.last_ratio = self.text_ratio(img)
+        return self.last_ratio >= self.min_ratio
+
+    def calibrate(self, ratio: float):
+        """ OCR 识别到了提示而占比低于阈值时，降低阈值 """
+        if ratio >= self.min_ratio:
+            return
+        min_ratio = max(ratio * 0.8, self._min_ratio_floor)
+        if min_ratio < self.min_ratio:
+            logger.debug("交互提示阈值: %.4f -> %.4f", self.min_ratio, min_ratio)
+            self.min_ratio = min_ratio
+
+
+class PromptOcrGate:
+    """
+    交互提示区域的OCR：先检测提示是否存在，不存在时不OCR；存在时经 OcrGate 只在提示出现或文字区域变化时OCR，
+    提示不变时复用上次识别的物品名。检测为不存在时仍每隔 recheck_interval 秒OCR一次，避免漏检
+    """
+
+    def __init__(self,
+                 ocr: Callable[[np.ndarray], list[TextPosition]],
+                 detector: PromptDetector | None = None,
+                 recheck_interval: float = 1.0,
+                 grid: int = 4,
+                 pixel_threshold: float = 12.0,
+                 full_interval: int = 30):
+        """
+        :param ocr: OCR函数，如 ocr_service.ocr
+        :param recheck_interval: 检测为不存在时强制OCR的间隔，秒，0为不强制
+        :param grid: 见 OcrGate
+        """
+        self.detector = detector or PromptDetector()
+        self._gate = OcrGate(ocr, grid=grid, pixel_threshold=pixel_threshold, full_interval=full_interval)
+        self._recheck_interval = recheck_interval
+        self._last_ocr_time = 0.0
+        self._present = False
+
+        # 统计
+        self.absent_count = 0
+        self.recheck_count = 0
+
+    def ocr(self, img: np.ndarray) -> list[TextPosition]:
+        present = self.detector.detect(img)
+        if not present:
+            if self._present:  # 提示消失，再次出现时重新识别
+                self._gate.reset()
+            self._present = False
+            if not self._recheck_interval or time.monotonic() - self._last_ocr_time < self._recheck_interval:
+                self.absent_count += 1
+                return []
+            self.recheck_count += 1
+            self._gate.reset()
+        self._present = present
+        self._last_ocr_time = time.monotonic()
+        return self._gate.ocr(img)
+
+    def on_match(self):
+        """ 识别结果匹配到了交互提示，检测却为不存在时校准检测阈值 """
+        if not self._present:
+            self.detector.calibrate(self.detector.last_ratio)
+
+    def stats(self) -> str:
+        return (f"prompt absent: {self.absent_count}, recheck: {self.recheck_count}, "
+                f"min ratio: {self.detector.min_ratio:.4f}, {self._gate.stats()}")
@@ -0,0 +1,195 @@
+"""
+离线回放录制的会话（录制见环境变量 WWA_SESSION_RECORD_PATH），不需要游戏窗口，可在 Linux 下运行：
+
+    python -m src.core.replay temp/session/boss.wwas [--realtime] [--service auto_boss_service]
+
+截图来自录制文件，键鼠调用只记录不执行，按刷boss任务的主循环运行，结束时输出截图、OCR、页面匹配的吞吐量
+"""
+import argparse
+import logging
+import threading
+import time
+from pathlib import Path
+
+from dependency_injector import containers, providers
+
+from src.core.contexts import Context
+from src.core.exceptions import ReplayFinishedError
+from src.core.interface import ImgService, OCRService, PageEventService
+from src.core.ocr_gate import create_ocr_gate
+from src.core.ocr_plan import planned_ocr
+from src.core.sessions import SessionReader
+
+logger = logging.getLogger(__name__)
+
+
+class ReplayContainer(containers.DeclarativeContainer):
+    """ 回放用的容器，只导入不依赖 win32 的服务，窗口、截图、键鼠服务替换为回放实现 """
+    from src.service.auto_boss_service import AutoBossServiceImpl
+    from src.service.auto_pickup_service import AutoPickupServiceImpl
+    from src.service.auto_story_service import AutoStoryServiceImpl
+    from src.service.boss_info_service import BossInfoServiceImpl
+    from src.service.daily_activity_service import DailyActivityServiceImpl
+    from src.service.ocr_service import get_ocr_service_impl
+    from src.service.od_service import YoloServiceImpl
+    from src.service.replay_service import ReplayImgServiceImpl, ReplayWindowServiceImpl, RecordingControlService
+
+    ocr_engine_impl = get_ocr_service_impl()
+
+    context = providers.Dependency()
+    session_reader = providers.Dependency()
+    realtime = providers.Object(False)
+    window_service = providers.Singleton(ReplayWindowServiceImpl, session_reader=session_reader)
+    img_service = providers.Singleton(ReplayImgServiceImpl, session_reader=session_reader, realtime=realtime)
+    control_service = providers.Singleton(RecordingControlService, control_service=None, session_writer=None)
+    ocr_service = providers.Singleton(
+        ocr_engine_impl,
+        context=context,
+        window_service=window_service,
+        img_service=img_service
+    )
+    od_service = providers.Singleton(
+        YoloServiceImpl,
+        context=context,
+        window_service=window_service,
+        img_service=img_service
+    )
+    boss_info_service = providers.Singleton(
+        BossInfoServiceImpl
+    )
+    auto_boss_service = providers.Singleton(
+        AutoBossServiceImpl,
+        context=context,
+        window_service=window_service,
+        img_service=img_service,
+        ocr_service=ocr_service,
+        control_service=control_service,
+        od_service=od_service,
+        boss_info_service=boss_info_service,
+    )
+    auto_pickup_service = providers.Singleton(
+        AutoPickupServiceImpl,
+        context=context,
+        window_service=window_service,
+        img_service=img_service,
+        ocr_service=ocr_service,
+        control_service=control_service,
+        od_service=None,
+        boss_info_service=boss_info_service,
+    )
+    auto_story_service = providers.Singleton(
+        AutoStoryServiceImpl,
+        context=context,
+        window_service=window_service,
+        img_service=img_service,
+        ocr_service=ocr_service,
+        control_service=control_service,
+        od_service=None,
+        boss_info_service=boss_info_service,
+    )
+    daily_activity_service = providers.Singleton(
+        DailyActivityServiceImpl,
+        context=context,
+        window_service=window_service,
+        img_service=img_service,
+        ocr_service=ocr_service,
+        control_service=control_service,
+        od_service=od_service,
+        boss_info_service=boss_info_service,
+    )
+
+    @staticmethod
+    def build(context: Context, session_path: str | Path, realtime: bool = False) -> "ReplayContainer":
+        """
+        :param context: 上下文
+        :param session_path: 录制文件路径
+        :param realtime: 是否按录制时间推进，否则不限速依次回放
+        """
+        container = ReplayContainer()
+        container.context.override(providers.Object(context))
+        container.session_reader.override(providers.Object(SessionReader(session_path)))
+        container.realtime.override(providers.Object(realtime))
+        context._container = container
+        container.init_resources()
+        return container
+
+
+class ReplayStats:
+    """ 回放的循环次数与耗时 """
+
+    def __init__(self):
+        self.count = 0
+        self.elapsed = 0.0
+        self.ocr_seconds = 0.0
+        self.execute_seconds = 0.0
+
+    def __str__(self):
+        count = max(self.count, 1)
+        return (f"循环: {self.count}, 耗时: {self.elapsed:.2f}s, "
+                f"{self.count / self.elapsed if self.elapsed > 0 else 0.0:.2f}次/s, "
+                f"OCR平均: {self.ocr_seconds * 1000 / count:.1f}ms, "
+                f"页面匹配平均: {self.execute_seconds * 1000 / count:.1f}ms")
+
+
+def run(container: ReplayContainer, service_name: str = "auto_boss_service",
+        event: threading.Event | None = None) -> ReplayStats:
+    """
+    按刷boss任务的主循环回放，直到录制的截图用完或 event 被清除
+    :param service_name: 页面事件服务名，即 ReplayContainer 的属性名
+    """
+    context: Context = container.context()
+    img_service: ImgService = container.img_service()
+    ocr_service: OCRService = container.ocr_service()
+    page_event_service: PageEventService = getattr(container, service_name)()
+    ocr_gate = create_ocr_gate(context.app_config, ocr_service.ocr)
+
+    stats = ReplayStats()
+    start_time = time.perf_counter()
+    try:
+        while event is None or event.is_set():
+            src_img = img_service.screenshot()
+            img = img_service.resize(src_img)
+            t0 = time.perf_counter()
+            regions = page_event_service.get_ocr_regions()
+            if ocr_gate:
+                result = ocr_gate.ocr(img, regions)
+            else:
+                result = planned_ocr(ocr_service.ocr, img, regions)
+            t1 = time.perf_counter()
+            page_event_service.execute(src_img=src_img, img=img, ocr_results=result)
+            stats.execute_seconds += time.perf_counter() - t1
+            stats.ocr_seconds += t1 - t0
+            stats.count += 1
+    except ReplayFinishedError:
+        pass
+    except KeyboardInterrupt:
+        logger.warning("KeyboardInterrupt")
+    finally:
+        stats.elapsed = time.perf_counter() - start_time
+        logger.info("回放结束，%s", stats)
+        if ocr_gate:
+            logger.info(ocr_gate.stats())
+    return stats
+
+
+def main(argv: list[str] | None = None) -> ReplayStats:
+    parser = argparse.ArgumentParser(description="离线回放录制的会话")
+    parser.add_argument("session_path", help="录制文件路径")
+    parser.add_argument("--realtime", action="store_true", help="按录制时间推进，默认不限速依次回放")
+    parser.add_argument("--service", default="auto_boss_service",
+                        choices=["auto_boss_service", "auto_pickup_service", "auto_story_service",
+                                 "daily_activity_service"],
+                        help="页面事件服务")
+    args = parser.parse_args(argv)
+    logger.info("回放会话: %s, realtime: %s", args.session_path, args.realtime)
+    container = ReplayContainer.build(Context(), args.session_path, args.realtime)
+    return run(container, args.service)
+
+
+if __name__ == '__main__':
+    from src.core import environs
+    from src.config import logging_config
+
+    environs.load_env()
+    logging_config.setup_logging()
+    main()
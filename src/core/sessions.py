@@ -0,0 +1,245 @@
+import json
+import logging
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Any, BinaryIO
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 会话录制文件格式（只追加，进程被强制结束时最多丢失最后一条不完整记录）：
+#     MAGIC
+#     记录*N: 类型(1字节) | 元数据长度(4字节) | 数据长度(4字节) | 元数据(json) | 数据
+# 类型 F 为截图帧，数据为PNG编码的图片；类型 C 为键鼠调用，无数据。
+# 相同的帧（帧总线复用的同一帧）只保存一次，后续截图记录引用其帧序号。
+
+MAGIC = b"WWASESS1"
+RECORD_FRAME = b"F"
+RECORD_CONTROL = b"C"
+_HEADER = struct.Struct("<cII")
+
+
+class FrameRecord:
+    """ 一次截图记录，t 为相对录制开始的秒数，region 为截图区域比例，为空表示整个窗口 """
+
+    __slots__ = ("index", "t", "frame_id", "region", "offset", "length")
+
+    def __init__(self, index: int, t: float, frame_id: int, region: tuple[float, float, float, float] | None,
+                 offset: int, length: int):
+        self.index: int = index
+        self.t: float = t
+        self.frame_id: int = frame_id
+        self.region: tuple[float, float, float, float] | None = region
+        self.offset: int = offset
+        self.length: int = length
+
+    def __repr__(self):
+        return f"FrameRecord(index={self.index}, t={self.t:.4f}, frame_id={self.frame_id}, region={self.region})"
+
+
+class ControlRecord:
+    """ 一次键鼠调用记录 """
+
+    __slots__ = ("t", "name", "args", "kwargs")
+
+    def __init__(self, t: float, name: str, args: list[Any], kwargs: dict[str, Any]):
+        self.t: float = t
+        self.name: str = name
+        self.args: list[Any] = args
+        self.kwargs: dict[str, Any] = kwargs
+
+    def __repr__(self):
+        return f"ControlRecord(t={self.t:.4f}, name={self.name}, args={self.args}, kwargs={self.kwargs})"
+
+
+def _to_jsonable(value: Any) -> Any:
+    """ 键鼠调用参数转为可序列化的值，窗口句柄等对象退化为字符串 """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [_to_jsonable(i) for i in value]
+    if isinstance(value, dict):
+        return {str(k): _to_jsonable(v) for k, v in value.items()}
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+class SessionWriter:
+    """ 会话录制，记录截图帧与键鼠调用，线程安全 """
+
+    def __init__(self, path: str | Path, png_compression: int = 1):
+        """
+        :param path: 录制文件路径
+        :param png_compression: PNG压缩级别 0~9，越大越慢，录制时优先保证速度
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._png_params = [cv2.IMWRITE_PNG_COMPRESSION, png_compression]
+        self._lock = threading.Lock()
+        self._file: BinaryIO | None = open(self.path, "wb")
+        self._file.write(MAGIC)
+        self._start_time = time.monotonic()
+        # 同一帧对象（帧总线复用）只编码一次
+        self._last_img: np.ndarray | None = None
+        self._last_index: int = -1
+        self.frame_count = 0
+        self.screenshot_count = 0
+        self.control_count = 0
+        logger.info("Session recording: %s", self.path)
+
+    @property
+    def closed(self) -> bool:
+        return self._file is None
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self._start_time
+
+    def write_frame(self, img: np.ndarray,
+                    region: tuple[float, float, float, float] | None = None,
+                    timestamp: float | None = None):
+        """
+        记录一次截图
+        :param img: 截图
+        :param region: 截图区域比例
+        :param timestamp: time.monotonic() 截图时间，默认为当前时间
+        """
+        t = (timestamp if timestamp is not None else time.monotonic()) - self._start_time
+        with self._lock:
+            if self._file is None:
+                return
+            self.screenshot_count += 1
+            if img is self._last_img:
+                meta = {"t": t, "ref": self._last_index, "region": region}
+                self._write(RECORD_FRAME, meta, b"")
+                return
+            ok, buf = cv2.imencode(".png", img, self._png_params)
+            if not ok:
+                logger.warning("Session frame encode failed")
+                return
+            index = self.frame_count
+            meta = {"t": t, "index": index, "region": region}
+            self._write(RECORD_FRAME, meta, buf.tobytes())
+            self._last_img = img
+            self._last_index = index
+            self.frame_count += 1
+
+    def write_control(self, name: str, args: tuple = (), kwargs: dict | None = None):
+        """ 记录一次键鼠调用 """
+        meta = {"t": self.elapsed(), "name": name, "args": _to_jsonable(args), "kwargs": _to_jsonable(kwargs or {})}
+        with self._lock:
+            if self._file is None:
+                return
+            self._write(RECORD_CONTROL, meta, b"")
+            self.control_count += 1
+
+    def _write(self, record_type: bytes, meta: dict, data: bytes):
+        meta_bytes = json.dumps(meta, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self._file.write(_HEADER.pack(record_type, len(meta_bytes), len(data)))
+        self._file.write(meta_bytes)
+        if data:
+            self._file.write(data)
+        # 立即落盘，任务进程被强制结束时记录依然完整
+        self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.close()
+            self._file = None
+        logger.info("Session recorded: %s, frames: %s, screenshots: %s, controls: %s",
+                    self.path, self.frame_count, self.screenshot_count, self.control_count)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class SessionReader:
+    """ 读取会话录制文件，截图帧按需解码 """
+
+    def __init__(self, path: str | Path, cache_size: int = 8):
+        """
+        :param path: 录制文件路径
+        :param cache_size: 已解码帧的缓存数量
+        """
+        self.path = Path(path)
+        self.frames: list[FrameRecord] = []
+        self.controls: list[ControlRecord] = []
+        self._cache_size = cache_size
+        self._cache: dict[int, np.ndarray] = {}
+        self._lock = threading.Lock()
+        self._file: BinaryIO = open(self.path, "rb")
+        self._load_index()
+
+    def _load_index(self):
+        f = self._file
+        file_size = self.path.stat().st_size
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"Not a session file: {self.path}")
+        # 帧序号 -> (数据偏移, 数据长度)
+        data_index: dict[int, tuple[int, int]] = {}
+        while True:
+            header = f.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                break
+            record_type, meta_length, data_length = _HEADER.unpack(header)
+            meta_bytes = f.read(meta_length)
+            offset = f.tell()
+            if len(meta_bytes) < meta_length or f.seek(data_length, 1) > file_size:
+                logger.warning("Session file truncated: %s", self.path)
+                break
+            meta = json.loads(meta_bytes)
+            if record_type == RECORD_FRAME:
+                region = tuple(meta["region"]) if meta.get("region") else None
+                if "ref" in meta:
+                    frame_id = meta["ref"]
+                else:
+                    frame_id = meta["index"]
+                    data_index[frame_id] = (offset, data_length)
+                if frame_id not in data_index:
+                    continue
+                offset, data_length = data_index[frame_id]
+                self.frames.append(
+                    FrameRecord(len(self.frames), meta["t"], frame_id, region, offset, data_length))
+            elif record_type == RECORD_CONTROL:
+                self.controls.append(ControlRecord(meta["t"], meta["name"], meta["args"], meta["kwargs"]))
+
+    @property
+    def duration(self) -> float:
+        return self.frames[-1].t if self.frames else 0.0
+
+    def __len__(self):
+        return len(self.frames)
+
+    def read(self, record: FrameRecord) -> np.ndarray:
+        """ 解码截图帧，返回只读图片，同一帧多次读取返回同一对象 """
+        with self._lock:
+            if (img := self._cache.get(record.frame_id)) is not None:
+                return img
+            self._file.seek(record.offset)
+            data = self._file.read(record.length)
+            img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+            img.flags.writeable = False
+            if len(self._cache) >= self._cache_size:
+                self._cache.pop(next(iter(self._cache)))
+            self._cache[record.frame_id] = img
+            return img
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+            self._cache.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,104 @@
+import logging
+import time
+from multiprocessing import Event, Pipe, Process
+from typing import Any, Callable, Iterable, Mapping
+
+logger = logging.getLogger(__name__)
+
+
+def standby_run(target: Callable[..., None], warmup: Callable[..., None] | None, ready: Event, conn,
+                *args, **kwargs):
+    """
+    备用进程入口：预热后等待启动信号，收到更新的参数后运行任务，收到None或连接关闭则退出
+    """
+    if warmup is not None:
+        try:
+            warmup(**kwargs)
+        except Exception:
+            logger.exception("备用进程预热失败")
+    ready.set()
+    try:
+        update = conn.recv()
+    except (EOFError, OSError):
+        return
+    if update is None:
+        return
+    kwargs.update(update)
+    target(*args, **kwargs)
+
+
+class StandbyProcess:
+    """
+    预热的备用进程：提前导入模块、加载模型后挂起，任务进程异常退出时直接接替，无需重新启动进程与加载模型
+    """
+
+    def __init__(self,
+                 target: Callable[..., None],
+                 warmup: Callable[..., None] | None,
+                 args: Iterable[Any] = (),
+                 kwargs: Mapping[str, Any] | None = None,
+                 name: str | None = None,
+                 daemon: bool | None = None):
+        """
+        :param target: 任务函数
+        :param warmup: 预热函数，以任务参数 kwargs 调用，需可被子进程导入
+        :param args: 任务位置参数，如停止事件，随进程创建传入
+        :param kwargs: 任务参数，启动时可更新其中可序列化的值
+        """
+        self._ready = Event()
+        self._recv_conn, self._send_conn = Pipe(duplex=False)
+        self.process = Process(
+            target=standby_run,
+            args=(target, warmup, self._ready, self._recv_conn, *(args or ())),
+            kwargs=dict(kwargs or {}),
+            name=f"{name}-standby" if name else None,
+            daemon=daemon,
+        )
+        self._start_time: float | None = None
+        self.activated = False
+
+    def start(self) -> "StandbyProcess":
+        self._start_time = time.monotonic()
+        self.process.start()
+        return self
+
+    @property
+    def ready(self) -> bool:
+        """ 是否已预热完成 """
+        return self._ready.is_set()
+
+    def wait_ready(self, timeout: float | None = None) -> bool:
+        return self._ready.wait(timeout)
+
+    def is_alive(self) -> bool:
+        return self.process.is_alive()
+
+    def activate(self, kwargs: Mapping[str, Any] | None = None) -> Process:
+        """
+        发送启动信号，备用进程开始运行任务
+        :param kwargs: 更新的任务参数，只发送字符串值（队列、事件等只能在创建进程时传入）
+        :return: 运行任务的进程
+        """
+        update = {k: v for k, v in (kwargs or {}).items() if isinstance(v, str)}
+        self._send_conn.send(update)
+        self._send_conn.close()
+        self.activated = True
+        logger.debug("activate standby process: %s, ready: %s, age: %.1fs",
+                     self.process.name, self.ready, time.monotonic() - self._start_time)
+        return self.process
+
+    def cancel(self, timeout: float = 1.0):
+        """ 关闭未启用的备用进程 """
+        if self.activated:
+            return
+        try:
+            self._send_conn.send(None)
+            self._send_conn.close()
+        except OSError:
+            pass
+        if self._start_time is None:
+            return
+        if timeout > 0:
+            self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
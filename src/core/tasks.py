@@ -14,10 +14,14 @@ from pynput.mouse import Controller
 
 from src.config import logging_config
 from src.config.gui_config import ParamConfig
+from src.core import metrics, profiler, tracing
 from src.core.contexts import Context
 from src.core.exceptions import ScreenshotError
 from src.core.interface import ImgService, OCRService, ControlService, PageEventService, WindowService
-from src.util import hwnd_util, keymouse_util
+from src.core.ocr_gate import create_ocr_gate
+from src.core.ocr_plan import planned_ocr
+from src.core.standby import StandbyProcess
+from src.util import file_util, hwnd_util, keymouse_util
 
 logger = logging.getLogger(__name__)
 
@@ -36,11 +40,23 @@ class ProcessTask(ABC):
         self._end_time: datetime | None = None
         self._restart_time_list: list[datetime] = []
         self._process: Process | None = None
+        self._standby: StandbyProcess | None = None  # 预热的备用进程，重启时直接接替
+        self.standby_enabled = False
+        self.standby_delay = 30.0  # 任务进程运行多久后才预热备用进程，秒
+        self._process_start_time: float | None = None  # time.monotonic()
 
     @abstractmethod
     def get_task(self, *args) -> Callable[..., None] | None:
         pass
 
+    def get_warmup(self) -> Callable[..., None] | None:
+        """ 备用进程的预热函数，为空则不使用备用进程 """
+        return None
+
+    def enable_standby(self):
+        self.standby_enabled = True
+        return self
+
     @classmethod
     def build(cls: type[Task],
               args: Iterable[Any] = (),
@@ -57,6 +73,7 @@ class ProcessTask(ABC):
             target=self.get_task(), args=self.args, kwargs=self.kwargs, name=self.name, daemon=self.daemon)
         self._start_time = datetime.now()
         self._process.start()
+        self._process_start_time = time.monotonic()
         return self
 
     def stop(self, timeout=3):
@@ -66,6 +83,7 @@ class ProcessTask(ABC):
         minutes, seconds = divmod(remainder, 60)
         logger.info(f"[{self.name}] 任务结束，已运行: {int(hours)}h {int(minutes)}m {seconds:.2f}s")
         self._stop(timeout=timeout)
+        self._stop_standby(timeout=timeout)
         return self
 
     def _stop(self, timeout=3):
@@ -96,9 +114,45 @@ class ProcessTask(ABC):
         restart_time = datetime.now()
         logger.warning(f"[{self.name}] 任务重启，上次重启时间: {start_time_last.strftime("%Y-%m-%d %H:%M:%S")}")
         self._restart_time_list.append(restart_time)
-        self._process = Process(
-            target=self.get_task(), args=self.args, kwargs=self.kwargs, name=self.name, daemon=self.daemon)
-        self._process.start()
+        standby, self._standby = self._standby, None
+        if standby is not None and standby.is_alive():
+            # 备用进程已导入模块、加载模型，直接接替
+            self._process = standby.activate(self.kwargs)
+            logger.info(f"[{self.name}] 切换到备用进程，预热完成: {standby.ready}，"
+                        f"耗时: {(datetime.now() - restart_time).total_seconds():.2f}s")
+        else:
+            self._process = Process(
+                target=self.get_task(), args=self.args, kwargs=self.kwargs, name=self.name, daemon=self.daemon)
+            self._process.start()
+        self._process_start_time = time.monotonic()
+
+    def start_standby_if_idle(self):
+        """
+        任务进程已运行 standby_delay 秒且没有备用进程时，后台预热新的备用进程。
+        由任务监控定时调用，避免备用进程与刚启动的任务进程同时导入模块、加载模型
+        """
+        if self._standby is not None or self._process_start_time is None:
+            return
+        if time.monotonic() - self._process_start_time < self.standby_delay or not self.is_alive():
+            return
+        self._start_standby()
+
+    def _start_standby(self):
+        warmup = self.get_warmup()
+        if not self.standby_enabled or warmup is None:
+            return
+        logger.info(f"[{self.name}] 预热备用进程")
+        self._standby = StandbyProcess(
+            self.get_task(), warmup, args=self.args, kwargs=self.kwargs, name=self.name, daemon=self.daemon).start()
+
+    def _stop_standby(self, timeout=3):
+        standby, self._standby = self._standby, None
+        if standby is None:
+            return
+        try:
+            standby.cancel(timeout)
+        except Exception:
+            logger.exception(f"任务[{self.name}]备用进程结束失败")
 
 
 class MouseResetProcessTask(ProcessTask):
@@ -110,21 +164,38 @@ class AutoBossProcessTask(ProcessTask):
     def get_task(self, *args) -> Callable[..., None] | None:
         return auto_boss_task_run
 
+    def get_warmup(self) -> Callable[..., None] | None:
+        return warmup_od_task
+
 
 class AutoPickupProcessTask(ProcessTask):
     def get_task(self, *args) -> Callable[..., None] | None:
         return auto_pickup_task_run
 
+    def get_warmup(self) -> Callable[..., None] | None:
+        return warmup_ocr_task
+
 
 class AutoStoryProcessTask(ProcessTask):
     def get_task(self, *args) -> Callable[..., None] | None:
         return auto_story_task_run
 
+    def get_warmup(self) -> Callable[..., None] | None:
+        return warmup_ocr_task
+
 
 class DailyActivityProcessTask(ProcessTask):
     def get_task(self, *args) -> Callable[..., None] | None:
         return daily_activity_task_run
 
+    def get_warmup(self) -> Callable[..., None] | None:
+        return warmup_od_task
+
+
+class FrameServerProcessTask(ProcessTask):
+    def get_task(self, *args) -> Callable[..., None] | None:
+        return frame_server_task_run
+
 
 class ClockAction:
     """定时执行函数"""
@@ -144,6 +215,60 @@ class ClockAction:
                 pass
 
 
+def _warmup(kwargs: dict, od: bool):
+    """ 备用进程预热：导入各服务模块，提前创建OCR引擎与当前boss的YOLO会话，启动任务时直接取用 """
+    for k, v in kwargs.items():
+        if isinstance(v, str):
+            os.environ[k] = v
+    logging_config.setup_logging(kwargs.get("LOG_QUEUE"))
+    start_time = time.perf_counter()
+    from src.core.injector import Container
+    from src.service.ocr_service import RapidOcrServiceImpl, is_ocr_use_gpu
+    from src.util import rapidocr_util, yolo_util
+
+    config = Context().config.app
+    if Container.ocr_engine_impl is RapidOcrServiceImpl:
+        rapidocr_util.warm_ocr(use_gpu=is_ocr_use_gpu(), intra_op_num_threads=config.OrtIntraOpThreads,
+                               inter_op_num_threads=config.OrtInterOpThreads)
+    if od:
+        models = [yolo_util.MODEL_BOSS_DEFAULT]
+        if config.OrtPreloadBossModels:
+            models += [i for i in yolo_util.MODEL_BOSS_ALL if i not in models]
+        yolo_util.warm_sessions(models, yolo_util.get_ort_providers(), config.OrtIntraOpThreads,
+                                config.OrtInterOpThreads, config.OrtParallelExecution)
+    logger.info("备用进程预热完成，耗时: %.2fs", time.perf_counter() - start_time)
+
+
+def warmup_ocr_task(**kwargs):
+    _warmup(kwargs, od=False)
+
+
+def warmup_od_task(**kwargs):
+    _warmup(kwargs, od=True)
+
+
+def start_metrics_writer(context: Context, process_name: str) -> metrics.SnapshotWriter | None:
+    """ 定时把本进程的指标快照写入 temp/metrics，由主进程汇总 """
+    return metrics.start_snapshot_writer(
+        file_util.get_temp("metrics"), process_name, context.app_config.MetricsSnapshotInterval)
+
+
+def stop_metrics_writer(metrics_writer: metrics.SnapshotWriter | None):
+    if metrics_writer is not None:
+        metrics_writer.stop()
+
+
+def start_profile_watcher(process_name: str) -> profiler.ProfileRequestWatcher:
+    """ 等待主进程的采样请求，采样结果导出到 temp/profile """
+    return profiler.start_request_watcher(file_util.get_temp("profile"), process_name)
+
+
+def start_tracing(context: Context, process_name: str):
+    """ 按配置开启本进程的阶段追踪，追踪导出到 temp/trace """
+    app_config = context.app_config
+    tracing.configure(app_config.TraceEnabled, app_config.TraceBufferSize, file_util.get_temp("trace"), process_name)
+
+
 def create_parent_monitor(event: Event, parent_pid: str):
     if not parent_pid:
         return
@@ -229,6 +354,55 @@ def mouse_reset_task_run(event: Event, **kwargs):
         logger.info("鼠标重置任务结束")
 
 
+def frame_server_task_run(event: Event, **kwargs):
+    """ 截图服务：截图写入共享内存，供同时运行的多个任务进程读取 """
+    from src.core import environs
+    from src.core.frame_transport import FrameServer, SharedFrameRing
+    from src.core.injector import Container
+
+    shm_name = kwargs.get(environs.ENV_WWA_FRAME_SERVER_NAME)
+    for k, v in kwargs.items():
+        # 截图服务自身直接截图
+        if isinstance(v, str) and k != environs.ENV_WWA_FRAME_SERVER_NAME:
+            os.environ[k] = v
+    logging_config.setup_logging(kwargs.get("LOG_QUEUE"))
+    logger.info("截图服务进程开始运行: %s", shm_name)
+
+    context = Context()
+    if param_config_snapshot := kwargs.get("PARAM_CONFIG_SNAPSHOT"):
+        context.param_config = ParamConfig.build(content=param_config_snapshot)
+    if game_path := kwargs.get("GAME_PATH"):
+        context.param_config.gamePath = game_path
+
+    container = Container.build(context)
+    img_service: ImgService = container.img_service()
+    create_parent_monitor(event, kwargs.get("PARENT_PID"))
+
+    ring = None
+    try:
+        # 按首帧大小分配槽位，窗口变大超出槽位时截图服务标记截图失败，任务进程不再等待，自行截图
+        img = None
+        while event.is_set() and img is None:
+            try:
+                img = img_service.screenshot()
+            except ScreenshotError:
+                logger.warning("截图服务等待游戏窗口")
+                time.sleep(1)
+        if img is None:
+            return
+        slot_bytes = max(img.nbytes, 2560 * 1440 * 3)
+        ring = SharedFrameRing.create(shm_name, context.app_config.FrameServerSlots, slot_bytes)
+        FrameServer(ring, img_service.screenshot, context.app_config.FrameBusInterval).serve(event)
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        logger.exception(e)
+    finally:
+        if ring is not None:
+            ring.close()
+        logger.info("截图服务进程结束")
+
+
 def auto_boss_task_run(event: Event, **kwargs):
     try:
         from src.core.injector import Container
@@ -286,19 +460,40 @@ def auto_boss_task_run(event: Event, **kwargs):
         count = 0
 
         page_event_service: PageEventService = container.auto_boss_service()
+        metrics_writer = start_metrics_writer(context, "AutoBoss")
+        start_tracing(context, "AutoBoss")
+        profile_watcher = start_profile_watcher("AutoBoss")
+
+        # 战斗线程与主循环共用截图帧
+        if context.app_config.FrameBusEnabled:
+            img_service.start_frame_bus()
+        ocr_gate = create_ocr_gate(context.app_config, ocr_service.ocr)
 
         try:
             while event.is_set():
                 try:
                     count += 1
                     # logger.info("count %s", count)
-                    clock_action.action()
-
-                    src_img = img_service.screenshot()
-                    img = img_service.resize(src_img)
-                    result = ocr_service.ocr(img)
-                    page_event_service.execute(src_img=src_img, img=img, ocr_results=result)
-                except ScreenshotError:
+                    with tracing.tick():
+                        clock_action.action()
+
+                        with tracing.span("screenshot"):
+                            src_img = img_service.screenshot()
+                        with tracing.span("resize"):
+                            img = img_service.resize(src_img)
+                        with tracing.span("ocr"):
+                            regions = page_event_service.get_ocr_regions()
+                            if ocr_gate:
+                                result = ocr_gate.ocr(img, regions)
+                            else:
+                                result = planned_ocr(ocr_service.ocr, img, regions)
+                        with tracing.span("execute"):
+                            page_event_service.execute(src_img=src_img, img=img, ocr_results=result)
+                    tracing.poll()
+                    if ocr_gate and count % 500 == 0:
+                        logger.debug(ocr_gate.stats())
+                except ScreenshotError as e:
+                    tracing.dump_on_error(e)
                     try:
                         logger.warning("截图异常，关闭游戏")
                         hwnd_util.force_close_process(window_service.window)
@@ -309,7 +504,13 @@ def auto_boss_task_run(event: Event, **kwargs):
             logger.warning("KeyboardInterrupt")
         except Exception as e:
             logger.exception(e)
+            tracing.dump_on_error(e)
         finally:
+            stop_metrics_writer(metrics_writer)
+            profile_watcher.stop()
+            img_service.stop_frame_bus()
+            if ocr_gate:
+                logger.info(ocr_gate.stats())
             try:
                 keymouse_util.mouse_left_up(window_service.window, 0, 0)
                 keymouse_util.mouse_right_up(window_service.window, 0, 0)
@@ -359,20 +560,29 @@ def auto_pickup_task_run(event: Event, **kwargs):
     clock_action = ClockAction(control_service.activate, 3.0)
 
     page_event_service: PageEventService = container.auto_pickup_service()
+    metrics_writer = start_metrics_writer(context, "AutoPickup")
+    start_tracing(context, "AutoPickup")
+    profile_watcher = start_profile_watcher("AutoPickup")
 
     try:
         while event.is_set():
-            clock_action.action()
-            try:
-                page_event_service.execute()
-            except ScreenshotError:
-                logger.exception("截图失败")
-                time.sleep(1)
+            with tracing.tick():
+                clock_action.action()
+                try:
+                    page_event_service.execute()
+                except ScreenshotError as e:
+                    logger.exception("截图失败")
+                    tracing.dump_on_error(e)
+                    time.sleep(1)
+            tracing.poll()
     except KeyboardInterrupt:
         logger.info("自动拾取任务进程结束")
     except Exception as e:
         logger.exception(e)
+        tracing.dump_on_error(e)
     finally:
+        stop_metrics_writer(metrics_writer)
+        profile_watcher.stop()
         try:
             keymouse_util.mouse_left_up(window_service.window, 0, 0)
             keymouse_util.mouse_right_up(window_service.window, 0, 0)
@@ -419,23 +629,32 @@ def auto_story_task_run(event: Event, **kwargs):
     clock_action = ClockAction(control_service.activate, 3.0)
 
     page_event_service: PageEventService = container.auto_story_service()
+    metrics_writer = start_metrics_writer(context, "AutoStory")
+    start_tracing(context, "AutoStory")
+    profile_watcher = start_profile_watcher("AutoStory")
     count = 0
 
     try:
         while event.is_set():
             logger.debug("count: %s", count)
             count += 1
-            clock_action.action()
-            try:
-                page_event_service.execute()
-            except ScreenshotError as e:
-                logger.exception("截图失败")
-                time.sleep(1)
+            with tracing.tick():
+                clock_action.action()
+                try:
+                    page_event_service.execute()
+                except ScreenshotError as e:
+                    logger.exception("截图失败")
+                    tracing.dump_on_error(e)
+                    time.sleep(1)
+            tracing.poll()
     except KeyboardInterrupt:
         logger.info("自动剧情任务进程结束")
     except Exception as e:
         logger.exception(e)
+        tracing.dump_on_error(e)
     finally:
+        stop_metrics_writer(metrics_writer)
+        profile_watcher.stop()
         try:
             keymouse_util.mouse_left_up(window_service.window, 0, 0)
             keymouse_util.mouse_right_up(window_service.window, 0, 0)
@@ -482,6 +701,9 @@ def daily_activity_task_run(event: Event, **kwargs):
     # clock_action = ClockAction(control_service.activate, 3.0)
 
     page_event_service: PageEventService = container.daily_activity_service()
+    metrics_writer = start_metrics_writer(context, "DailyActivity")
+    start_tracing(context, "DailyActivity")
+    profile_watcher = start_profile_watcher("DailyActivity")
 
     try:
         # while event.is_set():
@@ -491,7 +713,10 @@ def daily_activity_task_run(event: Event, **kwargs):
         logger.info("每日任务进程结束")
     except Exception as e:
         logger.exception(e)
+        tracing.dump_on_error(e)
     finally:
+        stop_metrics_writer(metrics_writer)
+        profile_watcher.stop()
         try:
             keymouse_util.mouse_left_up(window_service.window, 0, 0)
             keymouse_util.mouse_right_up(window_service.window, 0, 0)
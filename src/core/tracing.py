@@ -0,0 +1,266 @@
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# 请求各任务进程导出追踪的标记文件名，主进程写入，任务进程按修改时间判断是否有新请求
+DUMP_REQUEST_FILE = "dump.request"
+
+
+class _NullSpan:
+    """ 未开启追踪时返回的空上下文 """
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("_tracer", "_name", "_cat", "_args", "_start")
+
+    def __init__(self, tracer: "Tracer", name: str, cat: str, args: dict | None):
+        self._tracer = tracer
+        self._name = name
+        self._cat = cat
+        self._args = args
+
+    def __enter__(self):
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        end = time.perf_counter_ns()
+        args = self._args
+        if exc_type is not None:
+            args = dict(args or {}, error=exc_type.__name__)
+        # deque.append 线程安全，环形缓冲区满后丢弃最早的事件
+        self._tracer._events.append((self._name, self._cat, self._start, end - self._start,
+                                     threading.get_native_id(), args))
+        return False
+
+
+class Tracer:
+    """
+    进程内的追踪器：把各阶段耗时记录为 span，保存在环形缓冲区内，按需导出为 Chrome/Perfetto 追踪 JSON
+    （chrome://tracing 或 ui.perfetto.dev 打开）。未开启时 span 返回空上下文，不记录。
+    """
+
+    def __init__(self, capacity: int = 20000, error_dump_interval: float = 60.0,
+                 max_total_bytes: int = 50 * 1024 * 1024):
+        """
+        :param error_dump_interval: 异常时导出的最小间隔，秒，连续异常（如每轮截图失败）时不重复导出
+        :param max_total_bytes: 导出目录内追踪文件的总大小上限，0为不限制，超出时删除最早的追踪文件
+        """
+        self.enabled = False
+        self.error_dump_interval = error_dump_interval
+        self.max_total_bytes = max_total_bytes
+        self._last_error_dump: float | None = None  # time.monotonic()
+        self.suppressed_error_count = 0
+        self.process_name: str | None = None
+        self.directory: Path | None = None
+        self._events: deque = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._check_interval = 1.0
+        self._next_check = 0.0
+        self._request_mtime = 0.0
+
+    def configure(self, enabled: bool, capacity: int | None = None, directory: str | Path | None = None,
+                  process_name: str | None = None):
+        """
+        :param capacity: 最多保留的 span 数，超出后丢弃最早的
+        :param directory: 导出目录，同时在该目录内查找导出请求
+        """
+        with self._lock:
+            if capacity is not None and capacity != self._events.maxlen:
+                self._events = deque(self._events, maxlen=capacity)
+            if directory is not None:
+                self.directory = Path(directory)
+                # 启动前已存在的请求不处理
+                self._request_mtime = self._get_request_mtime()
+            if process_name is not None:
+                self.process_name = process_name
+            self.enabled = enabled
+
+    def span(self, name: str, cat: str = "stage", args: dict | None = None) -> _Span | _NullSpan:
+        """ with tracer.span("ocr"): ... 记录代码块耗时 """
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, cat, args)
+
+    def clear(self):
+        self._events.clear()
+
+    def events(self) -> list[dict]:
+        """ Chrome 追踪格式的事件列表，时间单位为微秒 """
+        pid = os.getpid()
+        events = [{"name": "process_name", "ph": "M", "pid": pid, "tid": 0,
+                   "args": {"name": self.process_name or str(pid)}}]
+        tids = set()
+        for name, cat, start, dur, tid, args in list(self._events):
+            tids.add(tid)
+            event = {"name": name, "cat": cat, "ph": "X", "ts": start / 1000, "dur": dur / 1000,
+                     "pid": pid, "tid": tid}
+            if args:
+                event["args"] = args
+            events.append(event)
+        threads = {i.native_id: i.name for i in threading.enumerate()}
+        for tid in tids:
+            if tid in threads:
+                events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+                               "args": {"name": threads[tid]}})
+        return events
+
+    def dump(self, path: str | Path | None = None, reason: str | None = None) -> Path | None:
+        """
+        导出为追踪 JSON，不清空缓冲区
+        :param path: 导出路径，默认为导出目录下的 <进程名>-<pid>-<时间>.json
+        :return: 导出路径，未记录任何 span 或写入失败时返回None
+        """
+        if not self._events:
+            return None
+        if path is None:
+            if self.directory is None:
+                return None
+            file_name = f"{self.process_name or 'process'}-{os.getpid()}-{time.strftime('%Y%m%d-%H%M%S')}.json"
+            path = self.directory.joinpath(file_name)
+        path = Path(path)
+        trace = {"traceEvents": self.events(), "displayTimeUnit": "ms"}
+        if reason:
+            trace["metadata"] = {"reason": reason}
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(trace, f, ensure_ascii=False)
+        except OSError as e:
+            logger.warning("导出追踪失败: %s, %s", path, e)
+            return None
+        logger.info("已导出追踪: %s", path)
+        self._prune(path)
+        return path
+
+    def dump_error(self, exc: BaseException) -> Path | None:
+        """ 异常时导出，距上次异常导出不足 error_dump_interval 秒时跳过，跳过的次数记入下次导出的原因 """
+        now = time.monotonic()
+        if self._last_error_dump is not None and now - self._last_error_dump < self.error_dump_interval:
+            self.suppressed_error_count += 1
+            return None
+        reason = f"error: {exc.__class__.__name__}: {exc}"
+        if self.suppressed_error_count:
+            reason += f", suppressed: {self.suppressed_error_count}"
+        path = self.dump(reason=reason)
+        if path is not None:
+            self._last_error_dump = now
+            self.suppressed_error_count = 0
+        return path
+
+    def _prune(self, keep: Path):
+        """ 按修改时间删除最早的追踪文件，使导出目录不超过总大小，不删除 keep """
+        if not self.max_total_bytes:
+            return
+        files = []
+        for path in keep.parent.glob("*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(i[1] for i in files)
+        for _, size, path in sorted(files, key=lambda i: i[0]):
+            if total <= self.max_total_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                path.unlink()
+                total -= size
+            except OSError as e:
+                logger.warning("删除追踪文件失败: %s, %s", path, e)
+
+    def _get_request_mtime(self) -> float:
+        try:
+            return os.stat(self.directory.joinpath(DUMP_REQUEST_FILE)).st_mtime
+        except OSError:
+            return 0.0
+
+    def poll(self) -> Path | None:
+        """ 任务循环每轮调用，最多每秒检查一次是否有新的导出请求，有则导出 """
+        if not self.enabled or self.directory is None:
+            return None
+        now = time.monotonic()
+        if now < self._next_check:
+            return None
+        self._next_check = now + self._check_interval
+        mtime = self._get_request_mtime()
+        if mtime <= self._request_mtime:
+            return None
+        self._request_mtime = mtime
+        return self.dump(reason="request")
+
+
+# 当前进程的默认追踪器
+TRACER = Tracer()
+
+
+def configure(enabled: bool, capacity: int | None = None, directory: str | Path | None = None,
+              process_name: str | None = None):
+    TRACER.configure(enabled, capacity, directory, process_name)
+
+
+def span(name: str, cat: str = "stage", args: dict | None = None) -> _Span | _NullSpan:
+    if not TRACER.enabled:
+        return _NULL_SPAN
+    return _Span(TRACER, name, cat, args)
+
+
+def tick(name: str = "tick") -> _Span | _NullSpan:
+    """ 任务主循环的一轮 """
+    return span(name, "tick")
+
+
+def traced(name: str | None = None, cat: str = "stage"):
+    """ 记录函数耗时的装饰器，未开启时只多一次判断 """
+
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not TRACER.enabled:
+                return func(*args, **kwargs)
+            with _Span(TRACER, span_name, cat, None):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def poll() -> Path | None:
+    return TRACER.poll()
+
+
+def dump_on_error(exc: BaseException) -> Path | None:
+    """ 任务异常时导出异常前的追踪，连续异常时按间隔限流 """
+    if not TRACER.enabled:
+        return None
+    return TRACER.dump_error(exc)
+
+
+def request_dump(directory: str | Path):
+    """ 主进程调用，请求各任务进程导出追踪 """
+    path = Path(directory).joinpath(DUMP_REQUEST_FILE)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(str(time.time()), encoding="utf-8")
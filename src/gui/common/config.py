@@ -60,6 +60,9 @@ class Config(QConfig):
     language = OptionsConfigItem(
         "MainWindow", "Language", Language.AUTO, OptionsValidator(Language), LanguageSerializer(), restart=True)
 
+    # terminal，终端最多保留的日志条数，超出后删除最早的
+    terminalMaxLines = RangeConfigItem("Terminal", "MaxLines", 5000, RangeValidator(500, 100000))
+
     # # Material
     # blurRadius  = RangeConfigItem("Material", "AcrylicBlurRadius", 15, RangeValidator(0, 40))
 
@@ -10,7 +10,7 @@ class SignalBus(QObject):
     windowSizeChanged = Signal(object)
     supportSignal = Signal()
 
-    logQueueSignal = Signal(tuple)  # 日志队列信号，表明队列有新日志
+    logQueueSignal = Signal(list, int)  # 日志队列信号，一批新日志 [(级别, 日志)] 及因超出上限丢弃的条数
 
 
 signalBus = SignalBus()
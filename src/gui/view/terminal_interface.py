@@ -2,13 +2,16 @@ import html
 import logging
 import queue
 import re
+import time
+from collections import deque
 
 from PySide6.QtCore import QThread
-from PySide6.QtGui import Qt, QColor
+from PySide6.QtGui import Qt, QColor, QTextBlockFormat, QTextCharFormat, QTextCursor
 from PySide6.QtWidgets import QTextEdit, QVBoxLayout
 from qfluentwidgets import SimpleCardWidget
 
 from .gallery_interface import GalleryInterface
+from ..common.config import cfg
 from ..common.globals import globalParam, globalSignal
 from ..common.signal_bus import signalBus
 
@@ -16,25 +19,51 @@ logger = logging.getLogger(__name__)
 
 
 class LogListener(QThread):
+    """
+    从日志队列批量取出日志，每隔 BATCH_INTERVAL 秒发送一批，避免每条日志一个信号、刷新一次控件。
+    一批超过 maxLines 条时只保留最新的，其余即使添加也会被立刻删除，直接丢弃并计数
+    """
+    BATCH_INTERVAL = 0.1  # 秒
 
-    def __init__(self, logQueue):
+    def __init__(self, logQueue, maxLines: int = 5000):
         super().__init__()
         self.logQueue = logQueue
+        self.maxLines = maxLines
 
     def run(self):
         while not self.isInterruptionRequested():
             try:
-                logText = self.logQueue.get(timeout=1)  # 设置超时，避免永久阻塞
-                if logText is None:
+                batch, dropped = self._drain()
+                if not batch and not dropped:
                     continue
                 # 异步必须用signal传递数据，再由槽函数往控件内添加文本，直接在这往控件添加文本QT会经常闪退
-                signalBus.logQueueSignal.emit(logText)
-            except queue.Empty:
-                continue  # 超时继续循环，及时感知运行状态
+                signalBus.logQueueSignal.emit(list(batch), dropped)
             except Exception:
                 logger.exception("日志监听线程发生未知异常，停止运行")
                 break
 
+    def _drain(self) -> tuple[deque, int]:
+        """ 等待第一条日志，再收集 BATCH_INTERVAL 秒内的日志 """
+        batch = deque(maxlen=self.maxLines)
+        try:
+            logText = self.logQueue.get(timeout=1)  # 设置超时，避免永久阻塞，及时感知运行状态
+        except queue.Empty:
+            return batch, 0
+        count = 0
+        deadline = time.monotonic() + self.BATCH_INTERVAL
+        while True:
+            if logText is not None:
+                batch.append(logText)
+                count += 1
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self.isInterruptionRequested():
+                break
+            try:
+                logText = self.logQueue.get(timeout=remaining)
+            except queue.Empty:
+                break
+        return batch, count - len(batch)
+
     def stop(self):
         self.requestInterruption()
         self.logQueue.put(None)
@@ -44,8 +73,14 @@ class LogListener(QThread):
 
 
 class TerminalCard(SimpleCardWidget):
+    """ 日志终端，最多保留 maxLines 条日志（每条一个文本块），超出后由 QTextDocument 删除最早的文本块 """
 
-    def __init__(self, parent=None):
+    ERROR_COLOR = QColor(255, 100, 100).name()
+    WARNING_COLOR = QColor(184, 134, 11).name()  # QColor(200, 200, 0)
+    DEBUG_COLOR = QColor(100, 255, 100).name()
+    NOTICE_COLOR = QColor(128, 128, 128).name()
+
+    def __init__(self, parent=None, maxLines: int = 5000):
         super().__init__(parent=parent)
 
         self.textEdit = QTextEdit()
@@ -61,36 +96,62 @@ class TerminalCard(SimpleCardWidget):
 
         self.textEdit.setReadOnly(True)
         self.textEdit.setObjectName('textEdit')
-
-    def append_log(self, emit_msg):
+        # 只读不需要撤销，否则撤销栈会保存所有添加过的文本
+        self.textEdit.setUndoRedoEnabled(False)
+        self.textEdit.document().setMaximumBlockCount(maxLines)
+
+        self.droppedCount = 0  # 监听线程丢弃的日志数
+        self.trimmedCount = 0  # 超出上限被删除的日志数
+
+    @classmethod
+    def format_log(cls, level_name: str, msg: str) -> str:
+        # 转义 HTML 特殊字符
+        safe_msg = html.escape(msg)
+        if '\n' in safe_msg:
+            # 替换每一行开头的空格为 &nbsp;（缩进）
+            safe_msg = re.sub(r'^(\s+)', lambda m: '&nbsp;' * len(m.group(1)), safe_msg, flags=re.MULTILINE)
+            # 替换换行符为 <br>
+            safe_msg = safe_msg.replace('\n', '<br>')
+        if level_name == "ERROR":
+            return f"<font color='{cls.ERROR_COLOR}'>{safe_msg}</font>"
+        if level_name == "WARNING" or level_name == "WARN":
+            return f"<font color='{cls.WARNING_COLOR}'>{safe_msg}</font>"
+        if level_name == "DEBUG":
+            return f"<font color='{cls.DEBUG_COLOR}'>{safe_msg}</font>"
+        return f"<span>{safe_msg}</span>"  # 也用html，防止被染色
+
+    def append_log(self, emit_msg: tuple[str, str]):
+        self.append_logs([emit_msg])
+
+    def append_logs(self, batch: list[tuple[str, str]], dropped: int = 0):
+        """ 一次编辑添加一批日志，只重新布局、刷新一次 """
         # 获取当前的滚动条位置
         scrollbar = self.textEdit.verticalScrollBar()
         # 判断滚动条是否在最底部
         is_at_bottom = scrollbar.value() == scrollbar.maximum()
 
-        level_name, msg = emit_msg
-        if level_name in ["ERROR", "WARN", "WARNING", "DEBUG"]:
-            if level_name == "ERROR":
-                color = QColor(255, 100, 100)
-                # 转义 HTML 特殊字符
-                safe_msg = html.escape(msg)
-                # 替换每一行开头的空格为 &nbsp;（缩进）
-                safe_msg = re.sub(r'^(\s+)', lambda m: '&nbsp;' * len(m.group(1)), safe_msg, flags=re.MULTILINE)
-                # 替换换行符为 <br>
-                safe_msg = safe_msg.replace('\n', '<br>')
-                formatted_msg = rf"<font color='{color.name()}'>{safe_msg}</font>"
-            elif level_name == "WARNING" or level_name == "WARN":
-                # color = QColor(200, 200, 0)
-                color = QColor(184, 134, 11)
-                formatted_msg = rf"<font color='{color.name()}'>{msg}</font>"
-            else:  # level_name == "DEBUG":
-                color = QColor(100, 255, 100)
-                formatted_msg = rf"<font color='{color.name()}'>{msg}</font>"
-            self.textEdit.append(formatted_msg)
-        else:
-            # 添加文本
-            formatted_msg = rf"<span>{msg}</span>"  # 也用html，防止被染色
-            self.textEdit.append(formatted_msg)
+        lines = []
+        if dropped:
+            self.droppedCount += dropped
+            lines.append(f"<font color='{self.NOTICE_COLOR}'>... 日志过多，已跳过 {dropped} 条 ...</font>")
+        lines.extend(self.format_log(level_name, msg) for level_name, msg in batch)
+        if not lines:
+            return
+
+        document = self.textEdit.document()
+        block_count = document.blockCount()
+        inserted_blocks = 0
+        cursor = QTextCursor(document)
+        cursor.movePosition(QTextCursor.End)
+        cursor.beginEditBlock()
+        for line in lines:
+            if not document.isEmpty():
+                # 新起一个文本块，并清除上一条日志的颜色
+                cursor.insertBlock(QTextBlockFormat(), QTextCharFormat())
+                inserted_blocks += 1
+            cursor.insertHtml(line)
+        cursor.endEditBlock()
+        self.trimmedCount += max(0, block_count + inserted_blocks - document.blockCount())
 
         # 如果原本在底部，添加文本后跳到最底部
         if is_at_bottom:
@@ -113,8 +174,9 @@ class TerminalInterface(GalleryInterface):
         self.setObjectName('terminalInterface')
 
         # self.textEdit = QTextEdit()
-        self.terminalCard = TerminalCard(self)
-        self.logListener = LogListener(self.logQueue)
+        maxLines = cfg.get(cfg.terminalMaxLines)
+        self.terminalCard = TerminalCard(self, maxLines)
+        self.logListener = LogListener(self.logQueue, maxLines)
         if self.logFIle is not None:
             self.logListener.start()
         else:
@@ -138,7 +200,8 @@ class TerminalInterface(GalleryInterface):
     def __connectSignalToSlot(self):
         """ connect signal to slot """
         globalSignal.closeMainWindowSignal.connect(self.stopLogListener)
-        signalBus.logQueueSignal.connect(self.terminalCard.append_log)
+        signalBus.logQueueSignal.connect(self.terminalCard.append_logs)
 
     def stopLogListener(self):
         self.logListener.stop()
+        logger.debug("终端日志跳过: %s, 删除: %s", self.terminalCard.droppedCount, self.terminalCard.trimmedCount)
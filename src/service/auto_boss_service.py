@@ -7,7 +7,7 @@ from src.core.contexts import Status, Context
 from src.core.interface import ControlService, OCRService, ODService, ImgService, WindowService, BossInfoService
 from src.core.pages import Page, Position, TextMatch, ConditionalAction
 from src.service.page_event_service import PageEventAbstractService
-from src.util import hwnd_util, img_util
+from src.util import img_util
 
 logger = logging.getLogger(__name__)
 
@@ -479,7 +479,7 @@ class AutoBossServiceImpl(PageEventAbstractService):
 
         def login_action(positions: dict[str, Position]) -> bool:
             if not self._login_reset_z_order:
-                from src.util import keymouse_util
+                from src.util import hwnd_util, keymouse_util
                 # 1. 先获取当前鼠标位置
                 original_x, original_y = keymouse_util.get_mouse_position()
                 # 2. 释放鼠标限制（如果有）
@@ -564,6 +564,7 @@ class AutoBossServiceImpl(PageEventAbstractService):
         self._general_pages.append(network_timeout_page)
 
         def account_login_action(positions: dict[str, Position]) -> bool:
+            from src.util import hwnd_util
 
             def click_login_page(login_hwnds) -> bool:
                 contains_login_text = False
@@ -3,12 +3,13 @@ import time
 
 import numpy as np
 
+from src.core import metrics
 from src.core.contexts import Context
 from src.core.interface import ControlService, OCRService, ImgService, WindowService, ODService, BossInfoService
 from src.core.pages import Page, Position, TextMatch, ConditionalAction
+from src.core.prompt_detector import PromptOcrGate
 from src.core.regions import DynamicPosition, TextPosition
 from src.service.page_event_service import PageEventAbstractService
-from src.util.wrap_util import timeit
 
 logger = logging.getLogger(__name__)
 
@@ -36,6 +37,12 @@ class AutoPickupServiceImpl(PageEventAbstractService):
         self._fps = 15
         self._fps_seconds = 1 / self._fps
 
+        # 没有交互提示时不OCR，提示不变时复用识别结果
+        self._prompt_gate: PromptOcrGate | None = None
+        if self._context.app_config.PickupPromptGateEnabled:
+            self._prompt_gate = PromptOcrGate(self._ocr_service.ocr)
+        self._execute_count = 0
+
     def execute(self, **kwargs):
         if not self._window_service.is_foreground_window():
             time.sleep(1)
@@ -56,16 +63,25 @@ class AutoPickupServiceImpl(PageEventAbstractService):
             logger.debug(f"final fps: {(1e9 / use_time)}")
         return
 
-    @timeit(ignore=3)
+    @metrics.timed(name="auto_pickup.execute", ignore=3)
     def _execute(self):
         dynamic_position = self._auto_pickup_page.targetTexts[0].position
         src_img = self._img_service.screenshot(dynamic_position)
         img = self._img_service.resize_by_ratio(src_img)
-        ocr_results = self._ocr_service.ocr(img)
+        if self._prompt_gate is not None:
+            ocr_results = self._prompt_gate.ocr(img)
+        else:
+            ocr_results = self._ocr_service.ocr(img)
         logger.debug(ocr_results)
         # img_util.save_img_in_temp(img)
         is_action = self.page_action(self._auto_pickup_page, img, img, ocr_results)
         logger.debug("is_action: %s", is_action)
+        if self._prompt_gate is not None:
+            if is_action:
+                self._prompt_gate.on_match()
+            self._execute_count += 1
+            if self._execute_count % 900 == 0:
+                logger.debug(self._prompt_gate.stats())
         # time.sleep(0.1)
 
     @staticmethod
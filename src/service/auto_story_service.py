@@ -4,15 +4,14 @@ import threading
 import time
 
 import numpy as np
-from pynput import keyboard
 
+from src.core import metrics
 from src.core.contexts import Context
 from src.core.interface import ControlService, OCRService, ImgService, WindowService, ODService, BossInfoService
 from src.core.languages import Languages
 from src.core.pages import Page, Position, TextMatch, ConditionalAction, ImageMatch
 from src.core.regions import DynamicPosition, TextPosition
 from src.service.page_event_service import PageEventAbstractService
-from src.util.wrap_util import timeit
 
 logger = logging.getLogger(__name__)
 
@@ -115,7 +114,7 @@ class AutoStoryServiceImpl(PageEventAbstractService):
 
         return
 
-    @timeit(ignore=3)
+    @metrics.timed(name="auto_story.execute", ignore=3)
     def _execute(self, **kwargs):
         # prepare
         src_img = self._img_service.screenshot()
@@ -215,6 +214,7 @@ class AutoStoryServiceImpl(PageEventAbstractService):
         self._dynamic_fps_limit.refresh()
 
     def _listen_keys(self):
+        from pynput import keyboard
         with keyboard.Listener(on_press=self._on_press) as listener:
             listener.join()
 
@@ -2,16 +2,46 @@ import logging
 import time
 
 import numpy as np
+import win32api
 import win32con
+import win32gui
 
+from src.core import input_dispatch
 from src.core.contexts import Context
+from src.core.input_dispatch import InputBackend, InputDispatcher, InputEvent
 from src.core.interface import ControlService, WindowService, PlayerControlService, ExtendedControlService, \
     GameControlService
-from src.util import keymouse_util
+from src.util import keymouse_util, timer_util
 
 logger = logging.getLogger(__name__)
 
 
+class Win32InputBackend(InputBackend):
+    """使用win32gui后台消息发送输入事件"""
+
+    # 事件类型 -> (消息, wParam)，键盘事件的wParam为虚拟键码
+    _MESSAGES = {
+        input_dispatch.KEY_DOWN: (win32con.WM_KEYDOWN, None),
+        input_dispatch.KEY_UP: (win32con.WM_KEYUP, None),
+        input_dispatch.MOUSE_LEFT_DOWN: (win32con.WM_LBUTTONDOWN, win32con.MK_LBUTTON),
+        input_dispatch.MOUSE_LEFT_UP: (win32con.WM_LBUTTONUP, 0),
+        input_dispatch.MOUSE_RIGHT_DOWN: (win32con.WM_RBUTTONDOWN, win32con.MK_RBUTTON),
+        input_dispatch.MOUSE_RIGHT_UP: (win32con.WM_RBUTTONUP, 0),
+    }
+
+    def __init__(self, window_service: WindowService):
+        self._window_service = window_service
+
+    def send(self, event: InputEvent):
+        msg, w_param = self._MESSAGES[event.kind]
+        if w_param is None:
+            win32gui.PostMessage(self._window_service.window, msg, event.code, 0)
+        else:
+            # noinspection PyUnresolvedReferences
+            l_param = win32api.MAKELONG(event.x, event.y)
+            win32gui.PostMessage(self._window_service.window, msg, w_param, l_param)
+
+
 class BaseControlService:
 
     def __init__(self, context: Context, window_service: WindowService):
@@ -19,12 +49,41 @@ class BaseControlService:
         super().__init__()
         self._context: Context = context
         self._window_service: WindowService = window_service
+        # (按键名, 默认按键) -> 映射后的虚拟键码
+        self._resolved_keys: dict[tuple[str, str | int], str | int] = {}
+        self._dispatcher: InputDispatcher | None = None
+        if context is not None:
+            config = context.config.app
+            timer_util.configure(config.InputTimerMode, config.InputTimerSpinMs / 1000)
+            if config.InputDispatchAsync:
+                self._dispatcher = InputDispatcher(Win32InputBackend(window_service))
+                self._dispatcher.start()
 
     def _get_mapping_key(self, reset_key: str, src_key: str | int):
         if self._context is None:
             return src_key
         return self._context.config.keyboard_mapping.get_mapping_key(reset_key, src_key)
 
+    def _resolve_key(self, reset_key: str, src_key: str | int) -> str | int:
+        """映射按键并解析为虚拟键码，结果缓存，战斗中每次按键无需重复查表"""
+        cache_key = (reset_key, src_key)
+        vk_key = self._resolved_keys.get(cache_key)
+        if vk_key is None:
+            vk_key = self._get_mapping_key(reset_key, src_key)
+            if isinstance(vk_key, str):
+                vk_key = keymouse_util.KEYBOARD_VK_MAPPING.get(vk_key.upper(), vk_key)
+            self._resolved_keys[cache_key] = vk_key
+        return vk_key
+
+    @staticmethod
+    def _random_press_seconds() -> float:
+        while (seconds := np.round(np.random.uniform(0, 0.01), 5)) == 0: pass
+        return float(seconds)
+
+    def cancel_input(self):
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+
 
 class Win32GameControlServiceImpl(GameControlService, BaseControlService):
     """使用win32gui实现的后台消息"""
@@ -179,28 +238,46 @@ class Win32PlayerControlServiceImpl(PlayerControlService, BaseControlService):
 
     def fight_click(self, x: int | float = 0, y: int | float = 0, seconds: float | None = None):
         if seconds is None:
-            while (seconds := np.round(np.random.uniform(0, 0.01), 5)) == 0: pass
+            seconds = self._random_press_seconds()
+        if self._dispatcher is not None:
+            self._dispatcher.press(InputEvent(input_dispatch.MOUSE_LEFT_DOWN, 0, int(x), int(y)),
+                                   InputEvent(input_dispatch.MOUSE_LEFT_UP, 0, int(x), int(y)), seconds)
+            return self
         keymouse_util.click(self._window_service.window, x, y, seconds)
         return self
 
     def fight_right_click(self, x: int | float = 0, y: int | float = 0, seconds: float | None = None):
         if seconds is None:
-            while (seconds := np.round(np.random.uniform(0, 0.01), 5)) == 0: pass
+            seconds = self._random_press_seconds()
+        if self._dispatcher is not None:
+            self._dispatcher.press(InputEvent(input_dispatch.MOUSE_RIGHT_DOWN, 0, int(x), int(y)),
+                                   InputEvent(input_dispatch.MOUSE_RIGHT_UP, 0, int(x), int(y)), seconds)
+            return self
         keymouse_util.right_click(self._window_service.window, x, y, seconds)
         return self
 
     def fight_tap(self, key: str, seconds: float | None = None):
-        key = self._get_mapping_key(key, key)
+        key = self._resolve_key(key, key)
         if seconds is None:
-            while (seconds := np.round(np.random.uniform(0, 0.01), 5)) == 0: pass
+            seconds = self._random_press_seconds()
+        if self._dispatcher is not None:
+            self._dispatcher.press(InputEvent(input_dispatch.KEY_DOWN, key),
+                                   InputEvent(input_dispatch.KEY_UP, key), seconds)
+            return
         keymouse_util.tap_key(self._window_service.window, key, seconds)
 
     def key_down(self, key: str, seconds: float | None = None):
-        key = self._get_mapping_key(key, key)
+        key = self._resolve_key(key, key)
+        if self._dispatcher is not None:
+            self._dispatcher.schedule(InputEvent(input_dispatch.KEY_DOWN, key), seconds or 0.0)
+            return
         keymouse_util.key_down(self._window_service.window, key, seconds)
 
     def key_up(self, key: str, seconds: float | None = None):
-        key = self._get_mapping_key(key, key)
+        key = self._resolve_key(key, key)
+        if self._dispatcher is not None:
+            self._dispatcher.schedule(InputEvent(input_dispatch.KEY_UP, key), seconds or 0.0)
+            return
         keymouse_util.key_up(self._window_service.window, key, seconds)
 
 
@@ -255,17 +332,27 @@ class Win32ExtendedControlServiceImpl(ExtendedControlService, BaseControlService
         keymouse_util.set_mouse_position(x, y)
         time.sleep(0.1)
 
+    def _schedule_mouse(self, kind: str, x: int | float, y: int | float, seconds: float) -> bool:
+        if self._dispatcher is None:
+            return False
+        self._dispatcher.schedule(InputEvent(kind, 0, int(x), int(y)), seconds)
+        return True
+
     def mouse_left_down(self, x: int | float = 0, y: int | float = 0, seconds: float = 0.0):
-        keymouse_util.mouse_left_down(self._window_service.window, x, y, seconds)
+        if not self._schedule_mouse(input_dispatch.MOUSE_LEFT_DOWN, x, y, seconds):
+            keymouse_util.mouse_left_down(self._window_service.window, x, y, seconds)
 
     def mouse_left_up(self, x: int | float = 0, y: int | float = 0, seconds: float = 0.0):
-        keymouse_util.mouse_left_up(self._window_service.window, x, y, seconds)
+        if not self._schedule_mouse(input_dispatch.MOUSE_LEFT_UP, x, y, seconds):
+            keymouse_util.mouse_left_up(self._window_service.window, x, y, seconds)
 
     def mouse_right_down(self, x: int | float = 0, y: int | float = 0, seconds: float = 0.0):
-        keymouse_util.mouse_right_down(self._window_service.window, x, y, seconds)
+        if not self._schedule_mouse(input_dispatch.MOUSE_RIGHT_DOWN, x, y, seconds):
+            keymouse_util.mouse_right_down(self._window_service.window, x, y, seconds)
 
     def mouse_right_up(self, x: int | float = 0, y: int | float = 0, seconds: float = 0.0):
-        keymouse_util.mouse_right_up(self._window_service.window, x, y, seconds)
+        if not self._schedule_mouse(input_dispatch.MOUSE_RIGHT_UP, x, y, seconds):
+            keymouse_util.mouse_right_up(self._window_service.window, x, y, seconds)
 
     def scroll_mouse(self, count: int, x: int | float = 0, y: int | float = 0, seconds: float = 0.0):
         keymouse_util.scroll_mouse(self._window_service.window, count, x, y, seconds)
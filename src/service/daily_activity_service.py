@@ -7,6 +7,7 @@ from enum import Enum
 
 from pydantic import BaseModel, Field
 
+from src.core import tracing
 from src.core.contexts import Context, Status
 from src.core.interface import ControlService, OCRService, ImgService, WindowService, ODService, BossInfoService
 from src.core.pages import Page, ConditionalAction
@@ -104,20 +105,28 @@ class DailyActivityServiceImpl(PageEventAbstractService, ABC):
             if datetime.now() - start_time > timedelta(seconds=3):
                 self._control_service.activate()
 
-            src_img = self._img_service.screenshot()
-            img = self._img_service.resize(src_img)
-            ocr_results = self._ocr_service.ocr(img)
+            tracing.poll()
+            with tracing.span("screenshot"):
+                src_img = self._img_service.screenshot()
+            with tracing.span("resize"):
+                img = self._img_service.resize(src_img)
+            with tracing.span("ocr"):
+                ocr_results = self._ocr_service.ocr(img)
             # self._ocr_service.print_ocr_result(ocr_results)
             actioned = False
             for page in self.get_pages():
-                if not page.is_match(src_img, img, ocr_results):
+                with tracing.span("page.is_match", args={"page": page.name}):
+                    matched = page.is_match(src_img, img, ocr_results)
+                if not matched:
                     continue
                 logger.info("当前页面：%s", page.name)
-                page.action(page.matchPositions)
+                with tracing.span("page.action", args={"page": page.name}):
+                    page.action(page.matchPositions)
                 actioned = True
                 break
             if not actioned:
-                self._run_conditional_actions()
+                with tracing.span("condition"):
+                    self._run_conditional_actions()
 
             if self._ctx.job_stop:
                 logger.info("任务终止")
@@ -1,10 +1,16 @@
 import logging
+import threading
+import time
 from enum import Enum
 
 import numpy as np
 
+from src.core import metrics
+from src.core.capture import Capturer
 from src.core.contexts import Context
 from src.core.exceptions import ForegroundScreenshotError, BackgroundScreenshotError, raise_as
+from src.core.frame_transport import SharedFrameClient
+from src.core.frames import Frame, FrameBus
 from src.core.interface import ImgService, WindowService
 from src.core.regions import Position, DynamicPosition
 from src.util import screenshot_util, img_util, file_util, mss_util
@@ -23,16 +29,26 @@ class ImgServiceImpl(ImgService):
         self._mss_camera = mss_util.create_mss()
         # self._dx_camera = dxcam_util.create_camera()
         self._capture_mode: Enum = ImgService.CaptureEnum.BG
+        self._frame_bus: FrameBus | None = None
+        self._frame_id = 0  # 未开启帧总线时，直接截图的帧序号
+        self._capturer: Capturer | None = None  # 后台截图器，窗口不变时复用
+        self._capturer_hwnd = None
+        self._capturer_lock = threading.Lock()
 
-    # @timeit(ignore=3)
     def screenshot(self, region: tuple[float, float, float, float] | DynamicPosition | None = None) -> np.ndarray:
+        if region is None and self._frame_bus is not None:
+            return self.get_frame().img
+        return self._screenshot(region)
+
+    @metrics.timed(name="screenshot")
+    def _screenshot(self, region: tuple[float, float, float, float] | DynamicPosition | None = None) -> np.ndarray:
         if isinstance(region, DynamicPosition):
             region = region.rate
-        focus_rect_on_screen = self._window_service.get_focus_rect_on_screen(region)
         if self._capture_mode == ImgService.CaptureEnum.FG:
+            focus_rect_on_screen = self._window_service.get_focus_rect_on_screen(region)
             return self._foreground_screenshot(focus_rect_on_screen)
         else:
-            return self._background_screenshot(focus_rect_on_screen)
+            return self._background_screenshot(region)
 
     @raise_as(BackgroundScreenshotError)
     def screenshot_window(self, window) -> np.ndarray:
@@ -41,6 +57,30 @@ class ImgServiceImpl(ImgService):
     def set_capture_mode(self, capture_mode: ImgService.CaptureEnum):
         self._capture_mode = capture_mode
 
+    def get_frame(self, max_age: float | None = None) -> Frame:
+        frame_bus = self._frame_bus
+        if frame_bus is not None:
+            if max_age is None:
+                max_age = self._context.app_config.FrameMaxAge
+            if frame := frame_bus.get(max_age):
+                return frame
+            logger.debug("Frame bus timeout, fallback to direct screenshot")
+        timestamp = time.monotonic()
+        img = self._screenshot()
+        self._frame_id += 1
+        return Frame(self._frame_id, timestamp, img)
+
+    def start_frame_bus(self):
+        if self._frame_bus is not None:
+            return
+        interval = self._context.app_config.FrameBusInterval
+        self._frame_bus = FrameBus(self._screenshot, interval=interval).start()
+
+    def stop_frame_bus(self):
+        frame_bus, self._frame_bus = self._frame_bus, None
+        if frame_bus is not None:
+            frame_bus.stop()
+
     @raise_as(ForegroundScreenshotError)
     def _foreground_screenshot(self, region: tuple[int, int, int, int] | None = None) -> np.ndarray:
         # return dxcam_util.screenshot(self._dx_camera, region)
@@ -48,11 +88,33 @@ class ImgServiceImpl(ImgService):
         return mss_util.screenshot(self._mss_camera, region)
 
     @raise_as(BackgroundScreenshotError)
-    def _background_screenshot(self, region: tuple[int, int, int, int] | None = None) -> np.ndarray:
+    def _background_screenshot(self, region: tuple[float, float, float, float] | None = None) -> np.ndarray:
+        """
+        后台截图，只复制所需区域
+        :param region: 区域比例，为空表示整个客户区
+        """
         try:
-            return screenshot_util.screenshot(self._window_service.window)
-        except Exception:  # 重试一次
-            return screenshot_util.screenshot(self._window_service.window)
+            return self._get_capturer().capture(region)
+        except Exception:  # 释放资源后重试一次
+            self._release_capturer()
+            return self._get_capturer().capture(region)
+
+    def _get_capturer(self) -> Capturer:
+        hwnd = self._window_service.window
+        with self._capturer_lock:
+            capturer = self._capturer
+            if capturer is None or self._capturer_hwnd != hwnd:
+                if capturer is not None:
+                    capturer.release()
+                capturer = self._capturer = screenshot_util.create_capturer(hwnd)
+                self._capturer_hwnd = hwnd
+            return capturer
+
+    def _release_capturer(self):
+        with self._capturer_lock:
+            capturer, self._capturer = self._capturer, None
+        if capturer is not None:
+            capturer.release()
 
     def match_template(self,
                        img: np.ndarray | None,
@@ -98,3 +160,29 @@ class ImgServiceImpl(ImgService):
         if ratio is None:
             ratio = self._window_service.get_ratio()
         return img_util.resize_by_ratio(img, ratio)
+
+
+class SharedFrameImgServiceImpl(ImgServiceImpl):
+    """
+    从截图服务进程的共享内存读取整窗口截图，多个任务进程共用一次截图；
+    区域截图、截图服务未运行或超时时仍自行截图
+    """
+
+    def __init__(self, context: Context, window_service: WindowService, frame_server_name: str):
+        super().__init__(context, window_service)
+        self._frame_client = SharedFrameClient(
+            frame_server_name, copy=not context.app_config.FrameServerZeroCopy)
+
+    def screenshot(self, region: tuple[float, float, float, float] | DynamicPosition | None = None) -> np.ndarray:
+        if region is None:
+            return self.get_frame().img
+        return self._screenshot(region)
+
+    def get_frame(self, max_age: float | None = None) -> Frame:
+        if max_age is None:
+            max_age = self._context.app_config.FrameMaxAge
+        if frame := self._frame_client.get(max_age):
+            return frame
+        frame = super().get_frame(max_age)
+        # 自行截图的帧序号取负，不与截图服务的帧序号重复
+        return Frame(-frame.frame_id, frame.timestamp, frame.img)
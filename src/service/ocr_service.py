@@ -9,12 +9,11 @@ from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 
-from src.core import environs
+from src.core import environs, metrics
 from src.core.contexts import Context
 from src.core.interface import OCRService, ImgService, WindowService
 from src.core.regions import Position, RapidocrPosition, TextPosition, DynamicPosition, PaddleocrPosition
 from src.util import rapidocr_util
-from src.util.wrap_util import timeit
 
 logger = logging.getLogger(__name__)
 
@@ -48,7 +47,12 @@ class RapidOcrServiceImpl(OCRService):
 
         self.ocr_use_gpu = is_ocr_use_gpu()
 
-        self._engine = rapidocr_util.create_ocr(use_gpu=self.ocr_use_gpu)
+        config = self._context.config.app
+        self._engine = rapidocr_util.create_ocr(
+            use_gpu=self.ocr_use_gpu,
+            intra_op_num_threads=config.OrtIntraOpThreads,
+            inter_op_num_threads=config.OrtInterOpThreads,
+        )
         # self._collection: set[str] = set()
         self._last_time = time.time()
         # self._executor = ThreadPoolExecutor(max_workers=2)
@@ -113,7 +117,7 @@ class RapidOcrServiceImpl(OCRService):
             time.sleep(wait_time)  # 每次截图和 OCR 处理之间增加一个短暂的暂停时间
         return None
 
-    @timeit(ignore=3)
+    @metrics.timed(name="ocr", ignore=3)
     def ocr(self, img: np.ndarray, position: Position | DynamicPosition | None = None,
             det=True, rec=True, cls=False) -> list[TextPosition]:
         self._ocr_wait()
@@ -201,7 +205,7 @@ class PaddleOcrServiceImpl(OCRService):
             time.sleep(wait_time)  # 每次截图和 OCR 处理之间增加一个短暂的暂停时间
         return None
 
-    # @timeit(ignore=3)
+    @metrics.timed(name="ocr", ignore=3)
     def ocr(self, img: np.ndarray, position: Position | DynamicPosition | None = None,
             det=True, rec=True, cls=False) -> list[TextPosition]:
         self._ocr_wait()
@@ -239,3 +243,16 @@ class PaddleOcrServiceImpl(OCRService):
 # SVTR
 # class SVTROcrServiceImpl(OCRService):
 #     pass
+
+
+def get_ocr_service_impl() -> type[OCRService]:
+    """ 若安装paddleocr则使用paddleocr作为ocr引擎，否则默认rapidocr """
+    try:
+        if importlib.util.find_spec("paddleocr"):
+            from paddleocr import PaddleOCR  # noqa 确认可导入
+            logger.info("paddleocr detected")
+            return PaddleOcrServiceImpl
+    except Exception:
+        pass
+    logger.debug("rapidocr detected")
+    return RapidOcrServiceImpl
@@ -1,16 +1,16 @@
 import asyncio
 import logging
-import time
+import threading
 from asyncio import Task
 from concurrent.futures import ThreadPoolExecutor
 from threading import RLock
 
 import numpy as np
 
+from src.core import metrics, tracing
 from src.core.contexts import Context
 from src.core.interface import ODService, ImgService, WindowService
 from src.util import yolo_util
-from src.util.wrap_util import timeit
 from src.util.yolo_util import Model
 
 logger = logging.getLogger(__name__)
@@ -26,24 +26,37 @@ class YoloServiceImpl(ODService):
         self._window_service: WindowService = window_service
         self._img_service: ImgService = img_service
         # self._provider: list[str] = yolo_util.get_ort_providers()
+        config = self._context.config.app
+        self._session_registry = yolo_util.SessionRegistry(
+            providers=yolo_util.get_ort_providers(),
+            intra_op_num_threads=config.OrtIntraOpThreads,
+            inter_op_num_threads=config.OrtInterOpThreads,
+            parallel=config.OrtParallelExecution,
+            max_memory_mb=config.OrtSessionCacheMB,
+        )
         self._default_model: Model = yolo_util.MODEL_BOSS_DEFAULT
         self._current_model: Model = self._default_model
-        self._session = self._create_session(self._current_model.path)
+        self._session = self._session_registry.get(self._current_model)
         # self._executor = ThreadPoolExecutor(max_workers=2)
         self._reward_model: Model = yolo_util.MODEL_REWARD
-        self._reward_session = self._create_session(self._reward_model.path)
+        self._reward_session = self._session_registry.get(self._reward_model)
+        if config.OrtPreloadBossModels:
+            # 后台创建其余boss模型的会话，切换boss时直接取用
+            threading.Thread(
+                target=self._preload_sessions, args=(yolo_util.MODEL_BOSS_ALL,), name="PreloadSessions", daemon=True
+            ).start()
 
     # def __del__(self):
     #     self._executor.shutdown(wait=False)
 
-    def _create_session(self, model_path: str):
-        return yolo_util.create_ort_session(
-            model_path=model_path,
-            providers=yolo_util.get_ort_providers(),
-            sess_options=yolo_util.create_ort_session_options()
-        )
+    def _preload_sessions(self, models: list[Model]):
+        try:
+            self._session_registry.preload(models)
+        except Exception as e:
+            logger.warning("Preload sessions failed: %s", e)
 
-    @timeit(ignore=3)
+    @tracing.traced("search_echo")
+    @metrics.timed(name="search_echo", ignore=3)
     def search_echo(self, img: np.ndarray | None = None) -> tuple[int, int, int, int] | None:
         boss_name = self._context.boss_task_ctx.lastBossName
         if img is None:
@@ -53,9 +66,7 @@ class YoloServiceImpl(ODService):
         if self._current_model != model:
             self._current_model = model
             logger.debug("Switch model: %s", model.name)
-            timestamp = time.time()
-            self._session = self._create_session(self._current_model.path)
-            logger.debug("Session creation time: %s seconds", int(time.time() - timestamp))
+            self._session = self._session_registry.get(model)
         results = yolo_util.search_echo(self._session, img, model.confidence_thres, model.iou_thres)
         if results is None:
             return None
@@ -88,11 +99,13 @@ class YoloServiceImpl(ODService):
                 return model
         return yolo_util.MODEL_BOSS_UNKNOWN
 
-    @timeit(ignore=3)
+    @tracing.traced("search_reward")
+    @metrics.timed(name="search_reward", ignore=3)
     def search_reward(self, img: np.ndarray | None = None) -> tuple[int, int, int, int] | None:
         if img is None:
             img = self._img_service.screenshot()
         model = self._reward_model
+        self._reward_session = self._session_registry.get(model)
         results = yolo_util.search_echo(self._reward_session, img, model.confidence_thres, model.iou_thres)
         if results is None:
             return None
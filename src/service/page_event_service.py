@@ -7,14 +7,17 @@ from typing import Callable
 
 import numpy as np
 
+from src.core import tracing
 from src.core.boss import BossNameEnum, MoveMode, Direction, RouteStep
-from src.core.combat.combat_core import DynamicPointTransformer, ResonatorNameEnum, AlignEnum, BaseResonator, \
+from src.core.combat.combat_core import DynamicPointTransformer, ResonatorNameEnum, AlignEnum, \
     ScenarioEnum
 from src.core.combat.combat_system import CombatSystem
 from src.core.contexts import Context, Status
 from src.core.interface import ControlService, OCRService, PageEventService, ImgService, WindowService, ODService, \
     BossInfoService
 from src.core.languages import Languages
+from src.core.ocr_plan import OcrRegionPlanner, planned_ocr
+from src.core.page_index import PageIndex
 from src.core.pages import ConditionalAction, TextMatch, Page
 from src.core.regions import TextPosition, DynamicPosition, Position
 
@@ -34,6 +37,8 @@ class PageEventAbstractService(PageEventService, ABC):
         self._control_service: ControlService = control_service
         self._od_service: ODService = od_service
         self._boss_info_service: BossInfoService = boss_info_service
+        self._ocr_region_planner = OcrRegionPlanner()
+        self._page_index = PageIndex()
         # page
         self._UI_F2_Guidebook_Activity = self.build_UI_F2_Guidebook_Activity()
         self._UI_F2_Guidebook_RecurringChallenges = self.build_UI_F2_Guidebook_RecurringChallenges()
@@ -71,24 +76,45 @@ class PageEventAbstractService(PageEventService, ABC):
         if not pages and not conditional_actions:
             raise ValueError("未配置匹配页面/条件操作")
         if src_img is None:
-            src_img = self._img_service.screenshot()
+            with tracing.span("screenshot"):
+                src_img = self._img_service.screenshot()
         if img is None:
-            img = self._img_service.resize(src_img)
+            with tracing.span("resize"):
+                img = self._img_service.resize(src_img)
         if ocr_results is None:
-            ocr_results = self._ocr_service.ocr(img)
+            with tracing.span("ocr"):
+                ocr_results = planned_ocr(self._ocr_service.ocr, img, self.get_ocr_regions(pages))
 
         logger.debug(ocr_results)
         # action
-        for page in pages:
-            if not page.is_match(src_img, img, ocr_results):
+        for page in self._page_index.candidates(pages, ocr_results):
+            with tracing.span("page.is_match", args={"page": page.name}):
+                matched = page.is_match(src_img, img, ocr_results)
+            if not matched:
                 continue
             logger.info("当前页面：%s", page.name)
-            page.action(page.matchPositions)
+            with tracing.span("page.action", args={"page": page.name}):
+                page.action(page.matchPositions)
         for conditionalAction in conditional_actions:
-            if not conditionalAction():
+            with tracing.span("condition", args={"condition": conditionalAction.name}):
+                matched = conditionalAction()
+            if not matched:
                 continue
             logger.info("当前条件操作: %s", conditionalAction.name)
-            conditionalAction.action()
+            with tracing.span("condition.action", args={"condition": conditionalAction.name}):
+                conditionalAction.action()
+
+    def get_ocr_regions(self, pages: list[Page] | None = None) -> tuple[tuple[float, float, float, float], ...] | None:
+        """
+        待匹配页面所需的OCR区域，只识别这些区域即可完成页面匹配
+        :param pages: 待匹配页面，默认为全部页面
+        :return: 百分比区域，None表示需整图识别
+        """
+        if not self._context.app_config.OcrRoiEnabled:
+            return None
+        if pages is None:
+            pages = self.get_pages()
+        return self._ocr_region_planner.plan(pages)
 
     def build_UI_F2_Guidebook_Activity(self, action: Callable = None) -> Page:
         return Page(
@@ -2435,7 +2461,7 @@ class PageEventAbstractService(PageEventService, ABC):
                     i = 0
                     while i < restart_param.cycle:
                         img = self._img_service.screenshot()
-                        if restart_param.check_health_bar is True and BaseResonator.is_boss_health_bar_exist(img):
+                        if restart_param.check_health_bar is True and self.combat_system.is_boss_health_bar_exist(img):
                             break
 
                         # restart = self._ocr_service.find_text(restart_param.restart_text, None, search_region)
@@ -0,0 +1,271 @@
+import logging
+import time
+from pathlib import Path
+
+import numpy as np
+
+from src.core.exceptions import ReplayFinishedError
+from src.core.frames import Frame
+from src.core.interface import ImgService, WindowService, ControlService
+from src.core.regions import Position, DynamicPosition
+from src.core.sessions import SessionWriter, SessionReader, FrameRecord
+from src.util import img_util, file_util
+
+logger = logging.getLogger(__name__)
+
+
+def _region_rate(region: tuple[float, float, float, float] | DynamicPosition | None
+                 ) -> tuple[float, float, float, float] | None:
+    if isinstance(region, DynamicPosition):
+        return region.rate
+    return tuple(region) if region is not None else None
+
+
+class RecordingImgServiceImpl(ImgService):
+    """ 录制截图，其余功能委托给被包装的ImgService """
+
+    def __init__(self, img_service: ImgService, session_writer: SessionWriter):
+        logger.debug("Initializing %s", self.__class__.__name__)
+        super().__init__()
+        self._img_service: ImgService = img_service
+        self._session_writer: SessionWriter = session_writer
+
+    def screenshot(self, region: tuple[float, float, float, float] | DynamicPosition | None = None) -> np.ndarray:
+        timestamp = time.monotonic()
+        img = self._img_service.screenshot(region)
+        self._session_writer.write_frame(img, _region_rate(region), timestamp)
+        return img
+
+    def screenshot_window(self, window) -> np.ndarray:
+        return self._img_service.screenshot_window(window)
+
+    def set_capture_mode(self, capture_mode: ImgService.CaptureEnum):
+        self._img_service.set_capture_mode(capture_mode)
+
+    def get_frame(self, max_age: float | None = None) -> Frame:
+        frame = self._img_service.get_frame(max_age)
+        self._session_writer.write_frame(frame.img, None, frame.timestamp)
+        return frame
+
+    def start_frame_bus(self):
+        self._img_service.start_frame_bus()
+
+    def stop_frame_bus(self):
+        self._img_service.stop_frame_bus()
+
+    def match_template(self,
+                       img: np.ndarray | None,
+                       template_img: np.ndarray | str,
+                       region: tuple[int, int, int, int] | None = None,
+                       threshold: float = 0.8) -> None | Position:
+        if img is None:
+            img = self.resize(self.screenshot())
+        return self._img_service.match_template(img, template_img, region, threshold)
+
+    def resize_by_dsize(self, img: np.ndarray, dsize: tuple[int, int]) -> np.ndarray:
+        return self._img_service.resize_by_dsize(img, dsize)
+
+    def resize_by_weight(self, img: np.ndarray, target_weight: int = 1280) -> np.ndarray:
+        return self._img_service.resize_by_weight(img, target_weight)
+
+    def resize_by_ratio(self, img: np.ndarray, ratio: float | None = None) -> np.ndarray:
+        return self._img_service.resize_by_ratio(img, ratio)
+
+
+class RecordingControlService:
+    """
+    录制键鼠调用的代理，调用转发给被包装的ControlService；
+    未指定被包装对象时只记录不执行（回放模式），返回值均为None。
+    """
+
+    # 返回自身的可见性函数，见 ControlService
+    _VIEWS = ("game", "player", "extended")
+
+    def __init__(self, control_service: ControlService | None, session_writer: SessionWriter | None):
+        logger.debug("Initializing %s", self.__class__.__name__)
+        self._control_service: ControlService | None = control_service
+        self._session_writer: SessionWriter | None = session_writer
+        self.calls: list[tuple[str, tuple, dict]] = []  # 回放模式下记录的调用
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        if name in self._VIEWS:
+            return lambda: self
+        target = getattr(self._control_service, name, None) if self._control_service is not None else None
+        if target is not None and not callable(target):
+            return target
+
+        def wrapper(*args, **kwargs):
+            if self._session_writer is not None:
+                self._session_writer.write_control(name, args, kwargs)
+            if target is None:
+                self.calls.append((name, args, kwargs))
+                return None
+            return target(*args, **kwargs)
+
+        return wrapper
+
+
+class ReplayWindowServiceImpl(WindowService):
+    """ 回放用窗口，尺寸取自录制的首帧，窗口位于屏幕左上角 """
+
+    def __init__(self, session_reader: SessionReader):
+        logger.debug("Initializing %s", self.__class__.__name__)
+        super().__init__()
+        if len(session_reader) == 0:
+            raise ReplayFinishedError("Empty session: %s" % session_reader.path)
+        full_frames = [i for i in session_reader.frames if i.region is None] or session_reader.frames
+        h, w = session_reader.read(full_frames[0]).shape[:2]
+        self._wh: tuple[int, int] = (w, h)
+
+    @property
+    def window(self):
+        return 0
+
+    def refresh(self) -> bool:
+        return True
+
+    def get_client_wh(self) -> tuple[int, int]:
+        return self._wh
+
+    def get_ratio(self):
+        """窗口大小与1280px的比例"""
+        return 1280 / self._wh[0]
+
+    def get_client_rect_on_screen(self) -> tuple[int, int, int, int]:
+        return 0, 0, self._wh[0], self._wh[1]
+
+    def get_window_rect(self) -> tuple[int, int, int, int]:
+        return self.get_client_rect_on_screen()
+
+    def get_focus_rect_on_screen(self, region: tuple[float, float, float, float] | None = None) -> tuple[
+        int, int, int, int]:
+        w, h = self._wh
+        if region is None:
+            return 0, 0, w, h
+        return int(region[0] * w), int(region[1] * h), int(region[2] * w), int(region[3] * h)
+
+    def is_foreground_window(self) -> bool:
+        return True
+
+    def close_window(self):
+        pass
+
+
+class ReplayImgServiceImpl(ImgService):
+    """
+    回放录制的会话，可在无游戏的环境下运行页面匹配、OCR、战斗逻辑。
+    realtime为True时按录制时间推进，取当前时刻最新的帧（与实际运行一样可能跳帧）；
+    为False时不限速，每次截图依次返回下一条录制记录，用于测试吞吐量与复现问题。
+    录制结束后抛出 ReplayFinishedError。
+    """
+
+    def __init__(self, session_reader: SessionReader, realtime: bool = False):
+        logger.debug("Initializing %s", self.__class__.__name__)
+        super().__init__()
+        self._session_reader: SessionReader = session_reader
+        self._realtime: bool = realtime
+        self._records: list[FrameRecord] = session_reader.frames
+        self._cursor: int = 0
+        self._start_time: float | None = None
+        self._template_img_cache: dict[str, np.ndarray] = {}
+        self.screenshot_count = 0
+
+    @classmethod
+    def open(cls, path: str | Path, realtime: bool = False) -> "ReplayImgServiceImpl":
+        return cls(SessionReader(path), realtime)
+
+    @property
+    def session_reader(self) -> SessionReader:
+        return self._session_reader
+
+    def screenshot(self, region: tuple[float, float, float, float] | DynamicPosition | None = None) -> np.ndarray:
+        region = _region_rate(region)
+        record = self._next_record(region)
+        img = self._session_reader.read(record)
+        self.screenshot_count += 1
+        if region is None or record.region == region:
+            return img
+        if record.region is not None:
+            # 录制的是其他区域的截图，无法还原，原样返回
+            return img
+        h, w = img.shape[:2]
+        return img[int(region[1] * h):int(region[3] * h), int(region[0] * w):int(region[2] * w)]
+
+    def _next_record(self, region: tuple[float, float, float, float] | None) -> FrameRecord:
+        records = self._records
+        if not self._realtime:
+            if self._cursor >= len(records):
+                raise ReplayFinishedError()
+            record = records[self._cursor]
+            self._cursor += 1
+            return record
+        now = time.monotonic()
+        if self._start_time is None:
+            self._start_time = now - records[0].t if records else now
+        elapsed = now - self._start_time
+        if not records or elapsed > records[-1].t + 1.0:
+            raise ReplayFinishedError()
+        # 取当前时刻之前最新的、可满足该区域的记录
+        found = None
+        index = self._cursor
+        while index < len(records) and records[index].t <= elapsed:
+            if records[index].region is None or records[index].region == region:
+                found = index
+            index += 1
+        if found is None:
+            # 当前时刻没有新记录，回退使用更早的可用记录
+            for index in range(min(self._cursor, len(records) - 1), -1, -1):
+                if records[index].region is None or records[index].region == region:
+                    found = index
+                    break
+            if found is None:
+                found = self._cursor
+        self._cursor = max(self._cursor, found)
+        return records[found]
+
+    def screenshot_window(self, window) -> np.ndarray:
+        return self.screenshot()
+
+    def set_capture_mode(self, capture_mode: ImgService.CaptureEnum):
+        pass
+
+    def get_frame(self, max_age: float | None = None) -> Frame:
+        timestamp = time.monotonic()
+        img = self.screenshot()
+        return Frame(self.screenshot_count, timestamp, img)
+
+    def start_frame_bus(self):
+        pass
+
+    def stop_frame_bus(self):
+        pass
+
+    def match_template(self,
+                       img: np.ndarray | None,
+                       template_img: np.ndarray | str,
+                       region: tuple[int, int, int, int] | None = None,
+                       threshold: float = 0.8) -> None | Position:
+        if img is None:
+            img = self.resize(self.screenshot())
+        if isinstance(template_img, str):
+            if template_img not in self._template_img_cache:
+                self._template_img_cache[template_img] = img_util.read_img(file_util.get_assets_template(template_img))
+            template_img = self._template_img_cache[template_img]
+        cropped_img = img[region[1]:region[3], region[0]:region[2]] if region else img
+        confidence, position = img_util.match_template(cropped_img, template_img)
+        if confidence < threshold:
+            return None
+        return Position.build(position[0], position[1], position[2], position[3], confidence=confidence)
+
+    def resize_by_dsize(self, img: np.ndarray, dsize: tuple[int, int]) -> np.ndarray:
+        return img_util.resize(img, dsize)
+
+    def resize_by_weight(self, img: np.ndarray, target_weight: int = 1280) -> np.ndarray:
+        return img_util.resize_by_weight(img, target_weight)
+
+    def resize_by_ratio(self, img: np.ndarray, ratio: float | None = None) -> np.ndarray:
+        if ratio is None:
+            ratio = 1280 / self._session_reader.read(self._records[0]).shape[1]
+        return img_util.resize_by_ratio(img, ratio)
@@ -1,60 +1,15 @@
 import ctypes
 import logging
 import random
-import time
 
 import win32api
 import win32con
 import win32gui
 
-logger = logging.getLogger(__name__)
+from src.util import timer_util
+from src.util.vk_util import KEYBOARD_VK_MAPPING, VK_KEYBOARD_MAPPING
 
-KEYBOARD_VK_MAPPING: dict[str, int] = {
-    "0": 48,
-    "1": 49,
-    "2": 50,
-    "3": 51,
-    "4": 52,
-    "5": 53,
-    "6": 54,
-    "7": 55,
-    "8": 56,
-    "9": 57,
-    "A": 65,
-    "B": 66,
-    "C": 67,
-    "D": 68,
-    "E": 69,
-    "F": 70,
-    "G": 71,
-    "H": 72,
-    "I": 73,
-    "J": 74,
-    "K": 75,
-    "L": 76,
-    "M": 77,
-    "N": 78,
-    "O": 79,
-    "P": 80,
-    "Q": 81,
-    "R": 82,
-    "S": 83,
-    "T": 84,
-    "U": 85,
-    "V": 86,
-    "W": 87,
-    "X": 88,
-    "Y": 89,
-    "Z": 90,
-    "LSHIFT": win32con.VK_LSHIFT,
-    "ESC": win32con.VK_ESCAPE,
-    "SPACE": win32con.VK_SPACE,
-    "F1": win32con.VK_F1,
-    "F2": win32con.VK_F2,
-    "ENTER": win32con.VK_RETURN,
-}
-
-VK_KEYBOARD_MAPPING: dict[int, str] = {v: k for k, v in KEYBOARD_VK_MAPPING.items()}
+logger = logging.getLogger(__name__)
 
 
 ###### Keyboard ######
@@ -194,10 +149,10 @@ def __sleep(seconds: float):
     if seconds == 0.0:
         return
     if seconds > 0.0:
-        time.sleep(seconds)
+        timer_util.sleep(seconds)
     else:  # < 0.0
         seconds = round(random.uniform(0.04, 0.06), 4)
-        time.sleep(seconds)
+        timer_util.sleep(seconds)
 
 
 def tap_esc(hwnd):
@@ -72,7 +72,33 @@ else:
     }
 
 
-def create_ocr(*, use_gpu: bool = False, use_dml=False) -> RapidOCR:
+# 预热进程提前创建的引擎，按参数取用一次
+_warm_engines: dict[tuple, RapidOCR] = {}
+
+
+def warm_ocr(*, use_gpu: bool = False, use_dml=False, intra_op_num_threads: int = 0, inter_op_num_threads: int = 0):
+    """ 提前创建引擎，之后以相同参数 create_ocr 时直接取用，用于备用任务进程预热 """
+    key = (use_gpu, use_dml, intra_op_num_threads, inter_op_num_threads)
+    if key not in _warm_engines:
+        _warm_engines[key] = _create_ocr(use_gpu=use_gpu, use_dml=use_dml, intra_op_num_threads=intra_op_num_threads,
+                                         inter_op_num_threads=inter_op_num_threads)
+
+
+def create_ocr(*, use_gpu: bool = False, use_dml=False,
+               intra_op_num_threads: int = 0, inter_op_num_threads: int = 0) -> RapidOCR:
+    """
+    :param intra_op_num_threads: ONNX Runtime 单个算子内的并行线程数，0为默认
+    :param inter_op_num_threads: ONNX Runtime 算子间的并行线程数，0为默认
+    """
+    engine = _warm_engines.pop((use_gpu, use_dml, intra_op_num_threads, inter_op_num_threads), None)
+    if engine is not None:
+        logger.debug("Use warm OCR engine")
+        return engine
+    return _create_ocr(use_gpu=use_gpu, use_dml=use_dml, intra_op_num_threads=intra_op_num_threads,
+                       inter_op_num_threads=inter_op_num_threads)
+
+
+def _create_ocr(*, use_gpu: bool, use_dml: bool, intra_op_num_threads: int, inter_op_num_threads: int) -> RapidOCR:
     # https://rapidai.github.io/RapidOCRDocs/main/install_usage/rapidocr/API/RapidOCR/#_1
     if use_gpu:
         params = _GPU_PADDLEPADDLE_PARAMS
@@ -80,6 +106,11 @@ def create_ocr(*, use_gpu: bool = False, use_dml=False) -> RapidOCR:
         params = _DML_PARAMS
     else:
         params = _CPU_PARAMS
+    params = dict(params)
+    if intra_op_num_threads > 0:
+        params["EngineConfig.onnxruntime.intra_op_num_threads"] = intra_op_num_threads
+    if inter_op_num_threads > 0:
+        params["EngineConfig.onnxruntime.inter_op_num_threads"] = inter_op_num_threads
     engine = RapidOCR(
         params=params
     )  # 输入BGR
@@ -6,39 +6,93 @@ import win32con
 import win32gui
 import win32ui
 
-logger = logging.getLogger(__name__)
-
-
-def screenshot(hwnd, region: tuple[int, int, int, int] | None = None) -> np.ndarray:
-    """ 截图，返回只读BGR图片 """
-    if region is None:
-        region = win32gui.GetClientRect(hwnd)
-    left, top, right, bottom = region
-    width = right - left
-    height = bottom - top
+from src.core.capture import CaptureBackend, Capturer
 
-    # 获取窗口设备上下文
-    hwnd_dc = win32gui.GetWindowDC(hwnd)
-    mfc_dc = win32ui.CreateDCFromHandle(hwnd_dc)
-    save_dc = mfc_dc.CreateCompatibleDC()
-
-    # 创建兼容位图
-    save_bitmap = win32ui.CreateBitmap()
-    save_bitmap.CreateCompatibleBitmap(mfc_dc, width, height)
-    save_dc.SelectObject(save_bitmap)
+logger = logging.getLogger(__name__)
 
-    # 尝试使用PrintWindow截图
-    ctypes.windll.user32.PrintWindow(hwnd, save_dc.GetSafeHdc(), 3)
-    # result = ctypes.windll.user32.PrintWindow(hwnd, save_dc.GetSafeHdc(), 3)
-    # result: 1
-    # logger.debug("result: %d", result)
-    # if not result:
-    #     # 回退到BitBlt
-    #     save_dc.BitBlt((0, 0), (width, height), mfc_dc, (0, 0), win32con.SRCCOPY)
 
+class PrintWindowCaptureBackend(CaptureBackend):
+    """ PrintWindow后台截图，设备上下文与位图在窗口尺寸不变时复用 """
+
+    def __init__(self, hwnd):
+        self.hwnd = hwnd
+        self._hwnd_dc = None
+        self._mfc_dc = None
+        self._save_dc = None
+        self._save_bitmap = None
+        self._size: tuple[int, int] = (0, 0)
+        # 子区域位图，按尺寸缓存：(w, h) -> (dc, bitmap)
+        self._region_buffers: dict[tuple[int, int], tuple] = {}
+
+    def get_size(self) -> tuple[int, int]:
+        left, top, right, bottom = win32gui.GetClientRect(self.hwnd)
+        return right - left, bottom - top
+
+    def allocate(self, width: int, height: int):
+        # 获取窗口设备上下文
+        self._hwnd_dc = win32gui.GetWindowDC(self.hwnd)
+        self._mfc_dc = win32ui.CreateDCFromHandle(self._hwnd_dc)
+        self._save_dc = self._mfc_dc.CreateCompatibleDC()
+        # 创建兼容位图
+        self._save_bitmap = win32ui.CreateBitmap()
+        self._save_bitmap.CreateCompatibleBitmap(self._mfc_dc, width, height)
+        self._save_dc.SelectObject(self._save_bitmap)
+        self._size = (width, height)
+
+    def render(self):
+        # PrintWindow只能渲染整个客户区
+        ctypes.windll.user32.PrintWindow(self.hwnd, self._save_dc.GetSafeHdc(), 3)
+        # result = ctypes.windll.user32.PrintWindow(hwnd, save_dc.GetSafeHdc(), 3)
+        # result: 1
+        # logger.debug("result: %d", result)
+        # if not result:
+        #     # 回退到BitBlt
+        #     save_dc.BitBlt((0, 0), (width, height), mfc_dc, (0, 0), win32con.SRCCOPY)
+
+    def copy(self, rect: tuple[int, int, int, int]) -> np.ndarray:
+        left, top, right, bottom = rect
+        width, height = right - left, bottom - top
+        if (width, height) == self._size:
+            return _bitmap_to_img(self._save_bitmap)
+        # 只复制所需区域到小位图，避免读取整个客户区的位图数据
+        buffer = self._region_buffers.get((width, height))
+        if buffer is None:
+            if len(self._region_buffers) >= 8:
+                self._release_region_buffer(self._region_buffers.pop(next(iter(self._region_buffers))))
+            region_dc = self._mfc_dc.CreateCompatibleDC()
+            region_bitmap = win32ui.CreateBitmap()
+            region_bitmap.CreateCompatibleBitmap(self._mfc_dc, width, height)
+            region_dc.SelectObject(region_bitmap)
+            buffer = self._region_buffers[(width, height)] = (region_dc, region_bitmap)
+        region_dc, region_bitmap = buffer
+        region_dc.BitBlt((0, 0), (width, height), self._save_dc, (left, top), win32con.SRCCOPY)
+        return _bitmap_to_img(region_bitmap)
+
+    @staticmethod
+    def _release_region_buffer(buffer: tuple):
+        region_dc, region_bitmap = buffer
+        win32gui.DeleteObject(region_bitmap.GetHandle())
+        region_dc.DeleteDC()
+
+    def release(self):
+        # 清理资源
+        for buffer in self._region_buffers.values():
+            self._release_region_buffer(buffer)
+        self._region_buffers.clear()
+        if self._save_bitmap is not None:
+            win32gui.DeleteObject(self._save_bitmap.GetHandle())
+            self._save_dc.DeleteDC()
+            self._mfc_dc.DeleteDC()
+            win32gui.ReleaseDC(self.hwnd, self._hwnd_dc)
+        self._hwnd_dc = self._mfc_dc = self._save_dc = self._save_bitmap = None
+        self._size = (0, 0)
+
+
+def _bitmap_to_img(bitmap) -> np.ndarray:
+    """ 位图数据转为只读BGR图片 """
     # 获取位图数据
-    bmp_info = save_bitmap.GetInfo()
-    bmp_str = save_bitmap.GetBitmapBits(True)
+    bmp_info = bitmap.GetInfo()
+    bmp_str = bitmap.GetBitmapBits(True)
     # bmp_mutable = bytearray(bmp_str)  # 可读写，加载到Python层面处理
 
     # 转换为NumPy数组
@@ -66,14 +120,25 @@ def screenshot(hwnd, region: tuple[int, int, int, int] | None = None) -> np.ndar
         img = img[..., :3]  # 去除Alpha通道
     elif bytes_per_pixel != 3:
         raise NotImplementedError(f"不支持的颜色深度: {bits_pixel}位/像素")
+    return img
 
-    # 清理资源
-    win32gui.DeleteObject(save_bitmap.GetHandle())
-    save_dc.DeleteDC()
-    mfc_dc.DeleteDC()
-    win32gui.ReleaseDC(hwnd, hwnd_dc)
 
-    return img
+def create_capturer(hwnd) -> Capturer:
+    """ 创建可复用的后台截图器，使用完毕需调用 release() """
+    return Capturer(PrintWindowCaptureBackend(hwnd))
+
+
+def screenshot(hwnd, region: tuple[float, float, float, float] | None = None) -> np.ndarray:
+    """
+    截图，返回只读BGR图片，频繁截图请使用 create_capturer 复用资源
+    :param hwnd: 窗口句柄
+    :param region: 区域比例 (x1, y1, x2, y2)，为空表示整个客户区
+    """
+    capturer = create_capturer(hwnd)
+    try:
+        return capturer.capture(region)
+    finally:
+        capturer.release()
 
 
 def screenshot_bitblt(hwnd, region: tuple[int, int, int, int] | None = None) -> np.ndarray:
@@ -0,0 +1,65 @@
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# 计时模式
+MODE_SLEEP = "sleep"  # 只用 time.sleep，CPU占用最低，系统繁忙时可能超时数毫秒
+MODE_HYBRID = "hybrid"  # 先粗睡眠到截止时间前 spin 秒，剩余时间忙等，精度与CPU占用折中
+MODE_SPIN = "spin"  # 全程忙等，精度最高，占满一个核心
+MODES = (MODE_SLEEP, MODE_HYBRID, MODE_SPIN)
+
+_mode: str = MODE_HYBRID
+_spin_seconds: float = 0.002
+
+
+def configure(mode: str = MODE_HYBRID, spin_seconds: float = 0.002):
+    """
+    设置全局计时模式
+    :param mode: 计时模式，见 MODES
+    :param spin_seconds: hybrid模式下截止时间前忙等的时间，越大越精确、CPU占用越高
+    """
+    global _mode, _spin_seconds
+    if mode not in MODES:
+        raise ValueError(f"Unknown timer mode: {mode}, supported: {MODES}")
+    if spin_seconds < 0:
+        raise ValueError("spin_seconds must be >= 0")
+    _mode = mode
+    _spin_seconds = spin_seconds
+    logger.debug("Timer mode: %s, spin seconds: %s", mode, spin_seconds)
+
+
+def get_mode() -> str:
+    return _mode
+
+
+def sleep_until(deadline: float, mode: str | None = None, spin_seconds: float | None = None):
+    """
+    等待到截止时间
+    :param deadline: time.perf_counter() 时间
+    :param mode: 计时模式，为空使用全局设置
+    :param spin_seconds: hybrid模式下忙等的时间，为空使用全局设置
+    """
+    if mode is None:
+        mode = _mode
+    remaining = deadline - time.perf_counter()
+    if remaining <= 0:
+        return
+    if mode == MODE_SLEEP:
+        time.sleep(remaining)
+        return
+    if mode == MODE_HYBRID:
+        if spin_seconds is None:
+            spin_seconds = _spin_seconds
+        if remaining > spin_seconds:
+            time.sleep(remaining - spin_seconds)
+    # 忙等，time.sleep(0) 让出时间片，避免饿死同优先级线程
+    while time.perf_counter() < deadline:
+        time.sleep(0)
+
+
+def sleep(seconds: float, mode: str | None = None, spin_seconds: float | None = None):
+    """ 按计时模式睡眠指定时间 """
+    if seconds <= 0:
+        return
+    sleep_until(time.perf_counter() + seconds, mode, spin_seconds)
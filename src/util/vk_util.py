@@ -0,0 +1,51 @@
+"""
+按键名与 Windows 虚拟键码的对应表，不依赖 win32 模块，配置与离线回放等非 Windows 环境也可导入
+"""
+
+KEYBOARD_VK_MAPPING: dict[str, int] = {
+    "0": 48,
+    "1": 49,
+    "2": 50,
+    "3": 51,
+    "4": 52,
+    "5": 53,
+    "6": 54,
+    "7": 55,
+    "8": 56,
+    "9": 57,
+    "A": 65,
+    "B": 66,
+    "C": 67,
+    "D": 68,
+    "E": 69,
+    "F": 70,
+    "G": 71,
+    "H": 72,
+    "I": 73,
+    "J": 74,
+    "K": 75,
+    "L": 76,
+    "M": 77,
+    "N": 78,
+    "O": 79,
+    "P": 80,
+    "Q": 81,
+    "R": 82,
+    "S": 83,
+    "T": 84,
+    "U": 85,
+    "V": 86,
+    "W": 87,
+    "X": 88,
+    "Y": 89,
+    "Z": 90,
+    "LSHIFT": 0xA0,
+    "ESC": 0x1B,
+    "SPACE": 0x20,
+    "F1": 0x70,
+    "F2": 0x71,
+    "ENTER": 0x0D,
+}
+
+VK_KEYBOARD_MAPPING: dict[int, str] = {v: k for k, v in KEYBOARD_VK_MAPPING.items()}
+
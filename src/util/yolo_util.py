@@ -1,5 +1,9 @@
 import logging
-from typing import Any
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable
 
 import cv2
 import numpy as np
@@ -72,10 +76,23 @@ MODEL_BOSS_ALL = [MODEL_BOSS_V20, MODEL_BOSS_V10]
 ###########################################################################
 
 
-def create_ort_session_options() -> onnxruntime.SessionOptions:
+def create_ort_session_options(intra_op_num_threads: int = 0, inter_op_num_threads: int = 0,
+                               parallel: bool = False) -> onnxruntime.SessionOptions:
+    """
+    :param intra_op_num_threads: 单个算子内的并行线程数，0为ONNX Runtime默认（物理核心数）
+    :param inter_op_num_threads: 算子间的并行线程数，仅并行执行模式有效，0为默认
+    :param parallel: 是否使用并行执行模式，默认顺序执行
+    """
     session_options = onnxruntime.SessionOptions()
     # session_options.log_severity_level = 1 # 打开日志，排查为何有警告日志时使用，打印详细ort日志
     session_options.log_severity_level = 3  # 日志级别3，只显示异常日志
+    if intra_op_num_threads > 0:
+        session_options.intra_op_num_threads = intra_op_num_threads
+    if inter_op_num_threads > 0:
+        session_options.inter_op_num_threads = inter_op_num_threads
+    session_options.execution_mode = (
+        onnxruntime.ExecutionMode.ORT_PARALLEL if parallel else onnxruntime.ExecutionMode.ORT_SEQUENTIAL
+    )
     return session_options
 
 
@@ -103,6 +120,152 @@ def create_ort_session(model_path: str, providers: list[str] | None = None,
     return session
 
 
+# 预热进程提前创建的会话，(模型路径, 执行提供者, 线程数, 执行模式) -> 会话，创建同样配置的会话时取用一次
+_warm_sessions: dict[tuple, InferenceSession] = {}
+_warm_lock = threading.Lock()
+
+
+def _warm_key(model_path: str, providers: list[str], intra_op_num_threads: int, inter_op_num_threads: int,
+              parallel: bool) -> tuple:
+    return model_path, tuple(providers), intra_op_num_threads, inter_op_num_threads, parallel
+
+
+def warm_sessions(models: list[Model], providers: list[str] | None = None, intra_op_num_threads: int = 0,
+                  inter_op_num_threads: int = 0, parallel: bool = False):
+    """ 提前创建会话，之后 SessionRegistry 以相同配置创建会话时直接取用，用于备用任务进程预热 """
+    if providers is None:
+        providers = get_ort_providers()
+    for model in models:
+        key = _warm_key(model.path, providers, intra_op_num_threads, inter_op_num_threads, parallel)
+        with _warm_lock:
+            if key in _warm_sessions:
+                continue
+        session = create_ort_session(
+            model_path=model.path,
+            providers=providers,
+            sess_options=create_ort_session_options(intra_op_num_threads, inter_op_num_threads, parallel),
+        )
+        with _warm_lock:
+            _warm_sessions[key] = session
+
+
+def _take_warm_session(key: tuple) -> InferenceSession | None:
+    with _warm_lock:
+        return _warm_sessions.pop(key, None)
+
+
+class SessionRegistry:
+    """
+    ONNX Runtime会话注册表：按模型缓存会话，切换模型只是一次字典查找，不再重新创建会话（数秒）。
+    所有会话使用相同的执行提供者、线程数与执行模式；可按估算内存做LRU淘汰，线程安全。
+    """
+
+    def __init__(self,
+                 providers: list[str] | None = None,
+                 intra_op_num_threads: int = 0,
+                 inter_op_num_threads: int = 0,
+                 parallel: bool = False,
+                 max_memory_mb: int = 0,
+                 session_factory: Callable[[Model], InferenceSession] | None = None):
+        """
+        :param providers: 执行提供者，为空时由 get_ort_providers 决定
+        :param intra_op_num_threads: 见 create_ort_session_options
+        :param inter_op_num_threads: 见 create_ort_session_options
+        :param parallel: 见 create_ort_session_options
+        :param max_memory_mb: 会话估算内存上限MB，超过时淘汰最久未使用的会话，0为不限制
+        :param session_factory: 自定义会话创建函数，默认按上述配置创建
+        """
+        self._providers = providers
+        self._intra_op_num_threads = intra_op_num_threads
+        self._inter_op_num_threads = inter_op_num_threads
+        self._parallel = parallel
+        self._max_memory = max_memory_mb * 1024 * 1024
+        self._session_factory = session_factory or self._create_session
+        self._lock = threading.Lock()
+        self._model_locks: dict[str, threading.Lock] = {}
+        # model.path -> (会话, 估算内存)，按使用时间排序，最近使用的在末尾
+        self._sessions: OrderedDict[str, tuple[InferenceSession, int]] = OrderedDict()
+        # 统计
+        self.create_count = 0
+        self.evict_count = 0
+
+    def _create_session(self, model: Model) -> InferenceSession:
+        if self._providers is None:
+            self._providers = get_ort_providers()
+        key = _warm_key(model.path, self._providers, self._intra_op_num_threads, self._inter_op_num_threads,
+                        self._parallel)
+        if (session := _take_warm_session(key)) is not None:
+            logger.debug("Use warm session: %s", model.name)
+            return session
+        return create_ort_session(
+            model_path=model.path,
+            providers=self._providers,
+            sess_options=create_ort_session_options(
+                self._intra_op_num_threads, self._inter_op_num_threads, self._parallel
+            ),
+        )
+
+    @staticmethod
+    def _estimate_memory(model: Model) -> int:
+        """ 以模型文件大小估算会话占用的内存 """
+        try:
+            return os.path.getsize(model.path)
+        except OSError:
+            return 0
+
+    def get(self, model: Model) -> InferenceSession:
+        """ 获取模型的会话，不存在时创建，同一模型并发获取时只创建一次 """
+        with self._lock:
+            if (entry := self._sessions.get(model.path)) is not None:
+                self._sessions.move_to_end(model.path)
+                return entry[0]
+            model_lock = self._model_locks.setdefault(model.path, threading.Lock())
+        with model_lock:
+            with self._lock:
+                if (entry := self._sessions.get(model.path)) is not None:
+                    self._sessions.move_to_end(model.path)
+                    return entry[0]
+            start = time.perf_counter()
+            session = self._session_factory(model)
+            logger.debug("Create session: %s, cost: %.2fs", model.name, time.perf_counter() - start)
+            with self._lock:
+                self.create_count += 1
+                self._sessions[model.path] = (session, self._estimate_memory(model))
+                self._evict()
+            return session
+
+    def _evict(self):
+        """ 超过内存上限时淘汰最久未使用的会话，至少保留最近使用的一个 """
+        if self._max_memory <= 0:
+            return
+        while len(self._sessions) > 1 and self.memory_bytes > self._max_memory:
+            path, _ = self._sessions.popitem(last=False)
+            self.evict_count += 1
+            logger.debug("Evict session: %s", path)
+
+    def preload(self, models: list[Model]):
+        """ 预先创建会话 """
+        for model in models:
+            self.get(model)
+
+    def contains(self, model: Model) -> bool:
+        with self._lock:
+            return model.path in self._sessions
+
+    def evict(self, model: Model):
+        with self._lock:
+            self._sessions.pop(model.path, None)
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+
+    @property
+    def memory_bytes(self) -> int:
+        """ 已缓存会话的估算内存 """
+        return sum(memory for _, memory in self._sessions.values())
+
+
 def run_ort_session(session: InferenceSession, img: np.ndarray):
     # img需为RGB
     input_name = session.get_inputs()[0].name
@@ -180,78 +343,71 @@ def preprocess(img: np.ndarray, new_shape: tuple = (640, 640)):
     return img_process, ratio, pad
 
 
-def postprocess(input_shape, img_shape, output, confidence_thres, iou_thres, ratio, pad) -> tuple[list[Any], list[Any], list[Any]]:
+def postprocess(input_shape, img_shape, output, confidence_thres, iou_thres, ratio, pad,
+                max_candidates: int = 300) -> tuple[list[Any], list[Any], list[Any]]:
+    """
+    YOLO输出后处理，阈值过滤、坐标还原均为数组运算
+    :param input_shape: 模型输入形状 NCHW
+    :param img_shape: 原图形状 HWC
+    :param output: 模型输出，[(1, 4 + 类别数, 检测框数)]
+    :param confidence_thres: 置信度阈值
+    :param iou_thres: NMS的IOU阈值
+    :param ratio: letterbox缩放比例
+    :param pad: letterbox填充 (pad_w, pad_h)
+    :param max_candidates: 进入NMS的最大检测框数，按置信度取前N个
+    :return: 检测框 [[left, top, width, height], ...]，置信度，类别
+    """
     # Transpose and squeeze the output to match the expected shape
-    outputs = np.transpose(np.squeeze(output[0]))
-
-    # Get the number of rows in the outputs array
-    rows = outputs.shape[0]
+    outputs = np.squeeze(output[0]).T  # (检测框数, 4 + 类别数)
 
-    # Lists to store the bounding boxes, scores, and class IDs of the detections
-    boxes = []
-    scores = []
-    class_ids = []
+    # 每行最大的类别置信度及其类别
+    classes_scores = outputs[:, 4:]
+    if classes_scores.shape[1] == 1:
+        max_scores = classes_scores[:, 0]
+        class_ids = np.zeros(len(max_scores), dtype=np.int64)
+    else:
+        class_ids = np.argmax(classes_scores, axis=1)
+        max_scores = classes_scores[np.arange(len(class_ids)), class_ids]
 
-    # Store the shape of the input for later use
-    input_width = input_shape[2]
-    input_height = input_shape[3]
-    # Get the height and width of the input image
-    img_height, img_width = img_shape[:2]
+    # 阈值过滤
+    candidates = np.flatnonzero(max_scores >= confidence_thres)
+    if len(candidates) == 0:
+        return [], [], []
+    # 只保留置信度最高的前N个，保持原有顺序，使NMS结果与逐行处理一致
+    if len(candidates) > max_candidates:
+        top = np.argpartition(-max_scores[candidates], max_candidates - 1)[:max_candidates]
+        candidates = np.sort(candidates[top])
+    rows = outputs[candidates]
+    scores = max_scores[candidates]
+    class_ids = class_ids[candidates]
 
     # Extract the scale ratio and padding values
     scale_ratio = ratio[0]  # ratio is the same for width and height
     pad_w, pad_h = pad
 
-    # Iterate over each row in the outputs array
-    for i in range(rows):
-        # Extract the class scores from the current row
-        classes_scores = outputs[i][4:]
-
-        # Find the maximum score among the class scores
-        max_score = np.amax(classes_scores)
+    # Adjust the coordinates by removing padding and scaling back to original image
+    x_adj = (rows[:, 0] - pad_w) / scale_ratio
+    y_adj = (rows[:, 1] - pad_h) / scale_ratio
+    w_adj = rows[:, 2] / scale_ratio
+    h_adj = rows[:, 3] / scale_ratio
 
-        # If the maximum score is above the confidence threshold
-        if max_score >= confidence_thres:
-            # Get the class ID with the highest score
-            class_id = np.argmax(classes_scores)
-
-            # Extract the bounding box coordinates from the current row
-            x, y, w, h = outputs[i][0], outputs[i][1], outputs[i][2], outputs[i][3]
-
-            # Adjust the coordinates by removing padding and scaling back to original image
-            x_adj = (x - pad_w) / scale_ratio
-            y_adj = (y - pad_h) / scale_ratio
-            w_adj = w / scale_ratio
-            h_adj = h / scale_ratio
-
-            # Calculate the scaled coordinates of the bounding box
-            left = int(x_adj - w_adj / 2)
-            top = int(y_adj - h_adj / 2)
-            width = int(w_adj)
-            height = int(h_adj)
-
-            # Add the class ID, score, and box coordinates to the respective lists
-            class_ids.append(class_id)
-            scores.append(max_score)
-            boxes.append([left, top, width, height])
-
-    if len(boxes) == 0:
-        return [], [], []
+    # 左上角坐标与宽高，向零取整与int()一致
+    boxes = np.stack([x_adj - w_adj / 2, y_adj - h_adj / 2, w_adj, h_adj], axis=1).astype(np.int64).tolist()
 
     # Apply non-maximum suppression to filter out overlapping bounding boxes
     # boxes：检测框列表，格式为 [[x, y, w, h], ...]（左上角坐标和宽高）。
     # scores：每个检测框对应的置信度分数（confidence scores）。
     # confidence_thres：过滤掉低于该值的检测框（通常不影响最终 NMS）。
     # iou_thres：IOU（交并比）阈值，用于控制 NMS 剔除重叠框的严格程度。
-    indices = cv2.dnn.NMSBoxes(boxes, scores, confidence_thres, iou_thres)
+    indices = cv2.dnn.NMSBoxes(boxes, scores.tolist(), confidence_thres, iou_thres)
     logger.debug("indices: %s", indices)
 
     filtered_boxes = [boxes[i] for i in indices]
     filtered_scores = [scores[i] for i in indices]
     filtered_class_ids = [class_ids[i] for i in indices]
-    logger.debug("boxes: %s", boxes)
-    logger.debug("scores: %s", scores)
-    logger.debug("class_ids: %s", class_ids)
+    logger.debug("boxes: %s", filtered_boxes)
+    logger.debug("scores: %s", filtered_scores)
+    logger.debug("class_ids: %s", filtered_class_ids)
     return filtered_boxes, filtered_scores, filtered_class_ids
 
 
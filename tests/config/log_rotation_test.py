@@ -0,0 +1,127 @@
+import gzip
+import logging
+import os
+import re
+import subprocess
+import sys
+import time
+
+from src.config import logging_config
+from src.config.log_rotation import LogRotator
+from src.util import file_util
+
+logger = logging.getLogger(__name__)
+
+# 写日志的进程：每条日志立即写入，频繁滚动
+_WRITER_SCRIPT = """
+import logging, sys
+from src.config import logging_config
+path, name, count = sys.argv[1], sys.argv[2], int(sys.argv[3])
+handler = logging_config.QueueFileHandler(path, encoding="utf-8", max_bytes=20 * 1024, max_total_bytes=0)
+handler.LOG_QUEUE = None
+handler.FLUSH_BYTES = 0
+handler.setFormatter(logging.Formatter("%(message)s"))
+for i in range(count):
+    handler.handle(logging.LogRecord("w", logging.INFO, "w.py", 1, "%s-%06d-" + "x" * 80, (name, i), None))
+handler.close()
+"""
+
+_LINE = re.compile(r"^(w\d)-(\d{6})-x{80}$")
+
+
+def _read_all(path) -> list[str]:
+    """ 当前日志与所有归档的行 """
+    lines = []
+    for i in path.parent.glob(path.name + "*"):
+        if i.name.endswith(".lock"):
+            continue
+        if i.name.endswith(".gz"):
+            with gzip.open(i, "rt", encoding="utf-8") as f:
+                lines.extend(f.read().splitlines())
+        else:
+            lines.extend(i.read_text(encoding="utf-8").splitlines())
+    return lines
+
+
+def test_rotate_by_size(tmp_path):
+    path = tmp_path / "wwa.log"
+    handler = logging_config.QueueFileHandler(str(path), encoding="utf-8", max_bytes=4096)
+    handler.LOG_QUEUE = None
+    handler.FLUSH_BYTES = 1024
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    for i in range(5000):
+        handler.handle(logging.LogRecord("w", logging.INFO, "w.py", 1, "line %04d", (i,), None))
+    handler.close()
+    archives = handler.rotator.archives()
+    assert len(archives) >= 10
+    assert all(i.name.endswith(".gz") for i in archives)
+    assert path.stat().st_size < 4096 + 1024
+    assert sorted(_read_all(path)) == [f"line {i:04d}" for i in range(5000)]
+
+
+def test_rotate_daily(tmp_path):
+    path = tmp_path / "wwa.log"
+    path.write_text("yesterday\n", encoding="utf-8")
+    yesterday = time.time() - 86400
+    os.utime(path, (yesterday, yesterday))
+    rotator = LogRotator(path, daily=True, compress=False)
+    rotator.write("today\n")
+    rotator.write("today\n")
+    rotator.close()
+    archives = rotator.archives()
+    assert len(archives) == 1 and archives[0].read_text(encoding="utf-8") == "yesterday\n"
+    assert path.read_text(encoding="utf-8") == "today\ntoday\n"
+
+
+def test_disk_budget(tmp_path):
+    path = tmp_path / "wwa.log"
+    path.write_bytes(b"x" * 1000)
+    other = tmp_path / "other.txt"
+    other.write_bytes(b"x" * 1000)
+    now = time.time()
+    for i in range(10):
+        archive = tmp_path / f"wwa.log.2026010{i}.gz"
+        archive.write_bytes(b"x" * 1000)
+        os.utime(archive, (now - 1000 + i, now - 1000 + i))
+    # 压缩中的原文件不删除
+    raw = tmp_path / "wwa.log.20250101"
+    raw.write_bytes(b"x" * 1000)
+    os.utime(raw, (now - 2000, now - 2000))
+    rotator = LogRotator(path, max_total_bytes=8000)
+    removed = rotator.enforce_budget()
+    rotator.close()
+    assert [i.name for i in removed] == [f"wwa.log.2026010{i}.gz" for i in range(5)]
+    assert path.exists() and other.exists() and raw.exists()
+    total = sum(i.stat().st_size for i in tmp_path.iterdir() if i.is_file())
+    assert total <= 8000
+
+
+def test_multi_process_rotation(tmp_path):
+    """ 多个进程同时写入并滚动，没有丢失或写坏的行 """
+    path = tmp_path / "wwa.log"
+    count = 2000
+    start = time.perf_counter()
+    writers = [
+        subprocess.Popen([sys.executable, "-c", _WRITER_SCRIPT, str(path), f"w{i}", str(count)],
+                         cwd=file_util.get_project_root(), stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        for i in range(3)
+    ]
+    for writer in writers:
+        _, stderr = writer.communicate(timeout=120)
+        assert writer.returncode == 0, stderr
+    elapsed = time.perf_counter() - start
+    # 退出前未压缩完成的归档，由下次滚动时压缩
+    rotator = LogRotator(path)
+    rotator.maintain()
+    rotator.close()
+    lines = _read_all(path)
+    assert len(lines) == 3 * count
+    seen = {}
+    for line in lines:
+        match = _LINE.match(line)
+        assert match, line
+        seen.setdefault(match.group(1), set()).add(int(match.group(2)))
+    assert all(len(i) == count for i in seen.values()) and len(seen) == 3
+    archives = rotator.archives()
+    assert archives and all(i.name.endswith(".gz") for i in archives)
+    logger.info("3 processes x %d lines, %d archives, %.2fs", count, len(archives), elapsed)
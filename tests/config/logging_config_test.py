@@ -1,4 +1,10 @@
 import logging
+import queue
+import time
+
+import pytest
+
+from src.config import logging_config
 
 logger = logging.getLogger(__name__)
 
@@ -10,3 +16,122 @@ def test_logging_config():
     logger.warning("This is a warning message")
     logger.error("This is an error message")
     logger.critical("This is a critical message")
+
+
+class _SyncFileHandler(logging.FileHandler):
+    """ 原实现：每条日志都格式化、写入并 flush """
+
+    def emit(self, record):
+        self.stream.write(self.format(record) + self.terminator)
+        self.flush()
+
+
+class _RegexFormatter(logging_config.CustomFormatter):
+    """ 原实现：每条日志都用正则解析 customLineno 宽度 """
+
+    def format(self, record):
+        match = logging_config.RE_CUSTOM_LINENO.search(self._style._fmt)
+        int(match.group(1))
+        return super().format(record)
+
+
+_FORMAT = '%(asctime)s.%(msecs)03d - %(levelname)-5s - %(customLineno)-30s - %(message)s'
+
+
+class _CountingStream:
+    """ 统计写入文件的次数 """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.write_count = 0
+        self.flush_count = 0
+
+    def write(self, s):
+        self.write_count += 1
+        return self.stream.write(s)
+
+    def flush(self):
+        self.flush_count += 1
+        self.stream.flush()
+
+    def close(self):
+        self.stream.close()
+
+
+def _bench(bench_logger: logging.Logger, n: int) -> float:
+    start = time.perf_counter()
+    for i in range(n):
+        bench_logger.info("ocr result: %s, page: %s", i, "BossPage")
+    return time.perf_counter() - start
+
+
+def test_custom_lineno_width_cached():
+    formatter = logging_config.CustomFormatter(_FORMAT)
+    record = logging.LogRecord("src.test", logging.INFO, "/x/combat_system.py", 12, "msg", None, None,
+                               func="a_very_long_function_name_for_test")
+    line = formatter.format(record)
+    assert formatter._custom_lineno_width == 30
+    assert "combat_system.a_very_lo...t:12" in line
+    assert logging_config.CustomFormatter("%(message)s").format(record) == "msg"
+
+
+def test_batch_file_handler(tmp_path):
+    path = tmp_path / "batch.log"
+    handler = logging_config.QueueFileHandler(str(path), encoding="utf-8")
+    handler.setFormatter(logging_config.CustomFormatter(_FORMAT))
+    handler.LOG_QUEUE = None
+    handler.FLUSH_INTERVAL = 60
+    record = logging.LogRecord("src.test", logging.INFO, "/x/a.py", 1, "info %s", (1,), None, func="f")
+    handler.handle(record)
+    assert path.read_text(encoding="utf-8") == ""  # 缓存中
+    warning = logging.LogRecord("src.test", logging.WARNING, "/x/a.py", 2, "warning", None, None, func="f")
+    handler.handle(warning)
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 2 and lines[0].endswith("info 1") and lines[1].endswith("warning")
+    handler.handle(record)
+    handler.close()
+    assert len(path.read_text(encoding="utf-8").splitlines()) == 3
+
+
+@pytest.mark.benchmark
+def test_listener_benchmark(tmp_path):
+    """ 对比原同步写入与队列监听线程批量写入，调用方每秒可记录的日志条数 """
+    n = 20000
+    results = {}
+    # enqueue: 监听线程稍后启动，只统计调用方放入队列的开销
+    for name in ("sync", "async", "enqueue"):
+        path = tmp_path / f"{name}.log"
+        bench_logger = logging.getLogger(f"bench.{name}")
+        bench_logger.propagate = False
+        bench_logger.setLevel(logging.INFO)
+        listener = None
+        if name == "sync":
+            handler = _SyncFileHandler(str(path), encoding="utf-8")
+            handler.setFormatter(_RegexFormatter(_FORMAT))
+            bench_logger.addHandler(handler)
+        else:
+            handler = logging_config.QueueFileHandler(str(path), encoding="utf-8")
+            handler.setFormatter(logging_config.CustomFormatter(_FORMAT))
+            log_queue = queue.SimpleQueue()
+            listener = logging_config.BatchQueueListener(log_queue, handler)
+            if name == "async":
+                listener.start()
+            bench_logger.addHandler(logging_config.LightQueueHandler(log_queue))
+        handler.LOG_QUEUE = None  # 不向界面日志队列发送，无人读取时进程退出会阻塞
+        handler.stream = stream = _CountingStream(handler.stream)
+        start = time.perf_counter()
+        caller_seconds = _bench(bench_logger, n)
+        if listener is not None:
+            if name == "enqueue":
+                listener.start()
+            listener.stop()  # 等待监听线程写完
+        total_seconds = time.perf_counter() - start
+        bench_logger.handlers.clear()
+        handler.close()
+        assert len(path.read_text(encoding="utf-8").splitlines()) == n
+        logger.info("%s logging: %.0f records/s in caller thread, %.0f records/s written, "
+                    "file writes: %d, flushes: %d",
+                    name, n / caller_seconds, n / total_seconds, stream.write_count, stream.flush_count)
+        results[name] = stream.flush_count
+    assert results["sync"] >= n
+    assert results["async"] < n / 10
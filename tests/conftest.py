@@ -1,5 +1,7 @@
 import logging
 
+import pytest
+
 from src.config import logging_config
 from src.core import environs
 
@@ -7,11 +9,25 @@ logger = logging.getLogger(__name__)
 
 
 # hook
+def pytest_addoption(parser):
+    parser.addoption("--benchmark", action="store_true", default=False, help="运行标记为 benchmark 的耗时测量")
+
+
 def pytest_configure(config):
     # option = config.option
     environs.load_env()
     logging_config.setup_logging_test()
 
+
+def pytest_collection_modifyitems(config, items):
+    """ 耗时测量受机器负载影响，默认跳过 """
+    if config.getoption("--benchmark"):
+        return
+    skip = pytest.mark.skip(reason="使用 --benchmark 运行")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
+
 #
 # @pytest.hookimpl(tryfirst=True)
 # def pytest_sessionstart(session):
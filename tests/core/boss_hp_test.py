@@ -0,0 +1,150 @@
+import logging
+import time
+
+import numpy as np
+import pytest
+
+from src.core.combat.boss_hp import BossHealthBar, BossHealthReading, BossHealthSeries
+from src.core.combat.combat_core import AlignEnum, BaseResonator, DynamicPointTransformer
+
+logger = logging.getLogger(__name__)
+
+RESOLUTIONS = [(1280, 720), (1600, 900), (1920, 1080), (2560, 1440), (1920, 1200), (2560, 1080), (3440, 1440)]
+
+
+def _frame(w: int, h: int, fraction: float | None) -> np.ndarray:
+    """ 绘制血条，fraction为None时不绘制 """
+    img = np.full((h, w, 3), 40, dtype=np.uint8)
+    if fraction is None:
+        return img
+    bar = BossHealthBar
+    dpt = DynamicPointTransformer((w, h))
+    stops_x = [x for x, _ in bar.GRADIENT]
+    colors = np.array([color for _, color in bar.GRADIENT], dtype=np.float64)
+    filled_to = bar.LEFT + fraction * (bar.RIGHT - bar.LEFT + 1)
+    y0 = dpt.transform((bar.LEFT, bar.ROWS[0] - 2), AlignEnum.TOP_CENTER)[1]
+    y1 = dpt.transform((bar.LEFT, bar.ROWS[-1] + 2), AlignEnum.TOP_CENTER)[1]
+    for x in range(bar.LEFT, bar.RIGHT + 1):
+        x0 = dpt.transform((x, 0), AlignEnum.TOP_CENTER)[0]
+        x1 = dpt.transform((x + 1, 0), AlignEnum.TOP_CENTER)[0]
+        if x < filled_to:
+            color = [np.interp(x, stops_x, colors[:, c]) for c in range(3)]
+        else:
+            color = (45, 18, 28)  # 已损失的血量
+        img[y0:y1 + 1, x0:max(x1, x0 + 1)] = color
+    return img
+
+
+def test_read_fraction():
+    bar = BossHealthBar()
+    for w, h in RESOLUTIONS:
+        for fraction in (1.0, 0.73, 0.5, 0.31, 0.1, 0.004):
+            reading = bar.read(_frame(w, h, fraction))
+            assert reading.present, (w, h, fraction)
+            assert abs(reading.fraction - fraction) < 0.01, (w, h, fraction, reading)
+        reading = bar.read(_frame(w, h, None))
+        assert not reading.present and reading.fraction == 0
+
+
+def test_legacy_level():
+    bar = BossHealthBar()
+    expected = {1.0: 1.0, 0.73: 0.5, 0.5: 0.5, 0.31: 0.3, 0.25: 0.2, 0.1: 0.01, 0.0: 0.0}
+    for fraction, level in expected.items():
+        reading = bar.read(_frame(1920, 1080, fraction if fraction > 0 else None))
+        assert bar.legacy_level(reading.fraction) == level, (fraction, reading)
+
+
+def test_boss_hp_compatible():
+    """ 按血条读取的结果与原五点采样一致 """
+    resonator = BaseResonator(None, None)
+    resonator.boss_health_bar = BossHealthBar()
+    for w, h in RESOLUTIONS:
+        for fraction in (None, 1.0, 0.6, 0.4, 0.25, 0.05):
+            img = _frame(w, h, fraction)
+            assert resonator.boss_hp(img) == BaseResonator.legacy_boss_hp(img), (w, h, fraction)
+            assert (resonator.is_boss_health_bar_exist(img)
+                    == BaseResonator.legacy_is_boss_health_bar_exist(img)), (w, h, fraction)
+
+
+def _cover(img: np.ndarray, x_1280: int, width: int, color=(255, 255, 255)) -> np.ndarray:
+    """ 在血条上覆盖宽 width 的竖条，模拟伤害数字、特效遮挡 """
+    img = img.copy()
+    h, w = img.shape[:2]
+    dpt = DynamicPointTransformer((w, h))
+    x0 = dpt.transform((x_1280, 0), AlignEnum.TOP_CENTER)[0]
+    x1 = dpt.transform((x_1280 + width, 0), AlignEnum.TOP_CENTER)[0]
+    img[:, x0:max(x1, x0 + 1)] = color
+    return img
+
+
+def test_read_covered():
+    """ 填充段内的短暂遮挡不影响读数，读数取填充段的结束位置而非填充像素数 """
+    bar = BossHealthBar()
+    for w, h in RESOLUTIONS:
+        full = _frame(w, h, 1.0)
+        for x, width in ((600, 1), (700, 3), (460, 5), (820, 6)):
+            reading = bar.read(_cover(full, x, width))
+            assert reading.present and reading.fraction == 1.0, (w, h, x, width, reading)
+            assert bar.legacy_level(reading.fraction) == 1.0
+        # 多处遮挡
+        img = full
+        for x in range(470, 820, 50):
+            img = _cover(img, x, 2)
+        assert bar.read(img).fraction == 1.0
+        # 部分血量时遮挡不改变结束位置
+        img = _cover(_frame(w, h, 0.6), 500, 4)
+        reading = bar.read(img)
+        assert abs(reading.fraction - 0.6) < 0.01, (w, h, reading)
+        assert bar.legacy_level(reading.fraction) == 0.5
+        # 噪声：少量像素偏色
+        rng = np.random.default_rng(w)
+        img = _frame(w, h, 0.8).astype(np.int16)
+        img += rng.integers(-12, 13, img.shape, dtype=np.int16)
+        reading = bar.read(np.clip(img, 0, 255).astype(np.uint8))
+        assert abs(reading.fraction - 0.8) < 0.01, (w, h, reading)
+    # 超过允许间断的缺口视为填充段结束
+    reading = bar.read(_cover(_frame(1920, 1080, 1.0), 600, BossHealthBar.MAX_GAP + 4, (45, 18, 28)))
+    assert abs(reading.fraction - (600 - BossHealthBar.LEFT) / (BossHealthBar.RIGHT - BossHealthBar.LEFT + 1)) < 0.01
+
+
+def test_fill_end():
+    filled = np.array([1, 1, 0, 1, 1, 0, 0, 0, 1], dtype=bool)
+    assert BossHealthBar.fill_end(filled, 1) == 5
+    assert BossHealthBar.fill_end(filled, 3) == 9
+    assert BossHealthBar.fill_end(filled, 0) == 2
+    assert BossHealthBar.fill_end(np.zeros(5, dtype=bool), 3) == 0
+    # 左端缺口过宽视为没有血量
+    assert BossHealthBar.fill_end(np.array([0, 0, 0, 1, 1], dtype=bool), 2) == 0
+    assert BossHealthBar.fill_end(np.array([0, 0, 1, 1], dtype=bool), 2) == 4
+
+
+def test_series_time_to_kill():
+    series = BossHealthSeries(window_seconds=10)
+    assert series.time_to_kill() is None
+    # 每秒掉5%
+    for i in range(20):
+        series.add(BossHealthReading(1.0 - 0.05 * i * 0.5, True, 100 + i * 0.5))
+    assert abs(series.damage_rate() - 0.05) < 1e-6
+    assert abs(series.time_to_kill() - 0.525 / 0.05) < 1e-3
+    # 没有血条的帧不记录
+    series.add(BossHealthReading(0.0, False, 200))
+    assert abs(series.latest() - 0.525) < 1e-9
+    # 换boss，血量回升，重新记录
+    series.add(BossHealthReading(1.0, True, 111))
+    assert len(series) == 1 and series.time_to_kill() is None
+
+
+@pytest.mark.benchmark
+def test_read_benchmark():
+    bar = BossHealthBar()
+    frames = [_frame(1920, 1080, f) for f in np.linspace(0.05, 1.0, 20)]
+    start = time.perf_counter()
+    for img in frames * 25:
+        BaseResonator.legacy_boss_hp(img)
+        BaseResonator.legacy_is_boss_health_bar_exist(img)
+    legacy_cost = (time.perf_counter() - start) / 500
+    start = time.perf_counter()
+    for img in frames * 25:
+        bar.read(img)
+    cost = (time.perf_counter() - start) / 500
+    logger.info("boss hp: five points + exist %.1f us/frame, bar scan %.1f us/frame", legacy_cost * 1e6, cost * 1e6)
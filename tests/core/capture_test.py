@@ -0,0 +1,50 @@
+import logging
+
+import numpy as np
+import pytest
+
+from src.core.capture import ArrayCaptureBackend, Capturer, region_to_rect
+
+logger = logging.getLogger(__name__)
+
+
+def _img(width: int = 1280, height: int = 720) -> np.ndarray:
+    return np.random.default_rng(0).integers(0, 256, (height, width, 3), dtype=np.uint8)
+
+
+def test_region_to_rect():
+    assert region_to_rect(None, 1280, 720) == (0, 0, 1280, 720)
+    assert region_to_rect((0.5, 0.5, 1.0, 1.0), 1280, 720) == (640, 360, 1280, 720)
+    assert region_to_rect((-0.1, 0.9, 1.2, 1.5), 1280, 720) == (0, 648, 1280, 720)
+
+
+def test_capturer_region():
+    img = _img()
+    capturer = Capturer(ArrayCaptureBackend(img))
+    full = capturer.capture()
+    assert np.array_equal(full, img)
+    region = (0.1, 0.2, 0.3, 0.4)
+    crop = capturer.capture(region)
+    x1, y1, x2, y2 = region_to_rect(region, 1280, 720)
+    assert crop.shape == (y2 - y1, x2 - x1, 3)
+    assert np.array_equal(crop, img[y1:y2, x1:x2])
+    with pytest.raises(ValueError):
+        capturer.capture((0.5, 0.5, 0.5, 0.6))
+
+
+def test_capturer_reuse():
+    backend = ArrayCaptureBackend(_img())
+    capturer = Capturer(backend)
+    for _ in range(5):
+        capturer.capture((0.0, 0.0, 0.5, 0.5))
+    assert capturer.allocate_count == 1
+    assert backend.render_count == 5
+
+    # 窗口尺寸变化时重新分配
+    backend.img = _img(1920, 1080)
+    assert capturer.capture().shape == (1080, 1920, 3)
+    assert capturer.allocate_count == 2
+
+    capturer.release()
+    assert capturer.capture((0.0, 0.0, 0.5, 0.5)).shape == (540, 960, 3)
+    assert capturer.allocate_count == 3
@@ -0,0 +1,129 @@
+import importlib
+import inspect
+import logging
+import pkgutil
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from src.core.combat import resonator
+from src.core.combat.combat_core import AlignEnum, BaseResonator, ColorChecker, DynamicPointTransformer, LogicEnum
+from src.core.sessions import SessionReader
+
+logger = logging.getLogger(__name__)
+
+_RESOLUTIONS = [(1280, 720), (1920, 1080), (1600, 900), (1280, 800), (1920, 1200), (2560, 1080), (3440, 1440)]
+
+
+def _collect_checkers() -> list[ColorChecker]:
+    """ 收集所有共鸣者与通用的颜色校验器 """
+    checkers = {}
+
+    def collect(obj):
+        for value in list(vars(type(obj)).values()) + list(vars(obj).values()):
+            if isinstance(value, ColorChecker):
+                checkers[id(value)] = value
+
+    for module_info in pkgutil.iter_modules(resonator.__path__):
+        module = importlib.import_module(f"{resonator.__name__}.{module_info.name}")
+        for _, cls in inspect.getmembers(module, inspect.isclass):
+            if issubclass(cls, BaseResonator) and cls.__module__ == module.__name__:
+                try:
+                    collect(cls(None, None))
+                except Exception as e:
+                    logger.debug("Skip %s: %s", cls.__name__, e)
+    for name, func in vars(ColorChecker).items():
+        if isinstance(func, staticmethod):
+            checker = func.__func__()
+            checkers[id(checker)] = checker
+    return list(checkers.values())
+
+
+def _fake_hud_frames(checkers: list[ColorChecker], w: int, h: int, seed: int, count: int) -> list[np.ndarray]:
+    """ 随机背景上，将部分校验点涂成目标颜色附近的颜色（容差内外均有），模拟HUD画面 """
+    rng = np.random.default_rng(seed)
+    dpt = DynamicPointTransformer((w, h))
+    frames = []
+    for _ in range(count):
+        img = rng.integers(0, 256, (h, w, 3), dtype=np.uint8)
+        for checker in checkers:
+            if rng.random() < 0.3:
+                continue
+            for point in checker.points:
+                x, y = dpt.transform(point, checker.align)
+                if rng.random() < 0.8 and 0 <= x < w and 0 <= y < h:
+                    color = checker.colors[rng.integers(len(checker.colors))]
+                    offset = rng.integers(-checker.tolerance - 3, checker.tolerance + 4, 3)
+                    img[y, x] = np.clip(color + offset, 0, 255)
+        frames.append(img)
+    return frames
+
+
+def _recorded_frames() -> list[np.ndarray]:
+    """ tests/core/data 下录制的会话帧，见 SessionWriter """
+    frames = []
+    for path in Path(__file__).parent.joinpath("data").glob("*.wwasess"):
+        reader = SessionReader(str(path))
+        frames += [reader.read(record) for record in reader.frames if record.region is None]
+    return frames
+
+
+def test_color_checker_same_result():
+    checkers = _collect_checkers()
+    logger.info("checkers: %s", len(checkers))
+    assert len(checkers) > 50
+    # 补充随机的多点、多颜色、与逻辑、各对齐方式
+    rng = np.random.default_rng(0)
+    for align in [None] + list(AlignEnum):
+        for logic in LogicEnum:
+            points = [tuple(int(i) for i in rng.integers((0, 0), (1280, 720))) for _ in range(4)]
+            colors = [tuple(int(i) for i in rng.integers(0, 256, 3)) for _ in range(3)]
+            checkers.append(ColorChecker(points, colors, tolerance=int(rng.integers(5, 60)), logic=logic, align=align))
+
+    frames = _recorded_frames()
+    for i, (w, h) in enumerate(_RESOLUTIONS):
+        frames += _fake_hud_frames(checkers, w, h, seed=i, count=3)
+    true_count = 0
+    for img in frames:
+        for checker in checkers:
+            expected = checker._check_points(img)
+            assert checker.check(img) == expected
+            true_count += expected
+    logger.info("frames: %s, true: %s", len(frames), true_count)
+    assert true_count > 0
+
+
+def test_color_checker_out_of_bounds():
+    # 越界的点在匹配点之后，或逻辑下短路返回，不抛出异常
+    checker = ColorChecker([(10, 10), (2000, 10)], [(255, 255, 255)])
+    img = np.zeros((720, 1280, 3), dtype=np.uint8)
+    img[10, 10] = (255, 255, 255)
+    assert checker.check(img) is True
+    img[10, 10] = (0, 0, 0)
+    try:
+        checker.check(img)
+        assert False
+    except IndexError:
+        pass
+
+
+@pytest.mark.benchmark
+def test_color_checker_benchmark():
+    checkers = _collect_checkers()
+    frames = _fake_hud_frames(checkers, 1920, 1080, seed=0, count=5)
+
+    def bench(check) -> float:
+        start = time.perf_counter()
+        for img in frames:
+            for checker in checkers:
+                check(checker, img)
+        return (time.perf_counter() - start) * 1e6 / (len(frames) * len(checkers))
+
+    for checker in checkers:  # 预编译坐标与颜色掩码表
+        checker.check(frames[0])
+    loop_us = bench(ColorChecker._check_points)
+    vectorized_us = bench(ColorChecker.check)
+    logger.info("ColorChecker loop: %.1fus, vectorized: %.1fus, speedup: %.1fx",
+                loop_us, vectorized_us, loop_us / vectorized_us)
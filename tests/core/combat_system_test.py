@@ -0,0 +1,120 @@
+import json
+import logging
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from src.core.combat.boss_hp import BossHealthReading, _CompiledBar
+from src.core.combat.combat_core import BaseResonator, ResonatorNameEnum
+from src.core.combat.combat_system import CombatSystem, CUSTOM_COMBO_RESONATORS, RESONATOR_REGISTRY
+from src.util import file_util
+
+logger = logging.getLogger(__name__)
+
+# 在新进程中测量导入、构造耗时与内存，load_all 为原先构造所有角色的开销
+_MEASURE_SCRIPT = """
+import json, sys, time
+import psutil
+process = psutil.Process()
+rss_start = process.memory_info().rss
+t0 = time.perf_counter()
+from src.core.combat.combat_system import CombatSystem, RESONATOR_REGISTRY
+t1 = time.perf_counter()
+combat_system = CombatSystem(None, None)
+t2 = time.perf_counter()
+rss_lazy = process.memory_info().rss
+resonator_modules = sorted(i for i in sys.modules if i.startswith("src.core.combat.resonator."))
+for name_enum in RESONATOR_REGISTRY:
+    combat_system.get_resonator(name_enum)
+t3 = time.perf_counter()
+rss_all = process.memory_info().rss
+print(json.dumps({
+    "import": t1 - t0, "construct": t2 - t1, "load_all": t3 - t2,
+    "rss_start": rss_start, "rss_lazy": rss_lazy, "rss_all": rss_all,
+    "resonator_modules": resonator_modules,
+}))
+"""
+
+
+def test_lazy_resonators():
+    combat_system = CombatSystem(None, None)
+    assert combat_system.loaded_resonators() == []
+
+    combat_system.set_resonators([ResonatorNameEnum.sanhua.value, ResonatorNameEnum.rover.value, "未知角色"])
+    names = [type(i).__name__ for i in combat_system.resonators]
+    assert names == ["Sanhua", "Rover", "GenericResonator"]
+    assert len(combat_system.loaded_resonators()) == 3
+    # 同一角色只构造一次，旧的属性访问方式仍可用
+    assert combat_system.sanhua is combat_system.resonators[0]
+    assert combat_system.generic_resonator is combat_system.resonators[2]
+    # 只有定制连招的角色有冷却预测
+    assert combat_system.sanhua.cooldowns is not None
+    assert combat_system.rover.cooldowns is None
+
+    # 未启用定制连招的角色使用默认连招
+    combat_system.set_resonators([ResonatorNameEnum.phoebe.value])
+    assert type(combat_system.resonators[0]).__name__ == "GenericResonator"
+
+
+def test_registry():
+    combat_system = CombatSystem(None, None)
+    for name_enum in RESONATOR_REGISTRY:
+        resonator = combat_system.get_resonator(name_enum)
+        assert isinstance(resonator, BaseResonator)
+        assert resonator.resonator_name() == name_enum
+    assert set(CUSTOM_COMBO_RESONATORS) <= set(RESONATOR_REGISTRY)
+
+
+def test_measure_startup():
+    """ 拾取、剧情等任务只构造 CombatSystem 不设置编队，对比按需加载与加载全部角色的耗时与内存 """
+    result = subprocess.run(
+        [sys.executable, "-c", _MEASURE_SCRIPT], cwd=file_util.get_project_root(),
+        capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    stats = json.loads(result.stdout.strip().splitlines()[-1])
+    logger.info(
+        "import %.1f ms, construct %.1f ms (lazy), load all resonators %.1f ms, "
+        "rss lazy %.1f MB, rss all %.1f MB (+%.2f MB)",
+        stats["import"] * 1000, stats["construct"] * 1000, stats["load_all"] * 1000,
+        stats["rss_lazy"] / 2 ** 20, stats["rss_all"] / 2 ** 20, (stats["rss_all"] - stats["rss_lazy"]) / 2 ** 20)
+    # 构造 CombatSystem 不导入任何角色模块
+    assert stats["resonator_modules"] == []
+
+
+def test_boss_health_per_system():
+    """ 每个 CombatSystem 的角色写入各自的血量序列 """
+    system_a = CombatSystem(None, None)
+    system_b = CombatSystem(None, None)
+    sanhua_a = system_a.get_resonator(ResonatorNameEnum.sanhua)
+    sanhua_b = system_b.get_resonator(ResonatorNameEnum.sanhua)
+    assert sanhua_a.boss_health_series is system_a.boss_health_series
+    assert sanhua_b.boss_health_series is system_b.boss_health_series
+    assert system_a.boss_health_series is not system_b.boss_health_series
+
+    # 满血的boss血条
+    bar = system_a.boss_health_bar
+    img = np.zeros((720, 1280, 3), dtype=np.uint8)
+    for x, color in zip(range(bar.LEFT, bar.RIGHT + 1), _CompiledBar(1280, 720, bar).expected):
+        img[bar.ROWS[0] - 2:bar.ROWS[-1] + 3, x] = color
+    assert sanhua_a.boss_hp(img) == 1.0
+    assert len(system_a.boss_health_series) == 1
+    assert len(system_b.boss_health_series) == 0
+
+
+def test_boss_near_death():
+    combat_system = CombatSystem(None, None)
+    assert not combat_system.is_boss_near_death()
+    now = time.monotonic()
+    # 每秒掉10%，剩余20%
+    for i in range(9):
+        combat_system.boss_health_series.add(BossHealthReading(1.0 - 0.1 * i, True, now - 8 + i))
+    assert abs(combat_system.boss_time_to_kill() - 2.0) < 0.1
+    assert combat_system.is_boss_near_death(3.0)
+    assert not combat_system.is_boss_near_death(1.0)
+    # 读数过期后不再判断
+    combat_system.boss_health_series.clear()
+    for i in range(9):
+        combat_system.boss_health_series.add(BossHealthReading(1.0 - 0.1 * i, True, now - 60 + i))
+    assert not combat_system.is_boss_near_death()
@@ -0,0 +1,161 @@
+import importlib
+import inspect
+import logging
+import pkgutil
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from src.core.combat import resonator
+from src.core.combat.combat_core import BaseCombo, BaseResonator
+from src.core.combat.combo import OP_CLICK, OP_KEY_DOWN, OP_KEY_UP, OP_MOUSE_LEFT_DOWN, OP_NONE, OP_TAP, \
+    compile_combo, get_compiled_combo
+from src.core.exceptions import StopError
+
+logger = logging.getLogger(__name__)
+
+
+class FakeControlService:
+    """ 记录每次调用时间的控制服务，按压时间照常睡眠，可模拟每次发送输入的额外耗时 """
+
+    def __init__(self, overhead: float = 0.0):
+        self.overhead = overhead
+        self.calls: list[tuple[str, tuple, float]] = []
+
+    def __getattr__(self, name):
+        def call(*args, seconds: float | None = None):
+            self.calls.append((name, args, time.perf_counter()))
+            press = seconds if seconds is not None else (args[-1] if args and isinstance(args[-1], float) else 0)
+            time.sleep(press + self.overhead)
+
+        return call
+
+
+def _legacy_combo_action(control_service, sequence, end_wait: bool):
+    """ 编译前逐步解析、累加睡眠的执行方式，用于对比计时误差 """
+    max_size = len(sequence)
+    for i, keys in enumerate(sequence):
+        key_src, press_time, wait_time = keys[:3]
+        key = key_src
+        key_action = None
+        if "_" in key_src:
+            key, key_action = key_src.strip().split("_", 1)
+        if not key_action:
+            if key in ("a", "z"):
+                control_service.fight_click(seconds=press_time)
+            elif key == "w":
+                pass
+            elif key == "j":
+                control_service.fight_tap("SPACE", press_time)
+            else:
+                control_service.fight_tap(key, press_time)
+        if wait_time <= 0:
+            continue
+        if i == max_size - 1 and end_wait is False:
+            break
+        time.sleep(wait_time)
+
+
+def test_compile_combo():
+    compiled = compile_combo([
+        ["a", 0.05, 0.30],
+        ["j", 0.05, 0.20],
+        ["E", 0.05, 0.00],
+        ["w", 0.00, 0.10],
+        ["a_down", 0.00, 0.50],
+        ["a_up", 0.00, 0.00],
+        ["W_down", 0.00, 0.10],
+        ["W_up", 0.00, 0.10],
+    ])
+    ops = compiled.ops
+    assert ops[0] == (OP_CLICK, None, 0.05, 0.30, None, None)
+    assert ops[1] == (OP_TAP, "SPACE", 0.05, 0.20, None, None)
+    assert ops[2] == (OP_TAP, "E", 0.05, 0.0, None, None)
+    assert ops[3][0] == OP_NONE
+    assert ops[4] == (OP_MOUSE_LEFT_DOWN, None, 0.0, 0.50, "a", None)
+    assert ops[6] == (OP_KEY_DOWN, "W", 0.0, 0.10, "W", None)
+    assert ops[7] == (OP_KEY_UP, "W", 0.0, 0.10, None, "W")
+    assert compiled.starts[:3] == (0.0, 0.35, 0.60)
+    assert compiled.duration == pytest.approx(1.45)
+
+    # 格式错误在编译时抛出
+    for sequence in [[["a", 0.5, 0.1]], [["z", 0.05, 0.1]], [["a_left", 0.05, 0.1]], [["a", 0.05]],
+                     [["", 0.05, 0.1]], [["a", "0.05", 0.1]]]:
+        with pytest.raises(ValueError):
+            compile_combo(sequence)
+
+    # 相同内容只编译一次
+    assert get_compiled_combo([["a", 0.05, 0.30]]) is get_compiled_combo([["a", 0.05, 0.30]])
+    assert get_compiled_combo(compiled) is compiled
+
+
+def test_resonator_combos_compile():
+    """ 所有共鸣者类上与连招方法返回的连招都能编译 """
+    count = 0
+    for module_info in pkgutil.iter_modules(resonator.__path__):
+        module = importlib.import_module(f"{resonator.__name__}.{module_info.name}")
+        for _, cls in inspect.getmembers(module, inspect.isclass):
+            if not issubclass(cls, BaseResonator) or cls.__module__ != module.__name__:
+                continue
+            obj = cls(None, None)  # 构造时编译类上的 COMBO_SEQ*
+            for name, method in inspect.getmembers(obj, inspect.ismethod):
+                if name in ("combo", "exit_special_state") or name.startswith("__"):
+                    continue
+                if any(p.default is p.empty for p in inspect.signature(method).parameters.values()):
+                    continue
+                try:
+                    sequence = method()
+                except Exception:
+                    continue
+                if isinstance(sequence, list) and sequence and isinstance(sequence[0], (list, tuple)):
+                    compile_combo(sequence)
+                    count += 1
+    logger.info("combos: %s", count)
+    assert count > 100
+
+
+def test_combo_action_stop():
+    control_service = FakeControlService()
+    combo = BaseCombo(control_service)
+    combo.event = threading.Event()
+    combo.event.set()
+
+    def stop():
+        time.sleep(0.05)
+        combo.event.clear()
+
+    threading.Thread(target=stop).start()
+    with pytest.raises(StopError):
+        combo.combo_action([["a_down", 0.0, 0.03], ["E_down", 0.0, 0.03]] + [["w", 0.0, 0.03]] * 10, True)
+    # 中断前丢弃未发送的按键，并释放仍按下的按键
+    released = [name for name, _, _ in control_service.calls[2:]]
+    assert released[0] == "cancel_input"
+    assert sorted(released[1:]) == ["key_up", "mouse_left_up"]
+
+
+def _timing_errors(control_service: FakeControlService, sequence: list) -> np.ndarray:
+    """ 每次按键实际开始时间与计划时间的误差ms """
+    compiled = compile_combo(sequence)
+    starts = [start for (op, *_), start in zip(compiled.ops, compiled.starts) if op != OP_NONE]
+    actual = [call_time for _, _, call_time in control_service.calls]
+    actual = np.array(actual) - actual[0]
+    return (actual - np.array(starts)) * 1000
+
+
+@pytest.mark.benchmark
+def test_combo_action_timing_benchmark():
+    sequence = [["a", 0.02, 0.05], ["a", 0.02, 0.06], ["E", 0.02, 0.10], ["j", 0.02, 0.04],
+                ["a", 0.02, 0.08], ["R", 0.02, 0.15]] * 3
+    for name in ("legacy", "compiled"):
+        # 模拟每次发送输入额外耗时1ms
+        control_service = FakeControlService(overhead=0.001)
+        if name == "legacy":
+            _legacy_combo_action(control_service, sequence, True)
+        else:
+            BaseCombo(control_service).combo_action(sequence, True)
+        errors = _timing_errors(control_service, sequence)
+        logger.info("%s: mean error: %.2fms, p95 error: %.2fms, max error: %.2fms, final drift: %.2fms",
+                    name, np.mean(np.abs(errors)), np.percentile(np.abs(errors), 95), np.max(np.abs(errors)),
+                    errors[-1])
@@ -0,0 +1,192 @@
+import json
+import logging
+
+import numpy as np
+
+from src.core.combat.combat_core import BaseResonator
+from src.core.combat.cooldown import CooldownStore, CooldownTracker
+from src.core.combat.resonator.cartethyia import Cartethyia
+from src.core.combat.resonator.sanhua import Sanhua
+
+logger = logging.getLogger(__name__)
+
+
+class FakeSkill:
+    """ 冷却固定的技能，模拟像素校验 """
+
+    def __init__(self, cooldown: float):
+        self.cooldown = cooldown
+        self.used_at = None
+        self.now = 0.0
+
+    def use(self):
+        if self.is_ready():
+            self.used_at = self.now
+
+    def is_ready(self, img=None) -> bool:
+        return self.used_at is None or self.now - self.used_at >= self.cooldown
+
+
+def _simulate(tracker: CooldownTracker | None, skill: FakeSkill, seconds: float, interval: float = 0.5):
+    """ 每 interval 秒检查一次技能，就绪就释放，返回截图次数与每次释放相对就绪的延迟 """
+    captures = 0
+    delays = []
+
+    def capture():
+        nonlocal captures
+        captures += 1
+        return np.zeros((1, 1, 3), dtype=np.uint8)
+
+    while skill.now < seconds:
+        if tracker is None:
+            ready = skill.is_ready(capture())
+        else:
+            ready = tracker.check({"E": skill.is_ready}, capture)["E"]
+        if ready:
+            if skill.used_at is not None:
+                delays.append(skill.now - (skill.used_at + skill.cooldown))
+            skill.use()
+            if tracker is not None:
+                tracker.mark_used("E", skill.now)
+        skill.now += interval
+        # 让 tracker 使用模拟时间
+        _clock[0] = skill.now
+    return captures, delays
+
+
+_clock = [0.0]
+
+
+def test_learn_and_skip(monkeypatch):
+    monkeypatch.setattr("src.core.combat.cooldown.time.monotonic", lambda: _clock[0])
+    _clock[0] = 0.0
+    baseline_captures, baseline_delays = _simulate(None, FakeSkill(8.0), 300)
+    _clock[0] = 0.0
+    tracker = CooldownTracker("sanhua")
+    captures, delays = _simulate(tracker, FakeSkill(8.0), 300)
+    logger.info("captures: %d -> %d, skipped: %d, cooldown: %s, max delay: %.2f",
+                baseline_captures, captures, tracker.skipped_captures, tracker.cooldowns(), max(delays))
+    assert 7.0 <= tracker.cooldowns()["E"] <= 8.5
+    assert captures < baseline_captures / 2
+    assert captures + tracker.skipped_captures == baseline_captures
+    # 跳过截图不会晚于按轮询间隔发现就绪
+    assert max(delays) <= max(baseline_delays) + 1e-6
+
+
+def test_cooldown_shortened(monkeypatch):
+    """ 学习到的冷却偏大时，提前就绪会缩短冷却 """
+    monkeypatch.setattr("src.core.combat.cooldown.time.monotonic", lambda: _clock[0])
+    _clock[0] = 0.0
+    tracker = CooldownTracker("sanhua", {"E": 20.0})
+    _simulate(tracker, FakeSkill(8.0), 300)
+    assert tracker.cooldowns()["E"] <= 9.0
+
+
+def test_tap_while_cooling():
+    """ 冷却中按下技能键不重新计时 """
+    tracker = CooldownTracker("sanhua", {"E": 8.0})
+    assert tracker.mark_used("E", 0.0)
+    assert not tracker.mark_used("E", 3.0)
+    assert tracker.predict_ready_at("E") == 8.0 * (1 - CooldownTracker.MARGIN)
+    # 冷却未知时，观测到未就绪后按键同样不重新计时
+    tracker = CooldownTracker("sanhua")
+    assert tracker.mark_used("E", 0.0)
+    assert tracker.mark_used("E", 1.0)
+    tracker.observe("E", False, 5.0)
+    assert not tracker.mark_used("E", 6.0)
+    tracker.observe("E", True, 8.0)
+    assert tracker.cooldowns() == {"E": 5.5}
+    assert tracker.mark_used("E", 9.0)
+
+
+def test_store(tmp_path, monkeypatch):
+    monkeypatch.setattr("src.core.combat.cooldown.time.monotonic", lambda: _clock[0])
+    path = tmp_path / "cooldowns.json"
+    store = CooldownStore(path)
+    tracker = store.tracker("sanhua")
+    assert store.tracker("sanhua") is tracker
+    tracker.mark_used("E", 0.0)
+    tracker.observe("E", False, 5.0)
+    tracker.observe("E", True, 7.0)
+    assert tracker.cooldowns() == {"E": 6.0}
+    assert json.loads(path.read_text(encoding="utf-8")) == {"sanhua": {"E": 6.0}}
+
+    # 下次启动直接使用已学习的冷却
+    tracker = CooldownStore(path).tracker("sanhua")
+    tracker.mark_used("E", 10.0)
+    assert not tracker.should_check("E", 12.0)
+    assert tracker.should_check("E", 16.0)
+
+    # 声骸技能冷却取决于装备的声骸，只在本次运行中使用，不持久化
+    tracker.mark_used("Q", 20.0)
+    tracker.observe("Q", False, 30.0)
+    tracker.observe("Q", True, 32.0)
+    assert tracker.cooldowns() == {"E": 6.0, "Q": 11.0}
+    assert json.loads(path.read_text(encoding="utf-8")) == {"sanhua": {"E": 6.0}}
+    path.write_text(json.dumps({"sanhua": {"E": 6.0, "Q": 11.0}}), encoding="utf-8")
+    assert CooldownStore(path).tracker("sanhua").cooldowns() == {"E": 6.0}
+
+    path.write_text("not json", encoding="utf-8")
+    assert CooldownStore(path).tracker("sanhua").cooldowns() == {}
+
+
+class FakeImgService:
+    count = 0
+
+    def screenshot(self):
+        self.count += 1
+        return np.zeros((720, 1280, 3), dtype=np.uint8)
+
+
+class FakeControlService:
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+def test_resonator_skills_ready(monkeypatch):
+    monkeypatch.setattr("src.core.combat.cooldown.time.monotonic", lambda: _clock[0])
+    _clock[0] = 100.0
+
+    img_service = FakeImgService()
+    sanhua = Sanhua(FakeControlService(), img_service)
+    sanhua.cooldowns = CooldownTracker("sanhua", {"E": 10.0, "Q": 20.0, "R": 25.0})
+    checks = {"E": lambda img: True, "Q": lambda img: True, "R": lambda img: False}
+    assert sanhua.skills_ready(checks) == {"E": True, "Q": True, "R": False}
+    assert img_service.count == 1
+
+    # 连招中按下技能键即开始计算冷却
+    sanhua.combo_action([["E", 0.0, 0.0], ["Q", 0.0, 0.0], ["R", 0.0, 0.0]], False, ignore_event=True)
+    assert sanhua.skills_ready(checks) == {"E": False, "Q": False, "R": False}
+    assert img_service.count == 1
+    assert sanhua.cooldowns.skipped_captures == 1
+
+    _clock[0] = 109.0
+    assert sanhua.skills_ready(checks)["E"]
+    assert img_service.count == 2
+
+    # 未设置冷却预测时每次都截图
+    sanhua.cooldowns = None
+    sanhua.skills_ready(checks)
+    assert img_service.count == 3
+    assert BaseResonator.skills_ready is Sanhua.skills_ready
+
+
+def test_skill_forms(monkeypatch):
+    """ 同一按键在不同形态下为不同技能，按技能名分别计算冷却 """
+    monkeypatch.setattr("src.core.combat.cooldown.time.monotonic", lambda: _clock[0])
+    _clock[0] = 100.0
+    img_service = FakeImgService()
+    cartethyia = Cartethyia(FakeControlService(), img_service)
+    cartethyia.cooldowns = CooldownTracker("cartethyia", {Cartethyia.SKILL_FLEURDELYS_E: 10.0})
+    checks = {Cartethyia.SKILL_FLEURDELYS_E: lambda img: True}
+
+    # 小卡按下E不影响大卡E的冷却
+    cartethyia.combo_action([["E", 0.0, 0.0]], False, ignore_event=True)
+    assert cartethyia.skills_ready(checks) == {Cartethyia.SKILL_FLEURDELYS_E: True}
+    assert img_service.count == 1
+
+    cartethyia.combo_action([["E", 0.0, 0.0]], False, ignore_event=True)
+    cartethyia.mark_skill_used(Cartethyia.SKILL_FLEURDELYS_E)
+    assert cartethyia.skills_ready(checks) == {Cartethyia.SKILL_FLEURDELYS_E: False}
+    assert img_service.count == 1
+    assert cartethyia.cooldowns.skipped_captures == 1
@@ -0,0 +1,249 @@
+import json
+import logging
+import subprocess
+import sys
+import threading
+import time
+import uuid
+
+import numpy as np
+import pytest
+
+from src.core.frame_transport import FrameServer, SharedFrameClient, SharedFrameRing
+from src.util import file_util
+
+logger = logging.getLogger(__name__)
+
+# 客户端进程：按需读取帧，校验每帧像素一致（未读到写了一半的帧）
+_CLIENT_SCRIPT = """
+import json, sys, time
+from src.core.frame_transport import SharedFrameClient
+name, count, copy = sys.argv[1], int(sys.argv[2]), sys.argv[3] == "1"
+client = SharedFrameClient(name, copy=copy)
+torn = 0
+frame_ids = []
+start = time.perf_counter()
+while len(frame_ids) < count:
+    frame = client.get(max_age=0.02, timeout=1.0)
+    if frame is None:
+        continue
+    if frame.img.min() != frame.img.max():
+        torn += 1
+    frame_ids.append(frame.frame_id)
+    time.sleep(0.005)
+elapsed = time.perf_counter() - start
+client.close()
+print(json.dumps({"torn": torn, "frame_ids": frame_ids, "elapsed": elapsed,
+                  "hit": client.hit_count, "wait": client.wait_count, "miss": client.miss_count}))
+"""
+
+
+class FakeCapture:
+
+    def __init__(self, w: int = 1280, h: int = 720, seconds: float = 0.008):
+        self.shape = (h, w, 3)
+        self.seconds = seconds
+        self.count = 0
+
+    def __call__(self) -> np.ndarray:
+        time.sleep(self.seconds)
+        self.count += 1
+        return np.full(self.shape, self.count % 256, dtype=np.uint8)
+
+
+def _name() -> str:
+    return f"wwa_test_{uuid.uuid4().hex[:8]}"
+
+
+def test_ring_read_write():
+    ring = SharedFrameRing.create(_name(), slots=3, slot_bytes=64 * 64 * 3)
+    reader = SharedFrameRing.attach(ring.name)
+    try:
+        assert reader.read() is None
+        for i in range(1, 5):
+            assert ring.write(np.full((32, 64, 3), i, dtype=np.uint8), i * 1_000_000) == i
+        frame = reader.read()
+        assert frame.frame_id == 4 and frame.img.shape == (32, 64, 3) and frame.img[0, 0, 0] == 4
+        assert abs(frame.timestamp - 0.004) < 1e-9
+        assert not frame.img.flags.writeable
+        # 环形覆盖，只保留最近 slots 帧
+        assert reader.read(2).img[0, 0, 0] == 2
+        assert reader.read(1) is None
+        # 零拷贝视图被覆盖后失效，复制的帧不受影响
+        copied = reader.read(copy=True)
+        ring.write(np.full((32, 64), 9, dtype=np.uint8), 0)
+        ring.write(np.full((32, 64), 9, dtype=np.uint8), 0)
+        ring.write(np.full((32, 64), 9, dtype=np.uint8), 0)
+        assert not reader.is_current(frame)
+        assert copied.img[0, 0, 0] == 4
+        assert reader.read().img.shape == (32, 64)
+        try:
+            ring.write(np.zeros((128, 128, 3), dtype=np.uint8), 0)
+            assert False
+        except ValueError:
+            pass
+    finally:
+        del frame
+        reader.close()
+        ring.close()
+
+
+def test_server_on_demand():
+    """ 无人请求时不截图，请求后截图，心跳停止后客户端返回None """
+    ring = SharedFrameRing.create(_name(), slots=4, slot_bytes=1280 * 720 * 3)
+    capture = FakeCapture()
+    server = FrameServer(ring, capture, interval=0.0)
+    client = SharedFrameClient(ring.name)
+    event = threading.Event()
+    event.set()
+    thread = threading.Thread(target=server.serve, args=(event,), daemon=True)
+    thread.start()
+    try:
+        time.sleep(0.05)
+        assert capture.count == 0
+        frame_1 = client.get(max_age=0.5)
+        frame_2 = client.get(max_age=0.5)
+        assert frame_1.frame_id == frame_2.frame_id == capture.count == 1
+        frame_3 = client.get(max_age=0.0)
+        assert frame_3.frame_id == 2
+        assert client.hit_count == 1 and client.wait_count == 2
+    finally:
+        event.clear()
+        thread.join()
+    client.STALE_SECONDS = 0.05
+    time.sleep(0.1)
+    assert client.get(max_age=0.0) is None
+    client.close()
+    ring.close()
+
+
+def test_server_starting():
+    """ 截图服务尚未心跳时视为启动中，读取方请求并等待，超过启动时间仍未心跳视为已退出 """
+    ring = SharedFrameRing.create(_name(), slots=2, slot_bytes=64 * 64 * 3)
+    client = SharedFrameClient(ring.name)
+    try:
+        assert client.get(max_age=0.0, timeout=0.01) is None
+        assert client.wait_count == 1 and ring.request_ns() > 0
+        client.STARTUP_SECONDS = 0.0
+        assert client.get(max_age=0.0, timeout=0.01) is None
+        assert client.wait_count == 1 and client.miss_count == 2
+    finally:
+        client.close()
+        ring.close()
+
+
+class FailingCapture(FakeCapture):
+
+    def __call__(self) -> np.ndarray:
+        self.count += 1
+        raise OSError("window not found")
+
+
+def _serve_failing(capture, slot_bytes: int):
+    """ 截图失败时客户端立即返回None，不等到超时，退避期间不再请求 """
+    ring = SharedFrameRing.create(_name(), slots=2, slot_bytes=slot_bytes)
+    server = FrameServer(ring, capture, interval=0.0)
+    client = SharedFrameClient(ring.name)
+    event = threading.Event()
+    event.set()
+    thread = threading.Thread(target=server.serve, args=(event,), daemon=True)
+    thread.start()
+    try:
+        timeout = 10.0
+        start = time.monotonic()
+        assert client.get(max_age=0.0, timeout=timeout) is None
+        elapsed = time.monotonic() - start
+        # 不等到超时
+        assert elapsed < timeout / 2, elapsed
+        assert server.error_count >= 1 and client.wait_count == 1
+        count = capture.count
+        assert client.get(max_age=0.0, timeout=5.0) is None
+        assert client.wait_count == 1 and capture.count == count
+        # 退避结束后重新请求
+        client._error_until = 0.0
+        assert client.get(max_age=0.0, timeout=5.0) is None
+        assert client.wait_count == 2
+        logger.info("failed request returned in %.1f ms", elapsed * 1000)
+    finally:
+        event.clear()
+        thread.join()
+        client.close()
+        ring.close()
+
+
+def test_capture_error():
+    _serve_failing(FailingCapture(), 1280 * 720 * 3)
+
+
+def test_slot_too_small():
+    _serve_failing(FakeCapture(1920, 1080, seconds=0.0), 1280 * 720 * 3)
+
+
+def test_multi_process_shared_capture():
+    """ 两个任务进程同时取帧，共用一个截图服务，对比各自截图的截图次数 """
+    count = 60
+    ring = SharedFrameRing.create(_name(), slots=8, slot_bytes=1920 * 1080 * 3)
+    capture = FakeCapture(1920, 1080)
+    server = FrameServer(ring, capture, interval=0.0)
+    event = threading.Event()
+    event.set()
+    thread = threading.Thread(target=server.serve, args=(event,), daemon=True)
+    thread.start()
+    try:
+        results = {}
+        for copy in ("1", "0"):
+            capture.count = 0
+            clients = [
+                subprocess.Popen([sys.executable, "-c", _CLIENT_SCRIPT, ring.name, str(count), copy],
+                                 cwd=file_util.get_project_root(), stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                 text=True)
+                for _ in range(2)
+            ]
+            outputs = [i.communicate(timeout=120) for i in clients]
+            for client, (stdout, stderr) in zip(clients, outputs):
+                assert client.returncode == 0, stderr
+            stats = [json.loads(stdout.strip().splitlines()[-1]) for stdout, _ in outputs]
+            for i in stats:
+                assert i["torn"] == 0
+                assert i["frame_ids"] == sorted(i["frame_ids"])
+            results[copy] = (capture.count, stats)
+            logger.info("copy=%s, 2 clients x %d frames, server captures: %d (separate capture: %d), "
+                        "client hit/wait/miss: %s, %.1f ms/frame",
+                        copy, count, capture.count, 2 * count,
+                        [(i["hit"], i["wait"], i["miss"]) for i in stats],
+                        max(i["elapsed"] for i in stats) / count * 1000)
+            # 两个进程的请求合并，截图次数少于各自截图
+            assert capture.count < 2 * count
+    finally:
+        event.clear()
+        thread.join()
+        ring.close()
+
+
+@pytest.mark.benchmark
+def test_read_benchmark():
+    ring = SharedFrameRing.create(_name(), slots=4, slot_bytes=1920 * 1080 * 3)
+    reader = SharedFrameRing.attach(ring.name)
+    try:
+        img = np.random.randint(0, 255, (1080, 1920, 3), dtype=np.uint8)
+        ring.write(img, time.monotonic_ns())
+        n = 200
+        start = time.perf_counter()
+        for _ in range(n):
+            frame = reader.read()
+        view_cost = (time.perf_counter() - start) / n
+        start = time.perf_counter()
+        for _ in range(n):
+            frame = reader.read(copy=True)
+        copy_cost = (time.perf_counter() - start) / n
+        start = time.perf_counter()
+        for _ in range(20):
+            ring.write(img, time.monotonic_ns())
+        write_cost = (time.perf_counter() - start) / 20
+        logger.info("1920x1080 frame: zero-copy read %.1f us, copy read %.1f us, write %.1f us",
+                    view_cost * 1e6, copy_cost * 1e6, write_cost * 1e6)
+        assert np.array_equal(frame.img, img)
+    finally:
+        del frame
+        reader.close()
+        ring.close()
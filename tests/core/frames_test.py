@@ -0,0 +1,94 @@
+import logging
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from src.core.frames import FrameBus
+
+logger = logging.getLogger(__name__)
+
+
+class FakeCapture:
+
+    def __init__(self, seconds: float = 0.01):
+        self.seconds = seconds
+        self.count = 0
+        self.error: Exception | None = None
+
+    def __call__(self) -> np.ndarray:
+        if self.error is not None:
+            raise self.error
+        time.sleep(self.seconds)
+        self.count += 1
+        return np.full((72, 128, 3), self.count % 256, dtype=np.uint8)
+
+
+def test_frame_bus_reuse():
+    capture = FakeCapture()
+    frame_bus = FrameBus(capture, interval=0.0).start()
+    try:
+        frame_1 = frame_bus.get(max_age=1.0)
+        frame_2 = frame_bus.get(max_age=1.0)
+        assert frame_1 is frame_2
+        assert capture.count == 1
+        assert not frame_1.img.flags.writeable
+
+        time.sleep(0.02)
+        frame_3 = frame_bus.get(max_age=0.005)
+        assert frame_3.frame_id > frame_1.frame_id
+        assert frame_3.age() < 0.1
+        assert capture.count == 2
+    finally:
+        frame_bus.stop()
+
+
+def test_frame_bus_coalesce():
+    capture = FakeCapture(seconds=0.05)
+    frame_bus = FrameBus(capture, interval=0.0).start()
+    frames = []
+
+    def consumer():
+        frames.append(frame_bus.get(max_age=0.2))
+
+    try:
+        threads = [threading.Thread(target=consumer) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        logger.debug("capture: %s, frame ids: %s", capture.count, [i.frame_id for i in frames])
+        assert len(frames) == 8
+        assert capture.count <= 2
+    finally:
+        frame_bus.stop()
+
+
+def test_frame_bus_idle():
+    capture = FakeCapture()
+    frame_bus = FrameBus(capture, interval=0.0).start()
+    try:
+        time.sleep(0.1)
+        assert capture.count == 0
+        assert frame_bus.latest() is None
+    finally:
+        frame_bus.stop()
+
+
+def test_frame_bus_error():
+    capture = FakeCapture()
+    capture.error = RuntimeError("capture failed")
+    frame_bus = FrameBus(capture, interval=0.0).start()
+    try:
+        with pytest.raises(RuntimeError):
+            frame_bus.get(max_age=0.05)
+        capture.error = None
+        assert frame_bus.get(max_age=0.05) is not None
+    finally:
+        frame_bus.stop()
+
+
+def test_frame_bus_stopped():
+    frame_bus = FrameBus(FakeCapture())
+    assert frame_bus.get(max_age=0.05, timeout=0.1) is None
@@ -0,0 +1,134 @@
+import logging
+import time
+
+import numpy as np
+import pytest
+
+from src.core.combat.combat_core import AlignEnum, BaseResonator, ColorChecker, DynamicPointTransformer, TeamMemberSelector
+from src.core.combat.hud import HudReader
+from src.core.combat.resonator.cartethyia import Cartethyia
+from src.core.combat.resonator.encore import Encore
+from src.core.combat.resonator.jinhsi import Jinhsi
+from src.core.combat.resonator.verina import Verina
+
+logger = logging.getLogger(__name__)
+
+
+def _create_reader():
+    reader = HudReader()
+    reader.register_checkers("boss", BaseResonator)
+    reader.register_checkers("team", TeamMemberSelector(None, None))
+    return reader
+
+
+def _fake_hud_frame(checkers: list[ColorChecker], w: int, h: int, rng: np.random.Generator) -> np.ndarray:
+    """ 随机背景上，将部分校验点涂成目标颜色，头像点随机涂成灰色 """
+    dpt = DynamicPointTransformer((w, h))
+    img = rng.integers(0, 256, (h, w, 3), dtype=np.uint8)
+    for checker in checkers:
+        if rng.random() < 0.5:
+            continue
+        for point in checker.points:
+            x, y = dpt.transform(point, checker.align)
+            if 0 <= x < w and 0 <= y < h:
+                img[y, x] = checker.colors[rng.integers(len(checker.colors))]
+    for member in (1, 2, 3):
+        if rng.random() < 0.5:
+            for x, y in BaseResonator.AVATAR_POINTS:
+                x, y = dpt.transform((x, y + (member - 1) * 88), AlignEnum.TOP_RIGHT)
+                img[y, x] = int(rng.integers(0, 256))
+    return img
+
+
+def test_hud_reader():
+    reader = _create_reader()
+    team = [Encore(None, None), Verina(None, None), Jinhsi(None, None)]
+    reader.set_resonators(team)
+    checkers = list(reader._entries.values())
+    logger.info("checkers: %s", len(checkers))
+    assert any(name.startswith("encore.") for name in reader._entries)
+    assert any(name.startswith("boss.") for name in reader._entries)
+    assert any(name.startswith("team.") for name in reader._entries)
+
+    rng = np.random.default_rng(0)
+    for w, h in [(1280, 720), (1920, 1080), (1280, 800), (2560, 1080)]:
+        for _ in range(5):
+            img = _fake_hud_frame(checkers, w, h, rng)
+            state = reader.read(img)
+            for name, checker in reader._entries.items():
+                assert state.get(name) == checker._check_points(img), name
+            expected_grey = tuple(BaseResonator.legacy_is_avatar_grey(img, member) for member in (1, 2, 3))
+            assert state.avatar_grey == expected_grey
+            assert tuple(team[0].is_avatar_grey(img, member) for member in (1, 2, 3)) == expected_grey
+            logger.debug("%s", state)
+
+    # 同一帧只计算一次，已注册的校验器直接读取快照
+    img = _fake_hud_frame(checkers, 1280, 720, rng)
+    state = reader.read(img)
+    hit_count = reader.hit_count
+    assert team[0]._resonance_skill_checker.check(img) == state.get("encore._resonance_skill_checker")
+    assert reader.read(img) is state
+    assert reader.hit_count == hit_count + 2
+    assert reader.read(img.copy()) is not state
+    assert reader.read(img, frame_id=1).frame_id == 1
+    assert reader.read(img.copy(), frame_id=1).frame_id == 1
+    assert reader.hit_count == hit_count + 3
+
+    # 切换编队后，旧角色的校验器不再读取快照
+    cartethyia = Cartethyia(None, None)
+    reader.set_resonators([cartethyia])
+    assert team[0]._resonance_skill_checker._hud_reader is None
+    assert team[0].hud_reader is None
+    assert cartethyia.hud_reader is reader
+    assert not any(name.startswith("encore.") for name in reader._entries)
+    assert any(name.startswith("cartethyia.") for name in reader._entries)
+
+
+
+def test_hud_reader_isolated():
+    # 每个 CombatSystem 各自持有读取器，共用的类级校验器不绑定到任何读取器
+    reader1, reader2 = _create_reader(), _create_reader()
+    team1 = [Encore(None, None), Verina(None, None)]
+    team2 = [Jinhsi(None, None)]
+    reader1.set_resonators(team1)
+    reader2.set_resonators(team2)
+    assert BaseResonator._health_01_color_checker._hud_reader is None
+    assert all(resonator.hud_reader is reader1 for resonator in team1)
+    assert team2[0].hud_reader is reader2
+    assert team1[0]._resonance_skill_checker._hud_reader is reader1
+    assert team2[0]._resonance_skill_checker._hud_reader is reader2
+
+    # boss、编队与角色的校验器在同一次批量计算中完成
+    rng = np.random.default_rng(2)
+    img = _fake_hud_frame(list(reader1._entries.values()), 1280, 720, rng)
+    state = reader1.read(img)
+    hit_count = reader1.hit_count
+    assert state.get("boss._health_01_color_checker") == BaseResonator._health_01_color_checker.check(img)
+    assert any(name.startswith("team.") for name in reader1._entries)
+    assert team1[0]._resonance_skill_checker.check(img) == state.get("encore._resonance_skill_checker")
+    assert team1[0].is_avatar_grey(img, 1) == state.avatar_grey[0]
+    assert reader1.hit_count == hit_count + 2
+    assert reader2.hit_count == 0
+
+
+@pytest.mark.benchmark
+def test_hud_reader_benchmark():
+    reader = _create_reader()
+    team = [Encore(None, None), Verina(None, None), Jinhsi(None, None)]
+    reader.set_resonators(team)
+    checkers = list(reader._entries.values())
+    rng = np.random.default_rng(1)
+    frames = [_fake_hud_frame(checkers, 1920, 1080, rng) for _ in range(20)]
+    reader.read(frames[0])  # 预编译
+
+    start = time.perf_counter()
+    for img in frames:
+        for checker in checkers:
+            checker._check_points(img)
+    loop_us = (time.perf_counter() - start) * 1e6 / len(frames)
+    start = time.perf_counter()
+    for img in frames:
+        reader.read(img)
+    batched_us = (time.perf_counter() - start) * 1e6 / len(frames)
+    logger.info("HUD checkers: %s, per frame loop: %.1fus, batched: %.1fus, speedup: %.1fx",
+                len(checkers), loop_us, batched_us, loop_us / batched_us)
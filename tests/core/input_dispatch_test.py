@@ -0,0 +1,142 @@
+import logging
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from src.core import input_dispatch
+from src.core.input_dispatch import InputDispatcher, InputEvent, RecordingInputBackend
+
+logger = logging.getLogger(__name__)
+
+
+def _key(kind: str, code: int) -> InputEvent:
+    return InputEvent(kind, code)
+
+
+def _dispatcher() -> tuple[InputDispatcher, RecordingInputBackend]:
+    backend = RecordingInputBackend()
+    dispatcher = InputDispatcher(backend)
+    dispatcher.start()
+    return dispatcher, backend
+
+
+def test_press_order_and_duration():
+    dispatcher, backend = _dispatcher()
+    try:
+        start = time.perf_counter()
+        for code in (69, 81, 82):
+            dispatcher.press(_key(input_dispatch.KEY_DOWN, code), _key(input_dispatch.KEY_UP, code), 0.02)
+        assert dispatcher.wait_idle(1.0)
+    finally:
+        dispatcher.stop()
+    kinds = [(event.kind, event.code) for event, _ in backend.events]
+    assert kinds == [
+        ("key_down", 69), ("key_up", 69),
+        ("key_down", 81), ("key_up", 81),
+        ("key_down", 82), ("key_up", 82),
+    ]
+    times = [sent for _, sent in backend.events]
+    # 按压时间依次累加，不会提前抬起
+    for i in range(0, len(times), 2):
+        assert times[i + 1] - start >= 0.02 * (i // 2 + 1)
+    # 抬起与下一次按下同时到期时，抬起先发送
+    assert times[2] >= times[1]
+
+
+def test_schedule_wait():
+    dispatcher, backend = _dispatcher()
+    try:
+        start = time.perf_counter()
+        dispatcher.schedule(_key(input_dispatch.MOUSE_LEFT_DOWN, 0), 0.03)
+        dispatcher.schedule(_key(input_dispatch.MOUSE_LEFT_UP, 0))
+        assert dispatcher.wait_idle(1.0)
+    finally:
+        dispatcher.stop()
+    (down, down_time), (up, up_time) = backend.events
+    assert down.kind == input_dispatch.MOUSE_LEFT_DOWN and up.kind == input_dispatch.MOUSE_LEFT_UP
+    assert up_time - start >= 0.03
+
+
+def test_cancel_releases_held_keys():
+    dispatcher, backend = _dispatcher()
+    try:
+        dispatcher.press(_key(input_dispatch.KEY_DOWN, 87), _key(input_dispatch.KEY_UP, 87), 0.5)
+        dispatcher.schedule(_key(input_dispatch.MOUSE_RIGHT_DOWN, 0), 0.5)
+        dispatcher.press(_key(input_dispatch.KEY_DOWN, 69), _key(input_dispatch.KEY_UP, 69), 0.05)
+        time.sleep(0.05)  # W 已按下，其余未到期
+        dispatcher.cancel()
+        assert dispatcher.wait_idle(1.0)
+        time.sleep(0.6)
+    finally:
+        dispatcher.stop()
+    kinds = [(event.kind, event.code) for event, _ in backend.events]
+    # 只发送了W按下与释放，未到期的事件全部丢弃
+    assert kinds == [("key_down", 87), ("key_up", 87)]
+    assert dispatcher.cancelled_count == 4
+
+
+class BlockingInputBackend(RecordingInputBackend):
+    """ 发送按下事件时阻塞，直到 release 被设置 """
+
+    def __init__(self):
+        super().__init__()
+        self.sending = threading.Event()
+        self.release = threading.Event()
+
+    def send(self, event: InputEvent):
+        if event.kind == input_dispatch.KEY_DOWN:
+            self.sending.set()
+            assert self.release.wait(1.0)
+        super().send(event)
+
+
+def test_cancel_while_sending():
+    """ 按下事件正在发送时取消，发送完成后仍会释放该按键 """
+    backend = BlockingInputBackend()
+    dispatcher = InputDispatcher(backend)
+    dispatcher.start()
+    try:
+        dispatcher.press(_key(input_dispatch.KEY_DOWN, 87), _key(input_dispatch.KEY_UP, 87), 0.5)
+        assert backend.sending.wait(1.0)
+        dispatcher.cancel()
+        backend.release.set()
+        assert dispatcher.wait_idle(1.0)
+    finally:
+        dispatcher.stop()
+    kinds = [(event.kind, event.code) for event, _ in backend.events]
+    assert kinds == [("key_down", 87), ("key_up", 87)]
+
+
+@pytest.mark.benchmark
+def test_throughput_and_latency():
+    """ 测量调用方耗时、分发吞吐与发送延迟 """
+    dispatcher, backend = _dispatcher()
+    count = 2000
+    try:
+        start = time.perf_counter()
+        for i in range(count):
+            dispatcher.press(_key(input_dispatch.KEY_DOWN, 65 + i % 26), _key(input_dispatch.KEY_UP, 65 + i % 26), 0)
+        submit_cost = time.perf_counter() - start
+        assert dispatcher.wait_idle(10.0)
+        total_cost = time.perf_counter() - start
+    finally:
+        dispatcher.stop()
+    assert len(backend.events) == count * 2
+    latencies = np.array(dispatcher.latencies) * 1000
+    logger.info("submit %.2f us/event, dispatch %.0f events/s, latency p50 %.3f ms, p99 %.3f ms",
+                submit_cost / count / 2 * 1e6, count * 2 / total_cost,
+                np.percentile(latencies, 50), np.percentile(latencies, 99))
+
+    # 定时事件的延迟
+    dispatcher, backend = _dispatcher()
+    try:
+        for i in range(50):
+            dispatcher.press(_key(input_dispatch.KEY_DOWN, 65), _key(input_dispatch.KEY_UP, 65), 0.005)
+        assert dispatcher.wait_idle(5.0)
+    finally:
+        dispatcher.stop()
+    latencies = np.array(dispatcher.latencies) * 1000
+    logger.info("timed latency p50 %.3f ms, p99 %.3f ms, max %.3f ms",
+                np.percentile(latencies, 50), np.percentile(latencies, 99), latencies.max())
@@ -0,0 +1,101 @@
+import logging
+
+import cv2
+import numpy as np
+
+from src.core.ocr_gate import OcrGate
+from src.core.regions import RapidocrPosition, TextPosition
+
+logger = logging.getLogger(__name__)
+
+
+class FakeOcr:
+    """ 识别图片中的白色矩形，文本为矩形的宽度 """
+
+    def __init__(self):
+        self.calls: list[tuple[int, int]] = []
+
+    def __call__(self, img: np.ndarray) -> list[TextPosition]:
+        self.calls.append(img.shape[:2])
+        mask = (img[..., 0] == 255).astype(np.uint8)
+        count, _, stats, _ = cv2.connectedComponentsWithStats(mask)
+        results = []
+        for i in range(1, count):
+            x, y, w, h = stats[i][:4]
+            results.append(RapidocrPosition.build(x1=x, y1=y, x2=x + w, y2=y + h, confidence=1.0, text=str(w)))
+        return sorted(results, key=lambda r: (r.y1, r.x1))
+
+
+def _img(*boxes: tuple[int, int, int, int]) -> np.ndarray:
+    img = np.zeros((720, 1280, 3), dtype=np.uint8)
+    for x1, y1, x2, y2 in boxes:
+        img[y1:y2, x1:x2] = 255
+    return img
+
+
+def _sorted(results: list[TextPosition]) -> list[TextPosition]:
+    return sorted(results, key=lambda r: (r.y1, r.x1))
+
+
+def test_ocr_gate_skip():
+    ocr = FakeOcr()
+    gate = OcrGate(ocr, full_interval=3)
+    img = _img((100, 100, 200, 130), (900, 600, 1000, 620))
+    first = gate.ocr(img)
+    assert len(first) == 2
+    assert gate.ocr(img.copy()) == first
+    assert gate.ocr(img.copy()) == first
+    assert len(ocr.calls) == 1
+    assert gate.skipped_count == 2
+    # 达到强制整图识别次数
+    gate.ocr(img.copy())
+    assert gate.full_count == 1
+    gate.ocr(img.copy())
+    assert gate.full_count == 2
+    logger.debug(gate.stats())
+
+
+def test_ocr_gate_partial():
+    ocr = FakeOcr()
+    gate = OcrGate(ocr)
+    gate.ocr(_img((100, 100, 200, 130), (900, 600, 1000, 620)))
+    # 右下角文字变长，左上角不变
+    img = _img((100, 100, 200, 130), (900, 600, 1050, 620))
+    results = gate.ocr(img)
+    assert gate.partial_count == 1
+    assert ocr.calls[-1][0] < 720 / 2  # 只识别了变化区域
+    assert _sorted(results) == FakeOcr()(img)
+
+    # 新文字出现在空白区域
+    img = _img((100, 100, 200, 130), (900, 600, 1050, 620), (500, 300, 560, 320))
+    results = gate.ocr(img)
+    assert gate.partial_count == 2
+    assert _sorted(results) == FakeOcr()(img)
+
+
+def test_ocr_gate_full():
+    ocr = FakeOcr()
+    gate = OcrGate(ocr, full_ratio=0.5)
+    gate.ocr(_img((100, 100, 200, 130)))
+    img = np.full((720, 1280, 3), 128, dtype=np.uint8)
+    img[100:130, 100:200] = 255
+    assert _sorted(gate.ocr(img)) == FakeOcr()(img)
+    assert gate.full_count == 2
+    assert gate.partial_count == 0
+
+
+def test_ocr_gate_gradual():
+    """ 逐帧变化都低于阈值，累积超过阈值后应重新识别 """
+    ocr = FakeOcr()
+    gate = OcrGate(ocr, full_interval=0)
+    gate.ocr(_img((100, 100, 200, 130)))
+    for level in range(5, 60, 5):
+        img = _img((100, 100, 200, 130))
+        img[400:500, 600:800] = level
+        gate.ocr(img)
+    assert len(ocr.calls) > 1
+    assert gate.partial_count >= 1
+    # 重新识别后以新的画面为基准，不再重复识别
+    count = len(ocr.calls)
+    gate.ocr(img.copy())
+    assert len(ocr.calls) == count
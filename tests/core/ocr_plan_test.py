@@ -0,0 +1,96 @@
+import logging
+
+import cv2
+import numpy as np
+
+from src.core.ocr_gate import OcrGate
+from src.core.ocr_plan import OcrRegionPlanner, planned_ocr, merge_rects
+from src.core.pages import Page, TextMatch
+from src.core.regions import DynamicPosition, RapidocrPosition, TextPosition
+
+logger = logging.getLogger(__name__)
+
+
+def fake_ocr(img: np.ndarray) -> list[TextPosition]:
+    """ 识别图片中的白色矩形，文本为矩形的宽度 """
+    fake_ocr.areas.append(img.shape[0] * img.shape[1])
+    mask = (img[..., 0] == 255).astype(np.uint8)
+    count, _, stats, _ = cv2.connectedComponentsWithStats(mask)
+    results = []
+    for i in range(1, count):
+        x, y, w, h = stats[i][:4]
+        results.append(RapidocrPosition.build(x1=x, y1=y, x2=x + w, y2=y + h, confidence=1.0, text=str(w)))
+    return sorted(results, key=lambda r: (r.y1, r.x1))
+
+
+fake_ocr.areas = []
+
+
+def _page(name: str, *rates: tuple[float, float, float, float] | None) -> Page:
+    return Page(
+        name=name,
+        targetTexts=[
+            TextMatch(name=f"{name}-{i}", text=r"^\d+$", position=DynamicPosition(rate=rate) if rate else None)
+            for i, rate in enumerate(rates)
+        ],
+    )
+
+
+def _img() -> np.ndarray:
+    img = np.zeros((720, 1280, 3), dtype=np.uint8)
+    img[20:50, 20:120] = 255  # 左上
+    img[660:690, 1100:1240] = 255  # 右下
+    img[340:380, 600:700] = 255  # 中间，不在任何区域内
+    return img
+
+
+def test_merge_rects():
+    assert merge_rects([(0, 0, 10, 10), (5, 5, 20, 20), (30, 30, 40, 40)]) == [(0, 0, 20, 20), (30, 30, 40, 40)]
+
+
+def test_planner():
+    planner = OcrRegionPlanner()
+    top_left = (0.0, 0.0, 0.2, 0.1)
+    bottom_right = (0.8, 0.85, 1.0, 1.0)
+    pages = [_page("a", top_left), _page("b", bottom_right, top_left)]
+    assert planner.plan(pages) == (top_left, bottom_right, top_left)
+    assert planner.plan(pages) is planner.plan(pages)
+    # 未限定区域的文本，整图识别
+    assert planner.plan(pages + [_page("c", None)]) is None
+    # 区域过大，整图识别
+    assert planner.plan([_page("d", (0.0, 0.0, 1.0, 0.9))]) is None
+
+
+def test_planned_ocr():
+    img = _img()
+    pages = [_page("a", (0.0, 0.0, 0.2, 0.1)), _page("b", (0.8, 0.85, 1.0, 1.0))]
+    regions = OcrRegionPlanner().plan(pages)
+    fake_ocr.areas.clear()
+    results = planned_ocr(fake_ocr, img, regions)
+    assert fake_ocr.areas[0] < 1280 * 720 / 4
+    full_results = fake_ocr(img)
+    assert results == [full_results[0], full_results[2]]
+    for page in pages:
+        assert page.is_match(img, img, results)
+    assert planned_ocr(fake_ocr, img, None) == full_results
+
+
+def test_ocr_gate_regions():
+    img = _img()
+    regions = OcrRegionPlanner().plan([_page("a", (0.0, 0.0, 0.2, 0.1)), _page("b", (0.8, 0.85, 1.0, 1.0))])
+    gate = OcrGate(fake_ocr)
+    results = gate.ocr(img, regions)
+    assert len(results) == 2
+    # 区域外的变化不触发识别
+    changed = img.copy()
+    changed[340:380, 600:760] = 255
+    assert gate.ocr(changed, regions) == results
+    assert gate.skipped_count == 1
+    # 区域内的变化局部识别
+    changed[20:50, 20:200] = 255
+    results = gate.ocr(changed, regions)
+    assert gate.partial_count == 1
+    assert sorted(i.text for i in results) == ["140", "180"]
+    # 区域变化时重新识别
+    gate.ocr(changed, None)
+    assert gate.full_count == 2
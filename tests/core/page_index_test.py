@@ -0,0 +1,81 @@
+import logging
+import re
+
+import numpy as np
+
+from src.core import page_index
+from src.core.page_index import PageIndex, extract_anchors
+from src.core.pages import Page, TextMatch
+from src.core.regions import RapidocrPosition
+
+logger = logging.getLogger(__name__)
+
+
+def _ocr_results(*texts: str):
+    return [RapidocrPosition.build(x1=0, y1=i * 20, x2=100, y2=i * 20 + 10, confidence=1.0, text=text)
+            for i, text in enumerate(texts)]
+
+
+def _img():
+    return np.zeros((720, 1280, 3), dtype=np.uint8)
+
+
+def test_extract_anchors():
+    assert extract_anchors(r"^(活跃度|Activity)$") == {"活跃度", "activity"}
+    assert extract_anchors(r"(.*小时.*分钟后刷新|Resets\s*after\s*\d{1,2}h\s*\d{1,2}m)$") == {"分钟后刷新", "resets"}
+    assert extract_anchors(r"ab[cd]e{2,}f?") == {"ab"}
+    assert extract_anchors(r"(abc)+x") == {"abc"}
+    assert extract_anchors(r"(abc)?x") == {"x"}
+    assert extract_anchors(r"^\d+$") is None
+    assert extract_anchors(r"(abc|.*)") is None
+    assert extract_anchors(re.compile("Claim")) == {"claim"}
+
+
+def test_extract_anchors_necessary():
+    """ 正则匹配成功时，锚点必然出现在文本中 """
+    cases = [
+        (r"^(活跃度|Activity)$", ["活跃度", "ACTIVITY", "activity"]),
+        (r"(.*小时.*分钟后刷新|Resets\s*after\s*\d{1,2}h\s*\d{1,2}m)$", ["3小时20分钟后刷新", "Resets after 3h 2m"]),
+        (r"击败|Defeat(ed)?", ["已击败", "DEFEATED"]),
+    ]
+    for pattern, texts in cases:
+        anchors = extract_anchors(pattern)
+        for text in texts:
+            assert re.search(pattern, text, re.I)
+            assert any(anchor in text.lower() for anchor in anchors), (pattern, text)
+
+
+def test_page_index_candidates():
+    activity = Page(name="activity", targetTexts=[
+        TextMatch(name="活跃度", text=r"^(活跃度|Activity)$"),
+        TextMatch(name="领取", text=r"^(领取|Claim)$", must=False),
+    ])
+    terminal = Page(name="terminal", targetTexts=[TextMatch(name="终端", text=r"^(终端|Terminal)$")])
+    number = Page(name="number", targetTexts=[TextMatch(name="数字", text=r"^\d+$")])
+    pages = [activity, terminal, number]
+    index = PageIndex()
+
+    candidates = index.candidates(pages, _ocr_results("活跃度", "100"))
+    assert candidates == [activity, number]
+    assert activity.is_match(_img(), _img(), _ocr_results("活跃度", "100"))
+
+    assert index.candidates(pages, _ocr_results("TERMINAL")) == [terminal, number]
+    assert index.candidates(pages, []) == [number]
+
+
+def test_parser_unavailable(monkeypatch):
+    """ 正则解析器不可用或解析结果结构变化时，所有页面均为候选 """
+    activity = Page(name="activity", targetTexts=[TextMatch(name="活跃度", text=r"^(活跃度|Activity)$")])
+    terminal = Page(name="terminal", targetTexts=[TextMatch(name="终端", text=r"^(终端|Terminal)$")])
+    monkeypatch.setattr(page_index, "sre_parser", None)
+    assert extract_anchors(r"^(活跃度|Activity)$") is None
+    assert PageIndex().candidates([activity, terminal], _ocr_results("活跃度")) == [activity, terminal]
+
+    class ChangedParser:
+        @staticmethod
+        def parse(pattern, flags):
+            return [(page_index._BRANCH, "changed")]
+
+    monkeypatch.setattr(page_index, "sre_parser", ChangedParser)
+    assert extract_anchors(r"^(活跃度|Activity)$") is None
+    assert PageIndex().candidates([activity, terminal], _ocr_results("活跃度")) == [activity, terminal]
@@ -0,0 +1,80 @@
+import logging
+import threading
+import time
+
+import pytest
+
+from src.core import profiler
+from src.core.profiler import ProfileRequestWatcher, SamplingProfiler
+
+logger = logging.getLogger(__name__)
+
+
+def _busy_ocr(event: threading.Event):
+    while event.is_set():
+        sum(i * i for i in range(1000))
+
+
+def _idle_combat(event: threading.Event):
+    while event.is_set():
+        time.sleep(0.001)
+
+
+def _start_threads() -> threading.Event:
+    event = threading.Event()
+    event.set()
+    threading.Thread(target=_busy_ocr, args=(event,), name="OcrLoop", daemon=True).start()
+    threading.Thread(target=_idle_combat, args=(event,), name="CombatThread", daemon=True).start()
+    return event
+
+
+def test_sampling_profiler(tmp_path):
+    event = _start_threads()
+    try:
+        sampler = SamplingProfiler(interval=0.005).run_for(0.5)
+    finally:
+        event.clear()
+    assert sampler.sample_count > 20
+    lines = sampler.collapsed()
+    stacks = {line.rsplit(" ", 1)[0]: int(line.rsplit(" ", 1)[1]) for line in lines}
+    ocr = sum(count for stack, count in stacks.items()
+              if stack.startswith("OcrLoop;") and "profiler_test:_busy_ocr" in stack)
+    combat = sum(count for stack, count in stacks.items()
+                 if stack.startswith("CombatThread;") and "profiler_test:_idle_combat" in stack)
+    # 每次采样每个线程一个调用栈
+    assert ocr > sampler.sample_count * 0.8 and combat > sampler.sample_count * 0.8
+    assert not any("SamplingProfilerThread" in stack for stack in stacks)
+    path = sampler.dump(tmp_path / "boss.collapsed")
+    assert path.read_text(encoding="utf-8").splitlines() == lines
+    logger.info("\n%s", sampler.summary(5))
+
+
+def test_request_watcher(tmp_path):
+    profiler.request_profile(tmp_path, "AutoBoss", seconds=0.1)
+    watcher = ProfileRequestWatcher(tmp_path, "AutoBoss")
+    # 启动前的请求不处理
+    assert watcher.check() is None
+    time.sleep(0.02)
+    profiler.request_profile(tmp_path, "AutoPickup", seconds=0.1)
+    assert watcher.check() is None
+    profiler.request_profile(tmp_path, "AutoBoss", seconds=0.1, interval=0.005)
+    path = watcher.check()
+    assert path is not None and path.name.startswith("AutoBoss-") and path.suffix == ".collapsed"
+    assert watcher.profiler.sample_count > 5
+    assert watcher.check() is None
+
+
+@pytest.mark.benchmark
+def test_overhead():
+    """ 每次采样的耗时，折算为 100Hz 采样时占用的时间比例 """
+    event = _start_threads()
+    try:
+        sampler = SamplingProfiler()
+        n = 500
+        start = time.perf_counter()
+        for _ in range(n):
+            sampler.sample()
+        cost = (time.perf_counter() - start) / n
+    finally:
+        event.clear()
+    logger.info("sample cost: %.1f us, %.2f%% at 100 Hz", cost * 1e6, cost * 100 * 100)
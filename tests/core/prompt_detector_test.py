@@ -0,0 +1,106 @@
+import logging
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+from src.core.prompt_detector import PromptDetector, PromptOcrGate
+from src.core.regions import RapidocrPosition, TextPosition
+
+logger = logging.getLogger(__name__)
+
+# 1280x720 下拾取提示区域的大小
+_W, _H = 312, 260
+
+
+class FakeOcr:
+    """ 返回固定的物品名，记录调用次数 """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, img: np.ndarray) -> list[TextPosition]:
+        self.count += 1
+        return [RapidocrPosition.build(x1=60, y1=110, x2=160, y2=130, confidence=1.0, text="鸢尾花")]
+
+
+def _scene(seed: int, bright: bool = False) -> np.ndarray:
+    """ 模拟野外画面：平滑的随机色块，bright 为天空、雪地等大片亮色 """
+    rng = np.random.default_rng(seed)
+    small = rng.integers(0, 256, (6, 6, 3), dtype=np.uint8)
+    img = cv2.resize(small, (_W, _H), interpolation=cv2.INTER_CUBIC)
+    if bright:
+        img = np.clip(img // 8 + 220, 0, 255).astype(np.uint8)
+    return img
+
+
+def _prompt(img: np.ndarray, text: str = "Iris", y: int = 100) -> np.ndarray:
+    """ 半透明深色底 + 按键框 + 白色文字 """
+    img = img.copy()
+    box = img[y:y + 40, 20:290]
+    img[y:y + 40, 20:290] = (box * 0.3 + 20).astype(np.uint8)
+    cv2.rectangle(img, (28, y + 8), (50, y + 32), (255, 255, 255), 1)
+    cv2.putText(img, "F", (33, y + 27), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1, cv2.LINE_AA)
+    cv2.putText(img, text, (64, y + 27), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1, cv2.LINE_AA)
+    return img
+
+
+def test_detect():
+    detector = PromptDetector()
+    for seed in range(20):
+        for bright in (False, True):
+            scene = _scene(seed, bright)
+            assert not detector.detect(scene), (seed, bright, detector.last_ratio)
+            assert detector.detect(_prompt(scene)), (seed, bright, detector.last_ratio)
+
+
+def test_gate_skips_ocr():
+    ocr = FakeOcr()
+    gate = PromptOcrGate(ocr, recheck_interval=0)
+    # 奔跑中，画面一直变化，没有提示
+    for seed in range(30):
+        assert gate.ocr(_scene(seed)) == []
+    assert ocr.count == 0
+    # 提示出现并保持不变，复用识别结果
+    scene = _scene(100)
+    prompt = _prompt(scene)
+    for _ in range(20):
+        assert gate.ocr(prompt.copy())[0].text == "鸢尾花"
+    assert ocr.count == 1
+    # 文字变化时重新识别
+    gate.ocr(_prompt(scene, "Lotus"))
+    assert ocr.count == 2
+    # 提示消失后再出现，重新识别
+    assert gate.ocr(scene) == []
+    gate.ocr(prompt)
+    assert ocr.count == 3
+    logger.info(gate.stats())
+
+
+def test_gate_recheck_calibrate():
+    ocr = FakeOcr()
+    # 阈值过高，提示被判断为不存在
+    gate = PromptOcrGate(ocr, detector=PromptDetector(min_ratio=0.5), recheck_interval=0.05)
+    prompt = _prompt(_scene(1))
+    assert gate.ocr(prompt)  # 首次兜底识别
+    assert gate.ocr(prompt) == []
+    assert ocr.count == 1
+    time.sleep(0.06)
+    assert gate.ocr(prompt)
+    assert ocr.count == 2
+    gate.on_match()
+    assert gate.detector.min_ratio < 0.5
+    assert gate.detector.detect(prompt)
+
+
+@pytest.mark.benchmark
+def test_detect_cost():
+    detector = PromptDetector()
+    img = _prompt(_scene(1))
+    n = 500
+    start = time.perf_counter()
+    for _ in range(n):
+        detector.detect(img)
+    cost = (time.perf_counter() - start) / n
+    logger.info("prompt detect: %.3f ms per %dx%d region", cost * 1000, _W, _H)
@@ -0,0 +1,35 @@
+import logging
+
+import numpy as np
+
+from src.core import replay
+from src.core.contexts import Context
+from src.core.sessions import SessionWriter
+from src.service.replay_service import ReplayImgServiceImpl, ReplayWindowServiceImpl, RecordingControlService
+
+logger = logging.getLogger(__name__)
+
+
+def _record(path, count: int = 3):
+    with SessionWriter(path) as writer:
+        for i in range(count):
+            writer.write_frame(np.full((720, 1280, 3), i * 40, dtype=np.uint8))
+
+
+def test_replay_container(tmp_path):
+    path = tmp_path.joinpath("session.wwas")
+    _record(path)
+    container = replay.ReplayContainer.build(Context(), path)
+    assert isinstance(container.window_service(), ReplayWindowServiceImpl)
+    assert isinstance(container.img_service(), ReplayImgServiceImpl)
+    assert isinstance(container.control_service(), RecordingControlService)
+    assert container.window_service().get_client_wh() == (1280, 720)
+
+
+def test_replay_main(tmp_path):
+    """ 通过命令行入口回放，截图用完后正常结束 """
+    path = tmp_path.joinpath("session.wwas")
+    _record(path)
+    stats = replay.main([str(path), "--service", "auto_pickup_service"])
+    logger.info(stats)
+    assert stats.count >= 1
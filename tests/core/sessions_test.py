@@ -0,0 +1,52 @@
+import logging
+
+import numpy as np
+
+from src.core.sessions import SessionWriter, SessionReader
+
+logger = logging.getLogger(__name__)
+
+
+def _img(value: int) -> np.ndarray:
+    img = np.zeros((72, 128, 3), dtype=np.uint8)
+    img[:, :, 0] = value
+    img[10:20, 30:40] = 255 - value
+    return img
+
+
+def test_session_round_trip(tmp_path):
+    path = tmp_path.joinpath("session.wwas")
+    img_1, img_2 = _img(1), _img(2)
+    with SessionWriter(path) as writer:
+        writer.write_frame(img_1)
+        writer.write_frame(img_1)  # 帧总线复用的同一帧
+        writer.write_control("tap", ("E",), {"seconds": 0.1})
+        writer.write_frame(img_2[0:36, 0:64], region=(0.0, 0.0, 0.5, 0.5))
+        assert writer.frame_count == 2
+        assert writer.screenshot_count == 3
+
+    with SessionReader(path) as reader:
+        logger.debug("frames: %s, controls: %s", reader.frames, reader.controls)
+        assert len(reader) == 3
+        assert reader.frames[0].frame_id == reader.frames[1].frame_id
+        assert reader.read(reader.frames[0]) is reader.read(reader.frames[1])
+        assert np.array_equal(reader.read(reader.frames[0]), img_1)
+        assert reader.frames[2].region == (0.0, 0.0, 0.5, 0.5)
+        assert np.array_equal(reader.read(reader.frames[2]), img_2[0:36, 0:64])
+        assert reader.controls[0].name == "tap"
+        assert reader.controls[0].args == ["E"]
+        assert reader.controls[0].kwargs == {"seconds": 0.1}
+        assert reader.frames[0].t <= reader.controls[0].t <= reader.frames[2].t
+
+
+def test_session_truncated(tmp_path):
+    path = tmp_path.joinpath("session.wwas")
+    with SessionWriter(path) as writer:
+        writer.write_frame(_img(1))
+        writer.write_frame(_img(2))
+    data = path.read_bytes()
+    path.write_bytes(data[:-10])  # 模拟进程被强制结束
+
+    with SessionReader(path) as reader:
+        assert len(reader) == 1
+        assert np.array_equal(reader.read(reader.frames[0]), _img(1))
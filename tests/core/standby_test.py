@@ -0,0 +1,63 @@
+import logging
+import time
+from multiprocessing import Process, Queue
+
+from src.core.standby import StandbyProcess
+
+logger = logging.getLogger(__name__)
+
+WARMUP_SECONDS = 0.5
+_warm = False
+
+
+def _warmup(**kwargs):
+    """ 模拟导入模块、加载模型 """
+    global _warm
+    time.sleep(WARMUP_SECONDS)
+    _warm = True
+
+
+def _task(queue: Queue, **kwargs):
+    queue.put((time.monotonic(), _warm, kwargs.get("GAME_PATH")))
+
+
+def _cold_task(queue: Queue, **kwargs):
+    _warmup(**kwargs)
+    _task(queue, **kwargs)
+
+
+def test_standby_activate():
+    queue = Queue()
+    standby = StandbyProcess(_task, _warmup, args=(queue,), kwargs={"GAME_PATH": "old"}, name="Test", daemon=True)
+    standby.start()
+    assert standby.wait_ready(10)
+    start = time.monotonic()
+    process = standby.activate({"GAME_PATH": "new", "LOG_QUEUE": object()})
+    started_at, warm, game_path = queue.get(timeout=10)
+    process.join(10)
+    standby_cost = started_at - start
+    assert warm and game_path == "new"
+
+    start = time.monotonic()
+    process = Process(target=_cold_task, args=(queue,), kwargs={"GAME_PATH": "new"}, daemon=True)
+    process.start()
+    started_at, warm, _ = queue.get(timeout=10)
+    process.join(10)
+    cold_cost = started_at - start
+    logger.info("task start after restart: standby %.1f ms, new process %.1f ms", standby_cost * 1000,
+                cold_cost * 1000)
+    assert cold_cost >= WARMUP_SECONDS
+
+
+def test_standby_cancel():
+    queue = Queue()
+    standby = StandbyProcess(_task, _warmup, args=(queue,), name="Test", daemon=True).start()
+    standby.cancel(10)
+    assert not standby.is_alive()
+    assert queue.empty()
+
+    # 预热未完成时也可关闭
+    standby = StandbyProcess(_task, _warmup, args=(queue,), name="Test", daemon=True).start()
+    standby.cancel(0)
+    standby.process.join(10)
+    assert not standby.is_alive()
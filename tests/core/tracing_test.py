@@ -0,0 +1,149 @@
+import json
+import logging
+import os
+import time
+
+import pytest
+
+from src.core import tracing
+from src.core.tracing import Tracer
+
+logger = logging.getLogger(__name__)
+
+
+def test_disabled():
+    tracer = Tracer()
+    with tracer.span("ocr"):
+        pass
+    assert tracer.events()[1:] == []
+    assert tracer.dump() is None
+
+
+def test_span_export(tmp_path):
+    tracer = Tracer(capacity=100)
+    tracer.configure(True, directory=tmp_path, process_name="AutoBoss")
+    with tracer.span("tick", "tick"):
+        with tracer.span("screenshot"):
+            time.sleep(0.002)
+        with tracer.span("page.is_match", args={"page": "Boss"}):
+            pass
+    try:
+        with tracer.span("page.action"):
+            raise ValueError()
+    except ValueError:
+        pass
+
+    path = tracer.dump(reason="test")
+    with open(path, encoding="utf-8") as f:
+        trace = json.load(f)
+    assert trace["metadata"]["reason"] == "test"
+    spans = {i["name"]: i for i in trace["traceEvents"] if i["ph"] == "X"}
+    assert set(spans) == {"tick", "screenshot", "page.is_match", "page.action"}
+    tick, screenshot = spans["tick"], spans["screenshot"]
+    # 子阶段在本轮范围内，时间单位为微秒
+    assert tick["ts"] <= screenshot["ts"] and screenshot["ts"] + screenshot["dur"] <= tick["ts"] + tick["dur"]
+    assert screenshot["dur"] >= 2000
+    assert spans["page.is_match"]["args"] == {"page": "Boss"}
+    assert spans["page.action"]["args"] == {"error": "ValueError"}
+    names = [i["args"]["name"] for i in trace["traceEvents"] if i["ph"] == "M"]
+    assert "AutoBoss" in names and "MainThread" in names
+
+
+def test_ring_buffer():
+    tracer = Tracer(capacity=10)
+    tracer.configure(True)
+    for i in range(25):
+        with tracer.span(f"span-{i}"):
+            pass
+    names = [i["name"] for i in tracer.events() if i["ph"] == "X"]
+    assert names == [f"span-{i}" for i in range(15, 25)]
+
+
+def test_request_dump(tmp_path):
+    tracing.request_dump(tmp_path)
+    tracer = Tracer()
+    # 开启前的请求不处理
+    tracer.configure(True, directory=tmp_path, process_name="AutoPickup")
+    with tracer.span("tick"):
+        pass
+    assert tracer.poll() is None
+    time.sleep(0.02)
+    tracing.request_dump(tmp_path)
+    tracer._next_check = 0.0
+    path = tracer.poll()
+    assert path is not None and path.name.startswith("AutoPickup-")
+    # 同一请求只导出一次
+    tracer._next_check = 0.0
+    assert tracer.poll() is None
+
+
+def test_dump_on_error(tmp_path):
+    """ 每轮都截图失败时不重复导出 """
+    tracer = Tracer(error_dump_interval=60.0)
+    tracer.configure(True, directory=tmp_path, process_name="AutoPickup")
+    with tracer.span("tick"):
+        pass
+    assert tracer.dump_error(ValueError("screenshot")) is not None
+    for _ in range(5):
+        assert tracer.dump_error(ValueError("screenshot")) is None
+    assert len(list(tmp_path.glob("*.json"))) == 1
+    tracer._last_error_dump -= 60.0
+    path = tracer.dump_error(ValueError("screenshot"))
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f)["metadata"]["reason"] == "error: ValueError: screenshot, suppressed: 5"
+
+
+def test_prune(tmp_path):
+    tracer = Tracer()
+    tracer.configure(True, directory=tmp_path, process_name="AutoBoss")
+    with tracer.span("tick"):
+        pass
+    paths = [tracer.dump(tmp_path.joinpath(f"{i}.json")) for i in range(3)]
+    for i, path in enumerate(paths):
+        os.utime(path, (time.time() - 100 + i, time.time() - 100 + i))
+    size = paths[0].stat().st_size
+    tracer.max_total_bytes = size * 3 + size // 2
+    paths.append(tracer.dump(tmp_path.joinpath("3.json")))
+    assert sorted(i.name for i in tmp_path.glob("*.json")) == ["1.json", "2.json", "3.json"]
+    # 上限小于单个文件时保留刚导出的文件
+    tracer.max_total_bytes = 1
+    tracer.dump(tmp_path.joinpath("4.json"))
+    assert [i.name for i in tmp_path.glob("*.json")] == ["4.json"]
+
+
+def test_traced():
+    @tracing.traced("search_echo")
+    def search_echo():
+        return 1
+
+    assert search_echo() == 1
+    assert not tracing.TRACER._events
+    tracing.configure(True)
+    try:
+        assert search_echo() == 1
+        assert [i["name"] for i in tracing.TRACER.events() if i["ph"] == "X"] == ["search_echo"]
+    finally:
+        tracing.configure(False)
+        tracing.TRACER.clear()
+
+
+@pytest.mark.benchmark
+def test_overhead():
+    """ 每轮约50个阶段，相比几十毫秒的一轮可忽略 """
+    tracer = Tracer()
+    n = 50_000
+    start = time.perf_counter()
+    for _ in range(n):
+        with tracer.span("ocr"):
+            pass
+    disabled_cost = (time.perf_counter() - start) / n
+    tracer.configure(True)
+    start = time.perf_counter()
+    for _ in range(n):
+        with tracer.span("page.is_match", args={"page": "Boss"}):
+            pass
+    enabled_cost = (time.perf_counter() - start) / n
+    tick_seconds = 0.05
+    logger.info("span cost: disabled %.2f us, enabled %.2f us, 50 spans per %d ms tick: %.3f%%",
+                disabled_cost * 1e6, enabled_cost * 1e6, tick_seconds * 1000,
+                50 * enabled_cost / tick_seconds * 100)
@@ -18,13 +18,13 @@ except Exception as e:
 from src.core.contexts import Context
 from src.core.injector import Container
 from src.core.interface import ControlService, OCRService, ODService, ImgService, WindowService
+from src.core.metrics import timed
 from src.core.pages import Page, TextMatch
 from src.core.regions import RapidocrPosition
 from src.service.auto_boss_service import AutoBossServiceImpl
 from src.service.daily_activity_service import DailyActivityServiceImpl
 from src.service.page_event_service import PageEventAbstractService
 from src.util import hwnd_util, img_util, file_util, rapidocr_util, screenshot_util
-from src.util.wrap_util import timeit
 
 logger = logging.getLogger(__name__)
 
@@ -95,7 +95,7 @@ def _test_ui_page(page, engine):
             __test_ui_page(page, engine, img_name)
 
 
-@timeit
+@timed
 def __test_ui_page(page, engine, img_name):
     logger.debug("img_name: %s", img_name)
     img = img_util.read_img(file_util.get_assets_screenshot(img_name))
@@ -0,0 +1,68 @@
+import logging
+import time
+
+import numpy as np
+import pytest
+
+from src.core.exceptions import ReplayFinishedError
+from src.core.sessions import SessionWriter, SessionReader
+from src.service.replay_service import ReplayImgServiceImpl, ReplayWindowServiceImpl, RecordingControlService
+
+logger = logging.getLogger(__name__)
+
+
+def _record(path, count: int = 3, interval: float = 0.0):
+    with SessionWriter(path) as writer:
+        control_service = RecordingControlService(None, writer)
+        for i in range(count):
+            img = np.full((720, 1280, 3), i, dtype=np.uint8)
+            writer.write_frame(img)
+            control_service.player().tap("E")
+            time.sleep(interval)
+
+
+def test_replay_unthrottled(tmp_path):
+    path = tmp_path.joinpath("session.wwas")
+    _record(path)
+    img_service = ReplayImgServiceImpl.open(path)
+    window_service = ReplayWindowServiceImpl(img_service.session_reader)
+    assert window_service.get_client_wh() == (1280, 720)
+    assert window_service.get_ratio() == 1.0
+
+    assert img_service.screenshot()[0, 0, 0] == 0
+    crop = img_service.screenshot((0.5, 0.5, 1.0, 1.0))
+    assert crop.shape == (360, 640, 3)
+    assert crop[0, 0, 0] == 1
+    assert img_service.get_frame().img[0, 0, 0] == 2
+    with pytest.raises(ReplayFinishedError):
+        img_service.screenshot()
+
+
+def test_replay_realtime(tmp_path):
+    path = tmp_path.joinpath("session.wwas")
+    _record(path, count=3, interval=0.1)
+    img_service = ReplayImgServiceImpl(SessionReader(path), realtime=True)
+    values = []
+    start_time = time.monotonic()
+    with pytest.raises(ReplayFinishedError):
+        while True:
+            values.append(int(img_service.screenshot()[0, 0, 0]))
+            time.sleep(0.02)
+    elapsed = time.monotonic() - start_time
+    logger.debug("values: %s, elapsed: %.3f", values, elapsed)
+    assert values[0] == 0
+    assert values[-1] == 2
+    assert values == sorted(values)
+    assert elapsed >= 0.2
+
+
+def test_recording_control_service(tmp_path):
+    path = tmp_path.joinpath("session.wwas")
+    _record(path, count=2)
+    with SessionReader(path) as reader:
+        assert [i.name for i in reader.controls] == ["tap", "tap"]
+        assert reader.controls[0].args == ["E"]
+
+    control_service = RecordingControlService(None, None)
+    assert control_service.game().activate() is None
+    assert control_service.calls == [("activate", (), {})]
@@ -19,8 +19,8 @@ try:
 except Exception as e:
     raise e
 
+from src.core.metrics import timed
 from src.util import file_util, img_util, hwnd_util, rapidocr_util, screenshot_util, yolo_util
-from src.util.wrap_util import timeit
 
 logger = logging.getLogger(__name__)
 
@@ -260,7 +260,7 @@ def yyy_test(img, model):
     logger.debug("总耗时: %s", use_time)
 
 
-@timeit
+@timed
 def _time_use_test_rapidocr(engine, img):
     output: RapidOCROutput = engine(img, use_det=True, use_rec=True, use_cls=False)
 
@@ -0,0 +1,61 @@
+import logging
+import time
+
+import numpy as np
+import pytest
+
+from src.util import timer_util
+
+logger = logging.getLogger(__name__)
+
+
+def test_configure():
+    mode = timer_util.get_mode()
+    try:
+        timer_util.configure(timer_util.MODE_SPIN, 0.001)
+        assert timer_util.get_mode() == timer_util.MODE_SPIN
+        with pytest.raises(ValueError):
+            timer_util.configure("unknown")
+        with pytest.raises(ValueError):
+            timer_util.configure(timer_util.MODE_HYBRID, -1)
+    finally:
+        timer_util.configure(mode)
+
+
+def test_sleep_until():
+    for mode in timer_util.MODES:
+        deadline = time.perf_counter() + 0.01
+        timer_util.sleep_until(deadline, mode)
+        assert time.perf_counter() >= deadline
+
+
+def test_sleep_until_past(monkeypatch):
+    """ 已过截止时间立即返回，不睡眠 """
+
+    def fail(seconds):
+        raise AssertionError(seconds)
+
+    monkeypatch.setattr(timer_util.time, "sleep", fail)
+    for mode in timer_util.MODES:
+        timer_util.sleep_until(time.perf_counter() - 1, mode)
+        timer_util.sleep(0, mode)
+
+
+@pytest.mark.benchmark
+def test_timer_benchmark():
+    """ 各模式的超时分布与CPU占用 """
+    durations = [0.001, 0.005, 0.02, 0.05]
+    repeat = 20
+    for mode in timer_util.MODES:
+        overshoots = []
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        for _ in range(repeat):
+            for seconds in durations:
+                start = time.perf_counter()
+                timer_util.sleep(seconds, mode)
+                overshoots.append((time.perf_counter() - start - seconds) * 1000)
+        cpu_ratio = (time.process_time() - cpu_start) / (time.perf_counter() - wall_start)
+        overshoots = np.array(overshoots)
+        logger.info("%-6s overshoot p50: %.3fms, p95: %.3fms, p99: %.3fms, max: %.3fms, cpu: %.0f%%",
+                    mode, *np.percentile(overshoots, [50, 95, 99]), overshoots.max(), cpu_ratio * 100)
@@ -1,6 +1,11 @@
 import logging
+import time
 from pathlib import Path
 
+import cv2
+import numpy as np
+import pytest
+
 from src.util import file_util, img_util, yolo_util, screenshot_util, hwnd_util
 
 logger = logging.getLogger(__name__)
@@ -220,4 +225,132 @@ def test_search_echo_from_local_dir_sort():
         img_util.save_img(img, str((target_folder_draw / png_file.name).absolute()))
 
 
-
+def _postprocess_loop(input_shape, img_shape, output, confidence_thres, iou_thres, ratio, pad):
+    """逐行处理的后处理实现，用于对照向量化实现的结果与耗时"""
+    outputs = np.transpose(np.squeeze(output[0]))
+    boxes, scores, class_ids = [], [], []
+    scale_ratio = ratio[0]
+    pad_w, pad_h = pad
+    for i in range(outputs.shape[0]):
+        classes_scores = outputs[i][4:]
+        max_score = np.amax(classes_scores)
+        if max_score >= confidence_thres:
+            class_id = np.argmax(classes_scores)
+            x, y, w, h = outputs[i][0], outputs[i][1], outputs[i][2], outputs[i][3]
+            x_adj = (x - pad_w) / scale_ratio
+            y_adj = (y - pad_h) / scale_ratio
+            w_adj = w / scale_ratio
+            h_adj = h / scale_ratio
+            class_ids.append(class_id)
+            scores.append(max_score)
+            boxes.append([int(x_adj - w_adj / 2), int(y_adj - h_adj / 2), int(w_adj), int(h_adj)])
+    if len(boxes) == 0:
+        return [], [], []
+    indices = cv2.dnn.NMSBoxes(boxes, scores, confidence_thres, iou_thres)
+    return [boxes[i] for i in indices], [scores[i] for i in indices], [class_ids[i] for i in indices]
+
+
+def _fake_outputs(seed: int, num_classes: int = 1, num_boxes: int = 8400, num_objects: int = 3):
+    """模拟YOLOv8输出 (1, 4 + 类别数, 8400)：大部分低置信度，少量目标周围聚集多个高置信度框"""
+    rng = np.random.default_rng(seed)
+    output = np.empty((4 + num_classes, num_boxes), dtype=np.float32)
+    output[0:2] = rng.uniform(0, 640, (2, num_boxes))
+    output[2:4] = rng.uniform(10, 120, (2, num_boxes))
+    output[4:] = rng.uniform(0, 0.3, (num_classes, num_boxes))
+    for _ in range(num_objects):
+        center = rng.uniform(100, 540, 2)
+        idx = rng.choice(num_boxes, 40, replace=False)
+        output[0:2, idx] = (center[:, None] + rng.normal(0, 4, (2, 40))).astype(np.float32)
+        output[2:4, idx] = rng.uniform(60, 80, (2, 40))
+        output[4 + rng.integers(num_classes), idx] = rng.uniform(0.5, 0.95, 40)
+    return [output[None]]
+
+
+def test_postprocess_vectorized():
+    input_shape = [1, 3, 640, 640]
+    img_shape = (720, 1280, 3)
+    ratio, pad = (0.5, 0.5), (0.0, 140.0)
+    for seed in range(10):
+        for num_classes in (1, 3):
+            outputs = _fake_outputs(seed, num_classes)
+            expected = _postprocess_loop(input_shape, img_shape, outputs, 0.5, 0.5, ratio, pad)
+            actual = yolo_util.postprocess(input_shape, img_shape, outputs, 0.5, 0.5, ratio, pad)
+            assert actual[0] == expected[0]
+            assert actual[1] == expected[1]
+            assert actual[2] == expected[2]
+    assert yolo_util.postprocess(input_shape, img_shape, _fake_outputs(0, num_objects=0), 0.5, 0.5, ratio, pad) \
+           == ([], [], [])
+
+
+@pytest.mark.benchmark
+def test_postprocess_benchmark():
+    input_shape = [1, 3, 640, 640]
+    img_shape = (720, 1280, 3)
+    ratio, pad = (0.5, 0.5), (0.0, 140.0)
+    outputs = [_fake_outputs(seed) for seed in range(20)]
+    # 若有录制的模型输出（np.save保存的 (1, 5, 8400) 数组），一并测试
+    recorded_dir = Path(__file__).parent.joinpath("data", "yolo_outputs")
+    if recorded_dir.is_dir():
+        outputs += [[np.load(i)] for i in recorded_dir.glob("*.npy")]
+
+    def bench(func) -> float:
+        start = time.perf_counter()
+        for output in outputs:
+            func(input_shape, img_shape, output, 0.5, 0.5, ratio, pad)
+        return (time.perf_counter() - start) * 1000 / len(outputs)
+
+    loop_ms = bench(_postprocess_loop)
+    vectorized_ms = bench(yolo_util.postprocess)
+    logger.info("postprocess loop: %.3fms, vectorized: %.3fms, speedup: %.1fx",
+                loop_ms, vectorized_ms, loop_ms / vectorized_ms)
+
+
+def test_session_registry():
+    created = []
+
+    def factory(model: yolo_util.Model):
+        time.sleep(0.05)  # 模拟创建会话耗时
+        created.append(model.name)
+        return object()
+
+    registry = yolo_util.SessionRegistry(session_factory=factory)
+    start = time.perf_counter()
+    registry.preload(yolo_util.MODEL_BOSS_ALL)
+    logger.info("preload cost: %.3fs", time.perf_counter() - start)
+    sessions = {model.name: registry.get(model) for model in yolo_util.MODEL_BOSS_ALL}
+    start = time.perf_counter()
+    for _ in range(1000):
+        for model in yolo_util.MODEL_BOSS_ALL:
+            assert registry.get(model) is sessions[model.name]
+    logger.info("switch cost: %.3fus", (time.perf_counter() - start) * 1e6 / 2000)
+    assert created == [model.name for model in yolo_util.MODEL_BOSS_ALL]
+    assert registry.create_count == len(yolo_util.MODEL_BOSS_ALL)
+
+    # 同一模型并发获取只创建一次
+    import threading
+    registry.clear()
+    created.clear()
+    threads = [threading.Thread(target=registry.get, args=(yolo_util.MODEL_BOSS_V20,)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert created == [yolo_util.MODEL_BOSS_V20.name]
+
+
+def test_session_registry_evict(tmp_path: Path):
+    models = []
+    for i in range(3):
+        path = tmp_path.joinpath(f"model_{i}.onnx")
+        path.write_bytes(b"0" * 1024 * 1024)
+        models.append(yolo_util.Model(f"model_{i}", str(path), 0.5, 0.5, {0: "echo"}, []))
+    registry = yolo_util.SessionRegistry(max_memory_mb=2, session_factory=lambda model: object())
+    registry.get(models[0])
+    registry.get(models[1])
+    registry.get(models[0])  # models[1] 最久未使用
+    registry.get(models[2])
+    assert registry.contains(models[0])
+    assert not registry.contains(models[1])
+    assert registry.contains(models[2])
+    assert registry.evict_count == 1
+    assert registry.memory_bytes == 2 * 1024 * 1024